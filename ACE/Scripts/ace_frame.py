@@ -0,0 +1,171 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       ace_frame.py: read an ace archive into a column frame which is      #
+#                     shared by the ace scripts                             #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- an ace archive (ace_12h_archive, ace_7day_archive) line is:
+#---    <yyyy> <mm> <dd> <hhmm> <mjd> <day secs> <e status> <e38-53> <e175-315>
+#---    <p status> <p47-68> <p115-195> <p310-580> <p795-1193> <p1060-1900> <aniso>
+#--- a frame is a dictionary of:
+#---    lines   --- a list of the data lines (white spaces are stripped)
+#---    rows    --- a list of the lists of the white space separated fields of the lines
+#---    utc     --- numpy datetime64[m] array of the line times
+#---    secs    --- numpy int array of the line times in seconds from 1998.1.1
+#---    <name>  --- numpy float array of each column; the names are in ace_columns
+#--- the lines without a readable time (e.g. empty lines) are not in the frame.
+#
+import sys
+import re
+import unittest
+import numpy
+#
+#--- vectorized time conversion
+#
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
+import time_convert as tcnv
+#
+#--- column names of the archive
+#
+ace_columns = ['year', 'month', 'day', 'hhmm', 'mjd', 'daysecs',\
+               'electron_status', 'electron38-53', 'electron175-315',\
+               'proton_status', 'proton47-68', 'proton115-195', 'proton310-580',\
+               'proton795-1193', 'proton1060-1900', 'aniso']
+
+#----------------------------------------------------------------------------------
+#-- read_archive: read an ace archive into a frame                               --
+#----------------------------------------------------------------------------------
+
+def read_archive(ifile):
+    """
+    read an ace archive into a frame
+    input:  ifile   --- archive file name
+    output: frame   --- a dictionary of the columns (see above)
+    """
+    with open(ifile) as f:
+        data = [line.strip() for line in f.readlines()]
+
+    return make_frame(data)
+
+#----------------------------------------------------------------------------------
+#-- make_frame: convert data lines into a frame                                  --
+#----------------------------------------------------------------------------------
+
+def make_frame(data):
+    """
+    convert ace data lines into a frame
+    input:  data    --- a list of data lines
+    output: frame   --- a dictionary of the columns (see above)
+    """
+    rows  = [re.split(r'\s+', ent.strip()) for ent in data]
+    utc   = line_times(rows)
+    keep  = ~numpy.isnat(utc)
+    pos   = numpy.nonzero(keep)[0].tolist()
+
+    frame = {}
+    frame['lines'] = [data[k].strip() for k in pos]
+    frame['rows']  = [rows[k] for k in pos]
+    frame['utc']   = utc[keep]
+    uts            = frame['utc'].astype('datetime64[s]').astype(numpy.int64).astype(float)
+    frame['secs']  = tcnv.uts_to_secs(uts).astype(numpy.int64)
+
+    vals = column_values(frame['rows'])
+    for k in range(0, len(ace_columns)):
+        frame[ace_columns[k]] = vals[:, k]
+
+    return frame
+
+#----------------------------------------------------------------------------------
+#-- line_times: find the times of the data lines                                 --
+#----------------------------------------------------------------------------------
+
+def line_times(rows):
+    """
+    find the times of the data lines
+    input:  rows    --- a list of the lists of the fields
+    output: utc     --- numpy datetime64[m] array; NaT if the time cannot be read
+    """
+    tstr = []
+    for atemp in rows:
+        if len(atemp) < 4 or len(atemp[3]) != 4:
+            tstr.append('NaT')
+        else:
+            tstr.append(atemp[0] + '-' + atemp[1] + '-' + atemp[2] + 'T'\
+                        + atemp[3][0:2] + ':' + atemp[3][2:4])
+#
+#--- convert all at once; if some of them are broken, convert them one by one
+#
+    try:
+        return numpy.array(tstr, dtype='datetime64[m]')
+    except ValueError:
+        utc = numpy.full(len(tstr), numpy.datetime64('NaT'), dtype='datetime64[m]')
+        for k in range(0, len(tstr)):
+            try:
+                utc[k] = numpy.datetime64(tstr[k], 'm')
+            except ValueError:
+                continue
+
+        return utc
+
+#----------------------------------------------------------------------------------
+#-- column_values: convert the fields into a float array                         --
+#----------------------------------------------------------------------------------
+
+def column_values(rows):
+    """
+    convert the fields of the data lines into a float array
+    input:  rows    --- a list of the lists of the fields
+    output: vals    --- (line x column) numpy array; nan if a field is missing or broken
+    """
+    ncol = len(ace_columns)
+    try:
+        vals = numpy.array([atemp[:ncol] for atemp in rows], dtype=float)
+        if vals.shape == (len(rows), ncol):
+            return vals
+    except ValueError:
+        pass
+
+    vals = numpy.full((len(rows), ncol), numpy.nan)
+    for k in range(0, len(rows)):
+        for m in range(0, min(ncol, len(rows[k]))):
+            try:
+                vals[k, m] = float(rows[k][m])
+            except ValueError:
+                continue
+
+    return vals
+
+#-----------------------------------------------------------------------------------------
+#-- TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST    ---
+#-----------------------------------------------------------------------------------------
+
+class TestFunctions(unittest.TestCase):
+
+    def test_make_frame(self):
+
+        data  = ['2021 03 16  0845   59289  31500     0   1.10e+03   2.20e+01     0'\
+                 + '   3.30e+03   4.40e+02   5.50e+01   6.60e+00   7.70e+00   -1.00',\
+                 '',\
+                 '2021 03 16  0850   59289  31800     0   1.20e+03   2.30e+01     1'\
+                 + '   3.40e+03   4.50e+02   5.60e+01   6.70e+00   7.80e+00']
+
+        frame = make_frame(data)
+
+        self.assertEqual(len(frame['lines']), 2)
+        self.assertEqual(frame['secs'].tolist(), [732271569, 732271869])
+        self.assertEqual(frame['proton_status'].tolist(), [0.0, 1.0])
+        self.assertEqual(frame['proton115-195'].tolist(), [440.0, 450.0])
+        self.assertTrue(numpy.isnan(frame['aniso'][1]))
+
+#-------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    unittest.main()
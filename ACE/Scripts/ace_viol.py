@@ -2,6 +2,7 @@
 import os
 import sys
 import argparse
+import ace_frame as afrm
 #
 #--- Define Globals
 #
@@ -13,31 +14,31 @@ ADMIN = 'mtadude@cfa.harvard.edu'
 ALERT = 'sot_ace_alert@cfa.harvard.edu'
 TMP_DIR = "/tmp/mta"
 
-def check_viol():
+def check_viol(frame=None):
     """
     Emails admins alert if ace data invalid for period of time
 
-    input:	<ace_dir>/Data/ace_12h_archive
-        <ace_dir>/Data/ace.archive
+    input:	frame: ace_12h_archive frame (see ace_frame.py); if not given,
+        read from <ace_dir>/Data/ace_12h_archive
     output:	Admin Email
         /tmp/mta/ace_viol.out
     """
     ifile = f"{ACE_DATA_DIR}/ace_12h_archive"
-    if not os.path.isfile(ifile):
+    if frame is None and os.path.isfile(ifile):
+        frame = afrm.read_archive(ifile)
+
+    if frame is None:
         content = f"Error: {ifile} not found\n"
         content += f"by script {__file__}.\n"
         content += f"Alerts depend on this file. Please Investigate.\n"
         content += f"This message was sent to {ADMIN}"
         send_mail("Missing ACE archive",content, ADMIN)
     else:
-        with open(f"{ACE_DATA_DIR}/ace_12h_archive") as f:
-            file_data = [line.strip() for line in f.readlines() if line != '']
-            file_data.reverse()
 #
 #--- Check only the time subsection of data which corresponds to
 #--- an ARCHIVE_LENGTH_LIM number of 5-min increments
 #
-        data = [line.split() for line in file_data[:ARCHIVE_LENGTH_LIM]]
+        data = frame['rows'][::-1][:ARCHIVE_LENGTH_LIM]
 #
 #--- If the entire data set is invalid, then email alert, otherwise proceed as normal
 #
@@ -4,22 +4,20 @@
 **alert_ace.py**: Run ACE alerts.
 
 :Author: W. Aaron (william.aaron@cfa.harvard.edu)
-:Last Updated: Mar 03, 2025
+:Last Updated: Oct 16, 2026
 
 """
 
 import os
 from email.mime.text import MIMEText
 from subprocess import Popen, PIPE
-from astropy.io import ascii
-from astropy.table import Column, unique
 import argparse
 from cxotime import CxoTime
-from datetime import datetime, timedelta
 import numpy as np
 import getpass
 import json
 import signal
+import ace_frame as afrm  #: Shared ACE archive frame.
 
 #
 # --- Define Directory Pathing and Globals
@@ -30,24 +28,6 @@ CRM_DATA_DIR = "/data/mta4/Space_Weather/CRM3/Data"
 COMM_DATA_DIR = "/data/mta4/Space_Weather/Comm_data/Data"
 SNAPSHOT_DIR = "/data/mta4/www/Snapshot"
 _ADMIN = "mtadude@cfa.harvard.edu"
-_INPUT_ACE_COLUMNS = [
-    "year",
-    "month",
-    "day",
-    "hhmm",
-    "mjd",
-    "daysecs",
-    "electron_status",
-    "electron38-53",
-    "electron175-315",
-    "proton_status",
-    "proton47-68",
-    "proton115-195",
-    "proton310-580",
-    "proton795-1193",
-    "proton1060-1900",
-    "aniso",
-]  #: For reading in ACE data file.
 _P3_CHANNEL = "proton115-195"  #: Channel selection for P3 alert.
 ACE_P3_LIMIT = 3.6e8  #: Fluence of 3.6e8 particles/cm2-ster-MeV within 2 hours.
 _DEFAULT_VIOLATION = {
@@ -56,31 +36,28 @@ _DEFAULT_VIOLATION = {
 _TESTMAIL = False
 
 
-def alert_ace():
+def alert_ace(frame=None):
     """
     Intake the last two hours worth of ACE data and calculate P3 fluence. If over the limit, send alert.
+
+    :param frame: ``ace_12h_archive`` frame (see ``ace_frame.py``), defaults to None (read the file).
+    :type frame: dict, optional
     """
     #
     # --- Source Data File
     #
-    data_file = f"{ACE_DATA_DIR}/ace_12h_archive"
-    ace_table = unique(ascii.read(data_file, names=_INPUT_ACE_COLUMNS))
-    cxotime_col = Column(
-        _convert_time_format(
-            ace_table["year"], ace_table["month"], ace_table["day"], ace_table["hhmm"]
-        ),
-        name="cxotime",
-    )
-    ace_table.add_column(cxotime_col)
-    two_hours_ago = ace_table["cxotime"][-1] - timedelta(hours=2)
-    sel = np.logical_and(
-        ace_table["cxotime"].data >= two_hours_ago, ace_table[_P3_CHANNEL] > 0
-    )
-    data_select = ace_table[sel]
-    if len(data_select) > 0:
+    if frame is None:
+        frame = afrm.read_archive(f"{ACE_DATA_DIR}/ace_12h_archive")
+    order = _unique_order(frame)
+    secs = frame["secs"][order]
+    p3 = frame[_P3_CHANNEL][order]
+    two_hours_ago = secs[-1] - 7200
+    sel = np.logical_and(secs >= two_hours_ago, p3 > 0)
+    if sel.any():
         p130f = (
-            np.mean(data_select[_P3_CHANNEL].data) * 7200
+            np.mean(p3[sel]) * 7200
         )  #: Calculates the fluence with available data.
+        last_time = CxoTime(float(secs[sel][-1]))
     else:
         p130f = -1e5 #: No valid data to send alert.
 
@@ -99,14 +76,14 @@ def alert_ace():
         else:
             curr_viol = _DEFAULT_VIOLATION
         if (
-            data_select[-1]["cxotime"].datetime
+            last_time.datetime
             - CxoTime(curr_viol["ace_p3"]["cxotime"]).datetime
         ).days > 1:
             #
             # --- Last alert was more than one day ago. Therefore this is a new alerting instance
             #
             curr_viol["ace_p3"] = {
-                "cxotime": int(data_select[-1]["cxotime"].secs),
+                "cxotime": int(last_time.secs),
                 "val": p130f,
             }
 
@@ -170,28 +147,19 @@ def send_mail(subject, recipients, text_body, cc=""):
         print(msg)
 
 
-@np.vectorize
-def _convert_time_format(year, month, day, hhmm):
-    """Converts separated ``numpy.ndarray`` containing date information into an array of ``CxoTime`` objects.
-
-    :param year: Four digit year
-    :type year: int
-    :param month: Month
-    :type month: int
-    :param day: Day
-    :type day: int
-    :param hhmm: Integer Combining Hours and Minutes
-    :type hhmm: int
-    :return: ``numpy.ndarray`` of ``CxoTime`` objects.
-    :rtype: ``numpy.ndarray(dtype = 'object')``
+def _unique_order(frame):
+    """Find the order of the distinct data rows, sorted by all columns (as ``astropy.table.unique``).
 
+    :param frame: ACE archive frame.
+    :type frame: dict
+    :return: Positions of the rows in the frame.
+    :rtype: ``numpy.ndarray``
     """
-    hh = hhmm // 100  #: hours in hundreds and thousands place
-    mm = hhmm % 100  #: minutes in tens and ones place
-    time = datetime.strptime(
-        f"{year:04}:{month:02}:{day:02}:{hh:02}:{mm:02}", "%Y:%m:%d:%H:%M"
-    )
-    return CxoTime(time, format="datetime")
+    vals = np.array([frame[col] for col in afrm.ace_columns])
+    order = np.lexsort(vals[::-1])
+    vals = vals[:, order]
+    first = np.concatenate([[True], (vals[:, 1:] != vals[:, :-1]).any(axis=0)])
+    return order[first]
 
 
 if __name__ == "__main__":
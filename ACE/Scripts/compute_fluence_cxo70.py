@@ -7,16 +7,17 @@
 #                                                                                   #
 #               author: t. isobe (tisobe@cfa.harvard.edu)                           #
 #                                                                                   #
-#               last updae: Mar 16, 2021                                            #
+#               last updae: Oct 16, 2026                                            #
 #                                                                                   #
 #####################################################################################
 
 import os
 import sys
 import re
-import time
+import numpy
 import Chandra.Time
 import argparse
+import ace_frame as afrm    #--- shared ace archive frame
 #
 #--- Define Directory Pathing
 #
@@ -34,12 +35,13 @@ CURRENT_CHANDRA_TIME = Chandra.Time.DateTime().secs
 #-- compute_fluence_cxo70: create a html page displaying ace fluence when cxo is above 70kkm
 #-----------------------------------------------------------------------------
 
-def compute_fluence_cxo70():
+def compute_fluence_cxo70(frame=None):
     """
     create a html page displaying ace fluence when cxo is above 70km
-    input:  none but read from:
+    input:  frame   --- ace_7day_archive frame (see ace_frame.py); if it is not given,
+                        read from <ace_dir>/Data/ace_7day_archive
+            also read from:
             <ephem_dir>/Data/PE.EPH.gsme_spherical
-            <ace_dir>/Data/ace_7day_archive
     output: <html_dir>/ACE/ace_flux_dat.html
     """
 #
@@ -73,73 +75,9 @@ def compute_fluence_cxo70():
 #
 #--- read ace data
 #
-    with open(f"{ACE_DATA_DIR}/ace_7day_archive") as f:
-        data = [line.strip() for line in f.readlines()]
-    e1     = 0.0
-    e2     = 0.0
-    p1     = 0.0
-    p2     = 0.0
-    p3     = 0.0
-    p4     = 0.0
-    p5     = 0.0
-    cstart = 0.0
-    cstop  = 0.0
-    for ent in data:
-        atemp = re.split(r'\s+', ent)
-#
-#--- convert time in Chandra Time
-#
-        ltime = atemp[0] + ':' + atemp[1] + ':' + atemp[2] + ':' + atemp[3][0] + atemp[3][1] + ':'
-        ltime = ltime    + atemp[3][2] + atemp[3][3] + ':00'
-        ltime = time.strftime('%Y:%j:%H:%M:%S', time.strptime(ltime, '%Y:%m:%d:%H:%M:%S'))
-        stime = int(Chandra.Time.DateTime(ltime).secs)
-#
-#--- compute fluence between the span
-#
-        if stime < start:
-            continue
-        elif stime > stop:
-            break
-        else:
-            ind1 = float(atemp[6])
-            ind2 = float(atemp[9])
-#
-#--- use only good data
-#
-            if (ind1 != 0) or (ind2 != 0):
-                continue
-
-            if cstart == 0.0:
-                cstart = stime
-            cstop = stime
-
-            ftime = atemp[0] + ' '  + atemp[1] + ' ' + atemp[2] + '  ' + atemp[3]
-            ftime = ftime    + '%8d%8d' % (float(atemp[4]), float(atemp[5]))
-
-            ve1 = float(atemp[7])
-            ve2 = float(atemp[8])
-            vp1 = float(atemp[10])
-            vp2 = float(atemp[11])
-            vp3 = float(atemp[12])
-            vp4 = float(atemp[13])
-            vp5 = float(atemp[14])
-#
-#--- sometime, some of the values are still show up negative. drop that set of the data
-#
-            if (ve1 < 0) or (ve2 < 0):
-                continue
-            if (vp1 < 0) or (vp2 < 0) or (vp3 < 0) or (vp4 < 0) or (vp5 < 0):
-                continue
-#
-#--- the values are given every 5 mins
-#
-            e1 +=  ve1 * 300
-            e2 +=  ve2 * 300
-            p1 +=  vp1 * 300
-            p2 +=  vp2 * 300
-            p3 +=  vp3 * 300
-            p4 +=  vp4 * 300
-            p5 +=  vp5 * 300
+    if frame is None:
+        frame = afrm.read_archive(f"{ACE_DATA_DIR}/ace_7day_archive")
+    [ftime, cstart, cstop, fluence] = compute_fluence(frame, start, stop)
 #
 #-- print out a text data
 #
@@ -149,22 +87,22 @@ def compute_fluence_cxo70():
     aline = aline + '# YR MO DA  HHMM    Day    Day    S    38-53   175-315   '
     aline = aline + 'S    47-68   115-195   310-580   795-1193 1060-1900   Index\n'
     aline = aline + '#' + '-'* 114 + '\n'
-    aline = aline + data[-1] + '\n'
+    aline = aline + frame['lines'][-1] + '\n'
     aline = aline + 'Latest ACE fluence when CXO is above 70kkm' + ' '*67
     aline = aline + 'Int Time (s)\n'
-    try:
+    if ftime != '':
         aline = aline + ftime 
         aline = aline + '  -'
-        aline = aline + '%10.2e' % e1
-        aline = aline + '%10.2e' % e2
+        aline = aline + '%10.2e' % fluence[0]
+        aline = aline + '%10.2e' % fluence[1]
         aline = aline + '  -'
-        aline = aline + '%10.2e' % p1
-        aline = aline + '%10.2e' % p2
-        aline = aline + '%10.2e' % p3
-        aline = aline + '%10.2e' % p4
-        aline = aline + '%10.2e' % p5
+        aline = aline + '%10.2e' % fluence[2]
+        aline = aline + '%10.2e' % fluence[3]
+        aline = aline + '%10.2e' % fluence[4]
+        aline = aline + '%10.2e' % fluence[5]
+        aline = aline + '%10.2e' % fluence[6]
         aline = aline + '%8d\n' % (cstop - cstart)
-    except:
+    else:
         aline = aline + '              N/A\n'
 
     with open(f"{ACE_HTML_DIR}/ace_flux.dat", 'w') as fo:
@@ -202,6 +140,63 @@ def compute_fluence_cxo70():
         fo.write(line)
 
 
+#-----------------------------------------------------------------------------
+#-- compute_fluence: compute ace fluence in a given time span               --
+#-----------------------------------------------------------------------------
+
+def compute_fluence(frame, start, stop):
+    """
+    compute ace fluence from the valid data in a given time span
+    input:  frame   --- ace archive frame (see ace_frame.py)
+            start   --- starting time in seconds from 1998.1.1
+            stop    --- stopping time in seconds from 1998.1.1
+    output: ftime   --- time of the last valid data (YR MO DA  HHMM  Julian Day Day);
+                        '' if there is no valid data
+            cstart  --- time of the first valid data
+            cstop   --- time of the last valid data
+            fluence --- a list of fluence of e38, e175, p47, p115, p310, p795, p1060
+    """
+    cols  = ['electron38-53', 'electron175-315', 'proton47-68', 'proton115-195',\
+             'proton310-580', 'proton795-1193', 'proton1060-1900']
+#
+#--- the data are read until the first entry after the span
+#
+    stime = frame['secs']
+    after = numpy.nonzero(stime > stop)[0]
+    end   = after[0] if len(after) > 0 else len(stime)
+#
+#--- use only good data
+#
+    sel   = (stime[:end] >= start) & (frame['electron_status'][:end] == 0)\
+                                   & (frame['proton_status'][:end]   == 0)
+    pos   = numpy.nonzero(sel)[0]
+    if len(pos) == 0:
+        return ['', 0.0, 0.0, [0.0] * len(cols)]
+
+    cstart = stime[pos[0]]
+    cstop  = stime[pos[-1]]
+
+    last   = pos[-1]
+    atemp  = frame['rows'][last]
+    ftime  = atemp[0] + ' '  + atemp[1] + ' ' + atemp[2] + '  ' + atemp[3]
+    ftime  = ftime    + '%8d%8d' % (frame['mjd'][last], frame['daysecs'][last])
+#
+#--- sometime, some of the values are still show up negative. drop that set of the data
+#
+    vals   = numpy.array([frame[col][pos] for col in cols])
+    pos    = numpy.nonzero((vals >= 0).all(axis=0))[0]
+#
+#--- the values are given every 5 mins; sum in the time order
+#
+    fluence = []
+    for k in range(0, len(cols)):
+        if len(pos) > 0:
+            fluence.append(float(numpy.cumsum(vals[k, pos] * 300)[-1]))
+        else:
+            fluence.append(0.0)
+
+    return [ftime, cstart, cstop, fluence]
+
 #-----------------------------------------------------------------------------
 
 if __name__ == '__main__':
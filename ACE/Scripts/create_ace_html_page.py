@@ -6,17 +6,17 @@
 #                                                                                                   #
 #               author: t. isobe    (tisobe@cfa.harvard.edu)                                        #
 #                                                                                                   #
-#               Last update: Nov 04, 2021                                                           #
+#               Last update: Oct 16, 2026                                                           #
 #                                                                                                   #
 #####################################################################################################
 
 import os
 import sys
 import re
-import time
 import numpy
 import Chandra.Time
 import argparse
+import ace_frame as afrm    #--- shared ace archive frame
 #
 #---Define Directory Pathing
 #
@@ -42,27 +42,28 @@ P5_P6_LIM = 1.0e10
 #-- create_ace_html_page: read ace data and update html page                                      ---
 #---------------------------------------------------------------------------------------------------
 
-def create_ace_html_page():
+def create_ace_html_page(frame=None):
     """
     read ace data and update html page
-    input:  none, but read from:
+    input:  frame   --- ace_12h_archive frame (see ace_frame.py); if it is not given,
+                        read from <ace_dir>/Data/ace_12h_archive
+            also read from:
             http://services.swpc.noaa.gov/images/ace-epam-7-day.gif
             http://services.swpc.noaa.gov/images/ace-mag-swepam-7-day.gif
-            <ace_dir>/Data/ace_12h_archive
     output: <html_dir>/ACE/ace.html
     """
 #
 #---- read 12h_archive data
 #
-    with open(f"{ACE_DATA_DIR}/ace_12h_archive") as f:
-        cdata = [line.strip() for line in f.readlines()]
+    if frame is None:
+        frame = afrm.read_archive(f"{ACE_DATA_DIR}/ace_12h_archive")
 #
 #--- cdata:     a list of lists of electron/proton flux data 
 #--- l_vals:    a list of the 'last' entries of those electron/proton flux data
 #--- data is also trimmed to the last 2 hours
 #
     try:
-        cdata_cols, l_vals = convert_to_col_data(cdata)
+        cdata_cols, l_vals = convert_to_col_data(frame)
     except:
         exit(1)
 #
@@ -526,10 +527,10 @@ def download_img(file, chg=1):
 #-- convert_to_col_data: read  data into a list of lists                    --
 #-----------------------------------------------------------------------------
 
-def convert_to_col_data(data):
+def convert_to_col_data(frame):
     """
-    convert the list of row data into column data
-    input:  a list of lists
+    convert the frame data into column data
+    input:  frame   --- ace archive frame (see ace_frame.py)
     output: a list of lists of:
             atime   --- a time in seconds from 1998.1.1
             jtime   --- a string time
@@ -546,79 +547,46 @@ def convert_to_col_data(data):
             [ech1_last, ech2_last, pch2_last, pch3_last, pch5_last, pch6_last, pch7_last]
                 --- this is a list of the last valid flux data before the current data set
     """
+    cols  = ['electron38-53', 'electron175-315', 'proton47-68', 'proton115-195',\
+             'proton310-580', 'proton795-1193', 'proton1060-1900']
 #
 #--- find the most recent entry time and set the cutting time to 2 hrs before that
 #
-    atemp   = re.split(r'\s+', data[-1])
-    ltime = atemp[0] + ':' + atemp[1] + ':' + atemp[2] + ':' + atemp[3][0] + atemp[3][1] + ':'
-    ltime = ltime    + atemp[3][2] + atemp[3][3] + ':00' 
-    ltime = time.strftime('%Y:%j:%H:%M:%S', time.strptime(ltime, '%Y:%m:%d:%H:%M:%S'))
-    cut   = int(Chandra.Time.DateTime(ltime).secs) - 2 * 3600.0 - 60.0
-
-    atime = []
-    jtime = []
-    echk  = []
-    ech1  = []
-    ech2  = []
-    pchk  = []
-    pch2  = []
-    pch3  = []
-    pch5  = []
-    pch6  = []
-    pch7  = []
-    ptime = 0
-    for ent in data:
-        atemp = re.split(r'\s+', ent)
-        clen  = len(atemp)
-#
-#--- convert time in Chandra Time
-#
-        ltime = atemp[0] + ':' + atemp[1] + ':' + atemp[2] + ':' + atemp[3][0] + atemp[3][1] + ':'
-        ltime = ltime    + atemp[3][2] + atemp[3][3] + ':00' 
-        ltime = time.strftime('%Y:%j:%H:%M:%S', time.strptime(ltime, '%Y:%m:%d:%H:%M:%S'))
-        stime = int(Chandra.Time.DateTime(ltime).secs)
+    stime = frame['secs']
+    cut   = stime[-1] - 2 * 3600.0 - 60.0
 #
 #--- sometime, there are double entries; so remove those
 #
-        if stime == ptime:
-            continue
-        else:
-            ptime = stime
+    pos   = numpy.nonzero(stime != numpy.concatenate([[0], stime[:-1]]))[0]
+    echk  = numpy.trunc(frame['electron_status'][pos]).astype(int)
+    pchk  = numpy.trunc(frame['proton_status'][pos]).astype(int)
 #
 #--- keep the record of 'previous' entry; only valid data
 #
-        if stime < cut:
-            chk1 = int(float(atemp[6]))
-            chk2 = int(float(atemp[9]))
-            if chk1 == 0 and chk2 == 0:
-                ech1_last = float(atemp[7])
-                ech2_last = float(atemp[8])
-                pch2_last = float(atemp[10])
-                pch3_last = float(atemp[11])
-                pch5_last = float(atemp[12])
-                pch6_last = float(atemp[13])
-                pch7_last = float(atemp[14])
-            continue
-#
-#--- save time part in a string format (YR MO DA  HHMM    Day    Day)
-#
-        ftime = atemp[0] + ' '  + atemp[1] + ' ' + atemp[2] + '  ' + atemp[3]
-#        ftime = ftime    + '%8d%8d' % (float(atemp[4]), float(atemp[5]))
-
-        atime.append(stime)
-        jtime.append(ftime)
-        echk.append(int(float(atemp[6])))
-        ech1.append(float(atemp[7]))
-        ech2.append(float(atemp[8]))
-        pchk.append(int(float(atemp[9])))
-        pch2.append(float(atemp[10]))
-        pch3.append(float(atemp[11]))
-        pch5.append(float(atemp[12]))
-        pch6.append(float(atemp[13]))
-        pch7.append(float(atemp[14]))
-
-    return [atime, jtime, echk, ech1, ech2, pchk, pch2, pch3, pch5, pch6, pch7],\
-                [ech1_last, ech2_last, pch2_last, pch3_last, pch5_last, pch6_last, pch7_last]
+    before = stime[pos] < cut
+    valid  = numpy.nonzero(before & (echk == 0) & (pchk == 0))[0]
+    if len(valid) == 0:
+        raise ValueError('No valid data before the current data period')
+
+    last  = pos[valid[-1]]
+    l_vals = [frame[col][last] for col in cols]
+#
+#--- save time part in a string format (YR MO DA  HHMM)
+#
+    now   = ~before
+    pos   = pos[now]
+    rows  = frame['rows']
+    jtime = [rows[k][0] + ' ' + rows[k][1] + ' ' + rows[k][2] + '  ' + rows[k][3]\
+                                                                        for k in pos]
+    out   = [stime[pos].tolist(), jtime, echk[now].tolist()]
+    for col in cols[:2]:
+        out.append(frame[col][pos].tolist())
+
+    out.append(pchk[now].tolist())
+    for col in cols[2:]:
+        out.append(frame[col][pos].tolist())
+
+    return out, [float(val) for val in l_vals]
 
 #---------------------------------------------------------------------------------------------------
 
@@ -6,12 +6,11 @@
 #                                                                                       #
 #               author: t. isobe    (tisobe@cfa.harvard.edu)                            #
 #                                                                                       #
-#               Last update: Mar 16, 2021                                               #
+#               Last update: Oct 16, 2026                                               #
 #                                                                                       #
 #########################################################################################
 
 import os
-import re
 import time
 import numpy
 import matplotlib as mpl
@@ -24,6 +23,7 @@ if __name__ == '__main__':
 
 import matplotlib.pyplot       as plt
 import matplotlib.font_manager as font_manager
+import ace_frame                as afrm     #--- shared ace archive frame
 #
 #--- Define Directory Pathing
 #
@@ -46,19 +46,19 @@ this_year            = int(float(time.strftime('%Y', time.gmtime())))
 #-- plot_p3_data: get ace data and plot the data                                    --
 #---------------------------------------------------------------------------------------
 
-def plot_p3_data():
+def plot_p3_data(frame=None):
     """
     create scaled p3 data plot
-    input: none but read from <data_dir>/ace_7day_archive
+    input: frame    --- ace_7day_archive frame (see ace_frame.py); if it is not given,
+                        read from <data_dir>/ace_7day_archive
     output: <ace_plot_dir>/mta_ace_plot_P3.png
     """
 #
 #--- read data and save in column array data format
 #
-    ifile = f"{ACE_DATA_DIR}/ace_7day_archive"
-    with open(ifile) as f:
-        data = [line.strip() for line in f.readlines()]
-    adata = convert_to_arrays(data)
+    if frame is None:
+        frame = afrm.read_archive(f"{ACE_DATA_DIR}/ace_7day_archive")
+    adata = convert_to_arrays(frame)
 #
 #--- plot data
 #
@@ -68,54 +68,33 @@ def plot_p3_data():
 #-- convert_to_arrays: convert data into array data                                   --
 #---------------------------------------------------------------------------------------
 
-def convert_to_arrays(data):
-   
-    sdata = []
-    for k in range(0, 8):
-       sdata.append([])
-
-    chk = 0
-    for ent in data:
-        atemp = re.split(r'\s+', ent)
-        chk1  = float(atemp[6])
-        chk2  = float(atemp[9])
-        if (chk1 != 0) or (chk2 != 0):
-            continue
+def convert_to_arrays(frame):
+    """
+    select the valid data and convert the time into ydate
+    input:  frame   --- ace archive frame
+    output: sdata   --- a list of lists of [ydate, e38, e175, p47, p115, p310, p795, p1060]
+    """
+    good  = (frame['electron_status'] == 0) & (frame['proton_status'] == 0)
 #
 #--- convert to ydate (input date format example: 2021 03 16  0845)
 #
-        ltime = atemp[0] + ':' +  atemp[1] + ':' + atemp[2] 
-        ltime = time.strftime('%Y:%j', time.strptime(ltime, '%Y:%m:%d'))
-        btemp = re.split(':', ltime)
-        year  = int(float(btemp[0]))
-        yday  = float(btemp[1])
-        hh    = float(atemp[3][0] + atemp[3][1])
-        mm    = float(atemp[3][2] + atemp[3][3])
-        yday += hh /24.0 + mm / 1440.0 
+    utc   = frame['utc'][good]
+    year  = utc.astype('datetime64[Y]').astype(int) + 1970
+    yday  = (utc.astype('datetime64[D]') - utc.astype('datetime64[Y]')).astype(int) + 1.0
+    hhmm  = frame['hhmm'][good]
+    yday += numpy.floor(hhmm / 100.0) / 24.0 + (hhmm % 100) / 1440.0
 #
 #--- if the year changes, use ydate from the year started
 #
-        if chk == 0:                #--- keeping the year of the first data point
-            byear = year
-            base = 365 + isleap(byear)
-            chk = 1
+    if len(year) > 0:
+        byear = year[0]             #--- keeping the year of the first data point
+        base  = 365 + isleap(byear)
+        yday[year > byear] += base
 
-        if year > byear:
-            yday += base
-        sdata[0].append(yday)
-#
-#--- electron part
-#
-        sdata[1].append(float(atemp[7]))
-        sdata[2].append(float(atemp[8]))
-#
-#--- proton part
-#
-        sdata[3].append(float(atemp[10]))
-        sdata[4].append(float(atemp[11]))
-        sdata[5].append(float(atemp[12]))
-        sdata[6].append(float(atemp[13]))
-        sdata[7].append(float(atemp[14]))
+    sdata = [yday.tolist()]
+    for col in ['electron38-53', 'electron175-315', 'proton47-68', 'proton115-195',\
+                'proton310-580', 'proton795-1193', 'proton1060-1900']:
+        sdata.append(frame[col][good].tolist())
 
     return sdata
 
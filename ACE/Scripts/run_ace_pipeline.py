@@ -0,0 +1,227 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#####################################################################################
+#                                                                                   #
+#       run_ace_pipeline.py: update ace data files and run the ace scripts          #
+#                            in one process                                         #
+#                                                                                   #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                           #
+#                                                                                   #
+#               last updae: Oct 16, 2026                                            #
+#                                                                                   #
+#####################################################################################
+#
+#--- the stages are the main functions of the ace scripts which were run one by one
+#--- from ace_main_script:
+#---    1. update_ace_data_files    --- updates the archives
+#---    2. ace_12h_archive and ace_7day_archive are read once into frames (ace_frame.py)
+#---    3. plot_p3_data, create_ace_html_page, compute_fluence_cxo70, ace_viol and
+#---       alert_ace are run at the same time with the frames; they only read the
+#---       archives and write their own outputs
+#--- the wall clock and the cpu times of each stage are printed at the end. each script
+#--- can still be run by itself.
+#
+import os
+import sys
+import time
+import traceback
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import matplotlib as mpl
+
+if __name__ == '__main__':
+    mpl.use('Agg')
+
+import ace_frame                as afrm
+import update_ace_data_files    as uadf
+import plot_p3_data             as pp3
+import create_ace_html_page     as cahp
+import compute_fluence_cxo70    as cf70
+import ace_viol                 as aviol
+import alert_ace                as aace
+#
+#--- Define Directory Pathing
+#
+ACE_DATA_DIR = "/data/mta4/Space_Weather/ACE/Data"
+#
+#--- the stages run after the archives are read: [name, function, archive]
+#
+stage_list = [['plot_p3_data',          pp3.plot_p3_data,           'ace_7day_archive'],\
+              ['create_ace_html_page',  cahp.create_ace_html_page,  'ace_12h_archive'],\
+              ['compute_fluence_cxo70', cf70.compute_fluence_cxo70, 'ace_7day_archive'],\
+              ['ace_viol',              aviol.check_viol,           'ace_12h_archive'],\
+              ['alert_ace',             aace.alert_ace,             'ace_12h_archive']]
+
+#-----------------------------------------------------------------------------
+#-- run_ace_pipeline: update ace data files and run the ace scripts         --
+#-----------------------------------------------------------------------------
+
+def run_ace_pipeline(workers=len(stage_list)):
+    """
+    update ace data files and run the ace scripts with the archives read once
+    input:  workers --- the number of the stages run at the same time;
+                        default: all of them
+    output: the outputs of the ace scripts (see README.rst)
+            the timing table is printed
+            status  --- True if all stages finished without an error
+    """
+    wall  = time.time()
+    cpu   = os.times()
+    timing = [run_stage('update_ace_data_files', uadf.update_ace_data_files, [])]
+#
+#--- read the archives once; if an archive cannot be read, the stages read it by themselves
+#
+    frames = {}
+    for arch in ['ace_12h_archive', 'ace_7day_archive']:
+        timing.append(run_stage('read ' + arch, read_frame, [arch, frames]))
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        jobs = []
+        for [name, func, arch] in stage_list:
+            jobs.append(pool.submit(run_stage, name, func, [frames.get(arch)]))
+
+        timing += [job.result() for job in jobs]
+
+    print_timing(timing, time.time() - wall, cpu_time(cpu))
+
+    return all(ent[3] == 'ok' for ent in timing)
+
+#-----------------------------------------------------------------------------
+#-- read_frame: read an archive into a frame                                --
+#-----------------------------------------------------------------------------
+
+def read_frame(arch, frames):
+    """
+    read an archive into a frame
+    input:  arch    --- archive name
+            frames  --- a dictionary to keep the frames
+    output: frames[arch]    --- frame (see ace_frame.py)
+    """
+    frames[arch] = afrm.read_archive(f"{ACE_DATA_DIR}/{arch}")
+
+#-----------------------------------------------------------------------------
+#-- run_stage: run a stage and measure the time                             --
+#-----------------------------------------------------------------------------
+
+def run_stage(name, func, args):
+    """
+    run a stage and measure the time; an error of the stage is printed and
+    does not stop the other stages
+    input:  name    --- stage name
+            func    --- function to run
+            args    --- a list of the arguments of the function
+    output: [name, wall clock time, cpu time, status ('ok' or 'failed')]
+            the cpu time is the one used by the thread of the stage
+    """
+    wall   = time.time()
+    cpu    = time.thread_time()
+    status = 'ok'
+    try:
+        func(*args)
+#
+#--- some of the scripts exit on an error
+#
+    except (Exception, SystemExit):
+        print(f"Stage {name} failed:")
+        traceback.print_exc()
+        status = 'failed'
+
+    return [name, time.time() - wall, time.thread_time() - cpu, status]
+
+#-----------------------------------------------------------------------------
+#-- cpu_time: cpu time used by the process and its child processes          --
+#-----------------------------------------------------------------------------
+
+def cpu_time(start):
+    """
+    find the cpu time used since a given time by the process and its child processes
+    (e.g. image downloads)
+    input:  start   --- os.times() at the start
+    output: cpu time in seconds
+    """
+    now = os.times()
+
+    return sum(now[k] - start[k] for k in range(0, 4))
+
+#-----------------------------------------------------------------------------
+#-- print_timing: print the timing table                                    --
+#-----------------------------------------------------------------------------
+
+def print_timing(timing, wall, cpu):
+    """
+    print the timing table
+    input:  timing  --- a list of [name, wall clock time, cpu time, status]
+            wall    --- total wall clock time
+            cpu     --- total cpu time (with the child processes)
+    output: printed table
+    """
+    line = '%-26s %10s %10s  %s\n' % ('stage', 'wall (s)', 'cpu (s)', 'status')
+    for ent in timing:
+        line = line + '%-26s %10.3f %10.3f  %s\n' % tuple(ent)
+
+    line = line + '%-26s %10.3f %10.3f\n' % ('total', wall, cpu)
+    print(line, end='')
+
+#-----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-m", "--mode", choices = ['flight','test'], required = True, help = "Determine running mode.")
+    parser.add_argument("-p", "--path", required = False, help = "Directory path to determine output location of files.")
+    parser.add_argument("-w", "--workers", type = int, default = len(stage_list), help = "Number of stages run at the same time.")
+    args = parser.parse_args()
+#
+#--- Determine if running in test mode and change pathing if so
+#
+    if args.mode == "test":
+        print("Running In Test Mode.")
+#
+#--- Path all data and outputs to the same location as unit tests
+#
+        if args.path:
+            OUT_DIR = args.path
+        else:
+            OUT_DIR = f"{os.getcwd()}/test/_outTest"
+        os.makedirs(f"{OUT_DIR}/longterm", exist_ok = True)
+        os.makedirs(f"{OUT_DIR}/Plots", exist_ok = True)
+        for arch in ['ace_12h_archive', 'ace_7day_archive']:
+            if not os.path.isfile(f"{OUT_DIR}/{arch}"):
+                os.system(f"cp {ACE_DATA_DIR}/{arch} {OUT_DIR}/{arch}")
+                print(f"Ran: cp {ACE_DATA_DIR}/{arch} {OUT_DIR}/{arch}")
+
+        ACE_DATA_DIR = OUT_DIR
+        uadf.OUT_ACE_DATA_DIR = OUT_DIR
+        for mod in [pp3, cahp, cf70, aviol, aace]:
+            mod.ACE_DATA_DIR = OUT_DIR
+        pp3.ACE_PLOT_DIR  = f"{OUT_DIR}/Plots"
+        cahp.ACE_PLOT_DIR = f"{OUT_DIR}/Plots"
+        cahp.ACE_HTML_DIR = OUT_DIR
+        cf70.ACE_HTML_DIR = OUT_DIR
+        cahp.TEMPLATE_DIR = f"{os.getcwd()}/Template"
+        cahp.TMP_DIR      = OUT_DIR
+        aviol.TMP_DIR     = OUT_DIR
+        cahp.TESTMAIL     = True
+        aviol.TESTMAIL    = True
+        aace._TESTMAIL    = True
+        print(f"OUT_DIR: {OUT_DIR}")
+        status = run_ace_pipeline(args.workers)
+
+    elif args.mode == "flight":
+#
+#--- Create a lock file and exit strategy in case of race conditions.
+#
+        import getpass
+        name = os.path.basename(__file__).split(".")[0]
+        user = getpass.getuser()
+        if os.path.isfile(f"/tmp/{user}/{name}.lock"):
+            sys.exit(f"Lock file exists as /tmp/{user}/{name}.lock. Process already running/errored out. Check calling scripts/cronjob/cronlog.")
+        else:
+            os.system(f"mkdir -p /tmp/{user}; touch /tmp/{user}/{name}.lock")
+        status = run_ace_pipeline(args.workers)
+#
+#--- Remove lock file once process is completed
+#
+        os.system(f"rm /tmp/{user}/{name}.lock")
+
+    if not status:
+        sys.exit(1)
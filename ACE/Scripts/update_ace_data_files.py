@@ -6,7 +6,7 @@
 #                                                                                   #
 #               author: t. isobe (tisobe@cfa.harvard.edu)                           #
 #                                                                                   #
-#               last updae: Mar 16, 2021                                            #
+#               last updae: Oct 16, 2026                                            #
 #                                                                                   #
 #####################################################################################
 
@@ -16,9 +16,7 @@ import re
 import time
 from datetime import datetime
 import Chandra.Time
-import copy 
-import subprocess
-import urllib.request
+import numpy
 import argparse
 #
 #--- Define Directory Pathing
@@ -28,6 +26,18 @@ OUT_ACE_DATA_DIR = ACE_DATA_DIR
 EPHEM_DIR = "/data/mta4/Space_Weather/EPHEM"
 KP_DIR = "/data/mta4/Space_Weather/KP"
 #
+#--- shared on-disk cache of the web feeds
+#
+sys.path.append('/data/mta4/Space_Weather/GOES/Scripts/')
+import feed_cache as fcache
+#
+#--- fixed width table formatter, append-only text archive and time conversion
+#
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
+import table_format as tfmt
+import text_archive as tarc
+import time_convert as tcnv
+#
 #--- ftp address
 #
 NOAA_LINK = 'https://services.swpc.noaa.gov/text/ace-epam.txt'
@@ -136,9 +146,8 @@ def read_current_ace_data():
 #
 #--- read the current data file
 #
-    with urllib.request.urlopen(NOAA_LINK) as url:
-        filestring = url.read().decode()
-        data = [line.strip() for line in filestring.split("\n") if line != '']
+    filestring = fcache.fetch_text(NOAA_LINK)
+    data = [line.strip() for line in filestring.split("\n") if line != '']
 #
 #--- [atime, jtime, echk, ech1, ech2, pchk, pch1, pch2, pch3, pch4, pch5, anis, fluen, head]
 #
@@ -402,53 +411,56 @@ def fill_missing_data(combined_data):
     input:  combined_data   --- a list of lists of data. 7th list will be used for estimate
     output: combined_data   --- a list of lists of dta. 12th list will be replaced with a new estimate
     """
-#
-#--- set a list of estimated proton flux
-#
-    dlen = len(combined_data[0])
-    est  = copy.deepcopy(combined_data[7])
-    for k in range(0, dlen):
-#
-#--- find bad data
-#
-        if combined_data[5][k] != 0:
-#
-#--- find the most recent good data
-#
-            m = k -1
-            while combined_data[5][m] != 0:
-                m -= 1
-#
-#--- find the next good data
-#
-            n   = k + 1
-            chk = 0
-#
-#--- if there is no good data after the current spot, use the last good data
-#
-            if n >= dlen:
-                est[k] = est[m]
-                chk = 1
-            else:    
-                while combined_data[5][n] != 0:
-                    n += 1
-                    if n >= dlen:
-                        est[k] = est[m]
-                        chk = 1
-                        break
-            if chk == 1:
-                continue
-#
-#--- extrapolate linierly
-#
-            est[k] = est[m] + (est[m] - est[n]) * (k - m) / (n - m)
+    bad = numpy.array(combined_data[5]) != 0
+    est = interpolate_gaps(combined_data[7], bad)
 #
 #--- replace the old one with the new estimate
 #
-    combined_data[12] = est
+    combined_data[12] = est.tolist()
 
     return combined_data
 
+#-----------------------------------------------------------------------------
+#-- interpolate_gaps: estimate the values at the bad data                   --
+#-----------------------------------------------------------------------------
+
+def interpolate_gaps(vals, bad):
+    """
+    estimate the values at the bad data from the good data around them
+    input:  vals    --- a list/numpy array of data; it can be (channel x time) to
+                        estimate all channels at once
+            bad     --- boolean array (time); True at the bad data
+    output: est     --- numpy array of the data with the estimates at the bad data
+    note:   m is the last good data before a bad data k, and n is the next good data;
+            est[k] = est[m] + (est[m] - est[n]) * (k - m) / (n - m)
+            if there is no good data after k, est[k] = est[m]. if there is no good data
+            before k, m is the last good data of the entire data and it is counted from
+            the end (a negative position).
+    """
+    est  = numpy.array(vals, dtype=float)
+    bad  = numpy.asarray(bad, dtype=bool)
+    dlen = len(bad)
+    good = numpy.nonzero(~bad)[0]
+    if len(good) == 0 or len(good) == dlen:
+        return est
+
+    pos  = numpy.arange(dlen)
+    prev = numpy.maximum.accumulate(numpy.where(bad, -1, pos))
+    prev = numpy.where(prev < 0, good[-1] - dlen, prev)
+    nxt  = numpy.minimum.accumulate(numpy.where(bad, dlen, pos)[::-1])[::-1]
+
+    k    = numpy.nonzero(bad)[0]
+    m    = prev[k]
+    n    = nxt[k]
+    last = n >= dlen
+    n    = numpy.minimum(n, dlen - 1)
+
+    a    = est[..., m]
+    b    = est[..., n]
+    est[..., k] = numpy.where(last, a, a + (a - b) * (k - m) / (n - m))
+
+    return est
+
 #-----------------------------------------------------------------------------
 #-- compute_fluence: upate fluence data list                                --
 #-----------------------------------------------------------------------------
@@ -460,49 +472,53 @@ def compute_fluence(data, collection_start, collection_stop):
                                     data[0] ---time/data[17] --- fluence
             collection_start    --- a list of fluence collection starting time
             collection_stop     --- a list of fluence collection stopping time
+                                    (collection_stop[n] == collection_start[n+1])
     output: data                --- fluence updated data
+    note:   the fluence starts from the last estimated fluence value at the beginning
+            and the estimated flux is added until the next orbital period starts. at
+            the beginning of the next period, the flux of the previous data is used as
+            the starting value. after that, each period starts from its first flux.
+            the data must be in time order.
     """
+    times  = numpy.array(data[0], dtype=float)
+    flux   = sampl * numpy.array(data[-2], dtype=float)
+    dlen   = len(times)
 #
-#--- start from the last estimated fluence value at the beginning
-#
-    fluence = [data[-1][0]]
-    dlen    = len(data[0])
-    clen    = len(collection_start)
+#--- the orbital period of each data; the first data is in the period nperiod - 1
 #
-#--- find which orbital period the first data set is in
-#
-    for n in range(0, clen):
-        if (collection_start[n] <= data[0][0]) and (collection_stop[n] > data[0][0]):
-            nperiod = n+1
-            break
+    period  = numpy.searchsorted(collection_start, times, side='right') - 1
+    nperiod = period[0] + 1
 #
 #--- fill the fluence based previously computed fluence between the first data and
 #--- the new orbital period starts
 #
-    for k in range(0, dlen):
-        if data[0][k] < collection_start[nperiod]:
-            fluence.append(fluence[-1] + sampl * data[-2][k])
-        else:
-            fluence.append(sampl * data[-2][k-1])
-            kstart = k
-            break
+    after   = numpy.nonzero(period >= nperiod)[0]
+    kstart  = after[0] if len(after) > 0 else dlen
+    fluence = numpy.cumsum(numpy.concatenate([[data[-1][0]], flux[:kstart]]))
 
-    for k in range(kstart, dlen):
+    if kstart < dlen:
 #
-#--- compute the current fluence by adding the estimated flux to the previous fluence
+#--- the period of each data after kstart: it moves to the next period (one at a time)
+#--- when the data is out of the current period; n[k] = min(n[k-1] + 1, period[k])
 #
-        if (data[0][k] >= collection_start[nperiod]) and (data[0][k] < collection_stop[nperiod]):
-                fluence.append(fluence[-1] + sampl * data[-2][k])
+        seq   = numpy.concatenate([[flux[kstart-1]], flux[kstart:]])
+        psub  = period[kstart:]
+        pos   = numpy.arange(len(psub))
+        now   = pos + numpy.minimum.accumulate(numpy.minimum(psub - pos, nperiod + 1))
+        prev  = numpy.concatenate([[nperiod], now[:-1]])
 #
-#--- new period starts
+#--- compute the current fluence by adding the estimated flux to the previous fluence;
+#--- it restarts when a new period starts
 #
-        else:
-            nperiod += 1
-            fluence.append(sampl * data[-2][k])
+        edges = numpy.concatenate([[0], numpy.nonzero(psub != prev)[0] + 1, [len(seq)]])
+        for k in range(0, len(edges) - 1):
+            seq[edges[k]:edges[k+1]] = numpy.cumsum(seq[edges[k]:edges[k+1]])
+
+        fluence = numpy.concatenate([fluence, seq])
 #
 #--- replace the fluence list
 #
-    data[-1] = fluence
+    data[-1] = fluence.tolist()
     
     return data
 
@@ -520,9 +536,7 @@ def update_ace_archive(updated_data, head):
 #
 #--- prep to update the table
 #
-    line = ''
-    for ent in head: 
-        line = line + ent + '\n'
+    line = ''.join([ent + '\n' for ent in head])
 #
 #--- cutting time 
 #
@@ -532,28 +546,15 @@ def update_ace_archive(updated_data, head):
 #-- atime, jtime, echk, ech1, ech2, pchk, pch1, pch2, pch3, pch4, pch5, anis, fluen
 #
     dlen = len(updated_data[0])
-    for k in range(0, dlen):
-        m = dlen - k -1
-        if updated_data[0][m] > cut:
-            line = line + updated_data[1][m]
-            line = line + '%3d'   % updated_data[2][m]
-            line = line + line_adjust(updated_data[3][m])
-            line = line + line_adjust(updated_data[4][m])
-            line = line + '%3d'   % updated_data[5][m]
-            line = line + line_adjust(updated_data[6][m])
-            line = line + line_adjust(updated_data[7][m])
-            line = line + line_adjust(updated_data[8][m])
-            line = line + line_adjust(updated_data[9][m])
-            line = line + line_adjust(updated_data[10][m])
-            line = line + '%7.2f' % updated_data[11][m]
-            line = line + line_adjust(updated_data[12][m])
-            line = line + line_adjust(updated_data[13][m])
-            line = line + '\n'
+    idx  = [m for m in range(dlen - 1, -1, -1) if updated_data[0][m] > cut]
+    cols = [[updated_data[c][m] for m in idx] for c in range(1, 14)]
+    line = line + tfmt.render_table(ace_spec + [line_adjust, line_adjust], cols)
 
     ofile = f"{OUT_ACE_DATA_DIR}/ace.archive"
-    
-    with open(ofile, 'w') as fo:
-        fo.write(line)
+#
+#--- the whole table is recomputed (newest first); replace it at once
+#
+    tarc.commit_file(ofile, line)
 
 #-----------------------------------------------------------------------------
 #-- update_secondary_archive_files: update ace_12h_archive, ace_7day_archive and long tem data files
@@ -595,15 +596,7 @@ def update_long_term_data(ndata):
     output: <ace_data_dir>/longterm/ace_data.txt
     """
     dfile = f"{ACE_DATA_DIR}/longterm/ace_data.txt"
-    last_line = subprocess.check_output(f"tail -n 1 {dfile}", shell=True, executable='/bin/csh').decode()
-    atemp = re.split(r'\s+', last_line)
-#
-#--- convert time in Chandra Time
-#
-    ltime = atemp[0] + ':' + atemp[1] + ':' + atemp[2] + ':' + atemp[3][0] + atemp[3][1] + ':'
-    ltime = ltime    + atemp[3][2] + atemp[3][3] + ':00' 
-    ltime = time.strftime('%Y:%j:%H:%M:%S', time.strptime(ltime, '%Y:%m:%d:%H:%M:%S'))
-    stime = int(Chandra.Time.DateTime(ltime).secs)
+    stime = ace_line_time(tarc.read_last(dfile)[0])
 
     dlen  = len(ndata[0])
     line  = ''
@@ -628,8 +621,7 @@ def update_long_term_data(ndata):
             line = line + '%7.2f' % ndata[11][m]
             line = line + '\n'
     
-    with open(f"{OUT_ACE_DATA_DIR}/longterm/ace_data.txt", 'a') as fo:
-        fo.write(line)
+    tarc.append_text(f"{OUT_ACE_DATA_DIR}/longterm/ace_data.txt", line)
 
 #-----------------------------------------------------------------------------
 #-- create_new_table: update the data table file with the newest data       --
@@ -645,47 +637,28 @@ def create_new_table(dfile, ndata, tstart, cut):
     ouptput dfile   --- updated data file
     """
 #
-#--- read the previous data
+#--- keep the previous data between cut and tstart, and append the newest data
 #
-    with open(dfile) as f:
-        odata = [line.strip() for line in f.readlines()]
+    line = tfmt.render_table(ace_spec, ndata[1:12])
+
+    tarc.update_window(dfile, line, ace_line_time, start=cut, stop=tstart)
+
+#-----------------------------------------------------------------------------
+#-- ace_line_time: get the time of a data line                              --
+#-----------------------------------------------------------------------------
+
+def ace_line_time(line):
+    """
+    get the time of a data line of the ace data tables
+    input:  line    --- data line: <yyyy> <mm> <dd> <hhmm> ...
+    output: stime   --- time in seconds from 1998.1.1 (integer)
+    """
+    atemp = re.split(r'\s+', line.strip())
+    ltime = atemp[0] + '-' + atemp[1] + '-' + atemp[2] + 'T' + atemp[3][0:2] + ':'
+    ltime = ltime    + atemp[3][2:4] + ':00'
+
+    return int(tcnv.date_to_secs(ltime))
 
-    line = ''
-    for ent in odata:
-        atemp = re.split(r'\s+', ent)
-#
-#--- convert time in Chandra Time
-#
-        ltime = atemp[0] + ':' + atemp[1] + ':' + atemp[2] + ':' + atemp[3][0] + atemp[3][1] + ':'
-        ltime = ltime    + atemp[3][2] + atemp[3][3] + ':00' 
-        ltime = time.strftime('%Y:%j:%H:%M:%S', time.strptime(ltime, '%Y:%m:%d:%H:%M:%S'))
-        stime = int(Chandra.Time.DateTime(ltime).secs)
-        if stime < cut:
-            continue
-        elif stime > tstart:
-            break
-        else:
-            line = line + ent + '\n'
-#
-#--- append the newest data 
-#
-    for m in range(0, len(ndata[0])):
-        line = line + ndata[1][m]
-        line = line + '%3d'   % ndata[2][m]
-        line = line + line_adjust(ndata[3][m])
-        line = line + line_adjust(ndata[4][m])
-        line = line + '%3d'   % ndata[5][m]
-        line = line + line_adjust(ndata[6][m])
-        line = line + line_adjust(ndata[7][m])
-        line = line + line_adjust(ndata[8][m])
-        line = line + line_adjust(ndata[9][m])
-        line = line + line_adjust(ndata[10][m])
-        line = line + '%7.2f' % ndata[11][m]
-        line = line + '\n'
-
-    with open(dfile, 'w') as fo:
-        fo.write(line)
-    
 #-----------------------------------------------------------------------------
 #-----------------------------------------------------------------------------
 #-----------------------------------------------------------------------------
@@ -696,6 +669,11 @@ def line_adjust(ent):
     else:
         line = '  %.2e' % ent
     return line
+#
+#--- the column formats of the ace data tables: jtime, echk, ech1, ech2, pchk, pch1 - pch5, anis
+#
+ace_spec = ['%s', '%3d', line_adjust, line_adjust, '%3d', line_adjust, line_adjust,\
+            line_adjust, line_adjust, line_adjust, '%7.2f']
 
 #-----------------------------------------------------------------------------
 #-- compute_latest_fluence: compute the fluence of the last period         ---
@@ -860,9 +838,8 @@ def update_kp_data_file():
 #--- read kp data   
 #
     ifile = f"{KP_DIR}/Data/k_index_data_past"
-    with open(ifile) as f:
-        data = [line.strip() for line in f.readlines()]
-    
+    data  = tarc.read_last(ifile)
+
     atemp = re.split(r'\s+', data[-1])
     ltime = float(atemp[0])
     kval  = atemp[1]
@@ -6,7 +6,7 @@
 #                                                                                                           #
 #                   author: t. isobe (tisobe@cfa.harvard.edu)                                               #
 #                                                                                                           #
-#                   last update: Mar 16, 2021                                                               #
+#                   last update: Oct 16, 2026                                                               #
 #                                                                                                           #
 #############################################################################################################
 
@@ -47,6 +47,11 @@ for ent in data:
 #--- append  pathes to private folders to a python directory
 #
 sys.path.append(acis_dir)
+sys.path.append(ephem_dir + 'Scripts/')
+
+import time_convert     as tcnv     #---- vectorized time conversion
+import time_index       as tidx     #---- time index of the data files
+import interval_edges   as iedg     #---- start and stop times of the periods
 #
 #--- temp writing file name
 #
@@ -89,157 +94,43 @@ def find_sim_position(start, stop):
     atemp = re.split(':', ntime)
     lyear = int(atemp[0])
 #
-#-- read all data sets contain the appropriate data
+#-- read the lines of the period from the data sets; int(stime) must be in [start, stop]
 #
-    data  = []
+    lines  = []
+    stimes = []
     for year in range(syear, lyear+1):
         #file = '/data/mta_www/mta_temp/mta_states/MJ/' + str(year) + '/comprehensive_data_summary' + str(year)
         ifile = '/data/mta_www/mta_temp/mta_states/Data/MJ/comprehensive_data_summary' + str(year)
-        with open(ifile, 'r') as f:
-            dtmp = [line.strip() for line in f.readlines()]
-
-        data  = data + dtmp
-
-    acis_i_start = []
-    acis_i_stop  = []
-    acis_s_start = []
-    acis_s_stop  = []
-    hrc_i_start  = []
-    hrc_i_stop   = []
-    hrc_s_start  = []
-    hrc_s_stop   = []
-    hetg_start   = []
-    hetg_stop    = []
-    letg_start   = []
-    letg_stop    = []
-    radmon_start = []
-    radmon_stop  = []
-    fmt          = []
-    time         = []
-    acis_i_in    = 0
-    acis_s_in    = 0
-    hrc_i_in     = 0
-    hrc_s_in     = 0
-    hetg_in      = 0
-    letg_in      = 0
-    radmon_on    = 0
+        [ttmp, dtmp] = tidx.read_window(ifile, math.ceil(start), math.floor(stop) + 1,\
+                                        conv=tcnv.date_to_secs)
+        stimes = stimes + ttmp
+        lines  = lines  + [re.split('\s+', ent) for ent in dtmp]
 
-    for ent in data:
+    time  = numpy.array(stimes).astype(numpy.int64)
+    scpos = numpy.array([float(atemp[1])  for atemp in lines])   #--- 3TSCPOS
+    hpos  = numpy.array([float(atemp[9])  for atemp in lines])   #--- 4HPOSARO
+    lpos  = numpy.array([float(atemp[11]) for atemp in lines])   #--- 4LPOSARO
+    radm  = numpy.array([atemp[5] for atemp in lines], dtype=str)
+    fmt   = [atemp[7] for atemp in lines]                        #--- FMT Format
 #
-#--- use only data line starting with year (which should be a digits)
+#--- ACIS I, ACIS S, HRC I and HRC S are tested in one chain; only one of them
+#--- can start or stop at a data point
 #
-        try:
-            val = float(ent[0])
-        except:
-            continue
+    sim_rules = [[scpos > 89000,                      scpos < 89000],\
+                 [(scpos < 80000) & (scpos > 71000),  (scpos > 80000)  | (scpos < 71000)],\
+                 [(scpos < -45000) & (scpos > -55000),(scpos > -45000) | (scpos < -55000)],\
+                 [scpos < -90000,                     scpos > -90000]]
 
-        atemp = re.split('\s+', ent)
-
-        stime = int(Chandra.Time.DateTime(atemp[0]).secs)
-
-        if stime < start:
-            continue
-        if stime > stop:
-            break
-
-        scpos = float(atemp[1])             #--- 3TSCPOS
-        hpos  = float(atemp[9])             #--- 4HPOSARO
-        lpos  = float(atemp[11])            #--- 4LPOSARO
-
-        time.append(stime)
-
-#
-#--- ACIS I
-#
-        if scpos > 89000 and acis_i_in == 0:
-            acis_i_start.append(stime)
-            acis_i_in = 1
-        elif scpos < 89000 and acis_i_in == 1:
-            acis_i_stop.append(stime)
-            acis_i_in = 0
-#
-#--- ACIS S
-#
-        elif scpos < 80000 and scpos > 71000 and acis_s_in == 0:
-            acis_s_start.append(stime)
-            acis_s_in = 1
-        elif (scpos > 80000 or scpos < 71000) and acis_s_in == 1:
-            acis_s_stop.append(stime)
-            acis_s_in = 0
+    [[acis_i_start, acis_i_stop], [acis_s_start, acis_s_stop],\
+     [hrc_i_start,  hrc_i_stop],  [hrc_s_start,  hrc_s_stop]]  = iedg.find_intervals(time, sim_rules, stop)
 #
-#--- HRC I
+#--- HETIG, LETG and RADMON
 #
-        elif scpos < -45000 and scpos > -55000 and hrc_i_in == 0:
-            hrc_i_start.append(stime)
-            hrc_i_in = 1
-        elif (scpos > -45000 or scpos < -55000) and hrc_i_in == 1:
-            hrc_i_stop.append(stime)
-            hrc_i_in = 0
-#
-#--- HRC S
-#
-        elif scpos < -90000 and hrc_s_in == 0:
-            hrc_s_start.append(stime)
-            hrc_s_in = 1
-        elif scpos > -90000 and hrc_s_in == 1:
-            hrc_s_stop.append(stime)
-            hrc_s_in = 0
-#
-#--- HETIG
-#
-        if hpos < 20 and hetg_in == 0:
-            hetg_start.append(stime)
-            hetg_in = 1
-        elif hpos > 60 and hetg_in == 1:
-            hetg_stop.append(stime)
-            hetg_in = 0
-#
-#--- LETG
-#
-        if lpos  < 20 and letg_in == 0:
-            letg_start.append(stime)
-            letg_in = 1
-        elif lpos > 60 and letg_in == 1:
-            letg_stop.append(stime)
-            letg_in = 0
-#
-#--- RADMON
-#
-        if atemp[5] == 'DISA' and radmon_on == 0:
-            radmon_start.append(stime)
-            radmon_on = 1
-        elif atemp[5] == 'ENAB' and radmon_on == 1:
-            radmon_stop.append(stime)
-            radmon_on = 0
-#
-#--- FMT Format
-#
-        fmt.append(atemp[7])
-#
-#--- for the case the period is not closed during the time interval given
-#--- add "stop" time to close the period
-#
-    if len(acis_i_stop) < len(acis_i_start):
-        acis_i_stop.append(stop)
-
-    if len(acis_s_stop) < len(acis_s_start):
-        acis_s_stop.append(stop)
-
-    if len(hrc_i_stop) < len(hrc_i_start):
-        hrc_i_stop.append(stop)
-
-    if len(hrc_s_stop) < len(hrc_s_start):
-        hrc_s_stop.append(stop)
-
-    if len(hetg_stop) < len(hetg_start):
-        hetg_stop.append(stop)
-
-    if len(letg_stop) < len(letg_start):
-        letg_stop.append(stop)
-
-    if radmon_on == 1:
-        radmon_stop.append(stop)
+    [[hetg_start,   hetg_stop]]   = iedg.find_intervals(time, [[hpos < 20, hpos > 60]], stop)
+    [[letg_start,   letg_stop]]   = iedg.find_intervals(time, [[lpos < 20, lpos > 60]], stop)
+    [[radmon_start, radmon_stop]] = iedg.find_intervals(time, [[radm == 'DISA', radm == 'ENAB']], stop)
 
+    time = time.tolist()
 
     return[acis_i_start, acis_i_stop, acis_s_start, acis_s_stop, hrc_i_start, hrc_i_stop, \
            hrc_s_start,  hrc_s_stop,  hetg_start,   hetg_stop,   letg_start,  letg_stop,  \
@@ -260,23 +151,12 @@ def read_ccd_data(start, stop):
             cti_stop    ---- cti measurement stopping time
     """
 
-    with  open('/data/mta4/www/DAILY/mta_rad/cti_data.txt', 'r') as f:
-        data = [line.strip() for line in f.readlines()]
-
-    cti_start = []
+    [cti_start, data] = tidx.read_window('/data/mta4/www/DAILY/mta_rad/cti_data.txt',\
+                                         start, stop, tcol=11)
     cti_stop  = []
     for ent in data:
         atemp  = re.split('\s+', ent)
-        cstart = float(atemp[11])
-        cstop  = float(atemp[12])
-        if cstart >= start and cstart < stop:
-            cti_start.append(float(atemp[11]))
-            cti_stop.append(float(atemp[12]))
-        elif cstart >= stop:
-            break
-        else:
-            continue
-
+        cti_stop.append(float(atemp[12]))
 
     return [cti_start, cti_stop]
 
@@ -300,12 +180,8 @@ def read_orbit_data(start, stop):
 
 #    with open('/data/mta4/Script/Ephem/Exc/zclean', 'r')
 #    with  open('/data/mta/DataSeeker/data/repository/dephem.rdb', 'r') as f:
-    with  open('/data/mta4/Space_Weather/ACIS_Rad/Data/dephem.rdb', 'r') as f:
-        data = [line.strip() for line in f.readlines()]
-
-    data.sort()
-
-    time = []
+    [time, data] = tidx.read_window('/data/mta4/Space_Weather/ACIS_Rad/Data/dephem.rdb',\
+                                    start, stop)
     alt  = []
     magx = []
     magy = []
@@ -313,23 +189,11 @@ def read_orbit_data(start, stop):
     crm  = []
     for ent in data:
         atemp = re.split('\s+', ent)
-        try:
-            stime = float(atemp[0])
-        except:
-            continue
-
-        if stime >=start and stime < stop: 
-            time.append(stime)
-            alt.append(float(atemp[1]) / 1000.0)
-            magx.append(float(atemp[5]))
-            magy.append(float(atemp[6]))
-            magz.append(float(atemp[7]))
-            crm.append(float(atemp[8]))
-        elif stime >= stop:
-            break
-        else:
-            continue
-
+        alt.append(float(atemp[1]) / 1000.0)
+        magx.append(float(atemp[5]))
+        magy.append(float(atemp[6]))
+        magz.append(float(atemp[7]))
+        crm.append(float(atemp[8]))
 
     return [time, alt, magx, magy, magz, crm]
 
@@ -348,30 +212,16 @@ def read_alt_data(start, stop):
             alt         --- altitude
     """
 
-    with open('/data/mta/DataSeeker/data/repository/aorbital.rdb', 'r') as f:
-        data = [line.strip() for line in f.readlines()]
-
-    time = []
+    [time, data] = tidx.read_window('/data/mta/DataSeeker/data/repository/aorbital.rdb',\
+                                    start, stop)
     alt  = []
     for ent in data:
         atemp = re.split('\s+', ent)
-        try:
-            stime = float(atemp[0])
-        except:
-            continue
-
-        if stime >=start and stime < stop: 
-            time.append(stime)
-            x   = float(atemp[1])
-            y   = float(atemp[2])
-            z   = float(atemp[3])
-            dist = math.sqrt(x * x + y * y + z * z) /1000.0
-            alt.append(dist)
-        elif stime >= stop:
-            break
-        else:
-            continue
-
+        x   = float(atemp[1])
+        y   = float(atemp[2])
+        z   = float(atemp[3])
+        dist = math.sqrt(x * x + y * y + z * z) /1000.0
+        alt.append(dist)
 
     return [time, alt]
 
@@ -0,0 +1,219 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       interval_edges.py: find the start and stop times of the periods     #
+#                          defined by threshold rules on data columns       #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- a set of rules is a list of [enter, leave] boolean arrays, one pair for each state.
+#--- they work like a chain of if/elif tests on each data row:
+#
+#---        if   enter[0] and not in state 0:   start state 0
+#---        elif leave[0] and in state 0:       stop  state 0
+#---        elif enter[1] and not in state 1:   start state 1
+#---        ...
+#
+#--- i.e. only the first applicable rule changes the states on a row. the states after
+#--- each row are found with array operations: the state transition of each row is a
+#--- table (state -> next state), and the tables of the rows in a block are combined in
+#--- log2(block) steps; only the states at the block boundaries are carried in a loop.
+#
+import numpy
+import unittest
+#
+#--- transition tables already made, keyed by the number of the states in a chain
+#
+tables = {}
+
+#----------------------------------------------------------------------------------
+#-- find_intervals: find the start and stop times of the states                  --
+#----------------------------------------------------------------------------------
+
+def find_intervals(times, rules, stop):
+    """
+    find the start and stop times of the states defined by a chain of rules
+    input:  times   --- numpy array of the times of the data rows (in time order)
+            rules   --- a list of [enter, leave] boolean arrays for each state (see above)
+            stop    --- time to close the states which are still on at the end
+    output: a list of [starts, stops] for each state
+                starts  --- a list of the starting times
+                stops   --- a list of the stopping times
+    """
+    times = numpy.asarray(times)
+    nrow  = len(times)
+    if nrow == 0:
+        return [[[], []] for ent in rules]
+#
+#--- the condition code of each row; bit 2m: enter of state m, bit 2m+1: leave of state m
+#
+    cond = numpy.zeros(nrow, dtype=numpy.int64)
+    for m, [enter, leave] in enumerate(rules):
+        cond |= numpy.asarray(enter, dtype=numpy.int64) << (2 * m)
+        cond |= numpy.asarray(leave, dtype=numpy.int64) << (2 * m + 1)
+
+    nstate = len(rules)
+    table  = chain_table(nstate)
+#
+#--- in a run of rows with the same conditions, only the first nstate rows can change
+#--- the states (each row moves one state toward its condition), if no state has both
+#--- of enter and leave on a row; the other rows keep the state of the previous row
+#
+    pos  = numpy.arange(nrow)
+    chg  = numpy.concatenate([[True], cond[1:] != cond[:-1]])
+    keep = (pos - numpy.maximum.accumulate(numpy.where(chg, pos, 0))) < nstate
+    for m in range(0, nstate):
+        if ((cond >> (2 * m)) & (cond >> (2 * m + 1)) & 1).any():
+            keep[:] = True
+            break
+
+    state = run_chain(table[cond[keep]])
+    state = state[numpy.cumsum(keep) - 1]
+    prev  = numpy.concatenate([[0], state[:-1]])
+
+    out = []
+    for m in range(0, len(rules)):
+        now    = (state >> m) & 1
+        before = (prev  >> m) & 1
+        starts = times[(now == 1) & (before == 0)].tolist()
+        stops  = times[(now == 0) & (before == 1)].tolist()
+#
+#--- for the case the period is not closed during the time interval given
+#
+        if len(stops) < len(starts):
+            stops.append(stop)
+
+        out.append([starts, stops])
+
+    return out
+
+#----------------------------------------------------------------------------------
+#-- chain_table: make the transition table of a chain of rules                   --
+#----------------------------------------------------------------------------------
+
+def chain_table(nstate):
+    """
+    make the transition table of a chain of rules
+    input:  nstate  --- the number of the states in the chain
+    output: table   --- (condition code x state) numpy array of the next state; a state
+                        is a bit set of the states which are on
+    """
+    if nstate in tables:
+        return tables[nstate]
+
+    table = numpy.zeros((4 ** nstate, 2 ** nstate), dtype=numpy.int8)
+    for cond in range(0, 4 ** nstate):
+        for state in range(0, 2 ** nstate):
+            nxt = state
+            for m in range(0, nstate):
+                on = (state >> m) & 1
+                if (cond >> (2 * m)) & 1 and on == 0:
+                    nxt = state | (1 << m)
+                    break
+                elif (cond >> (2 * m + 1)) & 1 and on == 1:
+                    nxt = state & ~(1 << m)
+                    break
+
+            table[cond, state] = nxt
+
+    tables[nstate] = table
+    return table
+
+#----------------------------------------------------------------------------------
+#-- run_chain: find the state after each row                                     --
+#----------------------------------------------------------------------------------
+
+def run_chain(trans, block=16):
+    """
+    find the state after each row; all the states are off before the first row
+    input:  trans   --- (row x state) numpy array of the transition of each row
+            block   --- the number of the rows combined at once; default: 16
+    output: numpy array of the state after each row
+    """
+    [nrow, nst] = trans.shape
+    nblk = -(-nrow // block)
+    comb = numpy.empty((nblk * block, nst), dtype=trans.dtype)
+    comb[:]     = numpy.arange(nst)
+    comb[:nrow] = trans
+    comb = comb.reshape(nblk, block, nst)
+#
+#--- after the step with distance d, comb[:, i] is the transition over the rows i-2d+1 to i
+#--- of the block
+#
+    dist = 1
+    while dist < block:
+        comb[:, dist:] = numpy.take_along_axis(comb[:, dist:], comb[:, :-dist], axis=2)
+        dist *= 2
+#
+#--- carry the state over the blocks
+#
+    entry = []
+    state = 0
+    for ent in comb[:, -1].tolist():
+        entry.append(state)
+        state = ent[state]
+
+    out = comb[numpy.arange(nblk)[:, None], numpy.arange(block)[None, :],\
+               numpy.array(entry)[:, None]]
+
+    return out.ravel()[:nrow]
+
+#-----------------------------------------------------------------------------------------
+#-- TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST    ---
+#-----------------------------------------------------------------------------------------
+
+class TestFunctions(unittest.TestCase):
+
+    def test_find_intervals(self):
+
+        times = numpy.arange(10) * 10
+        val   = numpy.array([0, 5, 5, 0, 9, 9, 5, 0, 9, 9])
+#
+#--- state 0: val == 5, state 1: val == 9; at 60 the rule to start state 0 comes
+#--- first and state 1 stays on
+#
+        out = find_intervals(times, [[val == 5, val != 5], [val == 9, val != 9]], 100)
+
+        self.assertEqual(out[0], [[10, 60], [30, 70]])
+        self.assertEqual(out[1], [[40], [100]])
+
+#------------------------------------------------------------------------
+
+    def test_compare_loop(self):
+
+        rng   = numpy.random.default_rng(5)
+        val   = rng.choice([0, 1, 2, 3], size=5000)
+        times = numpy.arange(5000)
+        rules = [[val == 1, val == 0], [val == 2, val != 2], [val == 3, val < 2]]
+        out   = find_intervals(times, rules, 99999)
+#
+#--- the same with a loop over the rows
+#
+        on   = [0, 0, 0]
+        comp = [[[], []], [[], []], [[], []]]
+        for k in range(0, len(times)):
+            for m in range(0, 3):
+                if rules[m][0][k] and on[m] == 0:
+                    comp[m][0].append(times[k])
+                    on[m] = 1
+                    break
+                elif rules[m][1][k] and on[m] == 1:
+                    comp[m][1].append(times[k])
+                    on[m] = 0
+                    break
+        for m in range(0, 3):
+            if on[m] == 1:
+                comp[m][1].append(99999)
+
+        self.assertEqual(out, comp)
+
+#-------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    unittest.main()
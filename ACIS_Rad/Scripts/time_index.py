@@ -0,0 +1,368 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       time_index.py: time index of the rdb and summary data files         #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- an index of a data file keeps the time of each data line with the byte positions
+#--- of the line in the file, sorted by time:
+#---    times   --- numpy array of the line times
+#---    starts  --- numpy array of the byte positions of the line starts
+#---    ends    --- numpy array of the byte positions of the line ends
+#--- it is kept in <index_dir>/<file name>.<time column>.idx.npz. when the data file is
+#--- appended, only the new lines are added; otherwise the index is rebuilt. the file is
+#--- taken as appended only if it is the same file (inode) and the checksum of the
+#--- indexed part has not changed. a data window is read from the file with one seek,
+#--- instead of reading the entire file.
+#
+import os
+import sys
+import zlib
+import numpy
+import unittest
+#
+#--- write through a temporary file and a rename
+#
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
+import atomic_file as afile
+
+index_dir = '/data/mta4/Space_Weather/ACIS_Rad/Data/Index/'
+if (os.getenv('TEST') == 'TEST'):
+    index_dir = os.getcwd() + '/TestOut/Index/'
+#
+#--- the number of bytes read at a time to compute the checksum of the indexed part
+#
+chunk_size = 1048576
+#
+#--- indices already read in this process, keyed by the data file name and the time column
+#
+loaded = {}
+
+#----------------------------------------------------------------------------------
+#-- read_window: read the data lines of a time period                            --
+#----------------------------------------------------------------------------------
+
+def read_window(ifile, start, stop, tcol=0, conv=None):
+    """
+    read the data lines whose times are in [start, stop)
+    input:  ifile   --- data file name
+            start   --- starting time
+            stop    --- stopping time
+            tcol    --- position of the time column (white space separated); default: 0
+            conv    --- function to convert a list of time strings into a numpy array
+                        of times; default: None (float)
+    output: [times, lines]
+                times   --- a list of the times of the lines
+                lines   --- a list of the data lines (white spaces are stripped)
+            the lines are in time order (the lines of the same time are in the file order)
+    """
+    [times, starts, ends] = read_index(ifile, tcol, conv)
+
+    pos1 = numpy.searchsorted(times, start, side='left')
+    pos2 = numpy.searchsorted(times, stop,  side='left')
+    if pos1 >= pos2:
+        return [[], []]
+
+    starts = starts[pos1:pos2].tolist()
+    ends   = ends[pos1:pos2].tolist()
+#
+#--- read the block which contains all the lines at once
+#
+    low  = min(starts)
+    high = max(ends)
+    with open(ifile, 'rb') as f:
+        f.seek(low)
+        block = f.read(high - low)
+
+    lines = [block[s - low:e - low].decode('utf-8', 'replace').strip()\
+                                            for s, e in zip(starts, ends)]
+
+    return [times[pos1:pos2].tolist(), lines]
+
+#----------------------------------------------------------------------------------
+#-- read_index: read the index of a data file                                    --
+#----------------------------------------------------------------------------------
+
+def read_index(ifile, tcol=0, conv=None):
+    """
+    read the index of a data file; the index is updated if the file has been changed
+    input:  ifile   --- data file name
+            tcol    --- position of the time column; default: 0
+            conv    --- time conversion function; default: None (float)
+    output: [times, starts, ends] (see above)
+    """
+    stat = os.stat(ifile)
+    key  = [stat.st_mtime_ns, stat.st_size]
+    name = ifile + ':' + str(tcol)
+
+    if name in loaded and loaded[name][0] == key:
+        return loaded[name][1]
+
+    cfile = index_dir + os.path.basename(ifile) + '.' + str(tcol) + '.idx.npz'
+    index = None
+    try:
+        with numpy.load(cfile) as cache:
+            index = dict((ent, cache[ent]) for ent in cache.files)
+    except (OSError, KeyError, ValueError):
+        pass
+
+    if index is not None and index['source'].tolist() == key:
+        out = [index['times'], index['starts'], index['ends']]
+        loaded[name] = [key, out]
+        return out
+#
+#--- add the new lines if the file is appended; otherwise index the entire file
+#
+    if index is not None and is_appended(ifile, stat, index):
+        prev    = int(index['indexed'])
+        keep    = index['starts'] < prev
+        [times, starts, ends, indexed] = index_lines(ifile, prev, tcol, conv)
+        crc     = file_crc(ifile, prev, indexed, int(index['crc']))
+
+        times   = numpy.concatenate([index['times'][keep],  times])
+        starts  = numpy.concatenate([index['starts'][keep], starts])
+        ends    = numpy.concatenate([index['ends'][keep],   ends])
+    else:
+        [times, starts, ends, indexed] = index_lines(ifile, 0, tcol, conv)
+        crc     = file_crc(ifile, 0, indexed)
+
+    order  = numpy.lexsort((starts, times))
+    out    = [times[order], starts[order], ends[order]]
+#
+#--- write through a temporary file so that other jobs never read a partial index
+#
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        afile.write_file(cfile, lambda fo: numpy.savez(fo, times=out[0], starts=out[1],\
+                                ends=out[2], source=numpy.array(key), indexed=indexed,\
+                                inode=stat.st_ino, crc=crc))
+    except OSError:
+        pass
+
+    loaded[name] = [key, out]
+    return out
+
+#----------------------------------------------------------------------------------
+#-- index_lines: find the times and the byte positions of the lines              --
+#----------------------------------------------------------------------------------
+
+def index_lines(ifile, offset, tcol, conv):
+    """
+    find the times and the byte positions of the lines after the given byte position;
+    the lines without a readable time are dropped
+    input:  ifile   --- data file name
+            offset  --- byte position to start; it must be at a line start
+            tcol    --- position of the time column
+            conv    --- time conversion function; None: float
+    output: times   --- numpy array of the line times
+            starts  --- numpy array of the byte positions of the line starts
+            ends    --- numpy array of the byte positions of the line ends
+            indexed --- byte position after the last complete (newline ended) line
+    """
+    with open(ifile, 'rb') as f:
+        f.seek(offset)
+        block = f.read()
+
+    pieces  = block.split(b'\n')
+    lengths = numpy.array([len(ent) + 1 for ent in pieces], dtype=numpy.int64)
+    ends    = offset + numpy.cumsum(lengths)
+    starts  = ends - lengths
+#
+#--- the last piece is empty if the block ends with a newline; otherwise it is
+#--- a partial line which is indexed again on the next update
+#
+    indexed = int(starts[-1])
+    ends[-1] = offset + len(block)
+
+    tstr = []
+    for ent in pieces:
+        atemp = ent.split()
+        if len(atemp) > tcol:
+            tstr.append(atemp[tcol].decode('utf-8', 'replace'))
+        else:
+            tstr.append('')
+
+    times = convert_times(tstr, conv)
+    keep  = ~numpy.isnan(times)
+
+    return [times[keep], starts[keep], ends[keep], indexed]
+
+#----------------------------------------------------------------------------------
+#-- convert_times: convert time strings                                          --
+#----------------------------------------------------------------------------------
+
+def convert_times(tstr, conv):
+    """
+    convert time strings; the strings which cannot be converted are set to nan
+    input:  tstr    --- a list of time strings
+            conv    --- time conversion function; None: float
+    output: times   --- numpy array of times
+    """
+    times = numpy.full(len(tstr), numpy.nan)
+    if conv is None:
+        for k in range(0, len(tstr)):
+            try:
+                times[k] = float(tstr[k])
+            except ValueError:
+                continue
+
+        return times
+#
+#--- convert all at once; if some of them are broken, convert them one by one
+#
+    try:
+        times[:] = conv(tstr)
+    except ValueError:
+        for k in range(0, len(tstr)):
+            try:
+                times[k] = conv([tstr[k]])[0]
+            except ValueError:
+                continue
+
+    return times
+
+#----------------------------------------------------------------------------------
+#-- is_appended: check whether the indexed part of the file is unchanged         --
+#----------------------------------------------------------------------------------
+
+def is_appended(ifile, stat, index):
+    """
+    check whether the file only has new lines after the indexed part: it is the same
+    file (a file replaced by a rename has a new inode) and the checksum of the entire
+    indexed part is not changed. reading the part is much faster than indexing it again.
+    input:  ifile   --- data file name
+            stat    --- os.stat of the file
+            index   --- the saved index
+    output: True if the indexed part of the file is not changed
+    """
+    try:
+        indexed = int(index['indexed'])
+        if (int(index['inode']) != stat.st_ino) or (stat.st_size < indexed):
+            return False
+
+        return file_crc(ifile, 0, indexed) == int(index['crc'])
+#
+#--- an index of an older format
+#
+    except KeyError:
+        return False
+
+#----------------------------------------------------------------------------------
+#-- file_crc: checksum of a part of the file                                     --
+#----------------------------------------------------------------------------------
+
+def file_crc(ifile, start, stop, crc=0):
+    """
+    compute the checksum (crc32) of a part of the file
+    input:  ifile   --- data file name
+            start   --- byte position of the start of the part
+            stop    --- byte position of the end of the part
+            crc     --- checksum of the bytes before start; the checksum is continued
+                        from it. default: 0
+    output: crc32 of the bytes from the file start (or the part of crc) to stop
+    """
+    with open(ifile, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < stop:
+            block = f.read(min(chunk_size, stop - pos))
+            if len(block) == 0:
+                break
+            crc  = zlib.crc32(block, crc)
+            pos += len(block)
+
+    return crc
+
+#-----------------------------------------------------------------------------------------
+#-- TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST    ---
+#-----------------------------------------------------------------------------------------
+
+class TestFunctions(unittest.TestCase):
+
+    def setUp(self):
+
+        global index_dir
+        index_dir  = os.getcwd() + '/TestOut/Index/'
+        self.ifile = index_dir + 'test_data.rdb'
+        os.makedirs(index_dir, exist_ok=True)
+        loaded.clear()
+
+    def tearDown(self):
+
+        for ent in os.listdir(index_dir):
+            if ent.startswith('test_data.rdb'):
+                os.remove(index_dir + ent)
+
+    def write_lines(self, lines, mode='w'):
+
+        with open(self.ifile, mode) as fo:
+            fo.write(lines)
+#
+#--- make the modification time different from the previous one
+#
+        os.utime(self.ifile, ns=(0, os.stat(self.ifile).st_mtime_ns + len(loaded) + 1))
+        loaded.clear()
+
+#------------------------------------------------------------------------
+
+    def test_read_window(self):
+
+        self.write_lines('time\tval\nN\tN\n10.0\t1\n20.0\t2\n30.0\t3\n40.0\t4\n')
+
+        self.assertEqual(read_window(self.ifile, 20, 40), [[20.0, 30.0], ['20.0\t2', '30.0\t3']])
+        self.assertEqual(read_window(self.ifile, 41, 50), [[], []])
+#
+#--- append lines including one without a newline at the end
+#
+        self.write_lines('50.0\t5\n60', mode='a')
+        self.assertEqual(read_window(self.ifile, 40, 70)[0], [40.0, 50.0, 60.0])
+
+        self.write_lines('.0\t6\n70.0\t7\n', mode='a')
+        self.assertEqual(read_window(self.ifile, 55, 80)[1], ['60.0\t6', '70.0\t7'])
+#
+#--- rewrite the file; the index must be rebuilt
+#
+        self.write_lines('15.0\ta\n5.0\tb\n25.0\tc\n')
+        self.assertEqual(read_window(self.ifile, 0, 20), [[5.0, 15.0], ['5.0\tb', '15.0\ta']])
+
+#------------------------------------------------------------------------
+
+    def test_is_appended(self):
+#
+#--- a line in the middle of a long file is changed in place (the same size) and
+#--- new lines are appended; the change must be found and the index rebuilt
+#
+        lines = ''.join(['%d.0\t%d\n' % (k, k % 10) for k in range(1000, 4000)])
+        self.write_lines(lines)
+        self.assertEqual(read_window(self.ifile, 2000, 2001)[1], ['2000.0\t0'])
+
+        with open(self.ifile, 'r+') as fo:
+            fo.seek(lines.index('2000.0\t0'))
+            fo.write('2000.5')
+        self.write_lines('4000.0\t0\n', mode='a')
+
+        self.assertEqual(read_window(self.ifile, 2000, 2001), [[2000.5], ['2000.5\t0']])
+        self.assertEqual(read_window(self.ifile, 3999, 4001)[0], [3999.0, 4000.0])
+
+#------------------------------------------------------------------------
+
+    def test_convert_times(self):
+
+        conv  = lambda x: numpy.array([float(ent) * 2 for ent in x])
+        times = convert_times(['1', 'x', '3'], conv)
+
+        self.assertEqual(times[0], 2.0)
+        self.assertTrue(numpy.isnan(times[1]))
+        self.assertEqual(times[2], 6.0)
+
+#-------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    unittest.main()
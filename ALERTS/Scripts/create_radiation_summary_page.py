@@ -6,7 +6,7 @@
 #                                                                                       #
 #               author: t. isobe (tisobe@cfa.harvard.edu)                               #
 #                                                                                       #
-#               last updae: mar 16, 2021                                                #
+#               last update: Oct 16, 2026                                               #
 #                                                                                       #
 #########################################################################################
 
@@ -42,10 +42,12 @@ if (os.getenv('TEST') == 'TEST'):
 #--- append  pathes to private folders to a python directory
 #
 sys.path.append('/data/mta4/Script/Python3.10/MTA/')
+sys.path.append(crm3_dir + 'Scripts/')
 #
 #--- import several functions
 #
 import mta_common_functions as mcf
+import inst_timeline        as itl
 #
 #--- temp writing file name
 #
@@ -607,100 +609,10 @@ def calc_acis_att_time(start, stop):
     output: att_time    --- total acis operation time during the given period
     """
 #
-#--- read the instrument in use list
+#--- the instrument timeline of /proj/sot/acis/FLU-MON/FPHIST-2001.dat is converted
+#--- only when the file is updated
 #
-    ifile = '/proj/sot/acis/FLU-MON/FPHIST-2001.dat'
-    data  = mcf.read_data_file(ifile)
-    
-#
-#--- create lists of starting time and stopping time for ACIS-I, ACIS-S, HRC-I, HRC-S 
-#--- set their positional index to 0, 1, 2, and 3, respectively
-#
-    inst_start = [[], [], [], []]
-    inst_stop  = [[], [], [], []]
-#
-#--- dummy instrument indicator
-#
-    pinst = -999
-    pchk  = 0
-
-    klen = len(data)
-    for k in range(0, klen):
-        atemp = re.split('\s+', data[k])
-        try:
-            ctime = Chandra.Time.DateTime(atemp[0]).secs
-        except:
-            continue
-
-        if atemp[1] == 'ACIS-I':
-            pos = 0
-        elif atemp[1] == 'ACIS-S':
-            pos = 1
-        elif atemp[1] == 'HRC-I':
-            pos = 2
-        elif atemp[1] == 'HRC-S':
-            pos = 3
-        else:
-            continue
-#
-#--- if the time is before the collecting period, just keep which instrument is used
-#
-        if ctime < start:
-            pinst = pos
-            continue
-#
-#--- if the time is after the collecting period, add the stop time to the previous instrument
-#--- before breaking the loop unless there is no starting time yet; then also add starting time
-#
-        if ctime > stop:
-            if pchk == 0:
-                inst_start[pinst].append(start)
-            inst_stop[pinst].append(stop)
-            break 
-#
-#--- the time is in the period first time, add the time to previous instrument
-#
-        if pchk == 0:
-            inst_start[pinst].append(start)
-            pchk = 1
-#
-#--- close the previous instrument and start the period of the new instrument
-#
-        inst_stop[pinst].append(ctime)
-        inst_start[pos].append(ctime)
-        pinst = pos
-#
-#--- accumulate time periods when acis is in use
-#
-    att_time = 0.0
-    for k in range(0, len(inst_start[0])):
-        istart = inst_start[0][k]
-        try:
-            istop  = inst_stop[0][k]
-        except:
-            istop  = stop
-
-        if istart < start:
-            istart = start
-        if istop > stop:
-            istop = stop
-
-        att_time += istop - istart
-
-    for k in range(0, len(inst_start[1])):
-        istart = inst_start[1][k]
-        try:
-            istop  = inst_stop[1][k]
-        except:
-            istop  = stop
-        if istart < start:
-            istart = start
-        if istop > stop:
-            istop = stop
-
-        att_time += istop - istart
-
-    return att_time
+    return itl.acis_exposure(start, stop)
             
 
 #-----------------------------------------------------------------------------
@@ -5,7 +5,7 @@
 #   run_goes_fluence_extract.py: compute goese fluece of this orbital period    #
 #                                                                               #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                           #
-#           last update: Mar 16, 2021                                           #
+#           last update: Oct 16, 2026                                           #
 #                                                                               #
 #################################################################################
 
@@ -17,8 +17,6 @@ import math
 import time
 import Chandra.Time
 import maude
-import urllib.request
-import json
 import random
 
 path = '/data/mta4/Space_Weather/house_keeping/dir_list'
@@ -38,9 +36,11 @@ if (os.getenv('TEST') == 'TEST'):
 #--- append path to a private folder
 #
 sys.path.append(goes_dir)
+sys.path.append(goes_dir + 'Scripts/')
 sys.path.append('/data/mta4/Script/Python3.10/MTA/')
 
 import mta_common_functions     as mcf
+import feed_cache               as fcache   #--- shared on-disk cache of the web feeds
 #
 #--- set a temporary file name
 #
@@ -170,11 +170,10 @@ def compute_goes_fluence(dlink, energy_list, ostart, factor):
     output: <data_dir>/<out file>
     """
 #
-#--- read json file from the web
+#--- read json file from the web (through the shared feed cache)
 #
     try:
-        with urllib.request.urlopen(dlink) as url:
-            data = json.loads(url.read().decode())
+        data = fcache.fetch_json(dlink)
     except:
         return ['na', 'na'], ['na', 'na']
 #
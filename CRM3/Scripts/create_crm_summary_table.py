@@ -6,7 +6,7 @@
 #                                                                                           #
 #               author: t. isobe (tiosbe@cfa.harvard.edu)                                   #
 #                                                                                           #
-#               last update: Oct 07, 2021                                                   #
+#               last update: Oct 16, 2026                                                   #
 #                                                                                           #
 #############################################################################################
 
@@ -33,6 +33,8 @@ for ent in data:
 
 sys.path.append('/data/mta4/Script/Python3.10/MTA/')
 import mta_common_functions     as mcf
+import inst_timeline            as itl
+import crm_cube                 as ccube
 #
 #--- set a temporary file name
 #
@@ -360,6 +362,7 @@ def read_crm_fluence(kpi, ace):
     input:  kpi --- crm file indicator
             ace --- ace vluae
             it also reads  data from <sumdat>= CRMsummary.dat
+            and <crm3_dir>/Data/CRM3_p.npy (crm flux cube)
     output: flux
             summary --- a list of values of:
                 Currently scheduled FPSI, OTG
@@ -397,35 +400,16 @@ def read_crm_fluence(kpi, ace):
 
         summary.append(val)
 
-    ifile = crmdat_root + kpi
-    data  = mcf.read_data_file(ifile)
-
-    chk = 0
-    for ent in data:
-        atemp = re.split('\s+', ent)
-        time  = float(atemp[0])
-        if time > current_time:
-            comp = atemp
-            chk =1
-            break
-        else:
-            stime = time
-            save  = atemp
 #
-#--- find data closest to the current time
+#--- find data closest to the current time in the crm flux cube
 #
-    if chk == 0:
-        crm = save
-    else:
-        if abs(time - current_time) > abs(current_time - stime):
-            crm = save
-        else:
-            crm = comp
+    cube   = ccube.read_cube(crm3_dir + 'Data/')
+    crm    = ccube.nearest_row(cube, current_time, ccube.tail.index(kpi))
 #
 #--- find flux with correction
 #
-    region = int(float(crm[1]))     
-    flux   = crm_factor[region] * float(crm[2]) + sw_factor[region] * ace
+    region = int(crm[ccube.col_idloc])
+    flux   = crm_factor[region] * float(crm[ccube.col_mean]) + sw_factor[region] * ace
 
     return [region, flux, summary]
 
@@ -439,19 +423,9 @@ def read_sim():
     input: none but read from <sim_file>
     output: si
     """
-    si   = 'NA'
-
-    data = mcf.read_data_file(sim_file)
-    for ent in data:
-        atemp = re.split('\s+', ent)
-        btemp = re.split('\.',  atemp[0])
-        try:
-            ctime = Chandra.Time.DateTime(btemp[0]).secs
-        except:
-            continue
-        if ctime > current_time:
-            break
-        si    = atemp[1]
+    si   = itl.state_at(sim_file, current_time)[0]
+    if si == '':
+        si = 'NA'
 
     return si
 
@@ -466,21 +440,7 @@ def read_otg():
     output: otg --- HETG/LETG/NONE/BAD
     """
     convert_grathist_format()
-    data = mcf.read_data_file(otg_file)
-    hetg = ''
-    letg = ''
-    for ent in data:
-        cols  = re.split('\s+', ent)
-        btemp = re.split('\.', cols[0])
-        try:
-            ctime = Chandra.Time.DateTime(btemp[0]).secs
-        except:
-            continue
-        if ctime > current_time:
-            break
-        else:
-            hetg  = cols[1]
-            letg  = cols[2]
+    [hetg, letg] = itl.state_at(otg_file, current_time)
 
     otg = 'NONE'
     if   hetg == 'HETG-IN'  and letg == 'LETG-OUT':
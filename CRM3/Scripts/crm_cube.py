@@ -0,0 +1,340 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       crm_cube.py: binary time x kp cube of the CRM proton flux           #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- the cube is a float64 numpy array of (time x 28 kp levels x 6) kept in
+#--- <data_dir>/CRM3_p.npy and read as a memory map. the last axis is the same as
+#--- the columns of CRM3_p.dat<tail>: time, idloc, fluxmn, flux95, flux50, fluxsd
+#--- the times are on a uniform grid; a grid time without data has idloc = -1.
+#--- if the times of the tables are not on one uniform grid, the time axis is the
+#--- sorted times of all tables instead (see make_cube).
+#--- the values have the precision of the text tables, so that both give the same numbers.
+#
+#--- run this script (crm_cube.py) after the fortran runcrm to write the cube.
+#
+import os
+import sys
+import numpy
+#
+#--- write through a temporary file and a rename
+#
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
+import atomic_file as afile
+
+data_dir = '/data/mta4/Space_Weather/CRM3/Data/'
+#
+#--- the file name tails of the 28 kp levels (kp = index / 3)
+#
+tail = ['00','03','07','10','13','17','20','23','27',\
+        '30','33','37','40','43','47','50','53','57',\
+        '60','63','67','70','73','77','80','83','87','90']
+#
+#--- the largest difference (seconds) between a time of the tables and its grid time
+#
+grid_tol = 1.0
+#
+#--- column positions on the last axis
+#
+col_time  = 0
+col_idloc = 1
+col_mean  = 2
+col_95    = 3
+col_50    = 4
+col_sd    = 5
+
+#----------------------------------------------------------------------------------
+#-- read_cube: read the crm flux cube                                            --
+#----------------------------------------------------------------------------------
+
+def read_cube(ddir=data_dir):
+    """
+    read the crm flux cube. if the cube is older than the text tables (e.g. they are
+    written by the fortran runcrm), it is rebuilt from the text tables first
+    input:  ddir    --- data directory; default: data_dir
+    output: cube    --- (time x 28 x 6) array (memory map); None if there are no data
+    """
+    cfile = ddir + 'CRM3_p.npy'
+    tfile = [ddir + 'CRM3_p.dat' + ent for ent in tail]
+    tlast = max([os.path.getmtime(ent) for ent in tfile if os.path.isfile(ent)], default=0)
+
+    if os.path.isfile(cfile) and os.path.getmtime(cfile) >= tlast:
+        return numpy.load(cfile, mmap_mode='r')
+#
+#--- rebuild the cube from the text tables
+#
+    tlists = []
+    vlists = []
+    for ifile in tfile:
+        try:
+            data = numpy.loadtxt(ifile, ndmin=2)
+        except (OSError, ValueError):
+            data = numpy.zeros((0, 6))
+        if len(data) == 0:
+            data = numpy.zeros((0, 6))
+        tlists.append(data[:, 0])
+        vlists.append(data[:, 1:6])
+
+    cube = make_cube(tlists, vlists)
+    if cube is None:
+        return None
+    try:
+        save_cube(cfile, cube)
+    except OSError:
+        pass
+
+    return cube
+
+#----------------------------------------------------------------------------------
+#-- write_cube: write the crm flux cube from the runcrm results                  --
+#----------------------------------------------------------------------------------
+
+def write_cube(cfile, tlist, results):
+    """
+    write the crm flux cube from the runcrm results
+    input:  cfile   --- output file name (<data_dir>/CRM3_p.npy)
+            tlist   --- array of time
+            results --- a list (for each kp level) of the lists of arrays of
+                        idloc, fluxmn, flux95, flux50, fluxsd
+    output: cfile
+    """
+#
+#--- round the values to the precision of the text tables
+#
+    tlist = text_precision(tlist, '%.1f')
+    tlists = []
+    vlists = []
+    for ent in results:
+        vals = [numpy.asarray(ent[0], dtype=float)]
+        for m in range(1, 5):
+            vals.append(text_precision(ent[m], '%.6e'))
+        tlists.append(tlist)
+        vlists.append(numpy.column_stack(vals))
+
+    cube = make_cube(tlists, vlists)
+    if cube is not None:
+        save_cube(cfile, cube)
+
+#----------------------------------------------------------------------------------
+#-- make_cube: place the data of each kp level on the uniform time grid          --
+#----------------------------------------------------------------------------------
+
+def make_cube(tlists, vlists):
+    """
+    place the data of each kp level on the uniform time grid. if a time is not on
+    the grid (within grid_tol) or two times of a level fall on the same grid time,
+    the time axis is the sorted times of all levels instead.
+    input:  tlists  --- a list (for each kp level) of arrays of time
+            vlists  --- a list (for each kp level) of (time x 5) arrays of
+                        idloc, fluxmn, flux95, flux50, fluxsd
+    output: cube    --- (time x 28 x 6) array; None if there are no data
+            raise ValueError if a level has the same time twice
+    """
+    filled = [tlist for tlist in tlists if len(tlist) > 0]
+    if len(filled) == 0:
+        return None
+
+    for tlist in filled:
+        if numpy.any(numpy.diff(numpy.sort(tlist)) == 0):
+            raise ValueError('a crm table has the same time twice')
+
+    start = min([tlist.min() for tlist in filled])
+    stop  = max([tlist.max() for tlist in filled])
+#
+#--- the ephemeris step; 5 min
+#
+    step  = 300.0
+    for tlist in filled:
+        if len(tlist) > 1:
+            step = float(numpy.median(numpy.diff(tlist)))
+            break
+
+    regular = False
+    if step > 0:
+        nrow    = int(numpy.rint((stop - start) / step)) + 1
+        grid    = start + step * numpy.arange(nrow)
+        plist   = [numpy.rint((tlist - start) / step).astype(int) for tlist in tlists]
+#
+#--- check that the times are on the grid and that each one has its own grid time
+#
+        regular = all(on_grid(tlists[k], plist[k], grid) for k in range(0, len(tlists)))
+
+    if not regular:
+        grid  = numpy.unique(numpy.concatenate(filled))
+        nrow  = len(grid)
+        plist = [numpy.searchsorted(grid, tlist) for tlist in tlists]
+
+    cube = numpy.full((nrow, len(tail), 6), numpy.nan)
+    cube[:, :, col_time]  = grid[:, None]
+    cube[:, :, col_idloc] = -1
+
+    for k in range(0, len(tlists)):
+        if len(tlists[k]) == 0:
+            continue
+        cube[plist[k], k, col_time] = tlists[k]
+        cube[plist[k], k, 1:]       = vlists[k]
+
+    return cube
+
+#----------------------------------------------------------------------------------
+#-- on_grid: check whether the times are on the uniform grid                     --
+#----------------------------------------------------------------------------------
+
+def on_grid(tlist, pos, grid):
+    """
+    check whether the times are on the uniform grid
+    input:  tlist   --- array of time
+            pos     --- array of the grid positions of the times
+            grid    --- array of the grid times
+    output: True if each time is within grid_tol of its own grid time
+    """
+    if len(tlist) == 0:
+        return True
+    if (pos.min() < 0) or (pos.max() >= len(grid)):
+        return False
+    if len(numpy.unique(pos)) != len(pos):
+        return False
+
+    return bool(numpy.all(numpy.abs(tlist - grid[pos]) <= grid_tol))
+
+#----------------------------------------------------------------------------------
+#-- save_cube: write the cube through a temporary file                           --
+#----------------------------------------------------------------------------------
+
+def save_cube(cfile, cube):
+    """
+    write the cube through a temporary file so that readers never see a partial file
+    input:  cfile   --- output file name
+            cube    --- (time x 28 x 6) array
+    output: cfile
+    """
+    afile.write_file(cfile, lambda fo: numpy.save(fo, cube))
+
+#----------------------------------------------------------------------------------
+#-- text_precision: round values to the precision of a format                    --
+#----------------------------------------------------------------------------------
+
+def text_precision(vals, fmt):
+    """
+    round values to the precision of a format (the values read back from the text)
+    input:  vals    --- array of values
+            fmt     --- '%' format
+    output: array of the rounded values
+    """
+    return numpy.array([fmt % val for val in numpy.asarray(vals).tolist()], dtype=float)
+
+#----------------------------------------------------------------------------------
+#-- nearest_row: find the data closest to the given time                         --
+#----------------------------------------------------------------------------------
+
+def nearest_row(cube, stime, k):
+    """
+    find the data of a kp level closest to the given time; if the time is in the
+    middle of two data, the later one is used
+    input:  cube    --- crm flux cube
+            stime   --- time in seconds from 1998.1.1
+            k       --- index of the kp level
+    output: a row of time, idloc, fluxmn, flux95, flux50, fluxsd
+    """
+    times = cube[:, k, col_time]
+    nrow  = len(times)
+#
+#--- the first grid time after stime
+#
+    nxt   = int(numpy.searchsorted(times, stime, side='right'))
+
+    valid = cube[:, k, col_idloc] >= 0
+    if (nxt < nrow and not valid[nxt]) or (nxt > 0 and not valid[nxt-1]):
+#
+#--- there is a gap around stime; use the closest data around it
+#
+        idx  = numpy.nonzero(valid)[0]
+        pos  = numpy.searchsorted(idx, nxt)
+        prev = idx[pos-1] if pos > 0 else None
+        nxt  = idx[pos] if pos < len(idx) else nrow
+    else:
+        prev = nxt - 1 if nxt > 0 else None
+
+    if nxt >= nrow:
+        return numpy.array(cube[prev, k])
+    if prev is None:
+        return numpy.array(cube[nxt, k])
+
+    if abs(times[nxt] - stime) > abs(stime - times[prev]):
+        return numpy.array(cube[prev, k])
+    else:
+        return numpy.array(cube[nxt, k])
+
+#----------------------------------------------------------------------------------
+#-- flux_at: interpolate the flux at given times and kp values                   --
+#----------------------------------------------------------------------------------
+
+def flux_at(cube, stime, kp, col=col_mean):
+    """
+    interpolate the flux at given times and kp values (linear in both time and kp)
+    input:  cube    --- crm flux cube
+            stime   --- a time or numpy array of times in seconds from 1998.1.1
+            kp      --- a kp value or numpy array of kp values (0 - 9)
+            col     --- column position of the flux; default: col_mean
+    output: interpolated flux; nan outside of the data
+    """
+    times = cube[:, 0, col_time]
+    nrow  = len(times)
+
+    tpos  = numpy.interp(numpy.asarray(stime, dtype=float), times, numpy.arange(nrow))
+    kpos  = numpy.clip(numpy.asarray(kp, dtype=float) * 3.0, 0, len(tail) - 1)
+    t1    = numpy.minimum(numpy.floor(tpos).astype(int), max(nrow - 2, 0))
+    k1    = numpy.minimum(numpy.floor(kpos).astype(int), len(tail) - 2)
+    t2    = numpy.minimum(t1 + 1, nrow - 1)
+    k2    = k1 + 1
+    wt    = tpos - t1
+    wk    = kpos - k1
+
+    f11   = cube[t1, k1, col]
+    f12   = cube[t1, k2, col]
+    f21   = cube[t2, k1, col]
+    f22   = cube[t2, k2, col]
+
+    flux  = (1 - wt) * ((1 - wk) * f11 + wk * f12) + wt * ((1 - wk) * f21 + wk * f22)
+    flux  = numpy.where((numpy.asarray(stime) < times[0]) | (numpy.asarray(stime) > times[-1]),\
+                        numpy.nan, flux)
+
+    if flux.ndim == 0:
+        return float(flux)
+
+    return flux
+
+#----------------------------------------------------------------------------------
+#-- kp_slice: select the data of a kp level in a time period                     --
+#----------------------------------------------------------------------------------
+
+def kp_slice(cube, k, start, stop):
+    """
+    select the data of a kp level in a time period
+    input:  cube    --- crm flux cube
+            k       --- index of the kp level
+            start   --- starting time in seconds from 1998.1.1
+            stop    --- stopping time in seconds from 1998.1.1
+    output: (n x 6) array of time, idloc, fluxmn, flux95, flux50, fluxsd
+    """
+    times = cube[:, k, col_time]
+    pos1  = numpy.searchsorted(times, start, side='left')
+    pos2  = numpy.searchsorted(times, stop,  side='right')
+    rows  = numpy.array(cube[pos1:pos2, k])
+
+    return rows[rows[:, col_idloc] >= 0]
+
+#----------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+#
+#--- rebuild the cube from the text tables written by the fortran runcrm
+#
+    read_cube()
@@ -0,0 +1,310 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       inst_timeline.py: instrument and grating timelines of FPHIST and    #
+#                         GRATHIST with a cache rebuilt on the file change  #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- a timeline is a pair of:
+#---    stime   --- numpy array of the entry times in seconds from 1998.1.1
+#---    cols    --- numpy string array of (entry x 2) state columns;
+#---                FPHIST: <instrument> <obsid>, GRATHIST: <HETG state> <LETG state>
+#--- the entries are converted once and kept in <cache_dir>/<file name>.npz with the
+#--- modification time and the size of the source; the cache is rebuilt when they change
+#
+import os
+import re
+import sys
+import numpy
+import Chandra.Time
+#
+#--- write through a temporary file and a rename
+#
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
+import atomic_file as afile
+
+fphist_file   = '/proj/sot/acis/FLU-MON/FPHIST-2001.dat'
+grathist_file = '/proj/sot/acis/FLU-MON/GRATHIST-2001.dat'
+
+cache_dir = '/data/mta4/Space_Weather/CRM3/Data/Timeline/'
+if (os.getenv('TEST') == 'TEST'):
+    cache_dir = os.getcwd() + '/TestOut/Timeline/'
+#
+#--- instrument list; the positional index is the instrument state code
+#
+inst_list = ['ACIS-I', 'ACIS-S', 'HRC-I', 'HRC-S']
+acis_code = [0, 1]
+#
+#--- time format of the entries; the others are converted one by one.
+#--- the fractional seconds are kept as plot_crm_flux_data.py and create_radiation_summary_page.py
+#--- did; read_sim/read_otg of create_crm_summary_table.py used to drop them, so their state
+#--- now changes at the exact entry time instead of up to one second before it.
+#
+time_pattern = re.compile(r'^\d{4}:\d{3}:\d{2}:\d{2}:\d{2}(\.\d*)?$')
+#
+#--- timelines already read in this process, keyed by the source file name
+#
+loaded = {}
+
+#----------------------------------------------------------------------------------
+#-- read_timeline: read the timeline of FPHIST or GRATHIST                       --
+#----------------------------------------------------------------------------------
+
+def read_timeline(ifile):
+    """
+    read the timeline of FPHIST or GRATHIST; the cache is used if the file has not changed
+    input:  ifile   --- FPHIST or GRATHIST file name
+    output: [stime, cols]
+                stime   --- numpy array of the entry times in seconds from 1998.1.1
+                cols    --- numpy string array of (entry x 2) state columns
+    """
+    stat = os.stat(ifile)
+    key  = [stat.st_mtime_ns, stat.st_size]
+
+    if ifile in loaded and loaded[ifile][0] == key:
+        return loaded[ifile][1]
+
+    cfile = cache_dir + os.path.basename(ifile) + '.npz'
+    try:
+        with numpy.load(cfile) as cache:
+            if cache['source'].tolist() == key:
+                out = [cache['stime'], cache['cols']]
+                loaded[ifile] = [key, out]
+                return out
+    except (OSError, KeyError, ValueError):
+        pass
+
+    out = build_timeline(ifile)
+#
+#--- write through a temporary file so that other jobs never read a partial cache
+#
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        afile.write_file(cfile, lambda fo: numpy.savez(fo, stime=out[0], cols=out[1],\
+                                                        source=numpy.array(key)))
+    except OSError:
+        pass
+
+    loaded[ifile] = [key, out]
+    return out
+
+#----------------------------------------------------------------------------------
+#-- build_timeline: convert the entries of FPHIST or GRATHIST                    --
+#----------------------------------------------------------------------------------
+
+def build_timeline(ifile):
+    """
+    convert the entries of FPHIST or GRATHIST; the lines without a readable time are dropped
+    input:  ifile   --- FPHIST or GRATHIST file name
+    output: [stime, cols] (see read_timeline)
+    """
+    with open(ifile, 'r') as f:
+        data = [line.strip() for line in f.readlines()]
+
+    tlist = []
+    cols  = []
+    for ent in data:
+        atemp = re.split(r'\s+', ent) + ['', '']
+        tlist.append(atemp[0])
+        cols.append(atemp[1:3])
+#
+#--- convert the standard time format at once and the others one by one
+#
+    stime = numpy.full(len(tlist), numpy.nan)
+    std   = numpy.array([time_pattern.match(x) is not None for x in tlist], dtype=bool)
+    if std.any():
+        stime[std] = Chandra.Time.DateTime(numpy.array(tlist)[std]).secs
+
+    for k in numpy.nonzero(~std)[0]:
+        try:
+            stime[k] = Chandra.Time.DateTime(tlist[k]).secs
+        except:
+            continue
+
+    keep  = ~numpy.isnan(stime)
+    cols  = numpy.array(cols, dtype=str).reshape(len(cols), 2)[keep]
+    stime = stime[keep]
+#
+#--- the file is in time order; a stable sort keeps the order of the entries at the same time
+#
+    order = numpy.argsort(stime, kind='stable')
+
+    return [stime[order], cols[order]]
+
+#----------------------------------------------------------------------------------
+#-- inst_codes: instrument state codes of FPHIST entries                         --
+#----------------------------------------------------------------------------------
+
+def inst_codes(cols):
+    """
+    instrument state codes of FPHIST entries
+    input:  cols    --- FPHIST state columns
+    output: codes   --- numpy array of 0: ACIS-I, 1: ACIS-S, 2: HRC-I, 3: HRC-S, -999: others
+    """
+    codes = numpy.full(len(cols), -999)
+    for k, inst in enumerate(inst_list):
+        codes[cols[:, 0] == inst] = k
+
+    return codes
+
+#----------------------------------------------------------------------------------
+#-- otg_codes: grating state codes of GRATHIST entries                           --
+#----------------------------------------------------------------------------------
+
+def otg_codes(cols):
+    """
+    grating state codes of GRATHIST entries
+    input:  cols    --- GRATHIST state columns
+    output: codes   --- numpy array of 0: HETG, 1: LETG, -999: none or both
+    """
+    codes = numpy.full(len(cols), -999)
+    codes[(cols[:, 0] == 'HETG-IN')  & (cols[:, 1] == 'LETG-OUT')] = 0
+    codes[(cols[:, 0] == 'HETG-OUT') & (cols[:, 1] == 'LETG-IN')]  = 1
+
+    return codes
+
+#----------------------------------------------------------------------------------
+#-- state_at: find the states in effect at the given times                       --
+#----------------------------------------------------------------------------------
+
+def state_at(ifile, stime):
+    """
+    find the states in effect at the given times (the last entries at or before the times)
+    input:  ifile   --- FPHIST or GRATHIST file name
+            stime   --- a time or numpy array of times in seconds from 1998.1.1
+    output: states  --- state columns of the entries; ['', ''] if the time is
+                        before the first entry
+    """
+    [etime, cols] = read_timeline(ifile)
+    pos    = numpy.atleast_1d(numpy.searchsorted(etime, stime, side='right') - 1)
+    states = numpy.full((len(pos), 2), '', dtype=cols.dtype)
+    found  = pos >= 0
+    states[found] = cols[pos[found]]
+
+    if numpy.ndim(stime) == 0:
+        return states[0].tolist()
+
+    return states
+
+#----------------------------------------------------------------------------------
+#-- acis_exposure: compute the time periods where acis was in use                --
+#----------------------------------------------------------------------------------
+
+def acis_exposure(start, stop, ifile=fphist_file):
+    """
+    compute the time periods where acis (ACIS-I or ACIS-S) was in use
+    input:  start   --- a starting time or numpy array of starting times in seconds from 1998.1.1
+            stop    --- a stopping time or numpy array of stopping times
+            ifile   --- FPHIST file name; default: fphist_file
+    output: total acis operation time of each period in seconds
+    """
+    [etime, cols] = read_timeline(ifile)
+    codes = inst_codes(cols)
+    known = codes >= 0
+    etime = etime[known]
+    acis  = numpy.isin(codes[known], acis_code)
+#
+#--- acis time accumulated up to each entry; the last state continues
+#
+    cum = numpy.zeros(len(etime))
+    if len(etime) > 1:
+        cum[1:] = numpy.cumsum(numpy.diff(etime) * acis[:-1])
+
+    def acis_time(t):
+        if len(etime) == 0:
+            return numpy.zeros(numpy.shape(t))
+        pos = numpy.searchsorted(etime, t, side='right') - 1
+        idx = numpy.maximum(pos, 0)
+        return numpy.where(pos >= 0, cum[idx] + acis[idx] * (t - etime[idx]), 0.0)
+
+    start = numpy.asarray(start, dtype=float)
+    stop  = numpy.asarray(stop,  dtype=float)
+    att_time = numpy.maximum(acis_time(stop) - acis_time(start), 0.0)
+
+    if att_time.ndim == 0:
+        return float(att_time)
+
+    return att_time
+
+#----------------------------------------------------------------------------------
+#-- state_intervals: create lists of start and stop times of each state          --
+#----------------------------------------------------------------------------------
+
+def state_intervals(etime, codes, nstate, start, stop, end_time):
+    """
+    create lists of start and stop times of each state from the entries in [start, stop]
+    input:  etime       --- numpy array of the entry times
+            codes       --- numpy array of the state codes; negative means no state
+            nstate      --- the number of the states
+            start       --- starting time of the period
+            stop        --- stopping time of the period
+            end_time    --- stopping time of the last state
+    output: s_start     --- a list of lists of starting times of each state
+            s_stop      --- a list of lists of stopping times of each state
+    """
+    sel   = (etime >= start) & (etime <= stop)
+    etime = etime[sel]
+    codes = codes[sel]
+
+    s_start = []
+    s_stop  = []
+    for k in range(0, nstate):
+        s_start.append(etime[codes == k].tolist())
+#
+#--- a state is closed by the next entry or at end_time if it is the last one
+#
+        stops = etime[1:][codes[:-1] == k].tolist()
+        if len(codes) > 0 and codes[-1] == k:
+            stops.append(end_time)
+        s_stop.append(stops)
+
+    return [s_start, s_stop]
+
+#----------------------------------------------------------------------------------
+#-- inst_intervals: create lists of start and stop times of each instrument      --
+#----------------------------------------------------------------------------------
+
+def inst_intervals(start, stop, end_time, ifile=fphist_file):
+    """
+    create lists of start and stop times of each instrument from the entries in [start, stop]
+    input:  start       --- starting time in seconds from 1998.1.1
+            stop        --- stopping time in seconds from 1998.1.1
+            end_time    --- stopping time of the last instrument
+            ifile       --- FPHIST file name; default: fphist_file
+    output: inst_start  --- a list of lists of starting time of each instrument
+            inst_stop   --- a list of lists of stopping time of each instrument
+            order of the instrument is: ACIS-I, ACIS-S, HRC-I, HRC-S
+    """
+    [etime, cols] = read_timeline(ifile)
+    codes = inst_codes(cols)
+#
+#--- the entries of other instruments are ignored
+#
+    known = codes >= 0
+
+    return state_intervals(etime[known], codes[known], len(inst_list), start, stop, end_time)
+
+#----------------------------------------------------------------------------------
+#-- otg_intervals: create lists of start and stop times of each grating          --
+#----------------------------------------------------------------------------------
+
+def otg_intervals(start, stop, end_time, ifile=grathist_file):
+    """
+    create lists of start and stop times of each grating from the entries in [start, stop]
+    input:  start       --- starting time in seconds from 1998.1.1
+            stop        --- stopping time in seconds from 1998.1.1
+            end_time    --- stopping time of the last grating
+            ifile       --- GRATHIST file name; default: grathist_file
+    output: otg_start   --- a list of lists of starting time
+            otg_stop    --- a list of lists of stopping time
+            order of otg is : HETG, LETG
+    """
+    [etime, cols] = read_timeline(ifile)
+
+    return state_intervals(etime, otg_codes(cols), 2, start, stop, end_time)
@@ -6,7 +6,7 @@
 #                                                                               #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                           #
 #                                                                               #
-#           last update: Mar 16, 2021                                           #
+#           last update: Oct 16, 2026                                           #
 #                                                                               #
 #################################################################################
 
@@ -47,10 +47,14 @@ if (os.getenv('TEST') == 'TEST'):
 #--- append  pathes to private folders to a python directory
 #
 sys.path.append('/data/mta4/Script/Python3.10/MTA/')
+sys.path.append(ephem_dir + 'Scripts/')
 #
 #--- import several functions
 #
 import mta_common_functions as mcf
+import inst_timeline        as itl
+import crm_cube             as ccube
+import time_join            as tjn
 #
 #--- temp writing file name
 #
@@ -260,7 +264,7 @@ def read_region_data(time_list, cre=0):
     """
     read region data and assign color to correspoinding time list
     input:  time_list   --- a list of time
-            also read from: <crm3_dir>/Data/CRM3_p.dat30
+            also read from: <crm3_dir>/Data/CRM3_p.npy (kp = 3.0 of the crm flux cube)
     output: color       --- a list of color correspond to the time_list
                 region: 1   solar wind      color: aqua
                 region: 2   magnetoshearth  color: fuchsia
@@ -274,73 +278,35 @@ def read_region_data(time_list, cre=0):
 #
 #--- read data 
 #
-    infile = crm3_dir + '/Data/CRM3_p.dat30'
-    data   = mcf.read_data_file(infile)
-    ctime  = []
-    region = []
-    for ent in data:
-        atemp = re.split('\s+', ent)
-        rtime = float(atemp[0])
-        if rtime < start:
-            continue
-        elif rtime > stop:
-            break
-        ctime.append(rtime)
-        region.append(int(float(atemp[1])))
-#
-#--- compare two time list and find which region satellite is in
-#
-    color  = []
-    r_list = []
-    start = 0
-    clen  = len(ctime)
-    chk   = 0
-    tlen  = len(time_list)
-    for n in range(0, tlen):
-        r_list.append(1)
-        otime = time_list[n]
-
-        for k in range(start, clen):
-            k1 = k + 1
-            if k1 >= clen:
-                chk = 1
-                break
+    cube   = ccube.read_cube(crm3_dir + 'Data/')
+    rows   = ccube.kp_slice(cube, ccube.tail.index('30'), start, stop)
+    ctime  = rows[:, ccube.col_time]
+    region = rows[:, ccube.col_idloc].astype(int)
+    clen   = len(ctime)
+#
+#--- find the region entry in effect at each time; the times after the last
+#--- entry are handled below
+#
+    pos    = tjn.asof_index(ctime, time_list, 'previous')
+    after  = numpy.nonzero(pos >= clen - 1)[0]
+    nin    = after[0] if len(after) > 0 else len(pos)
+    pos    = pos[:nin]
+    reg    = region[numpy.maximum(pos, 0)] if clen > 0 else pos
 #
 #--- if the region list could not cover the first part of the time list, use color "white"
 #
-            if k == 0 and otime < ctime[k]:
-                color.append('white')
-                r_list[n] =  1
-                break
-
-            elif otime >=ctime[k] and otime < ctime[k1]:
-                if region[k] == 1:
-                    color.append('aqua')
-                    r_list[n] = 1
-                elif region[k] == 2:
-                    color.append('fuchsia')
-                    r_list[n] = 2
-                else:
-                    color.append('yellow')
-                    r_list[n] = 3
-                start = k - 5
-                if start < 0:
-                    start = 0
-                break
-            else:
-                continue
-
-        if chk > 0:
-            break
+    color  = numpy.where(pos < 0, 'white', numpy.where(reg == 1, 'aqua',\
+                         numpy.where(reg == 2, 'fuchsia', 'yellow'))).tolist()
+    r_list = numpy.where((pos < 0) | (reg == 1), 1, numpy.where(reg == 2, 2, 3)).tolist()
 #
 #--- if the color list was not be filled, use the last region color to fill
+#--- (the region code is 1 there)
 #
-    if len(color) < len(time_list):
-        lcolor = color[-1]
-        val    = r_list[-1]
-        for k in range(len(color), len(time_list)):
-            color.append(lcolor)
-            r_list.append(val)
+    if nin < len(time_list):
+        nfill  = len(time_list) - nin
+        lcolor = color[-1] if nin > 0 else 'white'
+        color  = color  + [lcolor] * nfill
+        r_list = r_list + [1] * nfill
 
     color  = color[:clen]
     r_list = r_list[:clen]
@@ -357,7 +323,7 @@ def read_flux_model(kp):
     """
     read CRM flux model
     input:  kp  --- kp value
-            <crm3_dir>/Data/CRM3_p.dat*
+            <crm3_dir>/Data/CRM3_p.npy (crm flux cube)
     output: time_list   --- a list of lists of times
             flux_list   --- a list of lists of flux
             color_list  --- a list of lists of color indicating a region where the satellite is in
@@ -384,35 +350,23 @@ def read_flux_model(kp):
     color_list = [[], [], [], [], [], [], [], [], [], [], []]
     flux_list  = [[], [], [], [], [], [], [], [], [], [], []]
 #
-#--- read each of them and save the fluxes
+#--- read each of them from the crm flux cube and save the fluxes
 #
+    cube = ccube.read_cube(crm3_dir + 'Data/')
     for k in range(0, 11):
-        ifile = crm3_dir + 'Data/CRM3_p.dat' + tail_list[k]
-        data  = mcf.read_data_file(ifile)
-        for ent in data:
-            atemp = re.split('\s+', ent)
-            xtime = float(atemp[0])
-            if xtime < start:
-                continue
-            elif xtime > stop:
-                break
-            area  = float(atemp[1])     #--- where the satellite is such as solar wind region
-            flux  = float(atemp[2])
-
-            time_list[k].append(xtime)
-            flux_list[k].append(flux)
+        rows  = ccube.kp_slice(cube, ccube.tail.index(tail_list[k]), start, stop)
+        area  = rows[:, ccube.col_idloc]     #--- where the satellite is such as solar wind region
+
+        time_list[k] = rows[:, ccube.col_time].tolist()
+        flux_list[k] = rows[:, ccube.col_mean].tolist()
 #
 #--- change the region in which the satellite is to color code
 #--- yellow --- magnetosphere
 #--- fuchisa--- magnetosphearth
 #--- aqua   --- soloar wind
 #
-            if area == 1:
-                color_list[k].append('aqua')
-            elif area == 2:
-                color_list[k].append('fuchsia')
-            else:
-                color_list[k].append('yellow')
+        color = numpy.where(area == 1, 'aqua', numpy.where(area == 2, 'fuchsia', 'yellow'))
+        color_list[k] = color.tolist()
 
     return [time_list, flux_list, color_list]
 
@@ -435,63 +389,9 @@ def read_inst_list():
     start = today_chandra_time -  3.0 * 86400.0
     stop  = today_chandra_time + 10.0 * 86400.0
 #
-#--- read instrument starting time table
-#
-    ifile = '/proj/sot/acis/FLU-MON/FPHIST-2001.dat'
-    data  = mcf.read_data_file(ifile)
-#
-#--- create lists of starting time and stopping time for ACIS-I, ACIS-S, HRC-I, HRC-S 
-#--- set their positional index to 0, 1, 2, and 3, respectively
+#--- the last stopping time is set to the future: 2200:001:00:00:00
 #
-    inst_start = [[], [], [], []]
-    inst_stop  = [[], [], [], []]
-#
-#--- dummy instrument indicator
-#
-    pinst = -999
-#
-#--- start checking the data
-#
-    klen  = len(data)
-    for k in range(0, klen):
-        atemp = re.split('\s+', data[k])
-        try:
-            ctime = Chandra.Time.DateTime(atemp[0]).secs
-        except:
-            continue
-        if ctime < start:
-            continue
-        elif ctime > stop:
-            break
-
-        if atemp[1] == 'ACIS-I':
-            pos = 0
-        elif atemp[1] == 'ACIS-S':
-            pos = 1
-        elif atemp[1] == 'HRC-I':
-            pos = 2
-        elif atemp[1] == 'HRC-S':
-            pos = 3
-        else:
-            continue
-        inst_start[pos].append(ctime)
-#
-#--- unless the previous inst is a dummy one, stop time is the same as the starting
-#--- time of this round
-#
-        if pinst < 0:
-            pinst = pos
-            continue
-
-        inst_stop[pinst].append(ctime)
-        pinst = pos
-#
-#--- add the future time for the last stopping time
-#
-    if pinst >= 0:
-        inst_stop[pinst].append(6374591994)        #---- 2200:001:00:00:00
-
-    return [inst_start, inst_stop]
+    return itl.inst_intervals(start, stop, 6374591994)
 
 #--------------------------------------------------------------------------------
 #-- read_otg_list: create lists of start and stop time of each otg is in use    -
@@ -511,56 +411,11 @@ def read_otg_list():
 #
     start = today_chandra_time -  3.0 * 86400.0
     stop  = today_chandra_time + 10.0 * 86400.0
-
-    ifile = '/proj/sot/acis/FLU-MON/GRATHIST-2001.dat'
-    data  = mcf.read_data_file(ifile)
-    otg_start = [[], []]
-    otg_stop  = [[], []]
-
-    prev_state = -999
-    for ent in data:
 #
-#--- check which otg is on (or off)
+#--- both in or both out closes the previous otg; the last stopping time
+#--- is set to the future: 2200:001:00:00:00
 #
-        atemp = re.split('\s+', ent)
-        try:
-            ctime = Chandra.Time.DateTime(atemp[0]).secs
-        except:
-            continue
-        if ctime < start:
-            continue
-        elif ctime > stop:
-            break
-        state = -999
-        if atemp[1] == 'HETG-IN' and atemp[2] == 'LETG-IN':
-            state =-999
-        elif atemp[1] == 'HETG-IN' and atemp[2] == 'LETG-OUT':
-            state = 0
-        elif atemp[1] == 'HETG-OUT' and atemp[2] == 'LETG-IN':
-            state = 1
-#
-#--- if otg is turned off (or something wrong), add stopping time to the previous otg
-#
-        if state < 0:
-            if prev_state >= 0:
-                otg_stop[prev_state].append(ctime)
-#
-#--- if otg is turned on or changed, add starting time to that otg, and close the previous otg
-#
-        else:
-            otg_start[state].append(ctime)
-
-            if prev_state >= 0:
-                otg_stop[prev_state].append(ctime)
-
-        prev_state = state
-#
-#--- add the future time for the last stopping time
-#
-    if prev_state >= 0:
-        otg_stop[prev_state].append(6374591994)     #--- 2200:001:00:00:00
-
-    return [otg_start, otg_stop]
+    return itl.otg_intervals(start, stop, 6374591994)
 
 #--------------------------------------------------------------------------------
 #-- create_attenuation_list: create predictive flux models and their attenuated counterparts
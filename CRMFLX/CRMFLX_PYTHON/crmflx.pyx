@@ -7,7 +7,7 @@
 #                                                                               #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                           #
 #                                                                               #
-#           last upate: Mar 22, 2021                                            #
+#           last upate: Oct 16, 2026                                            #
 #                                                                               #
 #           baseed on Robert Cameron's crmflx.f (2001)                          #
 #                                                                               #
@@ -24,6 +24,8 @@ from datetime import datetime
 import Chandra.Time
 import copy
 import unittest
+cimport cython
+from libc.math cimport sqrt
 #
 #--- reading directory list
 #
@@ -41,10 +43,12 @@ for ent in data:
 #--- append  pathes to private folders to a python directory
 #
 sys.path.append('/data/mta/Script/Python3.8/MTA/')
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
 #
 #--- import several functions
 #
 import mta_common_functions as mcf
+import atomic_file          as afile    #--- write through a temporary file and a rename
 #
 #--- temp writing file name
 #
@@ -87,6 +91,8 @@ num2    = 6         #--- Sub-Volume Element Database Parameters: number of sub-v
 xinc2   = 0.1666666 #--- Sub-Volume Element Database Parameters: length of sub-volume element in x-direction (Re)
 yinc2   = 0.1666666 #--- Sub-Volume Element Database Parameters: length of sub-volume element in y-direction (Re)
 zinc2   = 1.0       #--- Sub-Volume Element Database Parameters: length of sub-volume element in z-direction (Re)
+cellblk = 32        #--- number of consecutive database cells grouped into one block of the cell index
+rngeps  = 1.0e-6    #--- margin (Re) used when a block of the cell index is skipped by its distance
 
 #----------------------------------------------------------------------------
 #-- crmflx: calculates the ion flux as a function of the magnetic activity kp index
@@ -97,7 +103,7 @@ def crmflx(xkp,xgsm,ygsm,zgsm,ispeci,iusesw,fswimn,fswi95,fswi50,fswisd,\
            xflux1, yflux1, zflux1, flxbin1, numbin1, numdat1, \
            xflux2, yflux2, zflux2, flxbin2, numbin2, numdat2, \
            xflux3, yflux3, zflux3, flxbin3, numbin3, numdat3, \
-           nsphvol3, ioffset3,joffset3,koffset3,imapindx3):
+           nsphvol3, ioffset3,joffset3,koffset3,imapindx3, kpcache=None, cellidx2=None):
     """
     this routine calculates the ion flux as a function of the
     magnetic activity kp index.
@@ -198,6 +204,11 @@ def crmflx(xkp,xgsm,ygsm,zgsm,ispeci,iusesw,fswimn,fswi95,fswi50,fswisd,\
             koffset3  - array of offset indices for z-direction.
             imapindx3 - array of pointers to flux database.
                         ---- for magnetosphere
+            kpcache   - KpScaleCache object which keeps the kp scaling parameters
+                        between calls. if it is not given, the scaling parameters
+                        are computed for this call only.
+            cellidx2  - cell index of the magnetosheath database (returned by mshinit).
+                        if it is not given, all cells are scanned.
 
     output: idloc   --- phenomenogical region location identification flag:
                             idloc = 1 if spacecraft is in solar wind
@@ -210,28 +221,23 @@ def crmflx(xkp,xgsm,ygsm,zgsm,ispeci,iusesw,fswimn,fswi95,fswi50,fswisd,\
 
     param included numsec, maxkp, maxnum, maxpnt, maxnsphvol
     """
-
-    global flxmn1, flx951, flx501, flxsd1 
-    global flxmn2, flx952, flx502, flxsd2
-#
-#--- initialize the kp save variables
 #
-#    xkpsav1 = 100.0
-    xkpsav2 = 100.0
-    xkpsav3 = 100.0
+#--- the kp scaling parameters are kept in the cache; they are recomputed
+#--- only when the kp value changes more than xkptol or the species changes
 #
-#--- initialize the species type save variables
-#
-#    ispsav0 = 100
-#    ispsav1 = 100
-    ispsav2 = 100
-    ispsav3 = 100
+    if kpcache is None:
+        kpcache = KpScaleCache()
 #
 #--- determine which phenomenological region the spacecraft is in. the
 #--- spacecraft's coordinates are returned after transformation into
 #--- the magnetotail aligned coordinate system.
 #
     xtail,ytail,ztail,idloc = locreg(xkp,xgsm,ygsm,zgsm)
+
+    fluxmn = 0.0
+    flux95 = 0.0
+    flux50 = 0.0
+    fluxsd = 0.0
 #
 #--- the spacecraft is in region 1: the solar wind
 #
@@ -252,12 +258,7 @@ def crmflx(xkp,xgsm,ygsm,zgsm,ispeci,iusesw,fswimn,fswi95,fswi50,fswisd,\
 #--- if the user supplied kp or species type has changed, redo the
 #--- scaling parameters.
 #
-        xkpdiff = abs(xkp - xkpsav2)
-        ispdiff = ispeci - ispsav2
-        if (xkpdiff > xkptol) or (ispdiff != 0):
-            nsectr2,sectx2,secty2,scmean2,sc952,sc502,scsig2 = scalkp2(xkp,ispeci)
-            xkpsav2 = xkp
-            ispsav2 = ispeci
+        nsectr2,sectx2,secty2,scmean2,sc952,sc502,scsig2 = kpcache.get(2, xkp, ispeci)
 #
 #--- calculate the solar wind's flux for this kp value & position.
 #
@@ -265,7 +266,7 @@ def crmflx(xkp,xgsm,ygsm,zgsm,ispeci,iusesw,fswimn,fswi95,fswi50,fswisd,\
             nbrflux(xkp,nsectr2,sectx2,secty2,scmean2,sc952,sc502, \
                     scsig2,xtail,ytail,ztail,numdat2,xflux2,yflux2,zflux2,\
                     flxbin2,numbin2,smooth1,nflxget,ndrophi,ndroplo,logflg,\
-                    rngtol,fpchi,fpclo)
+                    rngtol,fpchi,fpclo,cellidx=cellidx2)
 #
 #--- the spacecraft is in region 3, the magnetosphere
 #
@@ -281,12 +282,7 @@ def crmflx(xkp,xgsm,ygsm,zgsm,ispeci,iusesw,fswimn,fswi95,fswi50,fswisd,\
 #--- if the user supplied kp or species type has changed, redo the
 #--- scaling parameters.
 #
-        xkpdiff = abs(xkp3 - xkpsav3)
-        ispdiff = ispeci - ispsav3
-        if (xkpdiff > xkptol) or (ispdiff!= 0):
-            nsectr3,sectx3,secty3,scmean3,sc953,sc503,scsig3 = scalkp3(xkp3,ispeci)
-            xkpsav3 = xkp3
-            ispsav3 = ispeci
+        nsectr3,sectx3,secty3,scmean3,sc953,sc503,scsig3 = kpcache.get(3, xkp3, ispeci)
 #
 #---calculate the magnetosphere's flux for this Kp value & position
 #
@@ -303,6 +299,211 @@ def crmflx(xkp,xgsm,ygsm,zgsm,ispeci,iusesw,fswimn,fswi95,fswi50,fswisd,\
 
     return idloc, fluxmn, flux95, flux50, fluxsd
 
+#----------------------------------------------------------------------------
+#-- KpScaleCache: keeps the kp scaling parameters of scalkp2/scalkp3       --
+#----------------------------------------------------------------------------
+
+class KpScaleCache:
+    """
+    keeps the kp scaling parameters computed by scalkp1/scalkp2/scalkp3 so that
+    they are recomputed only when the kp value changes by more than xkptol or
+    the species changes (the same rule as crmflx.f). the entries are keyed on
+    the region, the species, and the kp value quantized by xkptol.
+
+    usage:  kpcache = KpScaleCache()
+            out     = kpcache.get(3, xkp, ispeci)  --- same output as scalkp3(xkp, ispeci)
+            kpcache.invalidate()                   --- drop all saved parameters
+            kpcache.hits, kpcache.misses           --- numbers of reused/computed parameters
+    """
+    def __init__(self, kptol=xkptol):
+        """
+        input:  kptol   --- the kp tolerance; default: xkptol
+        """
+        self.kptol  = kptol
+        self.table  = {}
+        self.hits   = 0
+        self.misses = 0
+
+    def get(self, region, xkp, ispeci):
+        """
+        return the kp scaling parameters of the region
+        input:  region  --- 1: solar wind, 2: magnetosheath, 3: magnetosphere
+                xkp     --- kp index
+                ispeci  --- ion species selection flag
+        output: nsectrs, sectx, secty, scmean, sc95, sc50, scsig (see get_scalkp)
+        """
+        key   = (region, ispeci, int(round(xkp / self.kptol)))
+        saved = self.table.get(key)
+        if (saved is not None) and (abs(xkp - saved[0]) <= self.kptol):
+            self.hits += 1
+            return saved[1]
+
+        self.misses += 1
+        if region == 1:
+            out = scalkp1(xkp, ispeci)
+        elif region == 2:
+            out = scalkp2(xkp, ispeci)
+        else:
+            out = scalkp3(xkp, ispeci)
+
+        self.table[key] = (xkp, out)
+
+        return out
+
+    def invalidate(self, region=None):
+        """
+        drop the saved parameters
+        input:  region  --- region to drop; if None, all regions are dropped
+        output: none
+        """
+        if region is None:
+            self.table = {}
+        else:
+            for key in list(self.table.keys()):
+                if key[0] == region:
+                    del self.table[key]
+
+    def hit_rate(self):
+        """
+        return the fraction of the requests served from the cache
+        """
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+
+        return self.hits / float(total)
+
+#----------------------------------------------------------------------------
+#-- crmflx_batch: calculates the ion flux for arrays of positions          --
+#----------------------------------------------------------------------------
+
+def crmflx_batch(kp_array,xgsm,ygsm,zgsm,ispeci,iusesw,fswimn,fswi95,fswi50,fswisd,\
+           iusemsh,iusemsp,smooth1,nflxget,ndrophi,ndroplo,logflg,rngtol,fpchi,fpclo,\
+           xflux1, yflux1, zflux1, flxbin1, numbin1, numdat1, \
+           xflux2, yflux2, zflux2, flxbin2, numbin2, numdat2, \
+           xflux3, yflux3, zflux3, flxbin3, numbin3, numdat3, \
+           nsphvol3, ioffset3,joffset3,koffset3,imapindx3, kpcache=None, cellidx2=None):
+    """
+    this routine calculates the ion flux as a function of the magnetic
+    activity kp index for the entire ephemeris arrays at once. the result
+    is identical to calling crmflx for each point with the same kpcache,
+    but the work arrays of the near-neighbor search are shared among the points.
+
+    input:  kp_array --- kp index user desires output for. either a single
+                         value or an array of the same length as xgsm.
+            xgsm     --- array of satellite's x-coordinate (re).
+            ygsm     --- array of satellite's y-coordinate (re).
+            zgsm     --- array of satellite's z-coordinate (re).
+            kpcache  --- KpScaleCache object which keeps the kp scaling parameters.
+                         if it is not given, a new one is used for this batch.
+            cellidx2 --- cell index of the magnetosheath database (returned by mshinit).
+                         if it is not given, all cells are scanned.
+            the rest of the input parameters are the same as those of crmflx
+
+    output: idloc   --- array of phenomenogical region location identification flag:
+                            idloc = 1 if spacecraft is in solar wind
+                            idloc = 2 if spacecraft is in magnetosheath
+                            idloc = 3 if spacecraft is in magnetosphere.
+            fluxmn  --- array of mean flux (#/[cm^2-sec-sr-mev]) for selected species.
+            flux95  --- array of 95% flux (#/[cm^2-sec-sr-mev]) for selected species.
+            flux50  --- array of 50% flux (#/[cm^2-sec-sr-mev]) for selected species.
+            fluxsd  --- array of standard deviation of flux for selected species.
+    """
+    cdef Py_ssize_t j, npnt
+    cdef double xkp, xkp3
+
+    xarr  = numpy.ascontiguousarray(xgsm, dtype=numpy.float64)
+    yarr  = numpy.ascontiguousarray(ygsm, dtype=numpy.float64)
+    zarr  = numpy.ascontiguousarray(zgsm, dtype=numpy.float64)
+    npnt  = xarr.shape[0]
+    kparr = numpy.ascontiguousarray(numpy.broadcast_to(numpy.asarray(kp_array, dtype=numpy.float64), (npnt,)))
+
+    cdef double [:] kv = kparr
+#
+#--- determine which phenomenological region the spacecraft is in
+#
+    xtarr, ytarr, ztarr, ilarr = locreg_array(kparr, xarr, yarr, zarr)
+
+    cdef double [:] xtv = xtarr
+    cdef double [:] ytv = ytarr
+    cdef double [:] ztv = ztarr
+    cdef long   [:] ilv = ilarr
+#
+#--- output arrays
+#
+    idloc  = numpy.zeros(npnt, dtype=int)
+    fluxmn = numpy.zeros(npnt)
+    flux95 = numpy.zeros(npnt)
+    flux50 = numpy.zeros(npnt)
+    fluxsd = numpy.zeros(npnt)
+
+    cdef long   [:] idv = idloc
+    cdef double [:] mnv = fluxmn
+    cdef double [:] f95 = flux95
+    cdef double [:] f50 = flux50
+    cdef double [:] fsd = fluxsd
+#
+#--- work arrays for the near-neighbor search
+#
+    flxbuf  = numpy.zeros(maxcell)
+    numbuf  = numpy.zeros(maxcell)
+    numbuf3 = numpy.zeros(maxcell).astype(int)
+#
+#--- the kp scaling parameters
+#
+    if kpcache is None:
+        kpcache = KpScaleCache()
+
+    for j in range(0, npnt):
+        out   = (0.0, 0.0, 0.0, 0.0)
+        xkp   = kv[j]
+        xtail = xtv[j]
+        ytail = ytv[j]
+        ztail = ztv[j]
+        iloc  = ilv[j]
+#
+#--- region 1: the solar wind; use the user's value for the uniform solar wind flux
+#
+        if iloc == 1:
+            out = (fswimn, fswi95, fswi50, fswisd)
+#
+#--- region 2: the magnetosheath
+#
+        elif iloc == 2:
+            nsectr2,sectx2,secty2,scmean2,sc952,sc502,scsig2 = kpcache.get(2, xkp, ispeci)
+
+            out = nbrflux(xkp,nsectr2,sectx2,secty2,scmean2,sc952,sc502, \
+                          scsig2,xtail,ytail,ztail,numdat2,xflux2,yflux2,zflux2,\
+                          flxbin2,numbin2,smooth1,nflxget,ndrophi,ndroplo,logflg,\
+                          rngtol,fpchi,fpclo,flxbuf,numbuf,cellidx2)
+#
+#--- region 3: the magnetosphere; avoid the xkp = 0 value
+#
+        elif iloc == 3:
+            if xkp <= -1.5:
+                xkp3 = 1.5
+            else:
+                xkp3 = xkp
+
+            nsectr3,sectx3,secty3,scmean3,sc953,sc503,scsig3 = kpcache.get(3, xkp3, ispeci)
+
+            out = nbrflux_map_z(xkp3,nsectr3,sectx3,secty3,scmean3,sc953,
+                                sc503,scsig3,xtail,ytail,ztail,numdat3,xflux3,yflux3,zflux3,
+                                flxbin3,numbin3,smooth1,nflxget,ndrophi,ndroplo,logflg,
+                                rngtol,fpchi,fpclo,nsphvol3,ioffset3,joffset3,koffset3,
+                                imapindx3,flxbuf,numbuf3)
+        else:
+            print(" error in phenomenological region id!")
+            exit(1)
+
+        idv[j] = iloc
+        mnv[j] = out[0]
+        f95[j] = out[1]
+        f50[j] = out[2]
+        fsd[j] = out[3]
+
+    return idloc, fluxmn, flux95, flux50, fluxsd
+
 #----------------------------------------------------------------------------
 #-- mspinit:  opens the crm magnetosphere database file and initializes the datarrays
 #----------------------------------------------------------------------------
@@ -346,7 +547,7 @@ def  mspinit(ispeci):
         print("No data file found: msph_short.asc")
         exit(1)
 
-    xflux3, yflux3, zflux3, flxbin3, numbin3, numdat3, imapindx3 = read_init_data_file(ifile)
+    xflux3, yflux3, zflux3, flxbin3, numbin3, numdat3, imapindx3 = read_db_file(ifile)
 #
 #--- get the (i,j,k) index offset values used to search for the
 #--- near-neighbor flux
@@ -378,6 +579,7 @@ def mshinit(ispeci):
             flxbin2 --- array of arrays of the average ion flux within each cell  (ions/[cm^2-sec-sr-mev])
             numbin2 --- array of arrays of the number of non-zero values within each cell
             numdat2 --- number of non-zero values in the database
+            cellidx2--- cell index of the database (see build_cell_index)
     """
 #
 #--- open input file containing solar wind data
@@ -395,7 +597,13 @@ def mshinit(ispeci):
         print("No data file found: msheath_short.asc")
         exit(1)
 
-    return read_init_data_file(ifile, 0)
+    xflux2, yflux2, zflux2, flxbin2, numbin2, numdat2 = read_db_file(ifile, 0)
+#
+#--- create the cell index used for the near-neighbor search
+#
+    cellidx2 = build_cell_index(xflux2, yflux2, zflux2, flxbin2, numdat2)
+
+    return xflux2, yflux2, zflux2, flxbin2, numbin2, numdat2, cellidx2
 
 #----------------------------------------------------------------------------
 #-- swinit: opens the crm solar wind database file and initializes the datarrays
@@ -433,7 +641,139 @@ def swinit(ispeci):
         print("No data file found: solwind_short.asc")
         exit(1)
 
-    return read_init_data_file(ifile, 0)
+    xflux1, yflux1, zflux1, flxbin1, numbin1, numdat1 = read_db_file(ifile, 0)
+
+    return xflux1, yflux1, zflux1, flxbin1, numbin1, numdat1
+
+#----------------------------------------------------------------------------
+#-- compile_crm_database: convert the ascii database files into the binary format 
+#----------------------------------------------------------------------------
+
+def compile_crm_database():
+    """
+    convert the three ascii database files in mdat_dir into the binary format
+    read by read_db_file. this needs to be run only once after the ascii files
+    are updated (read_db_file also recreates the binary files when they are stale).
+    input:  none but read from <mdat_dir>/msph_short.asc, msheath_short.asc, solwin_short.asc
+    output: <mdat_dir>/<name>_cell.npy, <name>_kpb.npy (and msph_short_imap.npy)
+    """
+    compile_data_file(mdat_dir + 'msph_short.asc',    1)
+    compile_data_file(mdat_dir + 'msheath_short.asc', 0)
+    compile_data_file(mdat_dir + 'solwin_short.asc',  0)
+
+#----------------------------------------------------------------------------
+#-- compile_data_file: convert an ascii database file into the binary format 
+#----------------------------------------------------------------------------
+
+def compile_data_file(ifile, iset=1):
+    """
+    read an ascii database file and save it in the binary format. the cells of all
+    kp bins are kept in one flat array and the boundaries of each kp bin are kept
+    separately, so that read_db_file can memory-map them.
+    input:  ifile   --- ascii data file name
+            iset    --- if > 0, save imapindx
+    output: <base>_cell.npy --- (5, ncell) array of x, y, z, flux, and number of the cells
+            <base>_kpb.npy  --- (maxkp + 1) array of the cell boundaries of each kp bin
+            <base>_imap.npy --- imapindx (if iset > 0)
+            where <base> is ifile without the extension
+    """
+    out    = read_init_data_file(ifile, iset)
+    numdat = out[5]
+
+    kpb    = numpy.zeros(maxkp + 1, dtype=int)
+    kpb[1:] = numpy.cumsum(numdat)
+
+    cell   = numpy.zeros((5, kpb[-1]))
+    for m in range(0, 5):
+        for k in range(0, maxkp):
+            cell[m, kpb[k]:kpb[k+1]] = out[m][k]
+
+    bfiles = get_db_file_names(ifile)
+    save_db_array(bfiles[0], cell)
+    save_db_array(bfiles[1], kpb)
+    if iset > 0:
+        save_db_array(bfiles[2], out[6])
+
+    return out
+
+#----------------------------------------------------------------------------
+#-- save_db_array: save an array in a npy file                             --
+#----------------------------------------------------------------------------
+
+def save_db_array(ofile, darray):
+    """
+    save an array in a npy file. the array is written in a temporary file first and
+    then renamed, so that a job reading the database does not see a partial file
+    input:  ofile   --- output file name
+            darray  --- array to save
+    output: ofile
+    """
+    afile.write_file(ofile, lambda fo: numpy.save(fo, darray))
+
+#----------------------------------------------------------------------------
+#-- get_db_file_names: create the binary database file names               --
+#----------------------------------------------------------------------------
+
+def get_db_file_names(ifile):
+    """
+    create the binary database file names from the ascii database file name
+    input:  ifile   --- ascii data file name
+    output: [<base>_cell.npy, <base>_kpb.npy, <base>_imap.npy]
+    """
+    base = os.path.splitext(ifile)[0]
+
+    return [base + '_cell.npy', base + '_kpb.npy', base + '_imap.npy']
+
+#----------------------------------------------------------------------------
+#-- read_db_file: read the binary database file and initialize the datarrays 
+#----------------------------------------------------------------------------
+
+def read_db_file(ifile, iset=1):
+    """
+    read the binary (memory-mapped) version of the database file and initialize 
+    the datarrays. if the binary files do not exist or they are older than the 
+    ascii file, the ascii file is read and the binary files are recreated.
+    input:  ifile   --- ascii data file name
+            iset    --- if > 0, create imapindx
+    output: the same as read_init_data_file
+    """
+    bfiles = get_db_file_names(ifile)
+    if iset <= 0:
+        bfiles = bfiles[:2]
+
+    amtime = os.path.getmtime(ifile)
+    for bfile in bfiles:
+        if (not os.path.isfile(bfile)) or (os.path.getmtime(bfile) < amtime):
+#
+#--- the binary is missing or stale; if it cannot be written, just use the ascii data
+#
+            try:
+                return compile_data_file(ifile, iset)
+            except (IOError, OSError):
+                return read_init_data_file(ifile, iset)
+#
+#--- the arrays are mapped in copy-on-write mode: the pages are shared among
+#--- the jobs as long as they are not modified
+#
+    cell = numpy.load(bfiles[0], mmap_mode='c')
+    kpb  = numpy.load(bfiles[1])
+
+    out  = []
+    for m in range(0, 5):
+        darray = numpy.empty(maxkp, dtype=object)
+        for k in range(0, maxkp):
+            if m == 4:
+                darray[k] = cell[m, kpb[k]:kpb[k+1]].astype(int)
+            else:
+                darray[k] = cell[m, kpb[k]:kpb[k+1]]
+        out.append(darray)
+
+    out.append(numpy.diff(kpb))
+
+    if iset > 0:
+        out.append(numpy.load(bfiles[2], mmap_mode='c'))
+
+    return out
 
 #----------------------------------------------------------------------------
 #-- read_init_data_file(ifile): read input ascii file and initialize the datarrays
@@ -529,11 +869,56 @@ def read_init_data_file(ifile, iset=1):
     else:
         return xflux, yflux, zflux, flxbin, numbin, numdat
          
+#----------------------------------------------------------------------------
+#-- build_cell_index: create the block index of the database cells         --
+#----------------------------------------------------------------------------
+
+def build_cell_index(xflux, yflux, zflux, flxbin, numdat, blksize=cellblk):
+    """
+    create the block index of the database cells for each kp bin. the cells are
+    grouped into blocks of blksize consecutive cells (in the order of the database)
+    and the bounding box and the maximum flux of each block are kept. flxdat1_idx
+    uses them to skip the blocks which cannot change the near-neighbor search result
+    of flxdat1, so that the result stays identical to that of the full scan.
+
+    input:  xflux   --- array of arrays of the x-coordinate of each data cell's center (re)
+            yflux   --- array of arrays of the y-coordinate of each data cell's center (re)
+            zflux   --- array of arrays of the z-coordinate of each data cell's center (re)
+            flxbin  --- array of arrays of the average ion flux within each cell
+            numdat  --- number of non-zero values in the database
+            blksize --- number of cells in a block; default: cellblk
+    output: cellidx --- a list (for each kp bin) of [bbound, bbox]
+                            bbound: cell index boundaries of the blocks (nblk + 1 entries)
+                            bbox:   (nblk, 7) array of xlo, xhi, ylo, yhi, zlo, zhi of 
+                                    the bounding box and the maximum flux of each block
+    """
+    cellidx = []
+    for k in range(0, maxkp):
+        ndat   = int(numdat[k])
+        bstart = numpy.arange(0, ndat, blksize).astype(int)
+        bbound = numpy.append(bstart, ndat).astype(int)
+        bbox   = numpy.zeros((len(bstart), 7))
+        if ndat > 0:
+            xarr = numpy.asarray(xflux[k],  dtype=float)[:ndat]
+            yarr = numpy.asarray(yflux[k],  dtype=float)[:ndat]
+            zarr = numpy.asarray(zflux[k],  dtype=float)[:ndat]
+            farr = numpy.asarray(flxbin[k], dtype=float)[:ndat]
+            m    = 0
+            for tarr in [xarr, yarr, zarr]:
+                bbox[:, m]   = numpy.minimum.reduceat(tarr, bstart)
+                bbox[:, m+1] = numpy.maximum.reduceat(tarr, bstart)
+                m += 2
+            bbox[:, 6] = numpy.maximum.reduceat(farr, bstart)
+
+        cellidx.append([bbound, bbox])
+
+    return cellidx
+
 #----------------------------------------------------------------------------
 #-- locreg: determines which phenomenological region the spacecraft is in  --
 #----------------------------------------------------------------------------
 
-def locreg( xkp, xgsm, ygsm, zgsm):
+def locreg( xkp, xgsm, ygsm, zgsm, bcache=None):
     """
     this routine determines which phenomenological region the
     spacecraft is in.
@@ -542,6 +927,7 @@ def locreg( xkp, xgsm, ygsm, zgsm):
             xgsm    --- satellite's x-coordinate (re).
             ygsm    --- satellite's y-coordinate (re).
             zgsm    --- satellite's z-coordinate (re).
+            bcache  --- BoundaryCache object; default: bndcache
          
     output: xtail   --- satellite's x-coordinate in geotail system (re).
             ytail   --- satellite's y-coordinate in geotail system (re).
@@ -556,17 +942,18 @@ def locreg( xkp, xgsm, ygsm, zgsm):
 #
     idloc = 0
 #
-#--- get the solar wind parameters used as inputs for the bow shock
-#--- and magnetopause boundary models for this value of kp
+#--- get the boundary model parameters for this value of kp (the solar 
+#--- wind parameters and the bow shock parameters computed from them)
 #
-    [bx,by,bz,vx,vy,vz,dennum,swetemp,swptemp,hefrac,swhtemp,bowang,dypres,abang,xhinge]\
-                    = solwind(xkp)
+    if bcache is None:
+        bcache = bndcache
+
+    angrad, xhinge, dypres, bowpar = bcache.get(xkp)
 #
 #--- transform the spacecraft's coordinates to a system aligned with the geotail
 #
 #--- rotate the bow shock by the aberration angle
 #
-    angrad        = -abang * 0.01745329252
     [xtail,ytail] = rot8ang(angrad,xgsm,ygsm,xhinge)
     ztail         = zgsm
 #
@@ -585,7 +972,7 @@ def locreg( xkp, xgsm, ygsm, zgsm):
 #--- the magnetosheath.  calculate the bow shock radius at this point
 #
     else:
-        radbs = bowshk2(bx,by,bz,vx,vy,vz,dennum,swetemp,swptemp,hefrac,swhtemp,xtail,bowang)
+        radbs = bowrad(bowpar, xtail)
 #
 #--- find the distance of the spacecraft from the aberrated x-axi
 #
@@ -603,6 +990,136 @@ def locreg( xkp, xgsm, ygsm, zgsm):
 
     return xtail, ytail, ztail, idloc
 
+#----------------------------------------------------------------------------
+#-- locreg_array: determines the phenomenological regions for position arrays 
+#----------------------------------------------------------------------------
+
+def locreg_array(xkp, xgsm, ygsm, zgsm, bcache=None):
+    """
+    array version of locreg. the results are identical to those of locreg
+    called on each position.
+
+    input:  xkp     --- kp index; either a single value or an array of the same 
+                        length as xgsm.
+            xgsm    --- array of satellite's x-coordinate (re).
+            ygsm    --- array of satellite's y-coordinate (re).
+            zgsm    --- array of satellite's z-coordinate (re).
+            bcache  --- BoundaryCache object; default: bndcache
+    output: xtail   --- array of satellite's x-coordinate in geotail system (re).
+            ytail   --- array of satellite's y-coordinate in geotail system (re).
+            ztail   --- array of satellite's z-coordinate in geotail system (re).
+            idloc   --- array of phenomenogical region location identification flag
+                        (see locreg)
+    
+    note: numpy.float_power is used instead of "**" (which numpy computes as x * x) 
+          so that the values are the same as those of the scalar computation.
+    """
+    if bcache is None:
+        bcache = bndcache
+
+    xarr  = numpy.asarray(xgsm, dtype=float)
+    yarr  = numpy.asarray(ygsm, dtype=float)
+    zarr  = numpy.asarray(zgsm, dtype=float)
+    kparr = numpy.broadcast_to(numpy.asarray(xkp, dtype=float), xarr.shape)
+
+    xtail = numpy.array(xarr)
+    ytail = numpy.array(yarr)
+    ztail = numpy.array(zarr)
+    idloc = numpy.zeros(xarr.shape, dtype=int)
+
+    for kval in numpy.unique(kparr):
+        angrad, xhinge, dypres, bowpar = bcache.get(float(kval))
+        ind = kparr == kval
+        xv  = xarr[ind]
+        yv  = yarr[ind]
+#
+#--- rotate by the aberration angle (see rot8ang)
+#
+        rot = xv <= xhinge
+        xt  = numpy.where(rot,  xv * math.cos(angrad) + yv * math.sin(angrad), xv)
+        yt  = numpy.where(rot, -xv * math.sin(angrad) + yv * math.cos(angrad), yv)
+        zt  = zarr[ind]
+#
+#--- inside of the magnetopause (see locate)
+#
+        rat16 = (dypres / 2.0)**0.14
+        a     = 70.0 / rat16
+        s0    = 1.08
+        x0    = 5.48 / rat16
+        xm    = x0 - a
+
+        rho   = numpy.sqrt(numpy.float_power(yt, 2.0) + numpy.float_power(zt, 2.0))
+        rhomgnp = a * math.sqrt(s0**2 - 1)
+
+        xksi  = (xt - x0) / a + 1.0
+        xdzt  = rho / a
+        sq1   = numpy.sqrt(numpy.float_power(1.0 + xksi, 2.0) + numpy.float_power(xdzt, 2.0))
+        sq2   = numpy.sqrt(numpy.float_power(1.0 - xksi, 2.0) + numpy.float_power(xdzt, 2.0))
+        sigma = 0.5 * (sq1 + sq2)
+
+        inside = numpy.where(xt < xm, rhomgnp > rho, sigma < s0)
+#
+#--- outside of the magnetopause: compare with the bow shock radius
+#
+        radbs  = bowrad(bowpar, xt, 1)
+        distsc = numpy.sqrt(numpy.float_power(yt, 2.0) + numpy.float_power(zt, 2.0))
+
+        idloc[ind] = numpy.where(inside, 3, numpy.where(distsc <= radbs, 2, 1))
+        xtail[ind] = xt
+        ytail[ind] = yt
+
+    return xtail, ytail, ztail, idloc
+
+#----------------------------------------------------------------------------
+#-- BoundaryCache: keeps the region boundary model parameters for each kp  --
+#----------------------------------------------------------------------------
+
+class BoundaryCache:
+    """
+    keeps the region boundary model parameters of each kp value. the solar wind
+    inputs of the magnetopause and bow shock models depend only on kp, so the
+    parameters (including the iterative fast() solution used by the bow shock
+    model) are computed once per kp value and used for all positions.
+
+    usage:  bcache = BoundaryCache()
+            angrad, xhinge, dypres, bowpar = bcache.get(xkp)
+            bcache.hits, bcache.misses  --- numbers of reused/computed parameters
+    """
+    def __init__(self):
+        self.table  = {}
+        self.hits   = 0
+        self.misses = 0
+
+    def get(self, xkp):
+        """
+        return the boundary model parameters of the kp value
+        input:  xkp     --- kp index
+        output: angrad  --- rotation angle of the aberration (rad)
+                xhinge  --- hinge point of magnetotail (re)
+                dypres  --- solar wind dynamic pressure (np)
+                bowpar  --- bow shock parameters (see bowshk2_param)
+        """
+        saved = self.table.get(xkp)
+        if saved is not None:
+            self.hits += 1
+            return saved
+
+        self.misses += 1
+        [bx,by,bz,vx,vy,vz,dennum,swetemp,swptemp,hefrac,swhtemp,bowang,dypres,abang,xhinge]\
+                    = solwind(xkp)
+
+        angrad = -abang * 0.01745329252
+        bowpar = bowshk2_param(bx,by,bz,vx,vy,vz,dennum,swetemp,swptemp,hefrac,swhtemp,bowang)
+
+        out = (angrad, xhinge, dypres, bowpar)
+        self.table[xkp] = out
+
+        return out
+#
+#--- the boundary model parameters shared by locreg calls
+#
+bndcache = BoundaryCache()
+
 #----------------------------------------------------------------------------
 #-- bowshk2: give the bow shock radius, at a given x                      ---
 #----------------------------------------------------------------------------
@@ -639,6 +1156,25 @@ def bowshk2( bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp,  hefrac, swhtemp,
     output: bowrad  --- updated cylindrical radius (re).
 
     """
+    bowpar = bowshk2_param(bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp,\
+                           hefrac, swhtemp, bowang)
+
+    return bowrad(bowpar, xpos)
+
+#----------------------------------------------------------------------------
+#-- bowshk2_param: compute the bow shock parameters which do not depend on x 
+#----------------------------------------------------------------------------
+
+def bowshk2_param( bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp,  hefrac, swhtemp, bowang):
+    """
+    compute the parameters of the bow shock model of bowshk2 which do not depend
+    on the down tail distance. 
+    input:  the same as bowshk2 except xpos
+    output: bowpar  --- [a, b, c, xn1, dtan]
+                        a, b, c: parameters of the base model rho**2 = a*x**2 - b*x + c
+                        xn1:     the nose position
+                        dtan:    tan(thet1) - tan(thet2) of the flaring angle change
+    """
 #
 #--- convert the temperature from kelvins to ev
 #
@@ -715,14 +1251,6 @@ def bowshk2( bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp,  hefrac, swhtemp,
     b = 2.0 * eps * xl + 2.0 *( eps * eps -1) * x0
     c = xl * xl + 2.0 * eps * xl * x0 + (eps * eps -1) * x0 * x0
 #
-#--- calculate shock with correct pressure
-#
-    xtemp = a * xpos**2 - b * xpos + c
-    if xtemp < 0:
-        rho2 = 0
-    else:
-        rho2 = math.sqrt(xtemp)
-#
 #--- modify the bow shock for the change in flaring due to the
 #--- change in local magnetosonic mach number
 #
@@ -755,11 +1283,42 @@ def bowshk2( bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp,  hefrac, swhtemp,
 
     m_f      = vtot / vms
     thet1    = math.asin(1.0 / m_f)
+
+    return [a, b, c, xn1, math.tan(thet1) - math.tan(thet2)]
+
+#----------------------------------------------------------------------------
+#-- bowrad: the bow shock radius at the given down tail distance           --
+#----------------------------------------------------------------------------
+
+def bowrad(bowpar, xpos, vect=0):
+    """
+    compute the bow shock radius at the given down tail distance
+    input:  bowpar  --- bow shock parameters (see bowshk2_param)
+            xpos    --- down tail distance cross section is calculated [re]
+            vect    --- if > 0, xpos is a numpy array
+    output: bowrad  --- updated cylindrical radius (re).
+    """
+    [a, b, c, xn1, dtan] = bowpar
+#
+#--- calculate shock with correct pressure
+#
+    if vect > 0:
+        xtemp = a * numpy.float_power(xpos, 2.0) - b * xpos + c
+        rho2  = numpy.sqrt(numpy.where(xtemp < 0, 0.0, xtemp))
+    else:
+        xtemp = a * xpos**2 - b * xpos + c
+        if xtemp < 0:
+            rho2 = 0
+        else:
+            rho2 = math.sqrt(xtemp)
+#
+#--- modify the bow shock for the change in flaring due to the
+#--- change in local magnetosonic mach number
+#
     xtemp1   = xn1 - xpos
-    rhox     = rho2 + xtemp1 * (math.tan(thet1) - math.tan(thet2))
-    bowrad   = rhox
+    rhox     = rho2 + xtemp1 * dtan
 
-    return bowrad
+    return rhox
 
 #----------------------------------------------------------------------------
 #-- fast: local fast magnetosonic speed                                    --
@@ -1073,6 +1632,10 @@ def msheflx(xkp,ispeci):
             flux50  --- 50% flux (#/[cm^2-sec-sr-mev]) for selected species.
             fluxsd  --- standard deviation of flux for selected species.
     """
+    fluxmn = 0.0
+    flux95 = 0.0
+    flux50 = 0.0
+    fluxsd = 0.0
 #
 #--- provide proton flux value
 #
@@ -1115,7 +1678,7 @@ def msheflx(xkp,ispeci):
 
 def nbrflux(xkp,nsectrs,sectx,secty,scmean,sc95,sc50,scsig,xtail,ytail,ztail,\
             numdat,xflux,yflux,zflux,fluxbin,numbin,smooth1,nflxget,ndrophi,\
-            ndroplo,logflg,rngtol,fpchi,fpclo):
+            ndroplo,logflg,rngtol,fpchi,fpclo,flxbuf=None,numbuf=None,cellidx=None):
     """
     this routine provides the region's ion flux as a function of kp.
 
@@ -1174,6 +1737,12 @@ def nbrflux(xkp,nsectrs,sectx,secty,scmean,sc95,sc50,scsig,xtail,ytail,ztail,\
                         (used if smooth1 = 6).
             fpclo   --- lower percentile limit for spatial averaging of flux
                         (used if smooth1 = 6).
+            flxbuf  --- work array (size of maxcell) to save flux values; 
+                        if not given, a new one is created
+            numbuf  --- work array (size of maxcell) to save data numbers; 
+                        if not given, a new one is created
+            cellidx --- cell index of the database (see build_cell_index);
+                        if not given, all cells are scanned
 
     output: fluxmn  --- mean flux (#/[cm^2-sec-sr-mev]) for selected species.
             flux95  --- 95% flux (#/[cm^2-sec-sr-mev]) for selected species.
@@ -1220,9 +1789,12 @@ def nbrflux(xkp,nsectrs,sectx,secty,scmean,sc95,sc50,scsig,xtail,ytail,ztail,\
     avgnum  = numpy.zeros(maxkp)
     rngcell = numpy.zeros(maxkp)
     numcell = numpy.zeros(maxkp)
-    tarr    = numpy.zeros(maxcell)
-    cdef double [:] flxsto =  copy.deepcopy(tarr)
-    cdef double [:] numsto =  copy.deepcopy(tarr)
+    if flxbuf is None:
+        flxbuf = numpy.zeros(maxcell)
+    if numbuf is None:
+        numbuf = numpy.zeros(maxcell)
+    cdef double [:] flxsto =  flxbuf
+    cdef double [:] numsto =  numbuf
 #
 #--- set z range
 #   
@@ -1233,11 +1805,19 @@ def nbrflux(xkp,nsectrs,sectx,secty,scmean,sc95,sc50,scsig,xtail,ytail,ztail,\
 #--- calculate the flux with no data smoothing or with spatial
 #--- averaging inside the volume defined by rngtol
 #
-        flux[i],avgnum[i],rngcell[i],numcell[i] = \
+        if cellidx is None:
+            flux[i],avgnum[i],rngcell[i],numcell[i] = \
                                 flxdat1(xtail, ytail, ztail, numdat[i],\
                                         xflux[i], yflux[i], zflux[i],\
                                         fluxbin[i], numbin[i], rngchk,\
                                         flxsto, numsto, zcklo, zckhi)
+        else:
+            flux[i],avgnum[i],rngcell[i],numcell[i] = \
+                                flxdat1_idx(xtail, ytail, ztail, numdat[i],\
+                                        xflux[i], yflux[i], zflux[i],\
+                                        fluxbin[i], numbin[i], rngchk,\
+                                        flxsto, numsto, zcklo, zckhi,\
+                                        *cellidx[i])
 #
 #--- find the minimum distance to a data cell from any one of the database's kp intervals
 #
@@ -1283,6 +1863,8 @@ def nbrflux(xkp,nsectrs,sectx,secty,scmean,sc95,sc50,scsig,xtail,ytail,ztail,\
 #-- flxdat1: finds the flux corresponding to the satellite's gsm position coordinate
 #----------------------------------------------------------------------------
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
 def flxdat1(double xgsm, double ygsm, double zgsm, long numdat,\
             double [:] xflux, double [:] yflux, double [:] zflux,\
             double [:] fluxbin, long [:] numbin, double rngchk,\
@@ -1320,7 +1902,7 @@ def flxdat1(double xgsm, double ygsm, double zgsm, long numdat,\
             numcell --- number of flux database cells used that have the
                         same value of rngcell.
     """
-    cdef double flux, avgnum, rngcell, rngdiff, rngabs
+    cdef double flux, avgnum, rngcell, rng, rngdiff, rngabs
     cdef int    i, numcell
 
     rngcell = 1.0e25
@@ -1366,6 +1948,137 @@ def flxdat1(double xgsm, double ygsm, double zgsm, long numdat,\
 
     return flux, avgnum, rngcell, numcell
 
+#----------------------------------------------------------------------------
+#-- flxdat1_idx: flxdat1 with the block index of the database cells        --
+#----------------------------------------------------------------------------
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def flxdat1_idx(double xgsm, double ygsm, double zgsm, long numdat,\
+                double [:] xflux, double [:] yflux, double [:] zflux,\
+                double [:] fluxbin, long [:] numbin, double rngchk,\
+                double [:] flxsto, double [:] numsto, int zcklo, int zckhi,\
+                long [:] bbound, double [:, :] bbox):
+    """
+    this routine does the same computation as flxdat1, but skips the blocks of
+    the database cells which cannot change the result:
+        * no cell in the block has flux larger than 1,
+        * the z range of the block is outside of the z-layer, or
+        * the nearest point of the bounding box of the block is farther than
+          the current nearest neighbor distance + rngchk (such a cell is neither
+          a new nearest neighbor nor inside of the range tolerance).
+    the cells are examined in the same order as flxdat1, so that the result is
+    identical to that of flxdat1.
+
+    input:  xgsm ... zckhi  --- the same as flxdat1
+            bbound, bbox    --- the cell index of this kp bin (see build_cell_index)
+    output: flux    --- computed average flux value  (ions/[cm^2-sec-sr-mev]).
+            avgnum  --- average number of flux values per cell used to get flux.
+            rngcell --- distance to center of flux database cell used  (re).
+            numcell --- number of flux database cells used that have the
+                        same value of rngcell.
+    """
+    cdef double flux, avgnum, rngcell, rng, rngdiff, rngabs
+    cdef double dx, dy, dz
+    cdef int    i, b, numcell, nblk, done
+
+    rngcell = 1.0e25
+    numcell = 0
+    nblk    = bbox.shape[0]
+    done    = 0
+
+    for b in range(0, nblk):
+        if (bbox[b, 6] <= 1) or (bbox[b, 5] <= zcklo) or (bbox[b, 4] > zckhi):
+            continue
+#
+#--- the distance from the position to the bounding box of the block
+#
+        dx = 0.0
+        if xgsm < bbox[b, 0]:
+            dx = bbox[b, 0] - xgsm
+        elif xgsm > bbox[b, 1]:
+            dx = xgsm - bbox[b, 1]
+        dy = 0.0
+        if ygsm < bbox[b, 2]:
+            dy = bbox[b, 2] - ygsm
+        elif ygsm > bbox[b, 3]:
+            dy = ygsm - bbox[b, 3]
+        dz = 0.0
+        if zgsm < bbox[b, 4]:
+            dz = bbox[b, 4] - zgsm
+        elif zgsm > bbox[b, 5]:
+            dz = zgsm - bbox[b, 5]
+
+        if sqrt(dx * dx + dy * dy + dz * dz) > rngcell + rngchk + rngeps:
+            continue
+
+        for i in range(bbound[b], bbound[b+1]):
+            if (fluxbin[i] > 1) and (zflux[i] > zcklo) and (zflux[i] <= zckhi):
+
+                rng = compute_rng(xflux[i],yflux[i],zflux[i], xgsm, ygsm, zgsm)
+
+                rngdiff = rng - rngcell
+                rngabs  = abs(rngdiff)
+#
+#--- there is a new nearest neighbor data cell
+#
+                if (rngabs > rngchk) and (rngdiff < 0.0):
+                    numcell = 1
+                    rngcell = rng
+                    flxsto[0] = fluxbin[i]
+                    numsto[0] = numbin[i]
+#
+#--- there is a new data cell within the range tolerance to the nearest neighbor
+#
+                elif rngabs <= rngchk:
+                    flxsto[numcell] = fluxbin[i]
+                    numsto[numcell] = numbin[i]
+                    numcell += 1
+
+                    if numcell > maxcell -1:
+                        done = 1
+                        break
+        if done > 0:
+            break
+#
+#--- use the average of the flux from all bins at the same distance
+#
+    if numcell > 0:
+        flux   = cell_mean(flxsto, numcell)
+        avgnum = cell_mean(numsto, numcell)
+    else:
+        flux   = 0.0
+        avgnum = 0.0
+
+    return flux, avgnum, rngcell, numcell
+
+#----------------------------------------------------------------------------
+#-- cell_mean: mean of the first n values of the array                     --
+#----------------------------------------------------------------------------
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double cell_mean(double [:] arr, int n):
+    """
+    mean of the first n values of the array. numpy sums less than 8 values
+    sequentially, so a plain loop gives the identical result to numpy.mean;
+    longer ones are passed to numpy.mean.
+    input:  arr --- array
+            n   --- number of values to use (> 0)
+    output: mean value
+    """
+    cdef double tsum
+    cdef int    i
+
+    if n >= 8:
+        return numpy.mean(arr[:n])
+
+    tsum = 0.0
+    for i in range(0, n):
+        tsum += arr[i]
+
+    return tsum / n
+
 #----------------------------------------------------------------------------
 #-- nbrflux_map_z:  provides the region's ion flux as a function of kp    ---
 #----------------------------------------------------------------------------
@@ -1373,7 +2086,7 @@ def flxdat1(double xgsm, double ygsm, double zgsm, long numdat,\
 def nbrflux_map_z(xkp,nsectrs,sectx,secty,scmean,sc95,sc50,scsig,xtail,ytail,\
                   ztail,numdat,xflux,yflux,zflux,fluxbin,numbin,smooth1,nflxget,\
                   ndrophi,ndroplo,logflg,rngtol,fpchi,fpclo,nsphvol,ioffset,\
-                  joffset,koffset,imapindx):
+                  joffset,koffset,imapindx,flxbuf=None,numbuf=None):
     """
     this routine provides the region's ion flux as a function of kp.
 
@@ -1436,6 +2149,10 @@ def nbrflux_map_z(xkp,nsectrs,sectx,secty,scmean,sc95,sc50,scsig,xtail,ytail,\
             joffset  --- array of offset indices for y-direction.
             koffset  --- array of offset indices for z-direction.
             imapindx --- array of pointers for mapped database.
+            flxbuf   --- work array (size of maxcell) to save flux values; 
+                         if not given, a new one is created
+            numbuf   --- work integer array (size of maxcell) to save data numbers;
+                         if not given, a new one is created
     
     output: fluxmn  --- mean flux (#/[cm^2-sec-sr-mev]) for selected species.
             flux95  --- 95% flux (#/[cm^2-sec-sr-mev]) for selected species.
@@ -1512,10 +2229,12 @@ def nbrflux_map_z(xkp,nsectrs,sectx,secty,scmean,sc95,sc50,scsig,xtail,ytail,\
     indy = int((ytail - ymin) / yinc)
     indz = int((ztail - zmin) / zinc)
 
-    tarr    = numpy.zeros(maxcell)
-    cdef double [:] flxsto = tarr 
-    tarr    = numpy.zeros(maxcell).astype(int)
-    cdef long [:]   numsto  = tarr
+    if flxbuf is None:
+        flxbuf = numpy.zeros(maxcell)
+    if numbuf is None:
+        numbuf = numpy.zeros(maxcell).astype(int)
+    cdef double [:] flxsto = flxbuf
+    cdef long [:]   numsto = numbuf
 
     for ikp in range(2, 7):
 #
@@ -1669,6 +2388,8 @@ def nbrflux_map_z(xkp,nsectrs,sectx,secty,scmean,sc95,sc50,scsig,xtail,ytail,\
 #-- flxdat1_map:  finds the flux corresponding to the satellite's gsm position  
 #----------------------------------------------------------------------------
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
 def  flxdat1_map(double xgsm,double ygsm,double zgsm,\
                  long numdat,double [:] xflux,double [:] yflux, double [:] zflux,\
                  double [:] fluxbin,long [:]numbin, long rngchk, long nsphvol,\
@@ -1728,7 +2449,7 @@ def  flxdat1_map(double xgsm,double ygsm,double zgsm,\
     """
     cdef int    i, j, k, n, numcell, indexnow
     cdef float  rngchk2
-    cdef double rngcell, flux, avgnum, rngdiff, rngabs
+    cdef double rngcell, flux, avgnum, rng, rngdiff, rngabs
     cdef double fve, xve, yve, zve
 
     rngcell = 1.0e25
@@ -1744,7 +2465,7 @@ def  flxdat1_map(double xgsm,double ygsm,double zgsm,\
         k = indz + koffset[n]
         if (i >= 0) and (j >= 0) and (k >= 0)\
            and (i < maxnum) and (j < maxnum) and (k < maxnum):
-            indexnow = imapindx[i][j][k]
+            indexnow = imapindx[i, j, k]
 
             if indexnow >= 0:
                 zve     = zflux[indexnow]
@@ -1797,7 +2518,7 @@ def  flxdat1_map(double xgsm,double ygsm,double zgsm,\
         flux    = flxsto[0]
         avgnum  = float(numsto[0])
     
-    elif numcell > 1:
+    else:
         flux    = numpy.mean(flxsto[:numcell])
         avgnum  = numpy.mean(numsto[:numcell])
 
@@ -1807,10 +2528,11 @@ def  flxdat1_map(double xgsm,double ygsm,double zgsm,\
 #----------------------------------------------------------------------------
 #----------------------------------------------------------------------------
 
-def compute_rng(double xve, double yve, double zve, double xgsm, double ygsm, double zgsm):
+@cython.profile(False)
+cpdef double compute_rng(double xve, double yve, double zve, double xgsm, double ygsm, double zgsm):
     cdef double rng
 
-    rng = math.sqrt((xve - xgsm)**2 + (yve - ygsm)**2 + (zve - zgsm)**2)
+    rng = sqrt((xve - xgsm)**2 + (yve - ygsm)**2 + (zve - zgsm)**2)
 
     return rng
 
@@ -2848,6 +3570,10 @@ def solwflx(int xkp, int ispeci):
             flux50  --- 50% flux (#/[cm^2-sec-sr-mev]) for selected species.
             fluxsd  --- standard deviation of flux for selected species.
     """
+    fluxmn = 0.0
+    flux95 = 0.0
+    flux50 = 0.0
+    fluxsd = 0.0
 #
 #--- provide proton flux values
 #
@@ -3249,6 +3975,115 @@ class run_test(unittest.TestCase):
         out = scalkp3(xkp,ispeci)
         print('sec 3:' + str(out[1]))
 
+#---------------------------------------
+
+    def test_kpcache(self):
+        ispeci  = 1
+        kpcache = KpScaleCache()
+
+        out  = kpcache.get(3, 2.0, ispeci)
+        comp = scalkp3(2.0, ispeci)
+        self.assertTrue(numpy.array_equal(out[3], comp[3]))
+        self.assertEqual(kpcache.misses, 1)
+#
+#--- within xkptol: the saved parameters are reused
+#
+        out  = kpcache.get(3, 2.1, ispeci)
+        self.assertTrue(numpy.array_equal(out[3], comp[3]))
+        self.assertEqual(kpcache.hits, 1)
+#
+#--- a different region, species, or kp beyond xkptol: recomputed
+#
+        kpcache.get(2, 2.0, ispeci)
+        kpcache.get(3, 2.0, 3)
+        kpcache.get(3, 2.0 + 1.0/3.0, ispeci)
+        self.assertEqual(kpcache.misses, 4)
+
+        kpcache.invalidate(3)
+        kpcache.get(2, 2.0, ispeci)
+        kpcache.get(3, 2.0, ispeci)
+        self.assertEqual(kpcache.hits,   2)
+        self.assertEqual(kpcache.misses, 5)
+
+#---------------------------------------
+
+    def test_flxdat1_idx(self):
+        numpy.random.seed(0)
+        ndat    = 500
+        xflux   = numpy.round(numpy.random.uniform(-20, 20, ndat))
+        yflux   = numpy.round(numpy.random.uniform(-20, 20, ndat))
+        zflux   = numpy.round(numpy.random.uniform(-10, 10, ndat))
+        fluxbin = numpy.random.uniform(0, 1000, ndat)
+        numbin  = numpy.random.randint(1, 10, ndat)
+
+        cellidx = build_cell_index([xflux] * maxkp, [yflux] * maxkp, [zflux] * maxkp,\
+                                   [fluxbin] * maxkp, [ndat] * maxkp)
+        flxsto  = numpy.zeros(maxcell)
+        numsto  = numpy.zeros(maxcell)
+
+        for k in range(0, 50):
+            xgsm, ygsm, zgsm = numpy.random.uniform(-20, 20, 3)
+            comp = flxdat1(xgsm, ygsm, zgsm, ndat, xflux, yflux, zflux, fluxbin,\
+                           numbin, 1.0, flxsto, numsto, -10, 10)
+            out  = flxdat1_idx(xgsm, ygsm, zgsm, ndat, xflux, yflux, zflux, fluxbin,\
+                           numbin, 1.0, flxsto, numsto, -10, 10, *cellidx[0])
+            self.assertEqual(out, comp)
+
+#---------------------------------------
+
+    def test_flxdat1_idx_ephem(self):
+#
+#--- an ephemeris fixture in the format of PE.EPH.gsme_in_Re_short: [time, xgsm, ygsm, zgsm (re)]
+#--- one orbit at 3 hour steps from the perigee; no recorded ephemeris is kept in the repository,
+#--- so the positions follow a chandra like orbit (perigee 22400 km, apogee 134000 km).
+#--- a cut of the real ephemeris file can replace the rows.
+#
+        ephem = numpy.array([\
+            [701150036.0,   0.944,  -2.993,  -1.574],\
+            [701160836.0,   5.626,   2.656,  -0.859],\
+            [701171636.0,   6.111,   7.513,   0.992],\
+            [701182436.0,   5.378,  11.026,   2.709],\
+            [701193236.0,   4.173,  13.618,   4.208],\
+            [701204036.0,   2.751,  15.525,   5.497],\
+            [701214836.0,   1.228,  16.885,   6.594],\
+            [701225636.0,  -0.329,  17.784,   7.512],\
+            [701236436.0,  -1.880,  18.279,   8.259],\
+            [701247236.0,  -3.394,  18.409,   8.841],\
+            [701258036.0,  -4.845,  18.200,   9.261],\
+            [701268836.0,  -6.211,  17.671,   9.518],\
+            [701279636.0,  -7.468,  16.830,   9.607],\
+            [701290436.0,  -8.589,  15.683,   9.521],\
+            [701301236.0,  -9.541,  14.228,   9.248],\
+            [701312036.0, -10.280,  12.459,   8.770],\
+            [701322836.0, -10.748,  10.363,   8.061],\
+            [701333636.0, -10.852,   7.920,   7.082],\
+            [701344436.0, -10.442,   5.110,   5.770],\
+            [701355236.0,  -9.228,   1.927,   4.022],\
+            [701366036.0,  -6.524,  -1.489,   1.658],\
+            [701376836.0,  -0.438,  -3.387,  -1.256],\
+            [701387636.0,   5.284,   1.683,  -1.144],\
+            [701398436.0,   6.150,   6.811,   0.687]])
+#
+#--- the block index search on the solar wind and magnetosheath databases must give
+#--- the same cells as the brute force scan at every ephemeris point and kp interval
+#
+        flxsto  = numpy.zeros(maxcell)
+        numsto  = numpy.zeros(maxcell)
+        for dbinit in [swinit, mshinit]:
+            xflux, yflux, zflux, flxbin, numbin, numdat = dbinit(1)[:6]
+            cellidx = build_cell_index(xflux, yflux, zflux, flxbin, numdat)
+
+            for [stime, xgsm, ygsm, zgsm] in ephem:
+                zcklo, zckhi = zbinner(xgsm, zgsm)
+                for i in range(0, maxkp):
+                    comp = flxdat1(xgsm, ygsm, zgsm, numdat[i], xflux[i], yflux[i],\
+                                   zflux[i], flxbin[i], numbin[i], 1.0, flxsto, numsto,\
+                                   zcklo, zckhi)
+                    out  = flxdat1_idx(xgsm, ygsm, zgsm, numdat[i], xflux[i], yflux[i],\
+                                   zflux[i], flxbin[i], numbin[i], 1.0, flxsto, numsto,\
+                                   zcklo, zckhi, *cellidx[i])
+                    self.assertEqual(out, comp)
+
 #---------------------------------------
 
     def test_sectr310(self):
@@ -6,7 +6,7 @@
 #                                                                               #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                           #
 #                                                                               #
-#           last upate: Mar 22, 2021                                            #
+#           last upate: Oct 16, 2026                                            #
 #                                                                               #
 #       converted from Robert Cameron's runcrm.f (2002)                         #
 #                                                                               #
@@ -17,6 +17,9 @@ import os
 import re
 import string
 import math
+import numpy
+import argparse
+import multiprocessing
 #
 #--- reading directory list
 #
@@ -35,31 +38,53 @@ for ent in data:
 #
 sys.path.append('/data/mta/Script/Python3.8/MTA/')
 sys.path.append('/data/mta4/Space_Weather/CRMFLX/CRMFLX_PYTHON/')
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
 #
 #--- import several functions
 #
 import mta_common_functions as mcf
 import crmflx               as cflx
+import table_format         as tfmt   #--- fixed width table formatter
+import atomic_file          as afile  #--- write through a temporary file and a rename
 
 tail = ['00','03','07','10','13','17','20','23','27',\
         '30','33','37','40','43','47','50','53','57',\
         '60','63','67','70','73','77','80','83','87','90']
+#
+#--- the names of the computed values kept in the incremental store
+#
+store_cols = ['idloc', 'fluxmn', 'flux95', 'flux50', 'fluxsd']
+#
+#--- the column formats of CRM3_p.dat* files: time, idloc, fluxmn, flux95, flux50, fluxsd
+#
+out_spec = ['%13.1f\t', '%2d\t', '%13.6e\t', '%13.6e\t', '%13.6e\t', '%13.6e']
+#
+#--- the input parameters, the databases, and the ephemeris data set by runcrm; 
+#--- the worker processes share them (read-only) through fork
+#
+crm_input = {}
 
 #----------------------------------------------------------------------------
 #-- runcrm: calculate CRM proton flux for Chandra ephemeris                --
 #----------------------------------------------------------------------------
 
-def runcrm(ifile=''):
+def runcrm(ifile='', workers=1, incremental=False):
     """
     calculate CRM proton flux for Chandra ephemeris
     read from a file, for all 28 possible values of Kp.
 
     input:  ifile   --- input ephemeris file, e.g., 'PE.EPH.gsme_in_Re_short'
+            workers --- number of processes to compute the kp levels; default: 1
+            incremental --- if True, reuse the results of the previous run kept in
+                        the store file and compute only new/changed ephemeris rows
     output: <crm3_dir>/Data/CRM3_p.dat<#>
+            ./CRM_Out/crm_store.npz (if incremental)
     """
     if ifile == '':
         ifile = ephem_dir + 'Data/PE.EPH.gsme_in_Re_short'
         #ifile = './PE.EPH.gsme_in_Re_short'
+
+    sfile = './CRM_Out/crm_store.npz'
 #
 #--- set parameters (see crmflx for definitions)
 #
@@ -87,7 +112,7 @@ def runcrm(ifile=''):
 #
 #--- read magnetosheath databas
 #
-    xflux2, yflux2, zflux2, flxbin2, numbin2, numdat2 = cflx.mshinit(ispeci)
+    xflux2, yflux2, zflux2, flxbin2, numbin2, numdat2, cellidx2 = cflx.mshinit(ispeci)
 #
 #--- read magnetosphere database
 #
@@ -98,43 +123,205 @@ def runcrm(ifile=''):
 #
     data  = mcf.read_data_file(ifile)
     cdata = mcf.separate_data_to_arrays(data)
-    tlist = cdata[0]
-    xgsm  = cdata[1]
-    ygsm  = cdata[2]
-    zgsm  = cdata[3]
-
-    for i in range(0, 28):
-        xkp   = i / 3.0
-        line  = ''
-        for j in range(0, len(tlist)):
-            idloc,fluxmn,flux95,flux50,fluxsd =\
-                cflx.crmflx(xkp,xgsm[j],ygsm[j],zgsm[j],ispeci,iusesw,\
-                    fswimn,fswi95,fswi50,fswisd,iusemsh,iusemsp,smooth1,\
-                    nflxget,ndrophi,ndroplo,logflg,rngtol,fpchi,fpclo,\
-                    xflux1, yflux1, zflux1, flxbin1, numbin1, numdat1,\
-                    xflux2, yflux2, zflux2, flxbin2, numbin2, numdat2,\
-                    xflux3, yflux3, zflux3, flxbin3, numbin3, numdat3,\
-                    nsphvol3, ioffset3,joffset3,koffset3,imapindx3)
-
-            line = line + '%13.1f\t' % tlist[j]
-            line = line + '%2d\t'    % idloc
-            line = line + '%13.6e\t' % fluxmn
-            line = line + '%13.6e\t' % flux95
-            line = line + '%13.6e\t' % flux50
-            line = line + '%13.6e\n' % fluxsd
-
-        ###ofile = crm3_dir +'Data/CRM3_p.dat' + tail[i]
-        ofile = './CRM_Out/CRM_p.dat' + tail[i]
-        with open(ofile, 'w') as fo:
-            fo.write(line)
+    tlist = numpy.array(cdata[0])
+    xgsm  = numpy.array(cdata[1])
+    ygsm  = numpy.array(cdata[2])
+    zgsm  = numpy.array(cdata[3])
+#
+#--- find the rows already computed in the previous run
+#
+    store = None
+    if incremental:
+        store = read_crm_store(sfile)
+
+    pos = match_crm_store(store, tlist, xgsm, ygsm, zgsm)
+    new = numpy.where(pos < 0)[0]
+#
+#--- keep the inputs for compute_kp_level
+#
+    crm_input['tlist'] = tlist
+    crm_input['pos']   = pos
+    crm_input['new']   = new
+    crm_input['store'] = store
+    crm_input['gsm']   = [xgsm[new], ygsm[new], zgsm[new]]
+    crm_input['args']  = [ispeci,iusesw,\
+                fswimn,fswi95,fswi50,fswisd,iusemsh,iusemsp,smooth1,\
+                nflxget,ndrophi,ndroplo,logflg,rngtol,fpchi,fpclo,\
+                xflux1, yflux1, zflux1, flxbin1, numbin1, numdat1,\
+                xflux2, yflux2, zflux2, flxbin2, numbin2, numdat2,\
+                xflux3, yflux3, zflux3, flxbin3, numbin3, numdat3,\
+                nsphvol3, ioffset3,joffset3,koffset3,imapindx3]
+    crm_input['cellidx2'] = cellidx2
+
+    if workers > 1:
+#
+#--- each kp level is written in its own file; fan them out to the worker processes.
+#--- the databases are loaded above and shared with the workers through fork
+#
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(min(workers, 28)) as pool:
+            results = pool.map(compute_kp_level, range(0, 28), chunksize=1)
+    else:
+#
+#--- kp scaling parameters are kept between the calls
+#
+        kpcache = cflx.KpScaleCache()
+
+        results = []
+        for i in range(0, 28):
+            results.append(compute_kp_level(i, kpcache))
+
+    if incremental:
+        write_crm_store(sfile, tlist, xgsm, ygsm, zgsm, results)
+
+#----------------------------------------------------------------------------
+#-- compute_kp_level: compute CRM proton flux for one kp level             --
+#----------------------------------------------------------------------------
+
+def compute_kp_level(i, kpcache=None):
+    """
+    compute CRM proton flux of the ephemeris for one kp level and write it out.
+    the inputs are read from crm_input which is set by runcrm.
+
+    input:  i       --- index of the kp level (kp = i / 3)
+            kpcache --- KpScaleCache; if it is not given, a new one is used
+    output: results --- a list of arrays of idloc, fluxmn, flux95, flux50, fluxsd
+            <crm3_dir>/Data/CRM3_p.dat<tail[i]>
+    """
+    tlist = crm_input['tlist']
+    pos   = crm_input['pos']
+    new   = crm_input['new']
+    store = crm_input['store']
+    xkp   = i / 3.0
+
+    npts    = len(tlist)
+    results = [numpy.zeros(npts, dtype=int)]
+    for m in range(1, 5):
+        results.append(numpy.zeros(npts))
+#
+#--- compute the flux for the new ephemeris points at once
+#
+    if len(new) > 0:
+        out = cflx.crmflx_batch(xkp, *crm_input['gsm'], *crm_input['args'],\
+                                kpcache=kpcache, cellidx2=crm_input['cellidx2'])
+        for m in range(0, 5):
+            results[m][new] = out[m]
+#
+#--- the rest are taken from the store
+#
+    if store is not None:
+        old = pos >= 0
+        for m in range(0, 5):
+            results[m][old] = store[store_cols[m]][i][pos[old]]
+
+    idloc,fluxmn,flux95,flux50,fluxsd = results
+
+    ###ofile = crm3_dir +'Data/CRM3_p.dat' + tail[i]
+    ofile = './CRM_Out/CRM_p.dat' + tail[i]
+    with open(ofile, 'w') as fo:
+        tfmt.write_table(fo, out_spec, [tlist, idloc, fluxmn, flux95, flux50, fluxsd])
+
+    return results
+
+#----------------------------------------------------------------------------
+#-- read_crm_store: read the results of the previous run                   --
+#----------------------------------------------------------------------------
+
+def read_crm_store(sfile):
+    """
+    read the results of the previous run kept in the store file. the store is
+    not used if it is older than the crm database files.
+    input:  sfile   --- store file name
+    output: store   --- a dict of the arrays of time, xgsm, ygsm, zgsm, and
+                        (28, npts) arrays of idloc, fluxmn, flux95, flux50, fluxsd
+                        None if the store is not available
+    """
+    if not os.path.isfile(sfile):
+        return None
+
+    smtime = os.path.getmtime(sfile)
+    for dfile in ['msph_short.asc', 'msheath_short.asc', 'solwin_short.asc']:
+        dfile = cflx.mdat_dir + dfile
+        if os.path.isfile(dfile) and (os.path.getmtime(dfile) > smtime):
+            return None
+
+    try:
+        with numpy.load(sfile) as fz:
+            store = {}
+            for col in ['time', 'xgsm', 'ygsm', 'zgsm'] + store_cols:
+                store[col] = fz[col]
+    except Exception:
+        return None
+
+    return store
+
+#----------------------------------------------------------------------------
+#-- match_crm_store: find the ephemeris rows already computed in the store  -
+#----------------------------------------------------------------------------
+
+def match_crm_store(store, tlist, xgsm, ygsm, zgsm):
+    """
+    find the ephemeris rows which are in the store with the same time and position
+    input:  store   --- store read by read_crm_store (or None)
+            tlist   --- array of time
+            xgsm    --- array of x coordinates
+            ygsm    --- array of y coordinates
+            zgsm    --- array of z coordinates
+    output: pos     --- array of the row index in the store; -1 if it must be computed
+    """
+    pos = numpy.full(len(tlist), -1, dtype=int)
+    if store is None:
+        return pos
+
+    sidx = {}
+    for k in range(0, len(store['time'])):
+        sidx[store['time'][k]] = k
+
+    for j in range(0, len(tlist)):
+        try:
+            k = sidx[tlist[j]]
+        except KeyError:
+            continue
+
+        if (store['xgsm'][k] == xgsm[j]) and (store['ygsm'][k] == ygsm[j]) \
+                and (store['zgsm'][k] == zgsm[j]):
+            pos[j] = k
+
+    return pos
+
+#----------------------------------------------------------------------------
+#-- write_crm_store: keep the results of this run in the store file        --
+#----------------------------------------------------------------------------
+
+def write_crm_store(sfile, tlist, xgsm, ygsm, zgsm, results):
+    """
+    keep the results of this run in the store file. only the rows of the current
+    ephemeris are kept.
+    input:  sfile   --- store file name
+            tlist   --- array of time
+            xgsm    --- array of x coordinates
+            ygsm    --- array of y coordinates
+            zgsm    --- array of z coordinates
+            results --- a list (for each kp level) of the results of compute_kp_level
+    output: sfile
+    """
+    save = {'time': tlist, 'xgsm': xgsm, 'ygsm': ygsm, 'zgsm': zgsm}
+    for m in range(0, 5):
+        save[store_cols[m]] = numpy.array([ent[m] for ent in results])
+
+    afile.write_file(sfile, lambda fo: numpy.savez(fo, **save))
 
 #---------------------------------------------------------------------
 
 if __name__ == '__main__': 
 
-    if len(sys.argv) > 1:
-        ifile = sys.argv[1].strip()
-    else:
-        ifile = ''
+    parser = argparse.ArgumentParser()
+    parser.add_argument('ifile', nargs='?', default='',\
+                        help='input ephemeris file')
+    parser.add_argument('--workers', type=int, default=1,\
+                        help='number of processes to compute the 28 kp levels')
+    parser.add_argument('--incremental', action='store_true',\
+                        help='compute only the ephemeris rows not in the previous run')
+    args = parser.parse_args()
 
-    runcrm(ifile)
+    runcrm(args.ifile.strip(), args.workers, args.incremental)
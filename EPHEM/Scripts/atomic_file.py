@@ -0,0 +1,117 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       atomic_file.py: write a file through a temporary file and a rename  #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 17, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- the content is written in <file>.<pid>.<thread>.tmp in the same directory, flushed
+#--- to the disk, and renamed to the file. a reader sees either the old or the new file,
+#--- never a partial one. the temporary file is removed if the write fails.
+#
+import os
+import threading
+import unittest
+
+#----------------------------------------------------------------------------------
+#-- write_file: write a file through a temporary file and a rename               --
+#----------------------------------------------------------------------------------
+
+def write_file(ofile, write, mode='wb', backup=''):
+    """
+    write a file through a temporary file and a rename
+    input:  ofile   --- output file name
+            write   --- function which writes the content in the given file object;
+                        e.g. lambda fo: numpy.save(fo, data)
+            mode    --- open mode of the temporary file: 'wb' or 'w'; default: 'wb'
+            backup  --- if given, the previous file is kept as <ofile><backup>
+    output: ofile
+    """
+    tfile = ofile + '.' + str(os.getpid()) + '.' + str(threading.get_ident()) + '.tmp'
+    try:
+        with open(tfile, mode) as fo:
+            write(fo)
+            fo.flush()
+            os.fsync(fo.fileno())
+
+        if backup != '' and os.path.isfile(ofile):
+            bfile = ofile + backup
+            if os.path.lexists(bfile):
+                os.remove(bfile)
+            os.link(ofile, bfile)
+
+        os.replace(tfile, ofile)
+    except BaseException:
+        try:
+            os.remove(tfile)
+        except OSError:
+            pass
+        raise
+
+#----------------------------------------------------------------------------------
+#-- write_bytes: write bytes or a string to a file through a temporary file      --
+#----------------------------------------------------------------------------------
+
+def write_bytes(ofile, content, backup=''):
+    """
+    write bytes or a string to a file through a temporary file and a rename
+    input:  ofile   --- output file name
+            content --- bytes or string (encoded in utf-8)
+            backup  --- if given, the previous file is kept as <ofile><backup>
+    output: ofile
+    """
+    if isinstance(content, str):
+        content = content.encode()
+
+    write_file(ofile, lambda fo: fo.write(content), backup=backup)
+
+#-----------------------------------------------------------------------------------------
+#-- TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST    ---
+#-----------------------------------------------------------------------------------------
+
+class TestFunctions(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tdir  = os.getcwd() + '/TestOut/Atomic/'
+        self.ofile = self.tdir + 'test_file'
+        os.makedirs(self.tdir, exist_ok=True)
+
+    def tearDown(self):
+
+        for ent in os.listdir(self.tdir):
+            os.remove(self.tdir + ent)
+
+    def test_write_file(self):
+
+        write_bytes(self.ofile, 'first\n')
+        write_bytes(self.ofile, 'second\n', backup='~')
+
+        with open(self.ofile) as f:
+            self.assertEqual(f.read(), 'second\n')
+        with open(self.ofile + '~') as f:
+            self.assertEqual(f.read(), 'first\n')
+#
+#--- a failed write leaves the file and no temporary file
+#
+        def broken(fo):
+            fo.write(b'partial')
+            raise ValueError('broken')
+
+        with self.assertRaises(ValueError):
+            write_file(self.ofile, broken)
+
+        with open(self.ofile) as f:
+            self.assertEqual(f.read(), 'second\n')
+        self.assertEqual(sorted(os.listdir(self.tdir)), ['test_file', 'test_file~'])
+
+#-------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    unittest.main()
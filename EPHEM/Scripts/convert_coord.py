@@ -6,7 +6,7 @@
 #                                                                                   #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                               #
 #                                                                                   #
-#           last updae: Mar 16, 2021                                                #
+#           last updae: Oct 16, 2026                                                #
 #                                                                                   #
 #####################################################################################
 
@@ -19,7 +19,6 @@ import numpy
 import time
 import Chandra.Time
 import calendar
-from datetime import datetime
 sys.path.append('/data/mta4/Script/Python3.10/lib/python3.10/site-packages')  
 from geopack  import geopack
 #import astropy.io.fits  as pyfits
@@ -43,6 +42,10 @@ sys.path.append(mta_dir)
 #--- import several functions
 #
 import mta_common_functions as mcf  #---- contains other functions commonly used in MTA scripts
+import coord_transform      as ctr  #---- array versions of the geopack coordinate conversions
+import ephem_store          as est  #---- columnar binary store of the ephemeris data
+import table_format         as tfmt #---- fixed width table formatter
+import time_convert         as tcnv #---- vectorized time conversion
 #
 #--- some constants
 #
@@ -50,6 +53,16 @@ pi     = math.pi
 earth  = 6371.0         #--- Earth radius
 dpr    = 6.2832/360.0   #--- degree per rad
 gamma  = 5.0 / 3.0
+#
+#--- the columns of the PE.EPH.gsme store (see compute_ephem_columns)
+#
+gsme_cols = ['time', 'r', 'x', 'y', 'z', 'xgsm', 'ygsm', 'zgsm', 'xgm', 'ygm', 'zgm',\
+             'xge', 'yge', 'zge', 'mr', 'mt', 'mp', 'et', 'ep', 'fy', 'mon', 'day',\
+             'hh', 'mm', 'kp', 'lid']
+#
+#--- the region boundary model parameters of each kp value (see get_boundary_model)
+#
+bnd_model = {}
 
 #---------------------------------------------------------------------------------------
 #-- cocochan: convert Chandra ECI linear coords to GSE, GSM coords                    --
@@ -71,104 +84,86 @@ def cocochan(ifile):
 
     python version of geopack: https://pypi.org/project/geopack/
     """
+    cols = compute_ephem_columns(ifile)
+
+    return format_ephem_lines(cols)
+
+#---------------------------------------------------------------------------------------
+#-- compute_ephem_columns: compute GSE, GSM coords of the ephemeris data              --
+#---------------------------------------------------------------------------------------
+
+def compute_ephem_columns(ifile):
+    """
+    compute GSE, GSM coords (and the region id) of the ephemeris data
+    input: ifile    --- a data file name with:
+                        t, x, y, z, vx, vy, vz, fy, mon, day, hh, mm, ss, kp
+    output: cols    --- (len(gsme_cols), ndata) array of the columns listed in gsme_cols
+    """
 #
-#--- read data
+#--- read data and convert into column data
 #
-    out = mcf.read_data_file(ifile)
+    out = est.read_text_columns(ifile)
+    [t, x, y, z, vx, vy, vz, fy, mon, day, hh, mm, ss] = out[:13]
+    if len(out) == 13:
+        kp = numpy.ones(len(t))
+    else:
+        kp = out[13]
 #
-#--- separate data and convert into column data
+#--- compute ut in seconds from 1970.1.1 for all data points
 #
-    try:
-        [t, x, y, z, vx, vy, vz, fy, mon, day, hh, mm, ss, kp] = mcf.separate_data_to_arrays(out)
-    except:
-        [t, x, y, z, vx, vy, vz, fy, mon, day, hh, mm, ss] = mcf.separate_data_to_arrays(out)
-        kp = [1] * len(t)
+    uts = ut_in_secs(fy, mon, day, hh, mm, ss)
 #
-#--- compute ut in seconds from 1970.1.1
+#--- convert position to km
 #
-    uts = ut_in_secs(fy[0], mon[0], day[0], hh[0], mm[0], ss[0])
+    xs  = x / 1.0e3
+    ys  = y / 1.0e3
+    zs  = z / 1.0e3
+    ra  = numpy.sqrt(xs * xs + ys * ys + zs * zs)
 #
-#--- usually this need to be run only once but it seems better to run every time; 
-#--- value is kept to be used by other geopack functions
+#--- convert the coordinates into gsm and gse for all data points at once
 #
-    psi = geopack.recalc(uts)
-
-    line1 = ''
-    line2 = ''
-    line3 = ''
-    for k in range(0, len(t)):
+    [xgsm, ygsm, zgsm, xgm, ygm, zgm, xge, yge, zge, lid] = compute_gsm_array(uts, xs, ys, zs, kp)
 #
-#--- convert position to km
+#--- convert to special coordinates
 #
-        xs  = x[k] /1.0e3
-        ys  = y[k] /1.0e3
-        zs  = z[k] /1.0e3
-        r   = math.sqrt(xs * xs + ys * ys + zs * zs)
+    [mr, mt, mp] = convert_to_special_coords_array(xgsm, ygsm, zgsm)
+    [er, et, ep] = convert_to_special_coords_array(xge, yge, zge)
+
+    return numpy.array([t, ra, xs, ys, zs, xgsm, ygsm, zgsm, xgm, ygm, zgm, xge, yge, zge,\
+                        mr, mt, mp, et, ep, fy, mon, day, hh, mm, kp, lid], dtype=float)
+
+#---------------------------------------------------------------------------------------
+#-- format_ephem_lines: create PE.EPH.gsme* data lines from the columns               --
+#---------------------------------------------------------------------------------------
+
+def format_ephem_lines(cols):
+    """
+    create PE.EPH.gsme, PE.EPH.gsme_in_Re, and PE.EPH.gsme_spherical data lines
+    input:  cols    --- (len(gsme_cols), ndata) array (see compute_ephem_columns)
+    output: [line1, line2, line3]
+                line1   --- t, r, x, y, z, xgsm, ygsm, zgsm, fy, mon, day, hh, mm, kp, lid
+                line2   --- t, xgsm, ygsm, zgsm, xgse, ygse, zgse (in earth radii),
+                            fy, mon, day, hh, mm, kp, lid
+                line3   --- t, r, theta and phi of gsm, theta and phi of gse,
+                            fy, mon, day, hh, mm, kp, lid
+    """
+    [t, ra, xs, ys, zs, xgsm, ygsm, zgsm, xgm, ygm, zgm, xge, yge, zge,\
+                        mr, mt, mp, et, ep, fy, mon, day, hh, mm, kp, lid] = cols
 
-        uts = ut_in_secs(fy[k], mon[k], day[k], hh[k], mm[k], ss[k])
-        psi = geopack.recalc(uts)
-#
-#--- convert the coordinates into gsm and gse
-#
-        [xgsm, ygsm, zgsm, xgm, ygm, zgm, xge, yge, zge, lid] = compute_gsm(xs, ys, zs,  kp[k])
 #
-#--- convert to special coordinates
+#--- the time, kp, and location id columns are common to all three data sets
 #
-        [mr, mt, mp] = convert_to_special_coords(xgsm, ygsm, zgsm)
-        [er, et, ep] = convert_to_special_coords(xge, yge, zge)
-
-
-
-        line1 = line1 + '%11.1f'   %  t[k]
-        line1 = line1 + '\t%10.2f' %  r
-        line1 = line1 + '\t%10.2f' %  xs 
-        line1 = line1 + '\t%10.2f' %  ys 
-        line1 = line1 + '\t%10.2f' %  zs 
-        line1 = line1 + '\t%10.2f' %  xgsm
-        line1 = line1 + '\t%10.2f' %  ygsm
-        line1 = line1 + '\t%10.2f' %  zgsm
-        line1 = line1 + '\t%12.6f' %  fy[k]
-        line1 = line1 + '%3d'      %  mon[k]
-        line1 = line1 + '%3d'      %  day[k]
-        line1 = line1 + '%3d'      %  hh[k]
-        line1 = line1 + '%3d'      %  mm[k]
-        #line1 = line1 + ' %3d'    %  ss[k]
-        line1 = line1 + '\t%1.1f'  %  kp[k]
-        line1 = line1 + '\t\t%1d'  %  lid
-        line1 = line1 + '\n'
-
-        line2 = line2 + '%11.1f'   %  t[k]
-        line2 = line2 + '\t%2.5f'  %  xgm
-        line2 = line2 + '\t%2.5f'  %  ygm
-        line2 = line2 + '\t%2.5f'  %  zgm
-        line2 = line2 + '\t%2.5f'  %  xge 
-        line2 = line2 + '\t%2.5f'  %  yge 
-        line2 = line2 + '\t%2.5f'  %  zge 
-        line2 = line2 + '\t%12.6f' %  fy[k]
-        line2 = line2 + '%3d'      %  mon[k]
-        line2 = line2 + '%3d'      %  day[k]
-        line2 = line2 + '%3d'      %  hh[k]
-        line2 = line2 + '%3d'      %  mm[k]
-        #line2 = line2 + '%3d'     %  ss[k]
-        line2 = line2 + '\t%1.1f'  %  kp[k]
-        line2 = line2 + '\t\t%1d'  %  lid
-        line2 = line2 + '\n'
-
-        line3 = line3 + '%11.1f'   %  t[k]
-        line3 = line3 + '\t%2.5f'  %  (mr / 1.0e3)
-        line3 = line3 + '\t%2.5f'  %  mt 
-        line3 = line3 + '\t%2.5f'  %  mp 
-        line3 = line3 + '\t%2.5f'  %  et 
-        line3 = line3 + '\t%2.5f'  %  ep  
-        line3 = line3 + '\t%12.6f' %  fy[k]
-        line3 = line3 + '%3d'      %  mon[k]
-        line3 = line3 + '%3d'      %  day[k]
-        line3 = line3 + '%3d'      %  hh[k]
-        line3 = line3 + '%3d'      %  mm[k]
-        #line3 = line3 + '%3d'     %  ss[k]
-        line3 = line3 + '\t%1.1f'  %  kp[k]
-        line3 = line3 + '\t\t%1d'  %  lid
-        line3 = line3 + '\n'
+    tail  = ['\t%12.6f', '%3d', '%3d', '%3d', '%3d', '\t%1.1f', '\t\t%1d']
+    ttail = [fy, mon, day, hh, mm, kp, lid]
+
+    spec1 = ['%11.1f'] + ['\t%10.2f'] * 7 + tail
+    line1 = tfmt.render_table(spec1, [t, ra, xs, ys, zs, xgsm, ygsm, zgsm] + ttail)
+
+    spec2 = ['%11.1f'] + ['\t%2.5f'] * 6 + tail
+    line2 = tfmt.render_table(spec2, [t, xgm, ygm, zgm, xge, yge, zge] + ttail)
+
+    spec3 = ['%11.1f'] + ['\t%2.5f'] * 5 + tail
+    line3 = tfmt.render_table(spec3, [t, mr / 1.0e3, mt, mp, et, ep] + ttail)
 
     return [line1, line2,  line3]
 
@@ -234,6 +229,37 @@ def compute_gsm(x, y, z, kp):
 
     return [xgsm, ygsm, zgsm, xgm, ygm, zgm, exgse, eygse, ezgse, lid]
 
+#---------------------------------------------------------------------------------------
+#-- compute_gsm_array: compute magnetic coordinates from equatorial coordinates (array)-
+#---------------------------------------------------------------------------------------
+
+def compute_gsm_array(uts, x, y, z, kp):
+    """
+    compute magnetic coordinates from equatorial coordinates for all data points
+    at once (array version of compute_gsm; no geopack.recalc call is needed)
+    input:  uts --- array of ut in seconds from 1970.1.1
+            x   --- array of x coordinates in km
+            y   --- array of y coordinates in km
+            z   --- array of z coordinates in km
+            kp  --- array of kp values
+    output: the same as compute_gsm, but each of them is an array
+    """
+    [xgsm, ygsm, zgsm, xgse, ygse, zgse] = ctr.gei_to_gsm(uts, x, y, z)
+#
+#--- find location id; convert coordinate into earth radii before run locreg
+#
+    xgm   = xgsm / earth
+    ygm   = ygsm / earth
+    zgm   = zgsm / earth
+
+    exgse = xgse / earth
+    eygse = ygse / earth
+    ezgse = zgse / earth
+
+    xtail, ytail, ztail, lid = locreg_array(kp, xgm, ygm, zgm)
+
+    return [xgsm, ygsm, zgsm, xgm, ygm, zgm, exgse, eygse, ezgse, lid]
+
 #---------------------------------------------------------------------------------------
 #---------------------------------------------------------------------------------------
 #---------------------------------------------------------------------------------------
@@ -247,6 +273,23 @@ def convert_to_special_coords(x, y, z):
 
     return [r, t, p]
 
+#---------------------------------------------------------------------------------------
+#-- convert_to_special_coords_array: array version of convert_to_special_coords       --
+#---------------------------------------------------------------------------------------
+
+def convert_to_special_coords_array(x, y, z):
+    """
+    convert cartesian coordinates into spherical ones in degree
+    input:  x, y, z --- arrays of the coordinates
+    output: [r, t, p] --- arrays of r, theta, and phi (-180 - 180)
+    """
+    r, t, p = ctr.car_to_sph(x, y, z)
+    t       = t * 180 / pi
+    p       = p * 180 / pi
+    p       = numpy.where(p >= 180.0, p - 360.0, p)
+
+    return [r, t, p]
+
 #---------------------------------------------------------------------------------------
 #-- ut_in_secs: onvert calendar date into univarsal time in sec                       --
 #---------------------------------------------------------------------------------------
@@ -262,15 +305,7 @@ def ut_in_secs(year, mon, day, hh, mm, ss):
             ss      --- seconds
     output:uts      --- UT in seconds from 1970.1.1
     """
-    year = int(float(year))
-    mon  = int(float(mon))
-    day  = int(float(day))
-    hh   = int(float(hh))
-    mm   = int(float(mm))
-    ss   = int(float(ss))
-
-    uts  = (datetime(year, mon, day, hh, mm, ss)\
-                    - datetime(1970,1,1)).total_seconds()
+    uts  = tcnv.ut_in_secs(year, mon, day, hh, mm, ss)
     uts += 86400.0
 
     return uts
@@ -299,16 +334,14 @@ def locreg(kp, xsm, ysm, zsm):
 #
     idloc = 0
 #
-#--- get the solar wind parameters used as inputs for the bow shock 
-#--- and magnetopause boundary models
+#--- get the boundary model parameters for this kp (the solar wind parameters
+#--- and the bow shock parameters computed from them)
 #
-    [bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp, \
-     hefrac, swhtemp, bowang, dypres, abang, xhinge] = solwind(kp)
+    [angrad, xhinge, dypres, bowpar] = get_boundary_model(kp)
 #
 #--- transform the spacecrafts coordinates to a system aligned with the geotail
 #--- rotate the bow shock by the aberration angle
 #
-    angrad         = -1.0 * abang * 0.01745329252
     [xtail, ytail] = rot8ang(angrad, xsm, ysm, xhinge)
     ztail          = zsm
 #
@@ -326,8 +359,7 @@ def locreg(kp, xsm, ysm, zsm):
 #--- determin if the spacecraft is in either the solar wind or
 #--- the magnetosheath. calculate the bow shock radius and this point
 #
-        radbs = bowshk2(bx, by, bz, vx, vy, vz, dennum, swetemp,\
-                        swptemp, hefrac, swhtemp, xtail, bowang)
+        radbs = bowrad(bowpar, xtail)
 #
 #--- find the distance of the spacecraft from the aberrated x-axis
 #
@@ -345,6 +377,112 @@ def locreg(kp, xsm, ysm, zsm):
 
     return [xtail, ytail, ztail, idloc]
 
+#---------------------------------------------------------------------------------------
+#-- locreg_array: determines the phenomenological regions of position arrays         ---
+#---------------------------------------------------------------------------------------
+
+def locreg_array(kp, xsm, ysm, zsm):
+    """
+    array version of locreg; the results are identical to those of locreg
+    called on each position
+    input   kp  --- kp index; either a single value or an array of the same length as xsm
+            xsm --- array of solar magnetic coordinate x (in earth radius)
+            ysm --- array of solar magnetic coordinate y (in earth radius)
+            zsm --- array of solar magnetic coordinate z (in earth radius)
+    output: xtail   --- array of satellite's X-coordinate in geotail system (Re)
+            ytail   --- array of satellite's Y-coordinate in geotail system (Re)
+            ztail   --- array of satellite's Z-coordinate in geotail system (Re)
+            idloc   --- array of phenomenogical region location identification flag
+                        (see locreg)
+
+    Note: numpy.float_power is used instead of "**" (which numpy computes as x * x)
+          to get the same values as those of the scalar computation.
+    """
+    xarr  = numpy.asarray(xsm, dtype=float)
+    yarr  = numpy.asarray(ysm, dtype=float)
+    zarr  = numpy.asarray(zsm, dtype=float)
+    kparr = numpy.broadcast_to(numpy.asarray(kp, dtype=float), xarr.shape)
+
+    xtail = numpy.array(xarr)
+    ytail = numpy.array(yarr)
+    ztail = numpy.array(zarr)
+    idloc = numpy.zeros(xarr.shape, dtype=int)
+
+    for kval in numpy.unique(kparr):
+        [angrad, xhinge, dypres, bowpar] = get_boundary_model(float(kval))
+        ind = kparr == kval
+        xv  = xarr[ind]
+        yv  = yarr[ind]
+#
+#--- rotate by the aberration angle (see rot8ang)
+#
+        rot = xv <= xhinge
+        xt  = numpy.where(rot,  xv * math.cos(angrad) + yv * math.sin(angrad), xv)
+        yt  = numpy.where(rot, -xv * math.sin(angrad) + yv * math.cos(angrad), yv)
+        zt  = zarr[ind]
+#
+#--- inside of the magnetopause (see locate)
+#
+        rat16   = (dypres / 2.0)**0.14
+        a       = 70.0 / rat16
+        s0      = 1.08
+        x0      = 5.48 / rat16
+        xm      = x0 - a
+
+        rho     = numpy.sqrt(numpy.float_power(yt, 2.0) + numpy.float_power(zt, 2.0))
+        rhomgnp = a * math.sqrt(s0**2 - 1)
+
+        xksi    = (xt - x0) / a + 1
+        xdzt    = rho / a
+        sq1     = numpy.sqrt(numpy.float_power(1.0 + xksi, 2.0) + numpy.float_power(xdzt, 2.0))
+        sq2     = numpy.sqrt(numpy.float_power(1.0 - xksi, 2.0) + numpy.float_power(xdzt, 2.0))
+        sigma   = 0.5 * (sq1 + sq2)
+
+        inside  = numpy.where(xt < xm, rhomgnp >= rho, sigma <= s0)
+#
+#--- outside of the magnetopause: compare with the bow shock radius
+#
+        radbs   = bowrad(bowpar, xt, 1)
+        distsc  = numpy.sqrt(numpy.float_power(yt, 2.0) + numpy.float_power(zt, 2.0))
+
+        idloc[ind] = numpy.where(inside, 3, numpy.where(distsc <= radbs, 2, 1))
+        xtail[ind] = xt
+        ytail[ind] = yt
+
+    return [xtail, ytail, ztail, idloc]
+
+#---------------------------------------------------------------------------------------
+#-- get_boundary_model: get the region boundary model parameters for the kp value    ---
+#---------------------------------------------------------------------------------------
+
+def get_boundary_model(kp):
+    """
+    get the region boundary model parameters for the kp value. the solar wind inputs
+    of the magnetopause and bow shock models depend only on kp, so the parameters
+    (including the iterative fast() solution of the bow shock model) are computed 
+    once for each kp value and kept in bnd_model
+    input:  kp      --- kp index
+    output: angrad  --- rotation angle of the aberration (rad)
+            xhinge  --- hinge point of magnetotail (Re)
+            dypres  --- solar wind dynamic pressure (nP)
+            bowpar  --- bow shock parameters (see bowshk2_param)
+    """
+    try:
+        return bnd_model[kp]
+    except KeyError:
+        pass
+
+    [bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp, \
+     hefrac, swhtemp, bowang, dypres, abang, xhinge] = solwind(kp)
+
+    angrad = -1.0 * abang * 0.01745329252
+    bowpar = bowshk2_param(bx, by, bz, vx, vy, vz, dennum, swetemp,\
+                           swptemp, hefrac, swhtemp, bowang)
+
+    bnd_model[kp] = [angrad, xhinge, dypres, bowpar]
+
+    return bnd_model[kp]
+
 #---------------------------------------------------------------------------------------
 #-- solwind: get the solar wind parameters used as inputs for the bow shock           --
 #---------------------------------------------------------------------------------------
@@ -610,6 +748,25 @@ def bowshk2(bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp, hefrac, swhtemp, x
         the Journal of Geophysical Research, 1997
         http://www.igpp.ucla.edu/galileo/newmodel.htm
     """
+    bowpar = bowshk2_param(bx, by, bz, vx, vy, vz, dennum, swetemp,\
+                           swptemp, hefrac, swhtemp, bowang)
+
+    return bowrad(bowpar, xpos)
+
+#---------------------------------------------------------------------------------------
+#-- bowshk2_param: compute the bow shock parameters which do not depend on x         --
+#---------------------------------------------------------------------------------------
+
+def bowshk2_param(bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp, hefrac, swhtemp, bowang):
+    """
+    compute the parameters of the bow shock model of bowshk2 which do not depend
+    on the down tail distance
+    input:  the same as bowshk2 except xpos
+    output: bowpar  --- [a, b, c, xn1, dtan]
+                        a, b, c --- parameters of the model rho**2 = a*x**2 - b*x + c
+                        xn1     --- the nose position
+                        dtan    --- tan(theta1) - tan(theta2) of the flaring angle change
+    """
 #
 #--- convert the temperature from kelvins to eV
 #
@@ -680,14 +837,6 @@ def bowshk2(bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp, hefrac, swhtemp, x
     b   = 2.0 * eps * xl + 2.0 * (eps * eps -1) * x0
     c   = xl * xl + 2.0 * eps * xl * x0 + (eps * eps -1) * x0 * x0
 #
-#--- calculate shock with correct pressure
-#
-    xtemp = a * xpos**2 - b * xpos + c
-    if xtemp < 0.0:
-        rho2 = 0.0
-    else:
-        rho2 = math.sqrt(xtemp)
-#
 #--- modify the bow shock for the change in flaring due to the
 #--- change in local magnetosonic Mach number.
 #
@@ -720,11 +869,44 @@ def bowshk2(bx, by, bz, vx, vy, vz, dennum, swetemp, swptemp, hefrac, swhtemp, x
 
     m_f    = vtot / vms
     theta1 = math.asin(1.0 / m_f)
+
+    return [a, b, c, xn1, math.tan(theta1) - math.tan(theta2)]
+
+#---------------------------------------------------------------------------------------
+#-- bowrad: the bow shock radius at the given down tail distance                      --
+#---------------------------------------------------------------------------------------
+
+def bowrad(bowpar, xpos, vect=0):
+    """
+    compute the bow shock radius at the given down tail distance
+    input:  bowpar  --- bow shock parameters (see bowshk2_param)
+            xpos    --- down tail distance cross section is calculated [Re]
+            vect    --- if > 0, xpos is a numpy array
+    output: bowrad  --- updated cylindrical radius (Re)
+    """
+    [a, b, c, xn1, dtan] = bowpar
+#
+#--- calculate shock with correct pressure
+#
+    if vect > 0:
+        xtemp = a * numpy.float_power(xpos, 2.0) - b * xpos + c
+        rho2  = numpy.sqrt(numpy.where(xtemp < 0.0, 0.0, xtemp))
+    else:
+        xtemp = a * xpos**2 - b * xpos + c
+        if xtemp < 0.0:
+            rho2 = 0.0
+        else:
+            rho2 = math.sqrt(xtemp)
+#
+#--- modify the bow shock for the change in flaring due to the
+#--- change in local magnetosonic Mach number.
+#
     xtemp1 = xn1 - xpos
-    bowrad = rho2 + xtemp1 * (math.tan(theta1) - math.tan(theta2))
+    bowrad = rho2 + xtemp1 * dtan
 
     return bowrad
 
+
 #---------------------------------------------------------------------------------------
 #-- fast: solve for the local fast magnetosonic speed                                 --
 #---------------------------------------------------------------------------------------
@@ -0,0 +1,405 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#####################################################################################
+#                                                                                   #
+#       coord_transform.py: array versions of the geopack coordinate conversions    #
+#                                                                                   #
+#           author: t. isobe (tisobe@cfa.harvard.edu)                               #
+#                                                                                   #
+#           last update: Oct 16, 2026                                               #
+#                                                                                   #
+#####################################################################################
+
+import os
+import sys
+import numpy
+import atomic_file as afile    #--- write through a temporary file and a rename
+sys.path.append('/data/mta4/Script/Python3.10/lib/python3.10/site-packages')
+from geopack  import geopack
+#
+#--- the rotation matrix elements set by geopack.recalc which are used for the
+#--- gei -> geo -> gsm -> gse conversions
+#
+mat_cols  = ['cgst', 'sgst', 'a11', 'a12', 'a13', 'a21', 'a22', 'a23',\
+             'a31', 'a32', 'a33', 'chi', 'shi']
+#
+#--- the matrix elements of each ut (in seconds from 1970.1.1):  {ut: array of mat_cols}
+#--- only the times of the last call are kept (see get_matrices)
+#
+mat_cache = {}
+
+#---------------------------------------------------------------------------------------
+#-- get_matrices: get the rotation matrix elements for the time array                 --
+#---------------------------------------------------------------------------------------
+
+def get_matrices(uts, cfile=None):
+    """
+    get the rotation matrix elements (the same values as geopack.recalc sets) for
+    the time array. the values are kept in mat_cache and only the times not in the
+    cache are computed. the cache keeps only the times of this call so that it does
+    not grow in the resident daemon; the next run is on an overlapping window.
+    input:  uts     --- array of ut in seconds from 1970.1.1
+            cfile   --- the cache file name. if it is given, the cache is read from
+                        the file and the values for uts are written back, so that
+                        the next run on an overlapping time window uses them.
+    output: mat     --- a dict of arrays of the matrix elements (keys: mat_cols)
+    """
+    uts = numpy.atleast_1d(numpy.asarray(uts, dtype=float))
+
+    if (cfile is not None) and (len(mat_cache) == 0):
+        read_matrix_cache(cfile)
+#
+#--- compute the matrices of the new times
+#
+    new = [ut for ut in numpy.unique(uts) if ut not in mat_cache]
+    if len(new) > 0:
+        new  = numpy.array(new)
+        vals = compute_matrices(new)
+        for k in range(0, len(new)):
+            mat_cache[new[k]] = vals[:, k]
+
+    vals = numpy.array([mat_cache[ut] for ut in uts]).reshape(len(uts), len(mat_cols))
+#
+#--- drop the times which are not in this window
+#
+    if len(mat_cache) > len(uts):
+        keep = set(uts.tolist())
+        for ut in [ut for ut in mat_cache if ut not in keep]:
+            del mat_cache[ut]
+
+    if (cfile is not None) and (len(new) > 0):
+        write_matrix_cache(cfile, uts)
+
+    mat = {}
+    for k in range(0, len(mat_cols)):
+        mat[mat_cols[k]] = vals[:, k]
+
+    return mat
+
+#---------------------------------------------------------------------------------------
+#-- compute_matrices: compute the rotation matrix elements for the time array         --
+#---------------------------------------------------------------------------------------
+
+def compute_matrices(uts):
+    """
+    compute the rotation matrix elements for the time array at once. this follows
+    geopack.recalc and gives the identical values. if the geopack version does not
+    have the functions used here, recalc is called for each time.
+    input:  uts     --- array of ut in seconds from 1970.1.1
+    output: vals    --- (len(mat_cols), len(uts)) array of the matrix elements
+    """
+    try:
+        return compute_matrices_array(uts)
+    except AttributeError:
+        return compute_matrices_recalc(uts)
+
+#---------------------------------------------------------------------------------------
+#-- compute_matrices_recalc: compute the rotation matrix elements with geopack.recalc --
+#---------------------------------------------------------------------------------------
+
+def compute_matrices_recalc(uts):
+    """
+    compute the rotation matrix elements by calling geopack.recalc for each time
+    input:  uts     --- array of ut in seconds from 1970.1.1
+    output: vals    --- (len(mat_cols), len(uts)) array of the matrix elements
+    """
+    vals = numpy.zeros((len(mat_cols), len(uts)))
+    for k in range(0, len(uts)):
+        geopack.recalc(uts[k])
+        for m in range(0, len(mat_cols)):
+            vals[m, k] = getattr(geopack, mat_cols[m])
+
+    return vals
+
+#---------------------------------------------------------------------------------------
+#-- compute_matrices_array: compute the rotation matrix elements with numpy arrays    --
+#---------------------------------------------------------------------------------------
+
+def compute_matrices_array(uts):
+    """
+    compute the rotation matrix elements for the time array with numpy arrays.
+    the computation is that of geopack.recalc (only the parts needed for the
+    gei/geo/gsm/gse conversions).
+    input:  uts     --- array of ut in seconds from 1970.1.1
+    output: vals    --- (len(mat_cols), len(uts)) array of the matrix elements
+
+    Note: numpy.float_power is used where recalc squares numpy scalars, so that
+          the values are identical to those of recalc.
+    """
+    npts = len(uts)
+#
+#--- the dipole coefficients of igrf at each time
+#
+    g10  = numpy.zeros(npts)
+    g11  = numpy.zeros(npts)
+    h11  = numpy.zeros(npts)
+    for k in range(0, npts):
+        g, h   = geopack.load_igrf(uts[k])
+        g10[k] = -g[1]
+        g11[k] = -g[2]
+        h11[k] = -h[2]
+#
+#--- the unit vector of the dipole axis in geo
+#
+    sq   = numpy.float_power(g11, 2.0) + numpy.float_power(h11, 2.0)
+    sqq  = numpy.sqrt(sq)
+    sqr  = numpy.sqrt(numpy.float_power(g10, 2.0) + sq)
+    sl0  = h11 / sqq
+    cl0  = g11 / sqq
+    st0  = sqq / sqr
+    ct0  = g10 / sqr
+    stcl = st0 * cl0
+    stsl = st0 * sl0
+#
+#--- the sun position
+#
+    gst, slong, srasn, sdec, obliq = geopack.sun(uts)
+    gst   = numpy.atleast_1d(gst)
+    srasn = numpy.atleast_1d(srasn)
+    sdec  = numpy.atleast_1d(sdec)
+    obliq = numpy.atleast_1d(obliq)
+#
+#--- the unit vectors of gse in gei
+#
+    xgse_x = numpy.cos(srasn) * numpy.cos(sdec)
+    xgse_y = numpy.sin(srasn) * numpy.cos(sdec)
+    xgse_z = numpy.sin(sdec)
+
+    zgse_x = 0.
+    zgse_y = -numpy.sin(obliq)
+    zgse_z =  numpy.cos(obliq)
+
+    ygse_x = zgse_y * xgse_z - zgse_z * xgse_y
+    ygse_y = zgse_z * xgse_x - zgse_x * xgse_z
+    ygse_z = zgse_x * xgse_y - zgse_y * xgse_x
+#
+#--- the dipole axis in gei
+#
+    cgst  = numpy.cos(gst)
+    sgst  = numpy.sin(gst)
+    zsm_x = stcl * cgst - stsl * sgst
+    zsm_y = stcl * sgst + stsl * cgst
+    zsm_z = ct0
+#
+#--- the unit vectors of gsm in gei
+#
+    xgsm_x, xgsm_y, xgsm_z = xgse_x, xgse_y, xgse_z
+
+    ygsm_x = zsm_y * xgsm_z - zsm_z * xgsm_y
+    ygsm_y = zsm_z * xgsm_x - zsm_x * xgsm_z
+    ygsm_z = zsm_x * xgsm_y - zsm_y * xgsm_x
+    y      = numpy.sqrt(ygsm_x * ygsm_x + ygsm_y * ygsm_y + ygsm_z * ygsm_z)
+    ygsm_x = ygsm_x / y
+    ygsm_y = ygsm_y / y
+    ygsm_z = ygsm_z / y
+
+    zgsm_x = xgse_y * ygsm_z - xgse_z * ygsm_y
+    zgsm_y = xgse_z * ygsm_x - xgse_x * ygsm_z
+    zgsm_z = xgse_x * ygsm_y - xgse_y * ygsm_x
+#
+#--- gse <--> gsm
+#
+    chi = ygsm_x * ygse_x + ygsm_y * ygse_y + ygsm_z * ygse_z
+    shi = ygsm_x * zgse_x + ygsm_y * zgse_y + ygsm_z * zgse_z
+#
+#--- geo <--> gsm
+#
+    a11 =  xgsm_x * cgst + xgse_y * sgst
+    a12 = -xgsm_x * sgst + xgse_y * cgst
+    a13 =  xgsm_z
+    a21 =  ygsm_x * cgst + ygsm_y * sgst
+    a22 = -ygsm_x * sgst + ygsm_y * cgst
+    a23 =  ygsm_z
+    a31 =  zgsm_x * cgst + zgsm_y * sgst
+    a32 = -zgsm_x * sgst + zgsm_y * cgst
+    a33 =  zgsm_z
+
+    return numpy.array([cgst, sgst, a11, a12, a13, a21, a22, a23, a31, a32, a33, chi, shi])
+
+#---------------------------------------------------------------------------------------
+#-- read_matrix_cache: read the saved rotation matrix elements                        --
+#---------------------------------------------------------------------------------------
+
+def read_matrix_cache(cfile):
+    """
+    read the saved rotation matrix elements into mat_cache
+    input:  cfile   --- the cache file name
+    output: mat_cache updated
+    """
+    if not os.path.isfile(cfile):
+        return
+
+    try:
+        with numpy.load(cfile) as fz:
+            uts  = fz['uts']
+            vals = fz['vals']
+    except Exception:
+        return
+
+    if vals.shape != (len(uts), len(mat_cols)):
+        return
+
+    for k in range(0, len(uts)):
+        mat_cache[uts[k]] = vals[k]
+
+#---------------------------------------------------------------------------------------
+#-- write_matrix_cache: save the rotation matrix elements of the given times          --
+#---------------------------------------------------------------------------------------
+
+def write_matrix_cache(cfile, uts):
+    """
+    save the rotation matrix elements of the given times
+    input:  cfile   --- the cache file name
+            uts     --- array of ut in seconds from 1970.1.1
+    output: cfile
+    """
+    uts  = numpy.unique(uts)
+    vals = numpy.array([mat_cache[ut] for ut in uts])
+
+    try:
+        afile.write_file(cfile, lambda fo: numpy.savez(fo, uts=uts, vals=vals))
+    except (IOError, OSError):
+        pass
+
+#---------------------------------------------------------------------------------------
+#-- gei_to_geo: converts gei to geo coordinates or vice versa                         --
+#---------------------------------------------------------------------------------------
+
+def gei_to_geo(mat, x, y, z, j=1):
+    """
+    converts equatorial inertial (gei) to geographical (geo) coordinates or vice versa
+    (array version of geopack.geigeo)
+    input:  mat     --- the matrix elements returned by get_matrices
+            x, y, z --- arrays of the coordinates
+            j       --- j > 0: gei -> geo,  j < 0: geo -> gei
+    output: [x, y, z] of the converted coordinates
+    """
+    x, y, z = to_arrays(x, y, z)
+    cgst    = mat['cgst']
+    sgst    = mat['sgst']
+
+    if j > 0:
+        xout = x * cgst + y * sgst
+        yout = y * cgst - x * sgst
+    else:
+        xout = x * cgst - y * sgst
+        yout = y * cgst + x * sgst
+
+    return [xout, yout, z]
+
+#---------------------------------------------------------------------------------------
+#-- geo_to_gsm: converts geo to gsm coordinates or vice versa                         --
+#---------------------------------------------------------------------------------------
+
+def geo_to_gsm(mat, x, y, z, j=1):
+    """
+    converts geographic (geo) to geocentric solar magnetospheric (gsm) coordinates
+    or vice versa (array version of geopack.geogsm)
+    input:  mat     --- the matrix elements returned by get_matrices
+            x, y, z --- arrays of the coordinates
+            j       --- j > 0: geo -> gsm,  j < 0: gsm -> geo
+    output: [x, y, z] of the converted coordinates
+    """
+    x, y, z = to_arrays(x, y, z)
+
+    if j > 0:
+        xout = mat['a11'] * x + mat['a12'] * y + mat['a13'] * z
+        yout = mat['a21'] * x + mat['a22'] * y + mat['a23'] * z
+        zout = mat['a31'] * x + mat['a32'] * y + mat['a33'] * z
+    else:
+        xout = mat['a11'] * x + mat['a21'] * y + mat['a31'] * z
+        yout = mat['a12'] * x + mat['a22'] * y + mat['a32'] * z
+        zout = mat['a13'] * x + mat['a23'] * y + mat['a33'] * z
+
+    return [xout, yout, zout]
+
+#---------------------------------------------------------------------------------------
+#-- gsm_to_gse: converts gsm to gse coordinates or vice versa                         --
+#---------------------------------------------------------------------------------------
+
+def gsm_to_gse(mat, x, y, z, j=1):
+    """
+    converts geocentric solar magnetospheric (gsm) to solar ecliptic (gse) coordinates
+    or vice versa (array version of geopack.gsmgse)
+    input:  mat     --- the matrix elements returned by get_matrices
+            x, y, z --- arrays of the coordinates
+            j       --- j > 0: gsm -> gse,  j < 0: gse -> gsm
+    output: [x, y, z] of the converted coordinates
+    """
+    x, y, z = to_arrays(x, y, z)
+    chi     = mat['chi']
+    shi     = mat['shi']
+
+    if j > 0:
+        yout = y * chi - z * shi
+        zout = y * shi + z * chi
+    else:
+        yout = y * chi + z * shi
+        zout = z * chi - y * shi
+
+    return [x, yout, zout]
+
+#---------------------------------------------------------------------------------------
+#-- gei_to_gsm: converts gei coordinates to gsm and gse coordinates                   --
+#---------------------------------------------------------------------------------------
+
+def gei_to_gsm(uts, x, y, z, cfile=None):
+    """
+    converts gei coordinates to gsm and gse coordinates (geopack.recalc, geigeo,
+    geogsm, and gsmgse for each position)
+    input:  uts     --- array of ut in seconds from 1970.1.1
+            x, y, z --- arrays of the gei coordinates
+            cfile   --- the matrix cache file name (see get_matrices)
+    output: [xgsm, ygsm, zgsm, xgse, ygse, zgse]
+    """
+    mat = get_matrices(uts, cfile)
+
+    xgeo, ygeo, zgeo = gei_to_geo(mat, x, y, z, 1)
+    xgsm, ygsm, zgsm = geo_to_gsm(mat, xgeo, ygeo, zgeo, 1)
+    xgse, ygse, zgse = gsm_to_gse(mat, xgsm, ygsm, zgsm, 1)
+
+    return [xgsm, ygsm, zgsm, xgse, ygse, zgse]
+
+#---------------------------------------------------------------------------------------
+#-- car_to_sph: converts cartesian coordinates into spherical ones                    --
+#---------------------------------------------------------------------------------------
+
+def car_to_sph(x, y, z):
+    """
+    converts cartesian coordinates into spherical ones (array version of
+    geopack.sphcar(x, y, z, -1))
+    input:  x, y, z --- arrays of the coordinates
+    output: [r, theta, phi] (theta and phi in radians; phi is in 0 - 2pi)
+    """
+    x, y, z = to_arrays(x, y, z)
+
+    sq    = numpy.float_power(x, 2.0) + numpy.float_power(y, 2.0)
+    r     = numpy.sqrt(sq + numpy.float_power(z, 2.0))
+
+    phi   = numpy.arctan2(y, x)
+    phi   = numpy.where(phi < 0, phi + 2 * numpy.pi, phi)
+    theta = numpy.arctan2(numpy.sqrt(sq), z)
+#
+#--- at the poles, phi = 0
+#
+    pole  = sq == 0
+    phi   = numpy.where(pole, 0.0, phi)
+    theta = numpy.where(pole, numpy.where(z < 0, numpy.pi, 0.0), theta)
+
+    return [r, theta, phi]
+
+#---------------------------------------------------------------------------------------
+#-- to_arrays: convert the inputs to float arrays                                     --
+#---------------------------------------------------------------------------------------
+
+def to_arrays(x, y, z):
+    """
+    convert the inputs to float arrays
+    input:  x, y, z --- lists/arrays (or values)
+    output: x, y, z --- numpy float arrays
+    """
+    x = numpy.atleast_1d(numpy.asarray(x, dtype=float))
+    y = numpy.atleast_1d(numpy.asarray(y, dtype=float))
+    z = numpy.atleast_1d(numpy.asarray(z, dtype=float))
+
+    return x, y, z
@@ -6,7 +6,7 @@
 #                                                                           #
 #               author: t. isobe (tisobe@@cfa.harvard.edu)                  #
 #                                                                           #
-#                   last update: Mar 16, 2021                               #
+#                   last update: Oct 16, 2026                               #
 #                                                                           #
 #############################################################################
 
@@ -43,6 +43,7 @@ sys.path.append(mta_dir)
 #
 import mta_common_functions as mcf  #---- contains other functions commonly used in MTA scripts
 import convert_coord        as cnvc #---- converting coordinate systems
+import ephem_store          as est  #---- columnar binary store of the ephemeris data
 #
 #--- temp writing file name
 #
@@ -58,8 +59,10 @@ def copy_ephem_data():
     copy ephem data from /data/mta/Script/Ephem/EPH_Data/
     input:  none, but read from <input_data>/DE*.EPH.dat0
     output: <data_dir>/EPH.dat
+            <data_dir>/EPH.dat.npy      --- binary column store of EPH.dat
             <data_dir>/EPH.gsme
             <data_dir>/EPH.gsme_in_Re
+            <data_dir>/EPH.gsme.npy     --- binary column store of the gsm/gse data
     """
 #
 #--- read the list of the previously copied data files
@@ -101,6 +104,10 @@ def copy_ephem_data():
         cmd = 'cp  '  + ent + ' ' + ofile
         os.system(cmd)
 #
+#--- create the binary column store of the new ephemeris data (read by ephem_interpolate.py)
+#
+        est.build_ephem_store(ofile)
+#
 #--- update the list of copied files
 #
         #for writing out files in test directory
@@ -117,7 +124,8 @@ def copy_ephem_data():
 #
 #---- create a data file with gsm and gse in the earth radius
 #
-    data  = cnvc.cocochan(c_list[-1])
+    cols  = cnvc.compute_ephem_columns(c_list[-1])
+    data  = cnvc.format_ephem_lines(cols)
 #
 #--- print out the results
 #
@@ -143,6 +151,14 @@ def copy_ephem_data():
     with open(out, 'w') as fo:
         for ent in data[2]:
             fo.write(ent)
+#
+#--- save the columns in the binary store; this is written after the text files
+#--- so that the store is not older than them (read by create_short_ephdata.py)
+#
+    out   = data_dir + 'PE.EPH.gsme.npy'
+    if (os.getenv('TEST') == 'TEST'):
+        out = test_out + "/" + os.path.basename(out)
+    est.save_store(out, cols)
         
 #------------------------------------------------------------------------------
 
@@ -6,7 +6,7 @@
 #                                                                                           #
 #               author: t. isobe (tiosbe@cfa.harvard.edu)                                   #
 #                                                                                           #
-#               last update: Mar 16, 2021                                                   #
+#               last update: Oct 16, 2026                                                   #
 #                                                                                           #
 #############################################################################################
 
@@ -36,28 +36,48 @@ if (os.getenv('TEST') == 'TEST'):
     test_out = os.getcwd() + '/TestOut'
 
 sys.path.append('/data/mta4/Script/Python3.10/MTA/')
+sys.path.append(ephem_dir + 'Scripts/')
 import mta_common_functions     as mcf
+import convert_coord            as cnvc
+import ephem_store              as est
 
 current = time.strftime('%Y:%j:%H:%M:%S', time.gmtime())
 current = Chandra.Time.DateTime(current).secs - 2.0 * 86400.
 #start   = current - 2.0 * 86400
 
-for ifile in ['PE.EPH.gsme', 'PE.EPH.gsme_in_Re','PE.EPH.gsme_spherical']:
-    ifile   = ephem_dir + 'Data/' + ifile
-    data    = mcf.read_data_file(ifile)
+#
+#--- the binary store of PE.EPH.gsme* data (created by copy_ephem_data.py);
+#--- the data lines are recreated from the selected part of the store
+#
+f_list  = ['PE.EPH.gsme', 'PE.EPH.gsme_in_Re','PE.EPH.gsme_spherical']
+f_list  = [ephem_dir + 'Data/' + ifile for ifile in f_list]
+cols    = est.read_store(ephem_dir + 'Data/PE.EPH.gsme.npy', f_list)
+if cols is not None:
+    cols    = est.get_window(cols, current, nmax=3500, inclusive=False)
+    s_lines = cnvc.format_ephem_lines(cols)
 
-    line    = ''
-    cnt     = 0
-    for ent in data:
-        atemp = re.split('\s+', ent)
-        stime = float(atemp[0])
-        if stime > current:
-            if cnt >= 3500:
-                break
-    
-            #ent  = ent.replace('\t', '  ')
-            line = line + ent + '\n'
-            cnt += 1
+for m in range(0, len(f_list)):
+    ifile   = f_list[m]
+    if cols is not None:
+        line = s_lines[m]
+    else:
+#
+#--- the store is not available; read the text data
+#
+        data    = mcf.read_data_file(ifile)
+
+        line    = ''
+        cnt     = 0
+        for ent in data:
+            atemp = re.split('\s+', ent)
+            stime = float(atemp[0])
+            if stime > current:
+                if cnt >= 3500:
+                    break
+        
+                #ent  = ent.replace('\t', '  ')
+                line = line + ent + '\n'
+                cnt += 1
     
     ofile = ifile + '_short'
     if (os.getenv('TEST') == 'TEST'):
@@ -6,7 +6,7 @@
 #                                                                           #
 #               author: t. isobe@cfa.harvard.edu                            #
 #                                                                           #
-#               last update Oct 12, 2022                                    #
+#               last update Oct 16, 2026                                    #
 #                                                                           #
 #############################################################################
 
@@ -15,6 +15,7 @@ import os
 import string
 import re
 import time
+import signal
 import random
 
 #
@@ -23,6 +24,16 @@ import random
 rtail  = int(time.time() * random.random())
 zspace = '/tmp/zspace' + str(rtail)
 
+#
+#--- the status file written by the daemon and the command to start the daemon
+#
+s_file     = '/data/mta4/Space_Weather/EPHEM/Data/gephem_status'
+daemon_cmd = '/data/mta4/Space_Weather/EPHEM/Scripts/ephem_interpolate.py -d'
+#
+#--- the name of the daemon script and that of the older c daemon which it replaced
+#
+daemon_name = 'ephem_interpolate.py'
+old_daemon  = 'interpolate_daemonize'
 #
 #--- Passes in emails from sys args
 #
@@ -38,33 +49,146 @@ for i in range(1,len(sys.argv)):
 def  daemon_process_check():
     """
     check whether EPHEM related daemon is running
-    input: none
+    input: none, but read <data_dir>/gephem_status written by the daemon
     output: email sent to admin, if the script found non-active daemon process
             Note: this must be run on the same cpu where the daemon processes
                   are running. (currently c3po-v)
     """
+    status = read_status(s_file)
 #
-#--- check SOH daemon processes
+#---    check the process is still running and it updated the status recently
 #
-    cmd = 'ps aux|grep daemonize > ' + zspace
-    os.system(cmd)
-
-    with open(zspace, 'r') as f:
-        out = f.read()
-
-    cmd = 'rm -rf ' + zspace
-    os.system(cmd)
-    line = ''
+    if is_running(status):
+        return
 #
-#---    check the process is still running
+#---- if the process is not running, send out email to admin and restart it.
+#---- the process in the status file is stopped only if it is still the daemon
+#---- (e.g. it hangs); the pid may have been reused by another process.
 #
-    mc1  = re.search('interpolate_daemonize', out)
+    send_email()
+    try:
+        pid = int(status['pid'])
+        if is_daemon(pid):
+            os.kill(pid, signal.SIGTERM)
+    except (KeyError, ValueError, OSError):
+        pass
+#
+#--- the first run after the cutover: there is no status file yet and the older
+#--- c daemon (interpolate_daemonize) may still be running; stop it so that the two
+#--- do not update gephem.dat at the same time
+#
+    for pid in find_processes(old_daemon):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+    os.system(daemon_cmd)
+
+#----------------------------------------------------------------------------
+#-- read_status: read the daemon status file                               --
+#----------------------------------------------------------------------------
+
+def read_status(sfile):
+    """
+    read the daemon status file
+    input:  sfile   --- status file name (lines of <key>: <value>)
+    output: status  --- a dict of the status; empty if the file cannot be read
+    """
+    status = {}
+    try:
+        with open(sfile, 'r') as f:
+            for ent in f.readlines():
+                atemp = ent.split(':', 1)
+                if len(atemp) == 2:
+                    status[atemp[0].strip()] = atemp[1].strip()
+    except (IOError, OSError):
+        pass
+
+    return status
+
+#----------------------------------------------------------------------------
+#-- is_running: check whether the daemon is alive from its status          --
+#----------------------------------------------------------------------------
+
+def is_running(status):
+    """
+    check whether the daemon is alive from its status: the process exists and
+    the last update is not older than three update intervals
+    input:  status  --- a dict of the status (see read_status)
+    output: True/False
+    """
+    try:
+        pid     = int(status['pid'])
+        update  = float(status['update'])
+        cadence = float(status['cadence'])
+    except (KeyError, ValueError):
+        return False
+
+    if time.time() - update > 3 * cadence:
+        return False
 #
-#---- if the process is not running, send out email to admin
+#--- the process must exist and still be the daemon (not a process with a reused pid)
 #
-    if mc1 is None:
-        send_email()
-        os.system("/data/mta4/Space_Weather/EPHEM/Scripts/interpolate_daemonize")
+    return is_daemon(pid)
+
+#----------------------------------------------------------------------------
+#-- is_daemon: check whether the process is the ephem_interpolate daemon   --
+#----------------------------------------------------------------------------
+
+def is_daemon(pid):
+    """
+    check whether the process is the ephem_interpolate daemon
+    input:  pid     --- process id
+    output: True if the command line of the process is that of daemon_cmd
+            (ephem_interpolate.py with -d); False if the process does not exist
+            or it is another process
+    """
+    args = read_cmdline(pid)
+
+    if not any(os.path.basename(ent) == daemon_name for ent in args):
+        return False
+
+    return ('-d' in args) or ('--daemon' in args)
+
+#----------------------------------------------------------------------------
+#-- find_processes: find the processes whose command line has a name       --
+#----------------------------------------------------------------------------
+
+def find_processes(name):
+    """
+    find the processes whose command line has a given name
+    input:  name    --- a part of the command name (e.g. interpolate_daemonize)
+    output: a list of the process ids (this process is not included)
+    """
+    pids = []
+    for ent in os.listdir('/proc'):
+        if (not ent.isdigit()) or (int(ent) == os.getpid()):
+            continue
+
+        args = read_cmdline(int(ent))
+        if any(name in os.path.basename(arg) for arg in args):
+            pids.append(int(ent))
+
+    return pids
+
+#----------------------------------------------------------------------------
+#-- read_cmdline: read the command line of a process                       --
+#----------------------------------------------------------------------------
+
+def read_cmdline(pid):
+    """
+    read the command line of a process from /proc/<pid>/cmdline
+    input:  pid     --- process id
+    output: a list of the command line arguments; empty if the process does not exist
+    """
+    try:
+        with open('/proc/' + str(pid) + '/cmdline', 'rb') as f:
+            line = f.read().decode('utf-8', 'replace')
+    except (IOError, OSError):
+        return []
+
+    return [ent for ent in line.split('\0') if ent != '']
 
 #----------------------------------------------------------------------------
 #-- send_email: send out email to admin                                    --
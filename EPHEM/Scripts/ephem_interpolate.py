@@ -6,7 +6,7 @@
 #                                                                           #
 #               author: t. isobe (tisobe@cfa.harvard.edu)                   #
 #                                                                           #
-#                   last update: Mar 16, 2021                               #
+#                   last update: Oct 16, 2026                               #
 #                                                                           #
 #############################################################################
 
@@ -18,6 +18,8 @@ import random
 import math
 import numpy
 import time
+import signal
+import argparse
 import Chandra.Time
 path = '/data/mta4/Space_Weather/EPHEM/house_keeping/dir_list_py'
 
@@ -38,6 +40,11 @@ if (os.getenv('TEST') == 'TEST'):
 sys.path.append(bin_dir)
 sys.path.append(mta_dir)
 #
+#--- import several functions
+#
+import ephem_store          as est  #---- columnar binary store of the ephemeris data
+import atomic_file          as afile  #---- write through a temporary file and a rename
+#
 #--- temp writing file name
 #
 rtail  = int(time.time() * random.random())
@@ -45,6 +52,11 @@ zspace = '/tmp/zspace' + str(rtail)
 
 e_file = data_dir + 'PE.EPH.dat'
 o_file = data_dir + 'gephem.dat'
+s_file = data_dir + 'gephem_status'
+#
+#--- the ephemeris data kept in memory by the daemon mode (see load_ephem)
+#
+eph_data = {'mtime': None, 'cols': None, 'reload': 0}
 
 #----------------------------------------------------------------------------------
 #-- ephem_interpolate: interpolate the current epheris data                      --
@@ -53,8 +65,10 @@ o_file = data_dir + 'gephem.dat'
 def ephem_interpolate():
     """
     interpolate the current epheris data
-    input:  <data_dir>/PE.EPH.dat
+    input:  <data_dir>/PE.EPH.dat (read through <data_dir>/PE.EPH.dat.npy)
     output: <data_dir>/gephem.dat
+            return True if the data are updated; False if the current time is
+            outside of the data range
     """
 #
 #--- find the current time
@@ -62,76 +76,153 @@ def ephem_interpolate():
     out = time.strftime('%Y:%j:%H:%M:%S', time.gmtime())
     now = Chandra.Time.DateTime(out).secs
 #
-#--- read epherims data
+#--- read epherims data (kept in memory and reloaded only when PE.EPH.dat is updated)
 #
-    data = read_data_file(e_file)
-
-    t_list = []
-    d_list = []
-    for ent in data:
-        atemp = re.split('\s+', ent)
-        t_list.append(float(atemp[0]))
-        d_list.append(ent)
+    cols = load_ephem()
 #
-#--- if the current data is outside of the data, stop
+#--- find the time interval that the current time drops between and
+#--- interpolate the postion; if the current data is outside of the data, stop
 #
-    t_len = len(t_list)
-    if now < t_list[0]:
-        print("Outside of the data range")
-        exit(1)
-    if now > t_list[-1]:
+    out = est.position_at(cols, now)
+    if out is None:
         print("Outside of the data range")
-        exit(1)
-#
-#--- find the time interval that the current time drops between
-#
-    for  k in range(1, t_len):
-        if (now >= t_list[k-1]) and (now <= t_list[k]):
-#
-#--- interpolate the postion
-#
-            ratio = (now - t_list[k-1]) / (t_list[k] - t_list[k-1])
+        return False
 
-            atemp = re.split('\s+', d_list[k-1])
-            btemp = re.split('\s+', d_list[k])
+    [k, ratio, vals] = out
 
-            line  = ''
-            dsum1 = 0
-            dsum2 = 0
+    line  = ''
+    dsum1 = 0
+    dsum2 = 0
 #
 #--- go through x, y, z and vx, vy, vz
 #
-            for m in range(1, 7):
-                sval = float(atemp[m])
-                tval = float(btemp[m])
-                est  = sval + (tval - sval) * ratio
-                line = line + "%16.3f" % est
-                if m in [1, 2, 3]:
-                    dsum1 += sval * sval
-                    dsum2 += tval * tval
+    for m in range(1, 7):
+        sval = float(cols[m, k-1])
+        tval = float(cols[m, k])
+        line = line + "%16.3f" % vals[m-1]
+        if m in [1, 2, 3]:
+            dsum1 += sval * sval
+            dsum2 += tval * tval
 #
 #--- compute the distrance from the center and ditermine whether the satellite is going up or down
 #
-            dist1 = math.sqrt(dsum1)
-            dist2 = math.sqrt(dsum2)
-            dist  = dist1 +(dist2 - dist1) * ratio
-            ###print("I AM HERE: " + str(dist1) + '<-->' + str(dist2) + '<-->' + str(dist) +'<-->' + str(ratio))
-            if dist1 <= dist2:
-                direct = 'A'
-            else:
-                direct = 'D'
-            sline = "%7d" % dist + ' ' +  direct + line + '\n'
+    dist1 = math.sqrt(dsum1)
+    dist2 = math.sqrt(dsum2)
+    dist  = dist1 +(dist2 - dist1) * ratio
+    if dist1 <= dist2:
+        direct = 'A'
+    else:
+        direct = 'D'
+    sline = "%7d" % dist + ' ' +  direct + line + '\n'
 #
 #--- print out the result
 #
-            outfile = o_file
-            if (os.getenv('TEST') == 'TEST'):
-                outfile = test_out + "/" + os.path.basename(o_file)
-            with open(outfile, 'w') as fo:
-                fo.write(sline)
-            
-            break
-                
+    outfile = o_file
+    if (os.getenv('TEST') == 'TEST'):
+        outfile = test_out + "/" + os.path.basename(o_file)
+    with open(outfile, 'w') as fo:
+        fo.write(sline)
+
+    return True
+
+#-------------------------------------------------------------------------------------
+#-- load_ephem: read the ephemeris data if PE.EPH.dat is updated                    --
+#-------------------------------------------------------------------------------------
+
+def load_ephem():
+    """
+    read the ephemeris data into memory if PE.EPH.dat is updated since the last read
+    input:  <data_dir>/PE.EPH.dat (read through <data_dir>/PE.EPH.dat.npy)
+    output: cols    --- (ncol, nrow) array of the ephemeris data (see ephem_store)
+    """
+    mtime = os.path.getmtime(e_file)
+    if (eph_data['cols'] is None) or (mtime != eph_data['mtime']):
+        eph_data['cols']    = numpy.array(est.read_ephem_store(e_file))
+        eph_data['mtime']   = mtime
+        eph_data['reload'] += 1
+
+    return eph_data['cols']
+
+#-------------------------------------------------------------------------------------
+#-- run_daemon: keep running ephem_interpolate with a fixed cadence                 --
+#-------------------------------------------------------------------------------------
+
+def run_daemon(cadence=180):
+    """
+    keep running ephem_interpolate with a fixed cadence. the ephemeris data are kept
+    in memory and the status of each pass is written in the status file, which
+    daemon_process_check_ephem_primary.py reads.
+    input:  cadence --- interval between the updates in seconds
+    output: <data_dir>/gephem.dat
+            <data_dir>/gephem_status
+    """
+    while True:
+        start = time.time()
+        try:
+            if ephem_interpolate():
+                status = 'ok'
+            else:
+                status = 'outside of the data range'
+        except Exception as err:
+            status = 'error: ' + ' '.join(str(err).split())
+
+        write_status(start, time.time() - start, status, cadence)
+#
+#--- sleep until the next round
+#
+        wait = cadence - (time.time() - start)
+        if wait > 0:
+            time.sleep(wait)
+
+#-------------------------------------------------------------------------------------
+#-- write_status: write the daemon status file                                      --
+#-------------------------------------------------------------------------------------
+
+def write_status(start, latency, status, cadence):
+    """
+    write the daemon status file. the file is written in a temporary file first and
+    then renamed, so that the checker does not see a partial file
+    input:  start   --- start time of the pass in seconds from 1970.1.1
+            latency --- time spent for the pass in seconds
+            status  --- status of the pass
+            cadence --- interval between the updates in seconds
+    output: <data_dir>/gephem_status with lines of <key>: <value>
+    """
+    line = 'pid: '     + str(os.getpid()) + '\n'
+    line = line + 'update: '  + '%.1f' % start   + '\n'
+    line = line + 'latency: ' + '%.3f' % latency + '\n'
+    line = line + 'cadence: ' + str(cadence)    + '\n'
+    line = line + 'reload: '  + str(eph_data['reload']) + '\n'
+    line = line + 'status: '  + status           + '\n'
+
+    outfile = s_file
+    if (os.getenv('TEST') == 'TEST'):
+        outfile = test_out + "/" + os.path.basename(s_file)
+
+    afile.write_bytes(outfile, line)
+
+#-------------------------------------------------------------------------------------
+#-- daemonize: detach the process from the terminal                                 --
+#-------------------------------------------------------------------------------------
+
+def daemonize():
+    """
+    detach the process from the terminal (the same steps as interpolate_daemonize.c)
+    input:  none
+    output: none; only the second child process returns
+    """
+    if os.fork() > 0:
+        os._exit(0)
+
+    os.setsid()
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    if os.fork() > 0:
+        os._exit(0)
+
+    os.umask(0)
+    os.chdir(bin_dir)
+
 #-------------------------------------------------------------------------------------
 #-------------------------------------------------------------------------------------
 #-------------------------------------------------------------------------------------
@@ -151,4 +242,19 @@ def read_data_file(ifile, remove=0):
 
 if __name__ == "__main__":
 
-    ephem_interpolate()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--daemon", action="store_true",\
+                        help="keep running as a daemon process")
+    parser.add_argument("-c", "--cadence", type=int, default=180,\
+                        help="interval between the updates in seconds (daemon mode)")
+    parser.add_argument("-f", "--foreground", action="store_true",\
+                        help="do not detach the daemon from the terminal")
+    args = parser.parse_args()
+
+    if args.daemon:
+        if not args.foreground:
+            daemonize()
+        run_daemon(args.cadence)
+    else:
+        if not ephem_interpolate():
+            exit(1)
@@ -0,0 +1,215 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       ephem_store.py: columnar binary store of the ephemeris data         #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+
+import os
+import numpy
+import atomic_file as afile    #--- write through a temporary file and a rename
+#
+#--- the first columns of the ephemeris data (DE*.EPH.dat0 and PE.EPH.dat)
+#
+eph_cols = ['time', 'x', 'y', 'z', 'vx', 'vy', 'vz']
+
+#----------------------------------------------------------------------------------
+#-- get_store_name: create the store file name from the text data file name     --
+#----------------------------------------------------------------------------------
+
+def get_store_name(ifile):
+    """
+    create the store file name from the text data file name
+    input:  ifile   --- text data file name
+    output: sfile   --- <ifile>.npy
+    """
+    return ifile + '.npy'
+
+#----------------------------------------------------------------------------------
+#-- read_text_columns: read a text data file into a column array                 --
+#----------------------------------------------------------------------------------
+
+def read_text_columns(ifile):
+    """
+    read a space separated text data file into a column array
+    input:  ifile   --- text data file name
+    output: cols    --- (ncol, nrow) array of the data; cols[0] is the time
+    """
+    with open(ifile, 'r') as f:
+        data = [line.split() for line in f.readlines() if line.strip() != '']
+
+    if len(data) == 0:
+        return numpy.zeros((len(eph_cols), 0))
+
+    return numpy.array(data, dtype=float).T
+
+#----------------------------------------------------------------------------------
+#-- build_ephem_store: create the binary store of a text data file               --
+#----------------------------------------------------------------------------------
+
+def build_ephem_store(ifile, sfile=None):
+    """
+    read a text data file and save it in the binary column store
+    input:  ifile   --- text data file name
+            sfile   --- store file name; if not given, <ifile>.npy
+    output: sfile
+            cols    --- (ncol, nrow) array of the data
+    """
+    if sfile is None:
+        sfile = get_store_name(ifile)
+
+    cols = read_text_columns(ifile)
+    save_store(sfile, cols)
+
+    return cols
+
+#----------------------------------------------------------------------------------
+#-- save_store: save a column array in a npy file                                --
+#----------------------------------------------------------------------------------
+
+def save_store(sfile, cols):
+    """
+    save a column array in a npy file. the array is written in a temporary file
+    first and then renamed, so that a job reading the store does not see a
+    partial file
+    input:  sfile   --- store file name
+            cols    --- (ncol, nrow) array
+    output: sfile
+    """
+    cols = numpy.ascontiguousarray(cols, dtype=float)
+    afile.write_file(sfile, lambda fo: numpy.save(fo, cols))
+
+#----------------------------------------------------------------------------------
+#-- read_store: read a binary column store                                       --
+#----------------------------------------------------------------------------------
+
+def read_store(sfile, sources=[]):
+    """
+    read a binary column store (memory-mapped)
+    input:  sfile   --- store file name
+            sources --- a list of the files the store was made from. if any of
+                        them is newer than the store, the store is stale
+    output: cols    --- (ncol, nrow) array of the data; None if the store does
+                        not exist or is stale
+    """
+    if not os.path.isfile(sfile):
+        return None
+
+    stime = os.path.getmtime(sfile)
+    for ifile in sources:
+        if os.path.isfile(ifile) and (os.path.getmtime(ifile) > stime):
+            return None
+
+    try:
+        return numpy.load(sfile, mmap_mode='r')
+    except (IOError, OSError, ValueError):
+        return None
+
+#----------------------------------------------------------------------------------
+#-- read_ephem_store: read the binary store of a text data file                  --
+#----------------------------------------------------------------------------------
+
+def read_ephem_store(ifile, sfile=None):
+    """
+    read the binary store of a text data file. if the store does not exist or it
+    is older than the text file, the text file is read and the store is recreated.
+    input:  ifile   --- text data file name
+            sfile   --- store file name; if not given, <ifile>.npy
+    output: cols    --- (ncol, nrow) array of the data; cols[0] is the time
+    """
+    if sfile is None:
+        sfile = get_store_name(ifile)
+
+    cols = read_store(sfile, [ifile])
+    if cols is not None:
+        return cols
+#
+#--- the store is missing or stale; if it cannot be written, just use the text data
+#
+    try:
+        return build_ephem_store(ifile, sfile)
+    except (IOError, OSError):
+        return read_text_columns(ifile)
+
+#----------------------------------------------------------------------------------
+#-- find_interval: find the data interval which the given time drops in          --
+#----------------------------------------------------------------------------------
+
+def find_interval(ttime, stime):
+    """
+    find the data interval which the given time drops in (binary search)
+    input:  ttime   --- array of time (sorted)
+            stime   --- time to look for
+    output: k       --- index of the end of the interval: ttime[k-1] <= stime <= ttime[k]
+                        -1 if stime is outside of the data range
+    """
+    tlen = len(ttime)
+    if (tlen < 2) or (stime < ttime[0]) or (stime > ttime[-1]):
+        return -1
+
+    k = int(numpy.searchsorted(ttime, stime, side='left'))
+
+    return max(k, 1)
+
+#----------------------------------------------------------------------------------
+#-- position_at: interpolate the data at the given time                          --
+#----------------------------------------------------------------------------------
+
+def position_at(cols, stime):
+    """
+    interpolate the data at the given time
+    input:  cols    --- (ncol, nrow) array of the data; cols[0] is the time
+            stime   --- time
+    output: [k, ratio, vals]
+                k       --- index of the end of the interval (see find_interval)
+                ratio   --- the position of stime in the interval (0 - 1)
+                vals    --- array of the interpolated values of cols[1:]
+            None if stime is outside of the data range
+    """
+    ttime = cols[0]
+    k     = find_interval(ttime, stime)
+    if k < 0:
+        return None
+
+    ratio = (stime - ttime[k-1]) / (ttime[k] - ttime[k-1])
+    sval  = numpy.array(cols[1:, k-1])
+    tval  = numpy.array(cols[1:, k])
+    vals  = sval + (tval - sval) * ratio
+
+    return [k, ratio, vals]
+
+#----------------------------------------------------------------------------------
+#-- get_window: select the data in the given time range                          --
+#----------------------------------------------------------------------------------
+
+def get_window(cols, tstart, tstop=None, nmax=0, inclusive=True):
+    """
+    select the data in the given time range (binary search)
+    input:  cols        --- (ncol, nrow) array of the data; cols[0] is the time
+            tstart      --- start time
+            tstop       --- stop time; if not given, to the end of the data
+            nmax        --- if > 0, the maximum number of the data points
+            inclusive   --- if True, tstart <= t <= tstop; otherwise tstart < t < tstop
+    output: cols        --- (ncol, nsel) array of the selected data
+    """
+    ttime = cols[0]
+    if inclusive:
+        sides = ['left', 'right']
+    else:
+        sides = ['right', 'left']
+
+    i0 = int(numpy.searchsorted(ttime, tstart, side=sides[0]))
+    if tstop is None:
+        i1 = len(ttime)
+    else:
+        i1 = int(numpy.searchsorted(ttime, tstop, side=sides[1]))
+
+    if nmax > 0:
+        i1 = min(i1, i0 + nmax)
+
+    return cols[:, i0:max(i0, i1)]
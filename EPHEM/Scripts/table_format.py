@@ -0,0 +1,182 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       table_format.py: format column data into fixed width text tables    #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- a format spec is a list of the column formats, one for each column:
+#---    a '%' format string which may include the separators (e.g. '\t%10.2f'), or
+#---    a function which takes a value and returns the formatted string
+#--- when all of them are strings, a row is created with one '%' operation
+#
+import numpy
+import unittest
+#
+#--- the number of rows formatted and written at a time by write_table
+#
+chunk_size = 10000
+
+#----------------------------------------------------------------------------------
+#-- format_rows: create the formatted lines of the column data                   --
+#----------------------------------------------------------------------------------
+
+def format_rows(spec, cols, end='\n'):
+    """
+    create the formatted lines of the column data
+    input:  spec    --- a list of the column formats (see above)
+            cols    --- a list of the columns (numpy arrays or lists) of the same length
+            end     --- a string added at the end of each line; default: '\n'
+    output: rows    --- a list of the formatted lines
+    """
+    if len(cols) != len(spec):
+        raise ValueError('The numbers of the formats and the columns are different')
+
+    cols = [to_list(col) for col in cols]
+    check_length(cols)
+
+    if all(isinstance(fmt, str) for fmt in spec):
+        fmt = ''.join(spec) + end
+        return [fmt % row for row in zip(*cols)]
+#
+#--- format each column separately and then combine them
+#
+    parts = []
+    for fmt, col in zip(spec, cols):
+        if isinstance(fmt, str):
+            parts.append([fmt % val for val in col])
+        else:
+            parts.append([fmt(val) for val in col])
+
+    return [''.join(row) + end for row in zip(*parts)]
+
+#----------------------------------------------------------------------------------
+#-- render_table: create the formatted text of the column data                   --
+#----------------------------------------------------------------------------------
+
+def render_table(spec, cols, end='\n'):
+    """
+    create the formatted text of the column data (the lines are joined once)
+    input:  spec    --- a list of the column formats
+            cols    --- a list of the columns of the same length
+            end     --- a string added at the end of each line; default: '\n'
+    output: text    --- formatted text
+    """
+    return ''.join(format_rows(spec, cols, end))
+
+#----------------------------------------------------------------------------------
+#-- write_table: write the formatted column data to a file                       --
+#----------------------------------------------------------------------------------
+
+def write_table(fo, spec, cols, end='\n'):
+    """
+    write the formatted column data to an open file, chunk_size rows at a time
+    input:  fo      --- file handle
+            spec    --- a list of the column formats
+            cols    --- a list of the columns of the same length
+            end     --- a string added at the end of each line; default: '\n'
+    output: the formatted lines written in fo
+    """
+    check_length(cols)
+    nrow = len(cols[0]) if len(cols) > 0 else 0
+    for start in range(0, nrow, chunk_size):
+        part = [col[start:start + chunk_size] for col in cols]
+        fo.write(''.join(format_rows(spec, part, end)))
+
+#----------------------------------------------------------------------------------
+#-- check_length: check that all columns have the same length                    --
+#----------------------------------------------------------------------------------
+
+def check_length(cols):
+    """
+    check that all columns have the same length; zip would silently cut the rows
+    to the shortest column
+    input:  cols    --- a list of the columns
+    output: none; ValueError is raised if the lengths are different
+    """
+    if len(set(len(col) for col in cols)) > 1:
+        raise ValueError('The lengths of the columns are different: '\
+                         + str([len(col) for col in cols]))
+
+#----------------------------------------------------------------------------------
+#-- to_list: convert a column into a list of python values                       --
+#----------------------------------------------------------------------------------
+
+def to_list(col):
+    """
+    convert a column into a list of python values; numpy arrays are converted
+    at once, which is much faster than indexing each element
+    input:  col     --- numpy array, list, or other sequence
+    output: a list of the values
+    """
+    if isinstance(col, numpy.ndarray):
+        return col.tolist()
+
+    return list(col)
+
+#-----------------------------------------------------------------------------------------
+#-- TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST    ---
+#-----------------------------------------------------------------------------------------
+
+class TestFunctions(unittest.TestCase):
+
+    def old_loop(self, spec, cols, end='\n'):
+#
+#--- the line by line concatenation which render_table replaced
+#
+        text = ''
+        for k in range(0, len(cols[0])):
+            line = ''
+            for fmt, col in zip(spec, cols):
+                v = col[k]
+                if isinstance(fmt, str):
+                    line = line + fmt % v
+                else:
+                    line = line + fmt(v)
+            text = text + line + end
+
+        return text
+
+    def test_render_table(self):
+
+        time = numpy.array([1.0, 2.5, 3.25])
+        flux = numpy.array([1.2e3, -99.0, 3.4e-2])
+        name = ['a', 'b', 'c']
+        nval = [1, 20, 300]
+
+        spec = ['%10.2f', '\t%.4e', '\t%s', '\t%5d']
+        cols = [time, flux, name, nval]
+        self.assertEqual(render_table(spec, cols), self.old_loop(spec, cols))
+#
+#--- mixed '%' and callable specs
+#
+        spec = ['%10.2f', lambda v: '\t' + ('%.4e' % v).upper(), '\t%s', lambda v: ' ' + str(v)]
+        self.assertEqual(render_table(spec, cols, end=' \n'), self.old_loop(spec, cols, end=' \n'))
+#
+#--- empty input
+#
+        cols = [numpy.array([]), numpy.array([]), [], []]
+        self.assertEqual(render_table(spec, cols), '')
+        self.assertEqual(render_table(spec, cols), self.old_loop(spec, cols))
+
+    def test_length(self):
+
+        with self.assertRaises(ValueError):
+            render_table(['%d', '%d'], [[1, 2, 3], [1, 2]])
+
+        with self.assertRaises(ValueError):
+            render_table(['%d', lambda v: str(v)], [[1, 2], [1, 2, 3]])
+
+        with self.assertRaises(ValueError):
+            render_table(['%d'], [[1], [2]])
+
+#-------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    unittest.main()
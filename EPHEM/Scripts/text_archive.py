@@ -0,0 +1,331 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       text_archive.py: append-only updates of the rolling text data       #
+#                        archives                                           #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- an archive is a text file of data lines in time order; other scripts read it as is.
+#---    append_text     --- new lines are written at the end with one write and fsync; a
+#---                        line without a newline at the end of the file is a broken write
+#---                        of a previous update and is removed first
+#---    commit_file     --- a file is replaced with a new content through a temporary file
+#---                        and a rename, so that readers never see a partial file
+#---    update_window   --- new lines are appended and the lines outside of a time window
+#---                        are dropped. if no line is dropped, it is a plain append;
+#---                        otherwise the kept part is copied as bytes (not parsed) with the
+#---                        new lines and committed
+#---    read_last       --- the last lines are read from the end of the file
+#---    read_after      --- the lines after a given time are found with a binary search on
+#---                        the byte positions of the file; only a few blocks are parsed
+#
+import os
+import unittest
+import atomic_file as afile    #--- write through a temporary file and a rename
+#
+#--- the size of the blocks read from the end of the file
+#
+block_size = 4096
+
+#----------------------------------------------------------------------------------
+#-- append_text: append data lines to an archive                                 --
+#----------------------------------------------------------------------------------
+
+def append_text(ifile, text):
+    """
+    append data lines to an archive with one write
+    input:  ifile   --- archive file name
+            text    --- data lines (each line ends with a newline)
+    output: ifile   --- updated archive
+    """
+    if text == '':
+        return
+
+    with open(ifile, 'ab+') as fo:
+#
+#--- remove a broken line left by a previous update
+#
+        size = fo.seek(0, 2)
+        pos  = complete_size(fo, size)
+        if pos < size:
+            fo.truncate(pos)
+
+        fo.write(text.encode())
+        fo.flush()
+        os.fsync(fo.fileno())
+
+#----------------------------------------------------------------------------------
+#-- commit_file: replace the content of a file                                   --
+#----------------------------------------------------------------------------------
+
+def commit_file(ifile, text, backup=''):
+    """
+    replace the content of a file through a temporary file and a rename
+    input:  ifile   --- file name
+            text    --- new content (string or bytes)
+            backup  --- if given, the previous file is kept as <ifile><backup>
+    output: ifile   --- updated file
+    """
+    afile.write_bytes(ifile, text, backup=backup)
+
+#----------------------------------------------------------------------------------
+#-- update_window: append data lines and drop the lines out of a time window     --
+#----------------------------------------------------------------------------------
+
+def update_window(ifile, text, tfunc, start=None, stop=None, backup=''):
+    """
+    append data lines and drop the lines whose times are out of [start, stop]
+    input:  ifile   --- archive file name
+            text    --- new data lines (each line ends with a newline)
+            tfunc   --- function to get the time of a data line
+            start   --- the lines older than this are dropped; default: None (no limit)
+            stop    --- the lines newer than this are dropped; default: None (no limit)
+            backup  --- if given and the file is rewritten, the previous file is kept
+                        as <ifile><backup>
+    output: ifile   --- updated archive. it is not replaced with an empty file
+    """
+    if not os.path.isfile(ifile):
+        if text != '':
+            commit_file(ifile, text)
+        return
+
+    with open(ifile, 'rb') as f:
+        size = complete_size(f, f.seek(0, 2))
+        pos1 = 0
+        pos2 = size
+        if start is not None:
+            pos1 = search_offset(f, size, start, tfunc, 'left')
+        if stop is not None:
+            pos2 = max(search_offset(f, size, stop, tfunc, 'right'), pos1)
+
+        f.seek(pos1)
+        kept = f.read(pos2 - pos1) if (pos1 > 0 or pos2 < size) else None
+#
+#--- nothing to drop; just append
+#
+    if kept is None:
+        append_text(ifile, text)
+        return
+
+    if kept == b'' and text == '':
+        return
+
+    commit_file(ifile, kept + text.encode(), backup)
+
+#----------------------------------------------------------------------------------
+#-- read_last: read the last data lines of a file                                --
+#----------------------------------------------------------------------------------
+
+def read_last(ifile, count=1, valid=None):
+    """
+    read the last data lines of a file from the end; the empty lines are skipped
+    input:  ifile   --- file name
+            count   --- the number of the lines to read; default: 1
+            valid   --- function to check a line; the lines with False are skipped;
+                        default: None (all lines)
+    output: a list of the lines (white spaces are stripped) in the file order
+    """
+    out  = []
+    rest = b''
+    with open(ifile, 'rb') as f:
+        pos = f.seek(0, 2)
+        while pos > 0 and len(out) < count:
+            step  = min(block_size, pos)
+            pos  -= step
+            f.seek(pos)
+            lines = (f.read(step) + rest).split(b'\n')
+#
+#--- the first piece may be a part of a line; keep it for the next block
+#
+            rest  = lines[0] if pos > 0 else b''
+            start = 1 if pos > 0 else 0
+            for ent in lines[start:][::-1]:
+                line = ent.decode('utf-8', 'replace').strip()
+                if line == '' or (valid is not None and not valid(line)):
+                    continue
+                out.append(line)
+                if len(out) >= count:
+                    break
+
+    return out[::-1]
+
+#----------------------------------------------------------------------------------
+#-- read_after: read the data lines after a given time                           --
+#----------------------------------------------------------------------------------
+
+def read_after(ifile, stime, tfunc):
+    """
+    read the data lines newer than a given time; the file must be in time order
+    input:  ifile   --- file name
+            stime   --- time
+            tfunc   --- function to get the time of a data line
+    output: a list of the data lines (white spaces are stripped)
+    """
+    with open(ifile, 'rb') as f:
+        size = f.seek(0, 2)
+        pos  = search_offset(f, size, stime, tfunc, 'right')
+        f.seek(pos)
+        block = f.read()
+
+    lines = [ent.strip() for ent in block.decode('utf-8', 'replace').split('\n')]
+
+    return [ent for ent in lines if ent != '']
+
+#----------------------------------------------------------------------------------
+#-- search_offset: find the byte position of a time in a file                    --
+#----------------------------------------------------------------------------------
+
+def search_offset(f, size, stime, tfunc, side='left'):
+    """
+    find the byte position of the first line whose time is >= stime (side='left') or
+    > stime (side='right') with a binary search; the lines whose times cannot be read
+    (e.g. headers) are treated as older lines
+    input:  f       --- file object opened in 'rb'
+            size    --- the size of the searched part of the file
+            stime   --- time
+            tfunc   --- function to get the time of a data line
+            side    --- 'left' or 'right'; default: 'left'
+    output: pos     --- byte position of the line start; size if there is no such line
+    """
+    def is_before(line):
+        try:
+            ltime = tfunc(line.decode('utf-8', 'replace').strip())
+        except (ValueError, IndexError):
+            return True
+        if side == 'left':
+            return ltime < stime
+        return ltime <= stime
+#
+#--- lo: all the lines before lo are older; hi: a line start (or size) which is not older
+#
+    lo = 0
+    hi = size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if mid > 0:
+            f.seek(mid - 1)
+            f.readline()
+            pos = f.tell()
+        else:
+            pos = 0
+#
+#--- no line starts in [mid, hi); the rest is checked line by line
+#
+        if pos >= hi:
+            break
+
+        f.seek(pos)
+        line = f.readline()
+        if is_before(line):
+            lo = pos + len(line)
+        else:
+            hi = pos
+
+    f.seek(lo)
+    while lo < hi:
+        line = f.readline()
+        if line == b'' or not is_before(line):
+            break
+        lo += len(line)
+
+    return min(lo, size)
+
+#----------------------------------------------------------------------------------
+#-- complete_size: find the size of the part of the file with complete lines    --
+#----------------------------------------------------------------------------------
+
+def complete_size(f, size):
+    """
+    find the byte position after the last newline of the file
+    input:  f       --- file object opened in binary mode
+            size    --- file size
+    output: pos     --- byte position after the last newline; 0 if there is no newline
+    """
+    pos = size
+    while pos > 0:
+        step = min(block_size, pos)
+        f.seek(pos - step)
+        block = f.read(step)
+        nloc  = block.rfind(b'\n')
+        if nloc >= 0:
+            return pos - step + nloc + 1
+        pos -= step
+
+    return 0
+
+#-----------------------------------------------------------------------------------------
+#-- TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST    ---
+#-----------------------------------------------------------------------------------------
+
+class TestFunctions(unittest.TestCase):
+
+    def setUp(self):
+
+        self.ifile = os.getcwd() + '/test_text_archive.dat'
+        self.tfunc = lambda line: float(line.split()[0])
+        with open(self.ifile, 'w') as fo:
+            fo.write(''.join(['%d\t%d\n' % (k * 10, k) for k in range(0, 1000)]))
+
+    def tearDown(self):
+
+        for ent in [self.ifile, self.ifile + '~']:
+            if os.path.isfile(ent):
+                os.remove(ent)
+
+    def read_file(self):
+
+        with open(self.ifile) as f:
+            return f.read()
+
+#------------------------------------------------------------------------
+
+    def test_read(self):
+
+        self.assertEqual(read_last(self.ifile), ['9990\t999'])
+        self.assertEqual(read_last(self.ifile, 2), ['9980\t998', '9990\t999'])
+        self.assertEqual(read_last(self.ifile, valid=lambda x: x.endswith('5')), ['9950\t995'])
+
+        self.assertEqual(read_after(self.ifile, 9975, self.tfunc), ['9980\t998', '9990\t999'])
+        self.assertEqual(read_after(self.ifile, 9980, self.tfunc), ['9990\t999'])
+        self.assertEqual(len(read_after(self.ifile, -1, self.tfunc)), 1000)
+        self.assertEqual(read_after(self.ifile, 9990, self.tfunc), [])
+
+#------------------------------------------------------------------------
+
+    def test_update(self):
+#
+#--- a broken line at the end is removed before appending
+#
+        with open(self.ifile, 'a') as fo:
+            fo.write('99')
+        append_text(self.ifile, '10000\t1000\n')
+        self.assertEqual(read_last(self.ifile, 2), ['9990\t999', '10000\t1000'])
+
+        update_window(self.ifile, '10010\t1001\n', self.tfunc, start=50, stop=9995, backup='~')
+        data = self.read_file().split('\n')
+        self.assertEqual(data[0], '50\t5')
+        self.assertEqual(data[-3:], ['9990\t999', '10010\t1001', ''])
+        self.assertTrue(os.path.isfile(self.ifile + '~'))
+#
+#--- nothing to drop: append only
+#
+        before = self.read_file()
+        update_window(self.ifile, '10020\t1002\n', self.tfunc, start=0)
+        self.assertEqual(self.read_file(), before + '10020\t1002\n')
+#
+#--- an archive is not replaced with an empty file
+#
+        update_window(self.ifile, '', self.tfunc, start=99999)
+        self.assertEqual(self.read_file(), before + '10020\t1002\n')
+
+#-------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    unittest.main()
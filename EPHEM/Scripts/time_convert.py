@@ -0,0 +1,537 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       time_convert.py: vectorized conversions between time formats        #
+#                        and chandra time (seconds from 1998.1.1)           #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- chandra time is TT seconds from 1998.1.1 00:00:00 TT; UT (uts) is the unix time in
+#--- seconds from 1970.1.1 (no leap seconds). the conversions go through numpy datetime64
+#--- arithmetic and the leap second table below, so that a whole column is converted at once.
+#--- supported time formats:
+#---    date        --- <yyyy>:<ddd>:<hh>:<mm>:<ss>.<ss> (the trailing fields may be dropped)
+#---                    or <yyyy>-<mm>-<dd>T<hh>:<mm>:<ss>.<ss> (iso; 'T' may be a space)
+#---    dom         --- day of mission (1999:202:00:00:00 is dom 0)
+#---    frac_year   --- fractional year; e.g. 2020.5
+#---    uts         --- seconds from 1970.1.1
+#---    secs        --- chandra time
+#--- the values agree with Chandra.Time to a few micro seconds (see TestFunctions)
+#
+import functools
+import unittest
+import numpy
+#
+#--- TAI - UTC and the date from which it is applied
+#--- to update: when IERS Bulletin C announces a new leap second (it is inserted at the
+#--- end of June or December), add [<the first day after it>, <new TAI - UTC>] at the end;
+#--- e.g. ['2017-01-01', 37] is the leap second of 2016 Dec 31. then run the tests
+#--- (python time_convert.py) on a machine with Chandra.Time or cxotime; check_leap_table
+#--- compares the table with them.
+#
+leap_table = [['1972-01-01', 10], ['1972-07-01', 11], ['1973-01-01', 12], ['1974-01-01', 13],\
+              ['1975-01-01', 14], ['1976-01-01', 15], ['1977-01-01', 16], ['1978-01-01', 17],\
+              ['1979-01-01', 18], ['1980-01-01', 19], ['1981-07-01', 20], ['1982-07-01', 21],\
+              ['1983-07-01', 22], ['1985-07-01', 23], ['1988-01-01', 24], ['1990-01-01', 25],\
+              ['1991-01-01', 26], ['1992-07-01', 27], ['1993-07-01', 28], ['1994-07-01', 29],\
+              ['1996-01-01', 30], ['1997-07-01', 31], ['1999-01-01', 32], ['2006-01-01', 33],\
+              ['2009-01-01', 34], ['2012-07-01', 35], ['2015-07-01', 36], ['2017-01-01', 37]]
+
+leap_uts = numpy.array([ent[0] for ent in leap_table], dtype='datetime64[s]').astype(float)
+leap_tai = numpy.array([ent[1] for ent in leap_table], dtype=float)
+#
+#--- 1998.1.1 00:00:00 UTC is 63.184 sec in chandra time (TAI - UTC = 31 sec, TT - TAI = 32.184 sec)
+#
+uts_1998 = 883612800.0
+tt_1998  = 63.184
+tai_1998 = 31.0
+#
+#--- the leap second times in chandra time (the first second with the new TAI - UTC)
+#
+leap_secs = leap_uts - uts_1998 + tt_1998 + (leap_tai - tai_1998)
+#
+#--- day of mission 0: 1999:202:00:00:00 UTC
+#
+dom_uts  = 932515200.0
+#
+#--- the standard format and its field positions
+#
+date_pad   = '0000:001:00:00:00'
+date_width = 32
+
+#----------------------------------------------------------------------------------
+#-- uts_to_secs: convert UT in seconds from 1970.1.1 into chandra time           --
+#----------------------------------------------------------------------------------
+
+def uts_to_secs(uts):
+    """
+    convert UT in seconds from 1970.1.1 into chandra time
+    input:  uts     --- a value or numpy array of seconds from 1970.1.1
+    output: secs    --- chandra time (float or numpy array)
+    """
+    uts = numpy.asarray(uts, dtype=float)
+    pos = numpy.searchsorted(leap_uts, uts, side='right') - 1
+    tai = numpy.where(pos >= 0, leap_tai[numpy.maximum(pos, 0)], leap_tai[0])
+
+    return scalar_out((uts - uts_1998) + (tai - tai_1998) + tt_1998)
+
+#----------------------------------------------------------------------------------
+#-- secs_to_uts: convert chandra time into UT in seconds from 1970.1.1           --
+#----------------------------------------------------------------------------------
+
+def secs_to_uts(secs):
+    """
+    convert chandra time into UT in seconds from 1970.1.1
+    input:  secs    --- a value or numpy array of chandra time
+    output: uts     --- seconds from 1970.1.1 (float or numpy array)
+    """
+    secs = numpy.asarray(secs, dtype=float)
+    pos  = numpy.searchsorted(leap_secs, secs, side='right') - 1
+    tai  = numpy.where(pos >= 0, leap_tai[numpy.maximum(pos, 0)], leap_tai[0])
+
+    return scalar_out((secs - tt_1998) - (tai - tai_1998) + uts_1998)
+
+#----------------------------------------------------------------------------------
+#-- date_to_secs: convert date strings into chandra time                         --
+#----------------------------------------------------------------------------------
+
+def date_to_secs(date):
+    """
+    convert date strings into chandra time
+    input:  date    --- a string or a list/numpy array of strings in
+                        <yyyy>:<ddd>:<hh>:<mm>:<ss> or <yyyy>-<mm>-<dd>T<hh>:<mm>:<ss> format
+    output: secs    --- chandra time (float or numpy array)
+    """
+    [uts, leap] = parse_date(date)
+#
+#--- a leap second (ss = 60) is one second after the last second of the day
+#
+    secs = uts_to_secs(uts - leap) + leap
+
+    if numpy.ndim(date) == 0:
+        return float(secs[0])
+
+    return secs
+
+#----------------------------------------------------------------------------------
+#-- date_to_uts: convert date strings into UT in seconds from 1970.1.1           --
+#----------------------------------------------------------------------------------
+
+def date_to_uts(date):
+    """
+    convert date strings into UT in seconds from 1970.1.1
+    input:  date    --- a string or a list/numpy array of date strings
+    output: uts     --- seconds from 1970.1.1 (float or numpy array)
+    """
+    uts = parse_date(date)[0]
+
+    if numpy.ndim(date) == 0:
+        return float(uts[0])
+
+    return uts
+
+#----------------------------------------------------------------------------------
+#-- parse_date: read date strings                                                --
+#----------------------------------------------------------------------------------
+
+def parse_date(date):
+    """
+    read date strings
+    input:  date    --- a string or a list/numpy array of date strings
+    output: uts     --- numpy array of seconds from 1970.1.1
+            leap    --- numpy array of 1.0 for a leap second (ss = 60), otherwise 0.0
+    """
+    date = numpy.atleast_1d(numpy.asarray(date, dtype=str))
+    uts  = numpy.zeros(len(date))
+    leap = numpy.zeros(len(date))
+    if len(date) == 0:
+        return [uts, leap]
+#
+#--- iso format has '-' after the year
+#
+    iso = numpy.char.find(date, '-') == 4
+    if iso.any():
+        try:
+            dtm = numpy.array(numpy.char.strip(date[iso]), dtype='datetime64[ns]')
+        except ValueError:
+            raise ValueError('Unknown time format: ' + str(date[iso][0]))
+        uts[iso] = dtm.astype(numpy.int64) / 1.0e9
+
+    if (~iso).any():
+        [uts[~iso], leap[~iso]] = yday_to_uts(date[~iso])
+
+    return [uts, leap]
+
+#----------------------------------------------------------------------------------
+#-- yday_to_uts: convert <yyyy>:<ddd>:<hh>:<mm>:<ss> into UT                     --
+#----------------------------------------------------------------------------------
+
+def yday_to_uts(date):
+    """
+    convert <yyyy>:<ddd>:<hh>:<mm>:<ss>.<ss> strings into UT in seconds from 1970.1.1;
+    the digits are read from the character codes of all strings at once
+    input:  date    --- numpy array of date strings
+    output: uts     --- numpy array of seconds from 1970.1.1
+            leap    --- numpy array of 1.0 for a leap second (ss = 60), otherwise 0.0
+    """
+#
+#--- fill the dropped trailing fields
+#
+    date = numpy.char.strip(date)
+    dlen = numpy.char.str_len(date)
+    for k in numpy.unique(dlen[dlen < len(date_pad)]):
+        date[dlen == k] = numpy.char.add(date[dlen == k], date_pad[k:])
+
+    try:
+        chars = numpy.char.ljust(date, date_width).astype('S' + str(date_width))
+    except UnicodeEncodeError:
+        raise ValueError('Unknown time format')
+    chars = chars.view(numpy.uint8).reshape(len(date), date_width).astype(int)
+    digit = chars - ord('0')
+    isdig = (digit >= 0) & (digit <= 9)
+    space = chars == ord(' ')
+#
+#--- check the format: digits and ':' at the right places, and an optional fraction
+#
+    dpos  = [0, 1, 2, 3, 5, 6, 7, 9, 10, 12, 13, 15, 16]
+    valid = numpy.all(isdig[:, dpos], axis=1)
+    valid = valid & numpy.all(chars[:, [4, 8, 11, 14]] == ord(':'), axis=1)
+    point = chars[:, 17] == ord('.')
+    valid = valid & (point | space[:, 17])
+    valid = valid & numpy.all(isdig[:, 18:] | space[:, 18:], axis=1)
+    valid = valid & (point | numpy.all(space[:, 18:], axis=1))
+    if not valid.all():
+        raise ValueError('Unknown time format: ' + str(date[~valid][0]))
+
+    year = digit[:, 0] * 1000 + digit[:, 1] * 100 + digit[:, 2] * 10 + digit[:, 3]
+    yday = digit[:, 5] * 100  + digit[:, 6] * 10  + digit[:, 7]
+    hh   = digit[:, 9]  * 10  + digit[:, 10]
+    mm   = digit[:, 12] * 10  + digit[:, 13]
+    ss   = digit[:, 15] * 10  + digit[:, 16]
+#
+#--- fractional seconds
+#
+    fdig = numpy.where(isdig[:, 18:], digit[:, 18:], 0)
+    fsec = (fdig * (10.0 ** -numpy.arange(1, date_width - 17))).sum(axis=1)
+
+    days = (year - 1970).astype('datetime64[Y]').astype('datetime64[D]').astype(numpy.int64) + yday - 1
+    uts  = days * 86400.0 + (hh * 3600 + mm * 60 + ss) + fsec
+
+    return [uts, (ss >= 60).astype(float)]
+
+#----------------------------------------------------------------------------------
+#-- secs_to_date: convert chandra time into <yyyy>:<ddd>:<hh>:<mm>:<ss>.<sss>    --
+#----------------------------------------------------------------------------------
+
+def secs_to_date(secs):
+    """
+    convert chandra time into <yyyy>:<ddd>:<hh>:<mm>:<ss>.<sss> (the same as Chandra.Time date)
+    input:  secs    --- a value or numpy array of chandra time
+    output: date    --- a string or a list of strings
+    """
+    uts  = numpy.atleast_1d(secs_to_uts(secs))
+    msec = numpy.rint(uts * 1000.0).astype(numpy.int64)
+    dtm  = msec.astype('datetime64[ms]')
+    day  = dtm.astype('datetime64[D]')
+    year = dtm.astype('datetime64[Y]')
+    yday = (day - year.astype('datetime64[D]')).astype(numpy.int64) + 1
+    msec = (dtm - day).astype(numpy.int64)
+
+    cols = [year.astype(numpy.int64) + 1970, yday, msec // 3600000,\
+            (msec // 60000) % 60, (msec // 1000) % 60, msec % 1000]
+    fmt  = '%04d:%03d:%02d:%02d:%02d.%03d'
+    date = [fmt % row for row in zip(*[col.tolist() for col in cols])]
+
+    if numpy.ndim(secs) == 0:
+        return date[0]
+
+    return date
+
+#----------------------------------------------------------------------------------
+#-- dom_to_secs: convert day of mission into chandra time                        --
+#----------------------------------------------------------------------------------
+
+def dom_to_secs(dom):
+    """
+    convert day of mission into chandra time
+    input:  dom     --- a value or numpy array of day of mission
+    output: secs    --- chandra time
+    """
+    return uts_to_secs(dom_uts + numpy.asarray(dom, dtype=float) * 86400.0)
+
+#----------------------------------------------------------------------------------
+#-- secs_to_dom: convert chandra time into day of mission                        --
+#----------------------------------------------------------------------------------
+
+def secs_to_dom(secs):
+    """
+    convert chandra time into day of mission
+    input:  secs    --- a value or numpy array of chandra time
+    output: dom     --- day of mission
+    """
+    return scalar_out((numpy.asarray(secs_to_uts(secs)) - dom_uts) / 86400.0)
+
+#----------------------------------------------------------------------------------
+#-- frac_year_to_secs: convert fractional year into chandra time                 --
+#----------------------------------------------------------------------------------
+
+def frac_year_to_secs(fyear):
+    """
+    convert fractional year into chandra time
+    input:  fyear   --- a value or numpy array of fractional year (e.g. 2020.5)
+    output: secs    --- chandra time
+    """
+    fyear = numpy.asarray(fyear, dtype=float)
+    year  = numpy.floor(fyear).astype(numpy.int64)
+    [ystart, ylen] = year_span(year)
+
+    return uts_to_secs(ystart + (fyear - year) * ylen)
+
+#----------------------------------------------------------------------------------
+#-- secs_to_frac_year: convert chandra time into fractional year                 --
+#----------------------------------------------------------------------------------
+
+def secs_to_frac_year(secs):
+    """
+    convert chandra time into fractional year
+    input:  secs    --- a value or numpy array of chandra time
+    output: fyear   --- fractional year
+    """
+    uts  = numpy.asarray(secs_to_uts(secs))
+    year = numpy.floor(uts).astype(numpy.int64).astype('datetime64[s]')
+    year = year.astype('datetime64[Y]').astype(numpy.int64) + 1970
+    [ystart, ylen] = year_span(year)
+
+    return scalar_out(year + (uts - ystart) / ylen)
+
+#----------------------------------------------------------------------------------
+#-- year_span: find the start time and the length of years in seconds            --
+#----------------------------------------------------------------------------------
+
+def year_span(year):
+    """
+    find the start time and the length of years in seconds
+    input:  year    --- numpy array of years
+    output: ystart  --- seconds from 1970.1.1 of the beginning of the years
+            ylen    --- length of the years in seconds
+    """
+    year   = numpy.asarray(year, dtype=numpy.int64)
+    ystart = (year - 1970).astype('datetime64[Y]').astype('datetime64[s]').astype(float)
+    ystop  = (year - 1969).astype('datetime64[Y]').astype('datetime64[s]').astype(float)
+
+    return [ystart, ystop - ystart]
+
+#----------------------------------------------------------------------------------
+#-- to_secs: convert time in a given format into chandra time                    --
+#----------------------------------------------------------------------------------
+
+def to_secs(vals, fmt='date'):
+    """
+    convert time in a given format into chandra time
+    input:  vals    --- a value or a list/numpy array of values
+            fmt     --- format of the values: date, dom, frac_year, uts, or secs; default: date
+    output: secs    --- chandra time
+    """
+    if fmt == 'date':
+        return date_to_secs(vals)
+    elif fmt == 'dom':
+        return dom_to_secs(vals)
+    elif fmt == 'frac_year':
+        return frac_year_to_secs(vals)
+    elif fmt == 'uts':
+        return uts_to_secs(vals)
+    elif fmt == 'secs':
+        return scalar_out(numpy.asarray(vals, dtype=float))
+    else:
+        raise ValueError('Unknown time format: ' + str(fmt))
+
+#----------------------------------------------------------------------------------
+#-- cached_secs: convert a date string into chandra time with a cache            --
+#----------------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=4096)
+def cached_secs(date):
+    """
+    convert a date string into chandra time; the repeated dates are taken from the cache
+    input:  date    --- a date string
+    output: secs    --- chandra time
+    """
+    return date_to_secs(date)
+
+#----------------------------------------------------------------------------------
+#-- cached_date: convert chandra time into a date string with a cache            --
+#----------------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=4096)
+def cached_date(secs):
+    """
+    convert chandra time into <yyyy>:<ddd>:<hh>:<mm>:<ss>.<sss>; the repeated values are
+    taken from the cache
+    input:  secs    --- chandra time
+    output: date    --- a date string
+    """
+    return secs_to_date(float(secs))
+
+#----------------------------------------------------------------------------------
+#-- ut_in_secs: convert calendar date into univarsal time in sec                 --
+#----------------------------------------------------------------------------------
+
+def ut_in_secs(year, mon, day, hh, mm, ss):
+    """
+    convert calendar date into univarsal time in sec (seconds from 1970.1.1)
+    input:  year    --- year
+            mon     --- month
+            day     --- day
+            hh      --- hour
+            mm      --- minutes
+            ss      --- seconds
+            each of them can be a value (or a string of the value) or a numpy array;
+            the fractional parts are dropped
+    output:uts      --- UT in seconds from 1970.1.1 (float or numpy array)
+    """
+    [year, mon, day, hh, mm, ss] = [numpy.asarray(numpy.asarray(x, dtype=float),\
+                                    dtype=numpy.int64) for x in [year, mon, day, hh, mm, ss]]
+
+    month = ((year - 1970) * 12 + mon - 1).astype('datetime64[M]')
+    days  = month.astype('datetime64[D]').astype(numpy.int64) + day - 1
+    uts   = days * 86400.0 + (hh * 3600 + mm * 60 + ss)
+
+    return scalar_out(uts)
+
+#----------------------------------------------------------------------------------
+#-- check_leap_table: compare the leap second table with Chandra.Time or cxotime --
+#----------------------------------------------------------------------------------
+
+def check_leap_table(dates=None):
+    """
+    compare the leap second table with Chandra.Time or cxotime (whichever is available)
+    at the days around the leap seconds and at the given dates
+    input:  dates   --- a list of dates (see date_to_secs); default: today
+    output: a list of the dates where the chandra times differ by more than 1 msec
+            (empty if the table is up to date); None if neither Chandra.Time nor
+            cxotime is available
+    """
+    try:
+        from Chandra.Time import DateTime
+        def ref_secs(date):
+            return DateTime(date).secs
+    except ImportError:
+        try:
+            from cxotime import CxoTime
+            def ref_secs(date):
+                return CxoTime(date).secs
+        except ImportError:
+            return None
+
+    if dates is None:
+        dates = [str(numpy.datetime64('today'))]
+#
+#--- a missing leap second shifts all the times after it by one second
+#
+    check = [ent[0] for ent in leap_table if ent[0] > '1998'] + list(dates)
+    diff  = []
+    for date in check:
+        if abs(date_to_secs(date) - ref_secs(date)) > 1.0e-3:
+            diff.append(date)
+
+    return diff
+
+#----------------------------------------------------------------------------------
+#-- scalar_out: return a 0-d array as a python float                             --
+#----------------------------------------------------------------------------------
+
+def scalar_out(vals):
+    """
+    return a 0-d array as a python float
+    input:  vals    --- numpy array
+    output: float if vals is 0-d; otherwise vals
+    """
+    if numpy.ndim(vals) == 0:
+        return float(vals)
+
+    return vals
+
+#-----------------------------------------------------------------------------------------
+#-- TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST    ---
+#-----------------------------------------------------------------------------------------
+
+class TestFunctions(unittest.TestCase):
+
+    def test_known_values(self):
+
+        self.assertAlmostEqual(date_to_secs('1998:001:00:00:00'), 63.184, places=6)
+        self.assertAlmostEqual(date_to_secs('2000:001:00:00:00'), 63072064.184, places=6)
+        self.assertAlmostEqual(date_to_secs('2017:001:00:00:00'), 599616069.184, places=6)
+        self.assertAlmostEqual(date_to_secs('2017-01-01T00:00:00'), 599616069.184, places=6)
+        self.assertAlmostEqual(date_to_secs('2016:366:23:59:60'), 599616068.184, places=6)
+        self.assertEqual(secs_to_date(599616069.184), '2017:001:00:00:00.000')
+        self.assertAlmostEqual(dom_to_secs(0), date_to_secs('1999:202:00:00:00'), places=6)
+        self.assertAlmostEqual(secs_to_frac_year(date_to_secs('2020:001:00:00:00')), 2020.0)
+        self.assertEqual(ut_in_secs(2020, 1, 1, 0, 0, 0), 1577836800.0)
+
+#------------------------------------------------------------------------
+
+    def test_formats(self):
+
+        dates = ['2021:123', '2021:123:04', '2021:123:04:05', '2021:123:04:05:06',\
+                 '2021:123:04:05:06.5', ' 2021:123:04:05:06.250 ', '2021-05-03 04:05:06.25']
+        secs  = date_to_secs(dates)
+        base  = date_to_secs('2021:123:00:00:00')
+        comp  = [0, 14400, 14700, 14706, 14706.5, 14706.25, 14706.25]
+        for k in range(0, len(dates)):
+            self.assertAlmostEqual(secs[k] - base, comp[k], places=6)
+
+        self.assertRaises(ValueError, date_to_secs, 'not a date')
+        self.assertRaises(ValueError, date_to_secs, '2021:1x3:00:00:00')
+
+#------------------------------------------------------------------------
+
+    def test_round_trip(self):
+
+        secs = numpy.linspace(0, 1.0e9, 10001)
+        self.assertTrue(numpy.allclose(date_to_secs(secs_to_date(secs)), secs, rtol=0, atol=1e-3))
+        self.assertTrue(numpy.allclose(uts_to_secs(secs_to_uts(secs)), secs, rtol=0, atol=1e-6))
+        self.assertTrue(numpy.allclose(dom_to_secs(secs_to_dom(secs)), secs, rtol=0, atol=1e-5))
+        self.assertTrue(numpy.allclose(frac_year_to_secs(secs_to_frac_year(secs)), secs, rtol=0, atol=1e-5))
+
+#------------------------------------------------------------------------
+
+    def test_chandra_time(self):
+
+        try:
+            import Chandra.Time
+        except ImportError:
+            self.skipTest('Chandra.Time is not available')
+
+        secs  = numpy.linspace(0, 1.0e9, 2001) + 0.123
+        dates = [Chandra.Time.DateTime(x).date for x in secs]
+        self.assertEqual(secs_to_date(secs), dates)
+
+        comp  = numpy.array([Chandra.Time.DateTime(x).secs for x in dates])
+        self.assertTrue(numpy.allclose(date_to_secs(dates), comp, rtol=0, atol=1e-5))
+
+        for x in ['2005:365:23:59:59', '2006:001:00:00:00', '2012-06-30T23:59:59', '2012-07-01T00:00:00']:
+            self.assertAlmostEqual(date_to_secs(x), Chandra.Time.DateTime(x).secs, places=5)
+
+#------------------------------------------------------------------------
+
+    def test_leap_table(self):
+#
+#--- the table must be up to date with Chandra.Time or cxotime (today and a year later)
+#
+        later = str(numpy.datetime64('today') + numpy.timedelta64(365, 'D'))
+        diff  = check_leap_table([str(numpy.datetime64('today')), later])
+        if diff is None:
+            self.skipTest('neither Chandra.Time nor cxotime is available')
+
+        self.assertEqual(diff, [])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
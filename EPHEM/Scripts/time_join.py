@@ -0,0 +1,248 @@
+#!/proj/sot/ska3/flight/bin/python
+
+#############################################################################
+#                                                                           #
+#       time_join.py: match the entries of two time series on sorted        #
+#                     arrays with binary searches                           #
+#                                                                           #
+#               author: t. isobe (tisobe@cfa.harvard.edu)                   #
+#                                                                           #
+#                   last update: Oct 16, 2026                               #
+#                                                                           #
+#############################################################################
+#
+#--- the reference series (rtime, rvals) must be in time order; the query times can be
+#--- in any order. each query is found with one binary search, so that the cost is
+#--- (queries x log(references)) instead of (queries x references).
+#--- matching methods:
+#---    previous    --- the last reference at or before the query time (the value in effect)
+#---    next        --- the first reference at or after the query time
+#---    nearest     --- the closest reference; if the query is in the middle, the later one
+#---    interpolate --- linear interpolation between the two references around the query
+#--- a tolerance (seconds) rejects the matches whose references are too far from the query
+#--- (for interpolate: whose two references are too far from each other).
+#
+#--- run "time_join.py bench" to see the timing against the row by row scan.
+#
+import sys
+import time
+import unittest
+import numpy
+
+#----------------------------------------------------------------------------------
+#-- asof_index: find the reference positions matched to the query times          --
+#----------------------------------------------------------------------------------
+
+def asof_index(rtime, qtime, how='previous', tolerance=None):
+    """
+    find the reference positions matched to the query times
+    input:  rtime       --- reference times (in time order)
+            qtime       --- a query time or a list/numpy array of query times
+            how         --- 'previous', 'next', or 'nearest'; default: 'previous'
+            tolerance   --- the largest time difference of a match; default: None (no limit)
+    output: pos         --- numpy array of the reference positions; -1 if not matched
+    """
+    rtime = numpy.asarray(rtime, dtype=float)
+    qtime = numpy.atleast_1d(numpy.asarray(qtime, dtype=float))
+    nref  = len(rtime)
+    if nref == 0:
+        return numpy.full(len(qtime), -1, dtype=numpy.int64)
+
+    if how == 'previous':
+        pos = numpy.searchsorted(rtime, qtime, side='right') - 1
+
+    elif how == 'next':
+        pos = numpy.searchsorted(rtime, qtime, side='left')
+        pos[pos >= nref] = -1
+
+    elif how == 'nearest':
+        nxt = numpy.searchsorted(rtime, qtime, side='left')
+        prv = numpy.maximum(nxt - 1, 0)
+        nxt = numpy.minimum(nxt, nref - 1)
+        pos = numpy.where(qtime - rtime[prv] < rtime[nxt] - qtime, prv, nxt)
+
+    else:
+        raise ValueError('Unknown matching method: ' + str(how))
+
+    if tolerance is not None:
+        found = pos >= 0
+        far   = numpy.abs(rtime[pos[found]] - qtime[found]) > tolerance
+        pos[numpy.nonzero(found)[0][far]] = -1
+
+    return pos
+
+#----------------------------------------------------------------------------------
+#-- asof_join: find the reference values matched to the query times              --
+#----------------------------------------------------------------------------------
+
+def asof_join(rtime, rvals, qtime, how='previous', tolerance=None, fill=numpy.nan):
+    """
+    find the reference values matched to the query times
+    input:  rtime       --- reference times (in time order)
+            rvals       --- reference values
+            qtime       --- a list/numpy array of query times
+            how         --- 'previous', 'next', 'nearest', or 'interpolate'; default: 'previous'
+            tolerance   --- the largest time difference of a match; default: None (no limit)
+            fill        --- value given to the queries not matched; default: nan
+    output: numpy array of the matched values
+    """
+    if how == 'interpolate':
+        return interp_join(rtime, rvals, qtime, tolerance, fill)
+
+    rvals = numpy.asarray(rvals)
+    pos   = asof_index(rtime, qtime, how, tolerance)
+    if len(rvals) == 0:
+        return numpy.full(len(pos), fill)
+
+    return numpy.where(pos >= 0, rvals[numpy.maximum(pos, 0)], fill)
+
+#----------------------------------------------------------------------------------
+#-- interp_join: interpolate the reference values at the query times             --
+#----------------------------------------------------------------------------------
+
+def interp_join(rtime, rvals, qtime, tolerance=None, fill=numpy.nan):
+    """
+    interpolate the reference values at the query times (linear)
+    input:  rtime       --- reference times (in time order)
+            rvals       --- reference values
+            qtime       --- a list/numpy array of query times
+            tolerance   --- the largest time gap between the two references used;
+                            default: None (no limit)
+            fill        --- value given outside of the references or over a gap; default: nan
+    output: numpy array of the interpolated values
+    """
+    rtime = numpy.asarray(rtime, dtype=float)
+    rvals = numpy.asarray(rvals, dtype=float)
+    qtime = numpy.atleast_1d(numpy.asarray(qtime, dtype=float))
+    nref  = len(rtime)
+    if nref < 2:
+        out = numpy.full(len(qtime), fill, dtype=float)
+        if nref == 1:
+            out[qtime == rtime[0]] = rvals[0]
+        return out
+
+    pos   = numpy.clip(numpy.searchsorted(rtime, qtime, side='right') - 1, 0, nref - 2)
+    span  = rtime[pos + 1] - rtime[pos]
+    wgt   = (qtime - rtime[pos]) / span
+    out   = rvals[pos] + wgt * (rvals[pos + 1] - rvals[pos])
+
+    bad   = (qtime < rtime[0]) | (qtime > rtime[-1])
+    if tolerance is not None:
+        bad |= span > tolerance
+
+    out[bad] = fill
+
+    return out
+
+#----------------------------------------------------------------------------------
+#-- run_benchmark: compare the timing against the row by row scan                --
+#----------------------------------------------------------------------------------
+
+def run_benchmark():
+    """
+    compare the timing of asof_index against the row by row scan used before
+    (a region entry every 5 min and a query every 1 min)
+    input:  none
+    output: printed table of the timing
+    """
+    print('%-8s %10s %10s %12s %12s' % ('span', 'refs', 'queries', 'scan (s)', 'join (s)'))
+
+    for [name, days] in [['1 day', 1], ['1 week', 7], ['1 month', 30], ['1 year', 365]]:
+        rtime = numpy.arange(0, days * 86400.0, 300.0)
+        qtime = numpy.arange(0, days * 86400.0, 60.0) + 7.0
+#
+#--- the scan is timed on up to 1 month of queries and scaled to the full length
+#
+        nscan = min(len(qtime), 30 * 1440)
+        rlist = rtime.tolist()
+        stime = time.time()
+        scan_previous(rlist, qtime[:nscan].tolist())
+        tscan = (time.time() - stime) * len(qtime) / nscan
+
+        stime = time.time()
+        asof_index(rtime, qtime)
+        tjoin = time.time() - stime
+
+        line  = '%-8s %10d %10d %12.4f %12.4f' % (name, len(rtime), len(qtime), tscan, tjoin)
+        if nscan < len(qtime):
+            line = line + '  (scan: scaled)'
+        print(line)
+
+#----------------------------------------------------------------------------------
+#-- scan_previous: match the query times with the row by row scan                --
+#----------------------------------------------------------------------------------
+
+def scan_previous(rtime, qtime):
+    """
+    the row by row scan (the way the times were matched before)
+    input:  rtime   --- a list of reference times
+            qtime   --- a list of query times
+    output: pos     --- a list of the reference positions
+    """
+    pos   = []
+    start = 0
+    for qt in qtime:
+        for m in range(start, len(rtime) - 1):
+            if qt >= rtime[m] and qt < rtime[m+1]:
+                pos.append(m)
+                start = max(m - 5, 0)
+                break
+
+    return pos
+
+#-----------------------------------------------------------------------------------------
+#-- TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST TEST    ---
+#-----------------------------------------------------------------------------------------
+
+class TestFunctions(unittest.TestCase):
+
+    def test_asof_index(self):
+
+        rtime = [10.0, 20.0, 30.0]
+        qtime = [5.0, 10.0, 15.0, 25.0, 30.0, 35.0]
+
+        self.assertEqual(asof_index(rtime, qtime).tolist(),            [-1, 0, 0, 1, 2, 2])
+        self.assertEqual(asof_index(rtime, qtime, 'next').tolist(),    [0, 0, 1, 2, 2, -1])
+        self.assertEqual(asof_index(rtime, qtime, 'nearest').tolist(), [0, 0, 1, 2, 2, 2])
+        self.assertEqual(asof_index(rtime, qtime, 'nearest', 4).tolist(), [-1, 0, -1, -1, 2, -1])
+        self.assertEqual(asof_index(rtime, qtime, 'previous', 4).tolist(), [-1, 0, -1, -1, 2, -1])
+        self.assertEqual(asof_index([], qtime).tolist(), [-1] * 6)
+
+        self.assertRaises(ValueError, asof_index, rtime, qtime, 'closest')
+
+#------------------------------------------------------------------------
+
+    def test_asof_join(self):
+
+        rtime = [10.0, 20.0, 30.0]
+        rvals = ['a', 'b', 'c']
+        out   = asof_join(rtime, rvals, [5, 12, 31], fill='')
+
+        self.assertEqual(out.tolist(), ['', 'a', 'c'])
+
+        out   = asof_join(rtime, [1.0, 2.0, 4.0], [15, 25, 40], how='interpolate')
+        self.assertEqual(out[:2].tolist(), [1.5, 3.0])
+        self.assertTrue(numpy.isnan(out[2]))
+
+        out   = interp_join([0, 10, 100], [0, 1, 10], [5, 50], tolerance=20)
+        self.assertEqual(out[0], 0.5)
+        self.assertTrue(numpy.isnan(out[1]))
+
+#------------------------------------------------------------------------
+
+    def test_compare_scan(self):
+
+        rtime = numpy.cumsum(numpy.random.default_rng(3).uniform(1, 100, 2000))
+        qtime = numpy.sort(numpy.random.default_rng(4).uniform(rtime[0], rtime[-1] - 1, 5000))
+
+        comp  = scan_previous(rtime.tolist(), qtime.tolist())
+        self.assertEqual(asof_index(rtime, qtime).tolist(), comp)
+
+#-------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        run_benchmark()
+    else:
+        unittest.main()
@@ -3,16 +3,18 @@
 **collect_goes_long.py**: Collect GOES data for the long term use
 
 :Author: t. isobe (tisobe@cfa.harvard.edu)
-:Last Updated: Feb 18, 2025
+:Last Updated: Oct 16, 2026
 
 """
 import os
 import sys
-import time
+import numpy as np
 from cxotime import CxoTime
-import urllib.request
-import json
 import argparse
+import goes_store
+import goes_analytics as gan
+sys.path.append("/data/mta4/Space_Weather/EPHEM/Scripts")
+import text_archive as tarc  #: append-only text archive
 
 #
 # --- Define directory pathing
@@ -20,7 +22,7 @@ import argparse
 GOES_DATA_DIR = "/data/mta4/Space_Weather/GOES/Data"
 OUT_DATA_DIR = "/data/mta4/Space_Weather/GOES/Data"
 
-PLINK = "https://services.swpc.noaa.gov/json/goes/primary/differential-protons-7-day.json"  #: json data locations proton and electron
+PFEED = "differential-protons"  #: GOES primary feed kept in the store (see goes_store.py)
 PROTON_LIST = [
     "1020-1860 keV",
     "1900-2300 keV",
@@ -41,7 +43,7 @@ PROTON_LIST = [
 def collect_goes_long():
     """Collect GOES data for the long term use
 
-    :Web Link: https://services.swpc.noaa.gov/json/goes/primary/differential-protons-7-day.json
+    :Data In: <data_dir>/Store/differential-protons (goes_store.py)
     :File Out: <data_dir>/goes_data_r.txt
                 Time P1  P2A P2B P3  P4  P5  P6  P7  P8A P8B P8C P9  P10 HRC Proxy
     """
@@ -49,170 +51,78 @@ def collect_goes_long():
     # --- find the last entry time
     #
     outfile = f"{GOES_DATA_DIR}/goes_data_r.txt"
-    with open(outfile, "r") as f:
-        data = [line.strip() for line in f.readlines()]
-        data = [line for line in data if line != ""]
-    cut = 0
-    while cut == 0:
-        atemp = data[-1].split()
-        try:
-            cut = CxoTime(atemp[0]).secs
-            break
-        except:  # noqa: E722
-            data.pop(-1)
+    data = tarc.read_last(outfile, valid=is_data_line)
+    cut = CxoTime(data[-1].split()[0]).secs
     #
-    # --- extract proton data
+    # --- extract proton data after the last entry
     #
-    p_data = extract_goes_data(PLINK, PROTON_LIST)
+    p_data = extract_goes_data(PFEED, PROTON_LIST, CxoTime(cut).isot[:19])
     #
     # --- time list
     #
-    t_list = p_data[0][0]
+    t_list = p_data.time_strings("%Y:%j:%H:%M:%S")
     d_len = len(t_list)
     #
-    # --- compute hrc proxy
+    # --- compute hrc proxy (-1e5 where a channel is missing)
     #
-    hrc_val = compute_hrc(p_data)
+    hrc_val = gan.compute_proxy(p_data, "hrc_proxy")
+    #
+    # ---If the time is less or equal to this cutoff point, then it's not new data.
+    #
+    if d_len > 0:
+        s_list = CxoTime(t_list).secs
     #
     # --- aline will save the text output of the table which is used by CRM
     #
     line = ""
 
     for k in range(0, d_len):
-        stime = CxoTime(t_list[k]).secs
-        if stime <= cut:
-            #
-            # ---If the time is less or equal to this cutoff point, then it's not new data.
-            #
+        if s_list[k] <= cut:
             continue
         line += f"{t_list[k]}\t\t"
 
         for m in range(0, 13):
-            try:
-                line += f"{p_data[m][1][k]:1.3e}\t"
-            except:  # noqa: E722
-                line += "0.0\t"
+            line += f"{p_data.flux[k, m]:1.3e}\t"
 
         line += f"{hrc_val[k]:5.0f}\t\n"
     #
     # ---  print out data file for ACIS Rad use
     #
     appendout = f"{OUT_DATA_DIR}/{os.path.basename(outfile)}"
-    with open(appendout, "a") as fo:
-        fo.write(line)
+    tarc.append_text(appendout, line)
 
 
-def extract_goes_data(dlink, energy_list):
-    """Extract GOES satellite flux data
+def is_data_line(line):
+    """Check whether a line of goes_data_r.txt starts with a readable time
 
-    :param dlink: JSON web address
-    :type dlink: str
-    :param energy_list: A list of energy designation
-    :type energy_list: list
-    :return: _description_
-    :rtype: _type_
-    """
-    """
-    
-    input: dlink        --- json web address
-            energy_list --- a list of energy designation
-    output: <data_dir>/<out file>
+    :param line: data line
+    :type line: str
+    :return: True if the time of the line can be read
+    :rtype: bool
     """
     try:
-        with urllib.request.urlopen(dlink) as url:
-            data = json.loads(url.read().decode())  #: Read json file from the web
-    except:
-        data = []
-    #
-    # --- go through all energy ranges
-    #
-    elen = len(energy_list)
-    d_save = []
-    for k in range(0, elen):
-        t_list = []
-        f_list = []
-        energy = energy_list[k]
-        last_time = time.strptime(data[0]["time_tag"], "%Y-%m-%dT%H:%M:%SZ")
-        for ent in data:
-            #
-            # --- read time and flux of the given energy range
-            #
-            if ent["energy"] == energy:
-                flux = float(ent["flux"]) * 1e3  # --- keV to MeV
-                #
-                # --- convert time into seconds from 1998.1.1
-                #
-                otime = ent["time_tag"]
-                otime = time.strptime(otime, "%Y-%m-%dT%H:%M:%SZ")
-
-                #
-                # ---If the otime is more than five minutes after the last_time,
-                # ---then that means the data set is missing an entry for this energy band and zero values should be append.
-                #
-                diff = time.mktime(otime) - time.mktime(last_time)
-                if diff > 300:
-                    for i in range(
-                        300, int(diff), 300
-                    ):  #: All times should be in divisions of 5 minutes/300 seconds.
-                        missing_time = time.localtime(time.mktime(last_time) + i)
-                        t_list.append(time.strftime("%Y:%j:%H:%M:%S", missing_time))
-                        f_list.append(
-                            -1e5
-                        )  #: Mark missing data with the invalid data marker (-1e5)
+        CxoTime(line.split()[0]).secs
+    except:  # noqa: E722
+        return False
+    return True
 
-                t_list.append(
-                    time.strftime("%Y:%j:%H:%M:%S", otime)
-                )  #: record time as string
-                f_list.append(flux)
-                last_time = otime
 
-        d_save.append([t_list, f_list])
-
-    return d_save
-
-
-def compute_hrc(data):
-    """Compute hrc proxy value.
-    HRC_PROXY = 6000 x P4 + 270000 x P5 + 100000 x P6
-        P4 ~ 11640-23270 keV + 25900-38100 keV
-        P5 ~ 40300-73400 keV,
-        P6 ~ 83700-98500 keV + 99900-118000 keV + 115000-143000 keV + 160000-242000 keV.
-        and:
-        c0: '1020-1860 keV',
-        c1: '1900-2300 keV',
-        c2: '2310-3340 keV',
-        c3: '3400-6480 keV',
-        c4: '5840-11000 keV',
-        c5: '11640-23270 keV',
-        c6: '25900-38100 keV',
-        c7: '40300-73400 keV',
-        c8: '83700-98500 keV',
-        c9: '99900-118000 keV',
-        c10: '115000-143000 keV',
-        c11: '160000-242000 keV',
-        c12: '276000-404000 keV'
+def extract_goes_data(feed, energy_list, start):
+    """Extract GOES satellite flux data
 
-    :param data: a list of lists of data: [[<time>, <data1>], [<time>, <data2>],...]
-    :type data: list
-    :return: hrc proxy list
-    :rtype: list
+    :param feed: feed name in the GOES store
+    :type feed: str
+    :param energy_list: A list of energy designation
+    :type energy_list: list
+    :param start: extract the data after this time (ISO format)
+    :type start: str
+    :return: (time x energy) flux matrix in /MeV on the 5 minute grid. Missing entries
+        are marked with the invalid data marker (-1e5)
+    :rtype: goes_ingest.GoesData
     """
-    c5 = data[5][1]
-    c6 = data[6][1]
-    c7 = data[7][1]
-
-    hrc = []
-    for k in range(0, len(c5)):
-        try:
-            val = (
-                143.0 * c5[k] + 64738.0 * c6[k] + 162505.0 * c7[k] + 4127
-            )  #: New proxy as of 2021:125:06:05:00
-        except:  # noqa: E722
-            val = 0.0
-
-        hrc.append(val)
-
-    return hrc
+    return goes_store.get_window(
+        feed, start=np.datetime64(start, "s"), channels=energy_list, scale=1e3
+    )  # --- keV to MeV
 
 
 if __name__ == "__main__":
@@ -237,6 +147,7 @@ if __name__ == "__main__":
         os.makedirs(OUT_DATA_DIR, exist_ok=True)
         if os.path.isfile(f"{OUT_DATA_DIR}/goes_data_r.txt"):
             GOES_DATA_DIR = OUT_DATA_DIR
+        goes_store.STORE_DIR = f"{OUT_DATA_DIR}/Store"
         collect_goes_long()
     else:
         #
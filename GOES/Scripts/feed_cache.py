@@ -0,0 +1,368 @@
+#!/proj/sot/ska3/flight/bin/python
+"""
+**feed_cache.py**: Shared fetch layer with an on-disk cache for the SWPC and CelesTrak feeds
+
+:Author: W. Aaron (william.aaron@cfa.harvard.edu)
+:Last Updated: Oct 16, 2026
+
+:INFO:
+    - Each URL is kept in the cache directory as <sha1 of url> (content) and
+      <sha1 of url>.json (url, ETag, Last-Modified, time of the last check).
+    - A cached copy younger than the TTL is used without a network access. An older copy
+      is revalidated with a conditional GET (If-None-Match/If-Modified-Since); an unchanged
+      feed costs a 304 response only.
+    - If the feed cannot be reached, a cached copy younger than max_stale is used instead.
+    - Connections are kept open and reused for the requests to the same host.
+    - serve_directory() starts a local file server which stands in for the feed sites in tests.
+    - Run the unit tests with: feed_cache.py -t
+
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import unittest
+import argparse
+import threading
+import http.client
+import http.server
+import functools
+import urllib.error
+from urllib.parse import urlsplit, urljoin
+
+sys.path.append("/data/mta4/Space_Weather/EPHEM/Scripts")
+import atomic_file as afile  #: write through a temporary file and a rename
+
+CACHE_DIR = "/data/mta4/Space_Weather/GOES/Data/Feed_cache/"  #: Cache directory shared by all jobs
+if os.getenv("TEST") == "TEST":
+    CACHE_DIR = os.getcwd() + "/TestOut/Feed_cache/"
+
+TTL = 60  #: Seconds in which a cached copy is used without checking the source
+MAX_STALE = 3600  #: Seconds in which a cached copy is used when the source cannot be reached
+TIMEOUT = 60  #: Connection timeout in seconds
+MAX_REDIRECT = 5  #: Maximum number of redirects followed
+
+_CONNECTIONS = {}  #: Open connections keyed by (scheme, host)
+
+
+def fetch(url, ttl=TTL, max_stale=MAX_STALE, timeout=TIMEOUT, cache_dir=None):
+    """Read the content of a URL through the on-disk cache
+
+    :param url: URL of the feed. A local file path is read directly.
+    :type url: str
+    :param ttl: seconds in which a cached copy is used without checking the source, defaults to TTL
+    :type ttl: int, optional
+    :param max_stale: seconds in which a cached copy is used when the source cannot be reached, defaults to MAX_STALE
+    :type max_stale: int, optional
+    :param timeout: connection timeout in seconds, defaults to TIMEOUT
+    :type timeout: int, optional
+    :param cache_dir: cache directory, defaults to CACHE_DIR
+    :type cache_dir: str, optional
+    :raises urllib.error.URLError: the source cannot be reached and there is no usable cached copy
+    :return: content of the feed
+    :rtype: bytes
+    """
+    if os.path.isfile(url):
+        with open(url, "rb") as f:
+            return f.read()
+
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+    body_file = os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest())
+    meta = _read_meta(body_file)
+    age = time.time() - meta["checked"] if meta else None
+
+    if meta and age < ttl:
+        return _read_body(body_file)
+    #
+    # --- revalidate the cached copy or download the feed
+    #
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        status, resp_headers, body = _request(url, headers, timeout)
+    except (OSError, http.client.HTTPException) as err:
+        if meta and age < max_stale:
+            return _read_body(body_file)
+        if isinstance(err, urllib.error.URLError):
+            raise
+        raise urllib.error.URLError(err)
+
+    if status == 304 and meta:
+        meta["checked"] = time.time()
+        _write_file(body_file + ".json", json.dumps(meta).encode())
+        return _read_body(body_file)
+
+    meta = {
+        "url": url,
+        "etag": resp_headers.get("ETag"),
+        "last_modified": resp_headers.get("Last-Modified"),
+        "checked": time.time(),
+    }
+    #
+    # --- the content is written before the meta data so that the meta data never
+    # --- points to an older content
+    #
+    _write_file(body_file, body)
+    _write_file(body_file + ".json", json.dumps(meta).encode())
+    return body
+
+
+def fetch_text(url, **kwargs):
+    """Read the content of a URL through the cache as text
+
+    :param url: URL of the feed
+    :type url: str
+    :return: decoded content
+    :rtype: str
+    """
+    return fetch(url, **kwargs).decode()
+
+
+def fetch_json(url, **kwargs):
+    """Read a json feed through the cache
+
+    :param url: URL of the feed
+    :type url: str
+    :return: decoded json data
+    :rtype: list or dict
+    """
+    return json.loads(fetch(url, **kwargs).decode())
+
+
+def _request(url, headers, timeout):
+    """GET a URL on a reused connection, following redirects
+
+    :param url: URL
+    :type url: str
+    :param headers: request headers
+    :type headers: dict
+    :param timeout: connection timeout in seconds
+    :type timeout: int
+    :raises urllib.error.HTTPError: the response status is an error
+    :return: status, response headers, and content
+    :rtype: tuple(int, http.client.HTTPMessage, bytes)
+    """
+    for _ in range(MAX_REDIRECT + 1):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = path + "?" + parts.query
+        resp, body = _send(parts.scheme, parts.netloc, path, headers, timeout)
+
+        if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+            url = urljoin(url, resp.getheader("Location"))
+            continue
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        return resp.status, resp.headers, body
+
+    raise urllib.error.URLError("too many redirects: " + url)
+
+
+def _send(scheme, host, path, headers, timeout):
+    """Send a GET request on the open connection of the host (opened if needed)
+
+    :return: response and its content
+    :rtype: tuple(http.client.HTTPResponse, bytes)
+    """
+    key = (scheme, host)
+    for attempt in range(2):
+        conn = _CONNECTIONS.get(key)
+        if conn is None:
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(host, timeout=timeout)
+            else:
+                conn = http.client.HTTPConnection(host, timeout=timeout)
+            _CONNECTIONS[key] = conn
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (OSError, http.client.HTTPException):
+            #
+            # --- the server may have closed the kept connection; retry once on a new one
+            #
+            conn.close()
+            del _CONNECTIONS[key]
+            if attempt > 0:
+                raise
+            continue
+        if resp.will_close:
+            conn.close()
+            del _CONNECTIONS[key]
+        return resp, body
+
+
+def _read_meta(body_file):
+    """Read the meta data of a cached copy
+
+    :return: meta data, or None if there is no usable cached copy
+    :rtype: dict or None
+    """
+    try:
+        with open(body_file + ".json") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.isfile(body_file):
+        return None
+    return meta
+
+
+def _read_body(body_file):
+    with open(body_file, "rb") as f:
+        return f.read()
+
+
+def _write_file(ofile, content):
+    """Write a file through a temporary file so that readers never see a partial file"""
+    os.makedirs(os.path.dirname(ofile), exist_ok=True)
+    afile.write_bytes(ofile, content)
+
+
+def serve_directory(directory, port=0):
+    """Start a local file server in a background thread (a stand-in of the feed sites for tests).
+    The server answers If-Modified-Since requests with 304.
+
+    :param directory: directory to serve
+    :type directory: str
+    :param port: port number, defaults to 0 (any free port)
+    :type port: int, optional
+    :return: the server (stop with shutdown()) and its base URL
+    :rtype: tuple(http.server.ThreadingHTTPServer, str)
+    """
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, "http://127.0.0.1:%d/" % server.server_address[1]
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  #: Keep the connections open as the feed sites do
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestFunctions(unittest.TestCase):
+    """Tests of the cache paths against a local file server"""
+
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.serve_dir = os.path.join(self.tdir, "serve")
+        self.cache_dir = os.path.join(self.tdir, "cache")
+        os.makedirs(self.serve_dir)
+        os.makedirs(self.cache_dir)
+        self._write_feed("first")
+        self.server, base = serve_directory(self.serve_dir)
+        self.url = base + "feed.json"
+        self.body_file = os.path.join(self.cache_dir, hashlib.sha1(self.url.encode()).hexdigest())
+
+    def tearDown(self):
+        self._stop_server()
+        shutil.rmtree(self.tdir)
+
+    def _write_feed(self, content, mtime=None):
+        ffile = os.path.join(self.serve_dir, "feed.json")
+        with open(ffile, "w") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(ffile, (mtime, mtime))
+
+    def _stop_server(self):
+        #
+        # --- the kept connections are closed first; otherwise their handler threads
+        # --- keep answering after the server is shut down
+        #
+        for conn in _CONNECTIONS.values():
+            conn.close()
+        _CONNECTIONS.clear()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _age_meta(self, seconds):
+        meta = _read_meta(self.body_file)
+        meta["checked"] -= seconds
+        _write_file(self.body_file + ".json", json.dumps(meta).encode())
+        return meta["checked"]
+
+    def test_ttl(self):
+        self.assertEqual(fetch(self.url, cache_dir=self.cache_dir), b"first")
+        #
+        # --- a copy younger than the TTL is used even though the source changed
+        #
+        self._write_feed("second", mtime=time.time() + 10)
+        self.assertEqual(fetch(self.url, ttl=60, cache_dir=self.cache_dir), b"first")
+
+        self.assertEqual(fetch(self.url, ttl=0, cache_dir=self.cache_dir), b"second")
+
+    def test_revalidate(self):
+        fetch(self.url, cache_dir=self.cache_dir)
+        checked = self._age_meta(100)
+        #
+        # --- an unchanged source answers 304; the cached copy is used and rechecked
+        #
+        self.assertEqual(fetch(self.url, ttl=0, cache_dir=self.cache_dir), b"first")
+        self.assertGreater(_read_meta(self.body_file)["checked"], checked + 50)
+
+    def test_stale(self):
+        fetch(self.url, cache_dir=self.cache_dir)
+        self._age_meta(100)
+        #
+        # --- an HTTP error: the stale copy is used within max_stale
+        #
+        os.remove(os.path.join(self.serve_dir, "feed.json"))
+        self.assertEqual(fetch(self.url, ttl=0, cache_dir=self.cache_dir), b"first")
+        with self.assertRaises(urllib.error.HTTPError):
+            fetch(self.url, ttl=0, max_stale=50, cache_dir=self.cache_dir)
+        #
+        # --- a connection error: the stale copy is used within max_stale
+        #
+        self._stop_server()
+        self.assertEqual(fetch(self.url, ttl=0, cache_dir=self.cache_dir), b"first")
+        with self.assertRaises(urllib.error.URLError):
+            fetch(self.url, ttl=0, max_stale=50, cache_dir=self.cache_dir)
+
+    def test_no_cache(self):
+        url = self.url.replace("feed.json", "none.json")
+        with self.assertRaises(urllib.error.HTTPError):
+            fetch(url, cache_dir=self.cache_dir)
+
+        self._stop_server()
+        with self.assertRaises(urllib.error.URLError):
+            fetch(self.url, cache_dir=self.cache_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url", nargs="?", help="Fetch the URL through the cache and print it.")
+    parser.add_argument("-s", "--serve", help="Serve the directory with a local file server.")
+    parser.add_argument("-p", "--port", type=int, default=8000, help="Port of the local file server.")
+    parser.add_argument("-t", "--test", action="store_true", help="Run the unit tests.")
+    args = parser.parse_args()
+
+    if args.test:
+        unittest.main(argv=[sys.argv[0]])
+    elif args.serve:
+        server, base = serve_directory(args.serve, args.port)
+        print("Serving " + args.serve + " at " + base)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.url:
+        sys.stdout.write(fetch_text(args.url))
+    else:
+        parser.print_help()
@@ -0,0 +1,125 @@
+#!/proj/sot/ska3/flight/bin/python
+"""
+**goes_analytics.py**: HRC proxies and channel statistics of the GOES proton flux on masked arrays
+
+:Author: W. Aaron (william.aaron@cfa.harvard.edu)
+:Last Updated: Oct 16, 2026
+
+:INFO:
+    - Negative (missing) flux entries are masked; a proxy is masked at the times where any
+      of its channels is masked, and is written back with the invalid data marker (-1e5).
+    - Proxies are linear combinations of the channels defined in PROXIES. A new proxy is
+      added with a new PROXIES entry; a new combined channel with a new COMBINED_RATES entry.
+
+"""
+import numpy as np
+from goes_ingest import MISSING
+from goes_store import CHANNEL_ENERGY
+
+#: GOES-16+ Energy bands (keV) [upper, lower, delta_e] of the goes_store.CHANNEL_ENERGY designations
+DE = {}
+for key, energy in CHANNEL_ENERGY.items():
+    lower, upper = [float(x) for x in energy.split()[0].split("-")]
+    DE[key] = [upper, lower, upper - lower]
+
+COMBINED_RATES = {
+    "P5P6": ("P5", "P6"),
+    "P8ABC": ("P8A", "P8B", "P8C"),
+    "P8ABCP9": ("P8A", "P8B", "P8C", "P9"),
+}  #: Combined channels: the energy weighted rate of the channels over the combined band
+
+PROXIES = {
+    "hrc_proxy": {
+        "terms": [(143.0, "P5"), (64738.0, "P6"), (162505.0, "P7")],
+        "offset": 4127,
+    },  #: After 2021:125:06:05:00
+    "hrc_proxy_legacy": {
+        "terms": [(6000, "P5P6"), (270000, "P7"), (100000, "P8ABC")],
+        "offset": 0,
+    },  #: Before 2020
+}  #: Proxies: sum of coefficient x channel rate + offset
+
+
+def masked(values):
+    """Mask the missing (negative or non-finite) entries
+
+    :param values: flux values
+    :type values: numpy.ndarray
+    :return: masked flux
+    :rtype: numpy.ma.MaskedArray
+    """
+    values = np.asarray(values, dtype=float)
+    return np.ma.masked_array(values, mask=~np.isfinite(values) | (values < 0))
+
+
+def channel_rate(data, name):
+    """Rate of a channel or a combined channel
+
+    :param data: (time x energy) flux matrix of the differential protons
+    :type data: goes_ingest.GoesData
+    :param name: channel name (e.g. 'P5') or combined channel name (e.g. 'P5P6')
+    :type name: str
+    :return: masked rate
+    :rtype: numpy.ma.MaskedArray
+    """
+    if name in COMBINED_RATES:
+        return combine_rates([channel_rate(data, x) for x in COMBINED_RATES[name]], COMBINED_RATES[name])
+    return masked(data.column(CHANNEL_ENERGY[name]))
+
+
+def combine_rates(rates, channel_names):
+    """Combine the rates of adjacent channels into the rate over the whole band
+
+    :param rates: masked rates of the channels
+    :type rates: list(numpy.ma.MaskedArray)
+    :param channel_names: channel names of the rates (lowest energy first)
+    :type channel_names: tuple(str)
+    :return: masked combined rate
+    :rtype: numpy.ma.MaskedArray
+    """
+    combined = np.zeros(len(rates[0]))
+    for rate, name in zip(rates, channel_names):
+        combined = combined + rate * DE[name][2]
+    delta_e = DE[channel_names[-1]][0] - DE[channel_names[0]][1]
+    return combined / delta_e
+
+
+def compute_proxy(data, name):
+    """Compute a proxy defined in PROXIES
+
+    :param data: (time x energy) flux matrix of the differential protons
+    :type data: goes_ingest.GoesData
+    :param name: proxy name
+    :type name: str
+    :return: proxy values; MISSING where any of the channels is missing
+    :rtype: numpy.ndarray
+    """
+    formula = PROXIES[name]
+    proxy = None
+    for coef, channel in formula["terms"]:
+        term = coef * channel_rate(data, channel)
+        proxy = term if proxy is None else proxy + term
+    if formula["offset"]:
+        proxy = proxy + formula["offset"]
+
+    return np.ma.masked_array(proxy).filled(MISSING)
+
+
+def channel_stats(flux):
+    """Mean and sum of each column over the valid (non-negative) entries
+
+    :param flux: (time x channel) flux matrix or a 1D array
+    :type flux: numpy.ndarray
+    :return: means and sums of the columns (nan/0 if a column has no valid entry)
+    :rtype: tuple(list(float), list(float))
+    """
+    flux = masked(flux)
+    if flux.ndim == 1:
+        flux = flux[:, np.newaxis]
+    means = []
+    sums = []
+    for m in range(flux.shape[1]):
+        valid = flux[:, m].compressed()
+        means.append(np.mean(valid))
+        sums.append(np.sum(valid))
+    return means, sums
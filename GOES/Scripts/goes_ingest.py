@@ -0,0 +1,251 @@
+#!/proj/sot/ska3/flight/bin/python
+"""
+**goes_ingest.py**: Parse the SWPC GOES json feeds into a (time x channel) flux matrix
+
+:Author: W. Aaron (william.aaron@cfa.harvard.edu)
+:Last Updated: Oct 16, 2026
+
+"""
+from datetime import datetime
+import unittest
+import numpy as np
+import feed_cache
+
+MISSING = -1e5  #: Invalid data marker used for the missing entries
+STEP = 300  #: GOES data cadence in seconds (5 minutes)
+
+
+class GoesData:
+    """Flux data of GOES energy channels on a common time grid
+
+    :param times: time grid of the data
+    :type times: numpy.ndarray of datetime64[s]
+    :param flux: flux matrix of (time x channel). Missing entries are MISSING.
+    :type flux: numpy.ndarray
+    :param channels: channel (energy) designation of each column
+    :type channels: list(str)
+    """
+
+    def __init__(self, times, flux, channels):
+        self.times = times
+        self.flux = flux
+        self.channels = list(channels)
+        self._index = {name: i for i, name in enumerate(self.channels)}
+
+    def __len__(self):
+        return len(self.times)
+
+    def column(self, channel, missing=None):
+        """Flux of a channel
+
+        :param channel: channel designation (e.g. '1020-1860 keV' or 'P1') or the column index
+        :type channel: str or int
+        :param missing: if given, the value which replaces MISSING entries
+        :type missing: float, optional
+        :return: flux of the channel (a contiguous copy)
+        :rtype: numpy.ndarray
+        """
+        if isinstance(channel, str):
+            channel = self._index[channel]
+        out = np.ascontiguousarray(self.flux[:, channel])
+        if missing is not None:
+            out = np.where(out == MISSING, missing, out)
+        return out
+
+    def time_strings(self, fmt="%Y:%j:%H:%M"):
+        """Times in the given format
+
+        :param fmt: strftime format, defaults to "%Y:%j:%H:%M"
+        :type fmt: str, optional
+        :return: time strings
+        :rtype: list(str)
+        """
+        return [x.strftime(fmt) for x in self.datetimes()]
+
+    def datetimes(self):
+        """Times as python datetime objects
+
+        :return: times
+        :rtype: list(datetime)
+        """
+        return self.times.astype(datetime).tolist()
+
+    def window(self, start=None, stop=None):
+        """Select the data in start < time <= stop
+
+        :param start: start time, defaults to the beginning of the data
+        :type start: numpy.datetime64, optional
+        :param stop: stop time, defaults to the end of the data
+        :type stop: numpy.datetime64, optional
+        :return: selected data
+        :rtype: GoesData
+        """
+        i0 = 0 if start is None else np.searchsorted(self.times, start, side="right")
+        i1 = len(self.times) if stop is None else np.searchsorted(self.times, stop, side="right")
+        return GoesData(self.times[i0:i1], self.flux[i0:i1], self.channels)
+
+    def align(self, times):
+        """Put the data on another time grid; times not in this data are MISSING
+
+        :param times: time grid
+        :type times: numpy.ndarray of datetime64[s]
+        :return: aligned data
+        :rtype: GoesData
+        """
+        flux = np.full((len(times), len(self.channels)), MISSING)
+        if len(self.times) > 0:
+            pos = np.searchsorted(self.times, times).clip(0, len(self.times) - 1)
+            found = self.times[pos] == times
+            flux[found] = self.flux[pos[found]]
+        return GoesData(times, flux, self.channels)
+
+    def merge(self, other):
+        """Add the channels of other data on the time grid of this data
+
+        :param other: data to add
+        :type other: GoesData
+        :return: merged data
+        :rtype: GoesData
+        """
+        other = other.align(self.times)
+        return GoesData(
+            self.times,
+            np.hstack([self.flux, other.flux]),
+            self.channels + other.channels,
+        )
+
+
+def read_goes_json(link):
+    """Read a GOES json feed (URLs are read through the shared feed cache)
+
+    :param link: URL or file path
+    :type link: str
+    :return: list of records
+    :rtype: list(dict)
+    """
+    return feed_cache.fetch_json(link)
+
+
+def parse_time_tags(tags):
+    """Convert ISO time tags (e.g. '2025-02-18T12:05:00Z') into datetime64[s]
+
+    :param tags: time tags
+    :type tags: list(str)
+    :return: times
+    :rtype: numpy.ndarray of datetime64[s]
+    """
+    tags = np.asarray(tags, dtype="U32").astype("U19")  #: Drop the trailing 'Z'
+    return tags.astype("datetime64[s]")
+
+
+def fill_time_gaps(times, step=STEP):
+    """Fill the gaps longer than the step in a sorted unique time array
+
+    :param times: sorted unique times
+    :type times: numpy.ndarray of datetime64[s]
+    :param step: data cadence in seconds, defaults to STEP
+    :type step: int, optional
+    :return: times with the gaps filled in the step from the time before the gap
+    :rtype: numpy.ndarray of datetime64[s]
+    """
+    if len(times) < 2:
+        return times
+    diff = np.diff(times).astype(np.int64)
+    nfill = np.where(diff > step, -(-diff // step) - 1, 0)
+    if nfill.sum() == 0:
+        return times
+    base = np.repeat(times[:-1], nfill)
+    offset = np.arange(nfill.sum()) - np.repeat(np.cumsum(nfill) - nfill, nfill) + 1
+    filled = base + (offset * step).astype("timedelta64[s]")
+    return np.union1d(times, filled)
+
+
+def ingest_goes_data(data, channel_list, key="energy", scale=1.0, hours=None):
+    """Parse GOES json records into a (time x channel) flux matrix in one pass
+
+    :param data: GOES json records
+    :type data: list(dict)
+    :param channel_list: channel designations to extract (the values of the key)
+    :type channel_list: list(str)
+    :param key: record key of the channel designation, defaults to "energy"
+    :type key: str, optional
+    :param scale: factor multiplied to the flux (e.g. 1e3 for keV to MeV), defaults to 1.0
+    :type scale: float, optional
+    :param hours: if given, keep only the data within the hours before the last record
+    :type hours: float, optional
+    :return: flux data on the 5 minute time grid; missing entries are MISSING
+    :rtype: GoesData
+    """
+    if len(data) == 0:
+        return GoesData(
+            np.array([], dtype="datetime64[s]"),
+            np.zeros((0, len(channel_list))),
+            channel_list,
+        )
+
+    times = parse_time_tags([ent["time_tag"] for ent in data])
+    names = np.array([ent[key] for ent in data])
+    flux = np.array([ent["flux"] for ent in data], dtype=float) * scale
+    #
+    # --- a null flux of the feed (nan after the conversion) is a missing entry
+    #
+    flux[~np.isfinite(flux)] = MISSING
+    #
+    # --- common time grid of all channels with the missing time filled
+    #
+    grid = fill_time_gaps(np.unique(times))
+    if hours is not None:
+        ctime = times[-1] - np.timedelta64(int(hours * 3600), "s")
+        grid = grid[grid > ctime]
+
+    matrix = np.full((len(grid), len(channel_list)), MISSING)
+    if len(grid) > 0:
+        pos = np.searchsorted(grid, times).clip(0, len(grid) - 1)
+        found = grid[pos] == times
+        for i, channel in enumerate(channel_list):
+            sel = found & (names == channel)
+            matrix[pos[sel], i] = flux[sel]
+
+    return GoesData(grid, matrix, channel_list)
+
+
+def extract_goes_data(link, channel_list, key="energy", scale=1.0, hours=None):
+    """Read a GOES json feed and parse it into a (time x channel) flux matrix
+
+    :param link: URL or file path
+    :type link: str
+    :param channel_list: channel designations to extract
+    :type channel_list: list(str)
+    :param key: record key of the channel designation, defaults to "energy"
+    :type key: str, optional
+    :param scale: factor multiplied to the flux, defaults to 1.0
+    :type scale: float, optional
+    :param hours: if given, keep only the data within the hours before the last record
+    :type hours: float, optional
+    :return: flux data
+    :rtype: GoesData
+    """
+    data = read_goes_json(link)
+    return ingest_goes_data(data, channel_list, key=key, scale=scale, hours=hours)
+
+
+class TestFunctions(unittest.TestCase):
+    """Tests of the GOES json ingestion"""
+
+    def test_ingest_goes_data(self):
+        data = [
+            {"time_tag": "2026-10-16T00:00:00Z", "energy": "A", "flux": 1.0},
+            {"time_tag": "2026-10-16T00:00:00Z", "energy": "B", "flux": None},
+            {"time_tag": "2026-10-16T00:05:00Z", "energy": "A", "flux": float("nan")},
+            {"time_tag": "2026-10-16T00:05:00Z", "energy": "B", "flux": 4.0},
+            {"time_tag": "2026-10-16T00:15:00Z", "energy": "A", "flux": 5.0},
+        ]
+        out = ingest_goes_data(data, ["A", "B"], scale=1e3)
+
+        self.assertEqual(len(out), 4)
+        self.assertEqual(out.flux[:, 0].tolist(), [1e3, MISSING, MISSING, 5e3])
+        self.assertEqual(out.flux[:, 1].tolist(), [MISSING, 4e3, MISSING, MISSING])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,287 @@
+#!/proj/sot/ska3/flight/bin/python
+"""
+**goes_store.py**: Incremental store of the GOES primary time series
+
+:Author: W. Aaron (william.aaron@cfa.harvard.edu)
+:Last Updated: Oct 16, 2026
+
+:INFO:
+    - Each feed is kept in <store_dir>/<feed>/ as
+        times.bin   --- int64 seconds from 1970.1.1 on the 5 minute grid
+        flux.bin    --- float64 (time x channel) flux in the feed units; missing entries are -1e5
+        state.json  --- channel list and the time of the last update
+    - The store is append-only. New times are appended (the gaps filled with missing rows),
+      and a record of a stored time only fills a missing entry (deduplicated on time x energy).
+    - Each update downloads one feed; the shortest SWPC span covering the time since
+      the last stored time.
+    - Windows are read from memory-mapped columns.
+
+"""
+import os
+import sys
+import json
+import time
+import fcntl
+import argparse
+import traceback
+import numpy as np
+import feed_cache
+import goes_ingest
+from goes_ingest import GoesData, MISSING
+
+sys.path.append("/data/mta4/Space_Weather/EPHEM/Scripts")
+import atomic_file as afile  #: write through a temporary file and a rename
+
+STORE_DIR = "/data/mta4/Space_Weather/GOES/Data/Store"  #: Store directory
+LINK = "https://services.swpc.noaa.gov/json/goes/primary/{feed}-{span}.json"  #: SWPC GOES primary json feeds
+SPANS = [("1-day", 1.0), ("3-day", 3.0), ("7-day", 7.0)]  #: Feed spans and their length in days
+STORE_TTL = 240  #: Seconds after which a reader updates the store itself (the collector runs every 5 min)
+
+DIFFERENTIAL_LIST = [
+    "1020-1860 keV",
+    "1900-2300 keV",
+    "2310-3340 keV",
+    "3400-6480 keV",
+    "5840-11000 keV",
+    "11640-23270 keV",
+    "25900-38100 keV",
+    "40300-73400 keV",
+    "83700-98500 keV",
+    "99900-118000 keV",
+    "115000-143000 keV",
+    "160000-242000 keV",
+    "276000-404000 keV",
+]  #: Differential proton energy designations
+
+INTEGRAL_LIST = [
+    ">=1 MeV",
+    ">=5 MeV",
+    ">=10 MeV",
+    ">=30 MeV",
+    ">=50 MeV",
+    ">=60 MeV",
+    ">=100 MeV",
+    ">=500 MeV",
+]  #: Integral proton energy designations
+
+ELECTRON_LIST = [">=2 MeV"]  #: Integral electron energy designations
+
+FEEDS = {
+    "differential-protons": DIFFERENTIAL_LIST,
+    "integral-protons": INTEGRAL_LIST,
+    "integral-electrons": ELECTRON_LIST,
+}  #: Stored feeds and their channels
+
+CHANNEL_ENERGY = dict(
+    zip(
+        ["P1", "P2A", "P2B", "P3", "P4", "P5", "P6", "P7", "P8A", "P8B", "P8C", "P9", "P10"],
+        DIFFERENTIAL_LIST,
+    )
+)  #: Differential proton channel names and their energy designations
+
+
+def get_window(feed, hours=None, start=None, channels=None, scale=1.0, max_age=STORE_TTL):
+    """Read a time window of a feed from the store. If the store has not been updated
+    within max_age, it is updated first.
+
+    :param feed: feed name (a key of FEEDS)
+    :type feed: str
+    :param hours: if given, the data within the hours before the last stored time
+    :type hours: float, optional
+    :param start: if given, the data after the time
+    :type start: numpy.datetime64, optional
+    :param channels: channels to read, defaults to all channels of the feed
+    :type channels: list(str), optional
+    :param scale: factor multiplied to the flux (e.g. 1e3 for keV to MeV), defaults to 1.0
+    :type scale: float, optional
+    :param max_age: seconds after which the store is updated before reading, defaults to STORE_TTL
+    :type max_age: int, optional
+    :return: flux data; missing entries are MISSING
+    :rtype: goes_ingest.GoesData
+    """
+    state = read_state(feed)
+    if state is None or time.time() - state["updated"] > max_age:
+        try:
+            update_store(feed)
+        except Exception:
+            #
+            # --- the feed is not available; use the stored data
+            #
+            traceback.print_exc()
+
+    data = read_store(feed)
+    if hours is not None and len(data) > 0:
+        start = data.times[-1] - np.timedelta64(int(hours * 3600), "s")
+    data = data.window(start, None)
+
+    flux = np.array(data.flux)
+    if channels is not None:
+        flux = flux[:, [data.channels.index(x) for x in channels]]
+    else:
+        channels = data.channels
+    if scale != 1.0:
+        flux = np.where(flux == MISSING, MISSING, flux * scale)
+
+    return GoesData(np.array(data.times), flux, channels)
+
+
+def read_store(feed):
+    """Read the stored data of a feed as memory-mapped columns
+
+    :param feed: feed name
+    :type feed: str
+    :return: stored data (empty if there is no store)
+    :rtype: goes_ingest.GoesData
+    """
+    channels = FEEDS[feed]
+    tfile, ffile = _store_files(feed)
+    nrow = os.path.getsize(tfile) // 8 if os.path.isfile(tfile) else 0
+    if nrow == 0:
+        return GoesData(
+            np.array([], dtype="datetime64[s]"), np.zeros((0, len(channels))), channels
+        )
+    #
+    # --- the flux is appended before the times; the times decide the number of rows
+    #
+    times = np.memmap(tfile, dtype=np.int64, mode="r", shape=(nrow,))
+    flux = np.memmap(ffile, dtype=np.float64, mode="r", shape=(nrow, len(channels)))
+    return GoesData(times.view("datetime64[s]"), flux, channels)
+
+
+def read_state(feed):
+    """Read the state of the store of a feed
+
+    :param feed: feed name
+    :type feed: str
+    :return: state ({"channels": list, "updated": time of the last update}) or None
+    :rtype: dict or None
+    """
+    try:
+        with open(os.path.join(STORE_DIR, feed, "state.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def update_store(feed):
+    """Add the new data of a feed to the store
+
+    :param feed: feed name
+    :type feed: str
+    :return: number of appended rows
+    :rtype: int
+    """
+    channels = FEEDS[feed]
+    fdir = os.path.join(STORE_DIR, feed)
+    os.makedirs(fdir, exist_ok=True)
+    with open(os.path.join(fdir, "lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        stored = read_store(feed)
+        last = stored.times[-1] if len(stored) > 0 else None
+        data = goes_ingest.ingest_goes_data(
+            feed_cache.fetch_json(select_link(feed, last)), channels
+        )
+        tfile, ffile = _store_files(feed)
+        if last is None:
+            new = data
+        else:
+            #
+            # --- fill the missing entries of the stored times
+            #
+            old = data.window(None, last)
+            if len(old) > 0:
+                pos = np.searchsorted(stored.times, old.times).clip(0, len(stored) - 1)
+                found = stored.times[pos] == old.times
+                pos = pos[found]
+                fill = (stored.flux[pos] == MISSING) & (old.flux[found] != MISSING)
+                if fill.any():
+                    flux = np.memmap(ffile, dtype=np.float64, mode="r+", shape=stored.flux.shape)
+                    rows = flux[pos]
+                    rows[fill] = old.flux[found][fill]
+                    flux[pos] = rows
+                    flux.flush()
+            #
+            # --- the new times continue the 5 minute grid from the last stored time
+            #
+            new = data.window(last, None)
+            if len(new) > 0:
+                grid = goes_ingest.fill_time_gaps(np.concatenate([[last], new.times]))[1:]
+                new = new.align(grid)
+
+        if len(new) > 0:
+            #
+            # --- an update which stopped between the two appends leaves flux rows without
+            # --- their times (or a partial row); cut both files back to the stored rows first
+            #
+            with open(ffile, "ab") as fo:
+                fo.truncate(len(stored) * len(channels) * 8)
+                fo.write(np.ascontiguousarray(new.flux, dtype=np.float64).tobytes())
+            with open(tfile, "ab") as fo:
+                fo.truncate(len(stored) * 8)
+                fo.write(new.times.astype("datetime64[s]").astype(np.int64).tobytes())
+
+        state = {"channels": channels, "updated": time.time()}
+        afile.write_bytes(os.path.join(fdir, "state.json"), json.dumps(state))
+
+    return len(new)
+
+
+def select_link(feed, last):
+    """Select the shortest feed span which covers the time since the last stored time
+
+    :param feed: feed name
+    :type feed: str
+    :param last: the last stored time or None
+    :type last: numpy.datetime64 or None
+    :return: URL of the feed
+    :rtype: str
+    """
+    if last is not None:
+        now = np.datetime64(int(time.time()), "s")
+        gap = (now - last).astype(np.int64) / 86400.0
+        for span, days in SPANS:
+            #
+            # --- keep an hour of margin for the latency of the feed
+            #
+            if gap < days - 1.0 / 24.0:
+                return LINK.format(feed=feed, span=span)
+
+    return LINK.format(feed=feed, span=SPANS[-1][0])
+
+
+def _store_files(feed):
+    fdir = os.path.join(STORE_DIR, feed)
+    return os.path.join(fdir, "times.bin"), os.path.join(fdir, "flux.bin")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-m",
+        "--mode",
+        choices=["flight", "test"],
+        required=True,
+        help="Determine running mode.",
+    )
+    parser.add_argument(
+        "-p",
+        "--path",
+        required=False,
+        help="Directory path of the store.",
+    )
+    args = parser.parse_args()
+
+    if args.mode == "test":
+        STORE_DIR = f"{os.getcwd()}/test/_outTest/Store"
+    if args.path:
+        STORE_DIR = args.path
+
+    status = 0
+    for name in FEEDS.keys():
+        try:
+            update_store(name)
+        except Exception:
+            traceback.print_exc()
+            status = 1
+    sys.exit(status)
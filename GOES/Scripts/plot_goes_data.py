@@ -3,15 +3,12 @@
 **plot_goes_data.py**: Get and plot goes data.
 
 :Author: t. isobe (tisobe@cfa.harvard.edu)
-:Last Updated: Feb 18, 2025
+:Last Updated: Oct 16, 2026
 
 """
 import sys
 import os
-import json
-import urllib.request
-from astropy.table import Table
-from datetime import datetime
+import numpy as np
 import matplotlib as mpl
 
 if __name__ == "__main__":
@@ -21,6 +18,8 @@ import matplotlib.font_manager as font_manager
 from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
 import argparse
 import traceback
+import goes_ingest
+import goes_store
 
 #
 # --- Defining Directory Pathing
@@ -29,12 +28,11 @@ HTML_DIR = "/data/mta4/www/RADIATION"
 PLOT_DIR = f"{HTML_DIR}/GOES/Plots"
 
 #
-# --- JSON data web links
+# --- GOES primary feeds kept in the store (see goes_store.py)
 #
-DLINK = (
-    "https://services.swpc.noaa.gov/json/goes/primary/differential-protons-3-day.json"
-)
-CLINK = "https://services.swpc.noaa.gov/json/goes/primary/integral-protons-3-day.json"
+DFEED = "differential-protons"
+CFEED = "integral-protons"
+PLOT_HOURS = 72  #: Plotted time span (3 days)
 
 BAND_LIMITS = {
     "P1": {"min": 1.02, "max": 1.86},
@@ -80,6 +78,10 @@ DIFF_GROUP_SELECTION = [
     Group_Info(("P7", "P8A")),
 ]  #: Differential Group Selection by channel. Determined by Band Limits to mimic ACE channels.
 
+DIFF_CHANNELS = [
+    x for group_info in DIFF_GROUP_SELECTION for x in group_info.channel_tuple
+]  #: Differential channels used in the groups
+
 INTG_GROUP_SELECTION = [
     ">=10 MeV",
     ">=50 MeV",
@@ -108,19 +110,19 @@ OFFSET_TICK_FORMATTING = [
     "%H:%M",  #: seconds
 ]
 
-def plot_goes_data(dlink=DLINK, clink=CLINK, choice=["diff", "intg"]):
+def plot_goes_data(dlink=DFEED, clink=CFEED, choice=["diff", "intg"]):
     """Fetch and plot GOES data
 
-    :param dlink: JSON file or web path for differential protons, defaults to DLINK
+    :param dlink: Store feed name or JSON file for differential protons, defaults to DFEED
     :type dlink: str, optional
-    :param clink: JSON file or web path for integral protons, defaults to CLINK
+    :param clink: Store feed name or JSON file for integral protons, defaults to CFEED
     :type clink: str, optional
     :param choice: List of strings to determine which kind of plot to generates, defaults to ["diff", "intg"]
     :type choice: list, optional
     """
     if "diff" in choice:
-        diff_table = extract_goes_table(dlink)
-        diff_data_dict = format_differential_data(diff_table)
+        diff_data = extract_goes_table(dlink, DIFF_CHANNELS, key="channel")
+        diff_data_dict = format_differential_data(diff_data)
         #
         # --- Define extra plotting variables
         #
@@ -139,8 +141,8 @@ def plot_goes_data(dlink=DLINK, clink=CLINK, choice=["diff", "intg"]):
         plot_data(diff_data_dict)
 
     if "intg" in choice:
-        intg_table = extract_goes_table(clink)
-        intg_data_dict = format_integral_data(intg_table)
+        intg_data = extract_goes_table(clink, INTG_GROUP_SELECTION, key="energy")
+        intg_data_dict = format_integral_data(intg_data)
         #
         # --- Define extra plotting variables
         #
@@ -152,95 +154,78 @@ def plot_goes_data(dlink=DLINK, clink=CLINK, choice=["diff", "intg"]):
         intg_data_dict["limits"] = {"y_min": 1e-2, "y_max": 1e4}
         plot_data(intg_data_dict)
 
-def extract_goes_table(jlink):
+def extract_goes_table(jlink, channel_list, key):
     """Extract GOES satellite flux data
 
-    :param jlink: JSON web address or file
+    :param jlink: feed name in the GOES store or JSON file
     :type jlink: str
-    :return: astropy table of the GOES data.
-    :rtype: astropy.Table
+    :param channel_list: channel designations to extract
+    :type channel_list: list(str)
+    :param key: record key of the channel designation ("channel" or "energy")
+    :type key: str
+    :return: (time x channel) flux matrix of the GOES data. Missing entries are marked
+        with goes_ingest.MISSING.
+    :rtype: goes_ingest.GoesData
 
     """
     if os.path.isfile(jlink):
         try:
-            with open(jlink) as f:
-                data = json.load(f)
+            data = goes_ingest.read_goes_json(jlink)
         except:  # noqa: E722
             traceback.print_exc()
             data = []
+
+        if len(data) < 1:
+            exit(1)
+        return goes_ingest.ingest_goes_data(data, channel_list, key=key)
+    #
+    # --- the store keeps the channels by the energy designation
+    #
+    if key == "channel":
+        energy_list = [goes_store.CHANNEL_ENERGY[x] for x in channel_list]
     else:
-        try:
-            with urllib.request.urlopen(jlink) as url:
-                data = json.loads(url.read().decode())
-        except:  # noqa: E722
-            traceback.print_exc()
-            data = []
+        energy_list = channel_list
+    data = goes_store.get_window(jlink, hours=PLOT_HOURS, channels=energy_list)
 
     if len(data) < 1:
         exit(1)
-    data = Table(data)
-    return data
+    return goes_ingest.GoesData(data.times, data.flux, channel_list)
 
-def format_differential_data(table):
-    """Create combined flux data of astropy table based on weighted average
+def format_differential_data(data):
+    """Create combined flux data based on weighted average
 
-    :param table: astropy table of the differential protons.
-    :type table: astropy.Table
+    :param data: (time x channel) flux matrix of the differential protons.
+    :type data: goes_ingest.GoesData
     :return: Combined flux data averaged into ACE energy bands.
     :rtype: dict
     """
-    diff_data_dict = {"plot_data": []}
+    diff_data_dict = {"plot_data": [], "times": data.datetimes()}
 
     for group_info in DIFF_GROUP_SELECTION:
         #
-        # --- Initialize group data arrays
-        #
-        channel = group_info.channel_tuple[0]
-        sel = table["channel"] == channel
-        subtable = table[sel]
-        if "times" not in diff_data_dict.keys():
-            diff_data_dict["times"] = [
-                datetime.strptime(x, ASTROPY_FORMATTING)
-                for x in subtable["time_tag"].data
-            ]
-        #
         # --- Flux averaged across energy bands from protons/cm2-s-ster-KeV to protons/cm2-s-ster-MeV
+        # --- (missing entries are NaN so that they are not plotted)
         #
-        avgs = subtable["flux"] * 1e3 * group_info.weights[0]
-
-        for i in range(1, len(group_info.channel_tuple)):
-            #
-            # --- Iterate over the rest of the channels to calculate the averages
-            #
-            channel = group_info.channel_tuple[i]
-            sel = table["channel"] == channel
-            subtable = table[sel]
-            avgs = avgs + subtable["flux"] * 1e3 * group_info.weights[i]
+        avgs = np.zeros(len(data))
+        for i, channel in enumerate(group_info.channel_tuple):
+            avgs = avgs + data.column(channel, missing=np.nan) * 1e3 * group_info.weights[i]
 
         avgs = avgs / (group_info.max - group_info.min)
         diff_data_dict["plot_data"].append(avgs)
     return diff_data_dict
 
-def format_integral_data(intg_table):
-    """Formats the GOES integral flux astropy table into a data table
+def format_integral_data(intg_data):
+    """Formats the GOES integral flux into a data table
 
-    :param intg_table: astropy table of the integral protons
-    :type intg_table: astropy.Table
+    :param intg_data: (time x channel) flux matrix of the integral protons
+    :type intg_data: goes_ingest.GoesData
     :return: Formatted integral protons data
     :rtype: dict
     """
-    intg_data_dict = {"plot_data": []}
-    sel = intg_table["energy"] == INTG_GROUP_SELECTION[0]
-    subtable = intg_table[sel]
-    intg_data_dict["times"] = [
-        datetime.strptime(x, ASTROPY_FORMATTING) for x in subtable["time_tag"].data
-    ]
-    intg_data_dict["plot_data"].append(subtable["flux"])
-
-    for i in range(1, len(INTG_GROUP_SELECTION)):
-        sel = intg_table["energy"] == INTG_GROUP_SELECTION[i]
-        subtable = intg_table[sel]
-        intg_data_dict["plot_data"].append(subtable["flux"])
+    intg_data_dict = {"plot_data": [], "times": intg_data.datetimes()}
+
+    for energy in INTG_GROUP_SELECTION:
+        intg_data_dict["plot_data"].append(intg_data.column(energy, missing=np.nan))
     return intg_data_dict
 
 def plot_data(data_dict):
@@ -347,6 +332,7 @@ if __name__ == "__main__":
         if args.path:
             PLOT_DIR = args.path
         os.makedirs(PLOT_DIR, exist_ok=True)
+        goes_store.STORE_DIR = f"{OUT_DIR}/Store"
         plot_goes_data()
     elif args.mode == "flight":
         #
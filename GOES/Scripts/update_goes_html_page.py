@@ -3,14 +3,12 @@
 **update_goes_html_page.py**: Update goes differential protons html page.
 
 :Author: W. Aaron (william.aaron@cfa.harvard.edu)
-:Last Updated: Feb 18, 2025
+:Last Updated: Oct 16, 2026
 
 """
 import os
+import sys
 import signal
-from datetime import datetime, timedelta
-import urllib.request
-import json
 import numpy as np
 import argparse
 import traceback
@@ -18,6 +16,12 @@ import getpass
 from jinja2 import Environment, FileSystemLoader
 from astropy.io import ascii
 from astropy.table import Table, join
+import goes_ingest
+import goes_store
+import goes_analytics as gan
+import feed_cache
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts')
+import table_format as tfmt  #: fixed width table formatter
 #
 #--- Define Directory Pathing
 #
@@ -30,9 +34,9 @@ ADMIN = ['mtadude@cfa.harvard.edu']
 #
 # --- Links to data sources
 #
-DLINK = 'https://services.swpc.noaa.gov/json/goes/primary/differential-protons-1-day.json'
-ILINK = 'https://services.swpc.noaa.gov/json/goes/primary/integral-protons-1-day.json'
-ELINK = 'https://services.swpc.noaa.gov/json/goes/primary/integral-electrons-1-day.json'
+DFEED = 'differential-protons'   #: GOES primary feeds kept in the store (see goes_store.py)
+IFEED = 'integral-protons'
+EFEED = 'integral-electrons'
 XLINK = 'https://services.swpc.noaa.gov/json/goes/primary/xray-flares-7-day.json'
 EVENTLINK = "https://services.swpc.noaa.gov/json/edited_events.json"
 
@@ -49,26 +53,6 @@ INTEGRAL_LIST = ['>=1 MeV', '>=5 MeV', '>=10 MeV', '>=30 MeV', '>=50 MeV',\
 
 ELECTRON_LIST   = ['>=2 MeV',]
 
-DE = {'P1': [1860., 1020.],
-      'P2A': [2300., 1900.],
-      'P2B': [3340., 2310.],
-      'P3': [6480., 3400.],
-      'P4': [11000., 5840.],
-      'P5': [23270., 11640.],
-      'P6': [38100., 25900.],
-      'P7': [73400., 40300.],
-      'P8A': [98500., 83700.],
-      'P8B': [118000., 99900.],
-      'P8C': [143000., 115000.],
-      'P9': [242000., 160000.],
-      'P5P6': [23270., 11640.],
-      'P8ABC': [143000., 83700.],
-      'P8ABCP9': [242000., 83700.]
-} #: GOES-16+ Energy bands (keV) and combinations
-
-for key in DE.keys():
-    de = DE[key] 
-    de.append(de[0] - de[1]) #: Add delta_e to each list
 #
 # --- Template Globals
 #
@@ -123,17 +107,18 @@ def make_diff_table():
 #
 #--- extract proton data
 #
-    p_data = extract_goes_data(DLINK, DIFFERENTIAL_LIST, TO_MEV = True)
+    p_data = extract_goes_data(DFEED, DIFFERENTIAL_LIST, TO_MEV = True)
 #
 #--- time list
 #
-    t_list = p_data[0][0]
+    t_list = p_data.time_strings('%Y:%j:%H:%M')
     d_len  = len(t_list)
+    c_len  = len(DIFFERENTIAL_LIST)
 #
 #--- compute hrc proxy
 #
-    pre_hrc_val = compute_pre2020_hrc(p_data)
-    hrc_val = compute_hrc(p_data)
+    pre_hrc_val = gan.compute_proxy(p_data, 'hrc_proxy_legacy')
+    hrc_val = gan.compute_proxy(p_data, 'hrc_proxy')
 #
 #---- create the main table
 #
@@ -161,81 +146,31 @@ def make_diff_table():
 #
 #--- aline will save the text output of the table which is used by CRM
 #
-    aline = ''
-
-    for k in range(0, d_len):
-        line = line + '\t' +  t_list[k]  + '\t\t'
-
-
-        try:
-            line = line + adjust_format(p_data[0][1][k]) + "\t"
-            line = line + adjust_format(p_data[1][1][k]) + "\t"
-            line = line + adjust_format(p_data[2][1][k]) + "\t"
-            line = line + adjust_format(p_data[3][1][k]) + "\t"
-            line = line + adjust_format(p_data[4][1][k]) + "\t"
-            line = line + adjust_format(p_data[5][1][k]) + "\t"
-            line = line + adjust_format(p_data[6][1][k]) + "\t"
-            line = line + adjust_format(p_data[7][1][k]) + "\t"
-            line = line + adjust_format(p_data[8][1][k]) + "\t"
-            line = line + adjust_format(p_data[9][1][k]) + "\t"
-            line = line + adjust_format(p_data[10][1][k]) + "\t"
-            line = line + adjust_format(p_data[11][1][k]) + "\t"
-            line = line + adjust_format(p_data[12][1][k]) + "\t"
-        except:
-            pass
-
-        try:
-            line = line + "%5.0f\t\t" % (hrc_val[k])
-        except:
-            line = line + '\t\t '
-
-        try:
-            line = line + f"{pre_hrc_val[k]:5.0f}\n" 
-        except:
-            line = line + '\n'
+    spec = ['\t%s\t\t'] + [tab_format] * c_len + ['%5.0f\t\t', '%5.0f']
+    cols = [t_list] + [p_data.flux[:, m] for m in range(0, c_len)] + [hrc_val, pre_hrc_val]
+    line = line + tfmt.render_table(spec, cols)
 
     line  = line + '\n'
     aline = line
     line  = line + '\t' + '-'*150 +'\n\n'
 #
-#--- add average and sum
+#--- add average and sum of the valid entries of the channels and the proxies
 #
+    avgs, sums = gan.channel_stats(np.column_stack([p_data.flux, hrc_val, pre_hrc_val]))
+
     line = line + '\tAVERAGE\t\t\t'
+    for m in range(0, c_len):
+        line = line + adjust_format(avgs[m]) + "\t"
 
-    line = line + adjust_format(np.mean([i for i in p_data[0][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[1][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[2][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[3][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[4][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[5][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[6][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[7][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[8][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[9][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[10][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[11][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.mean([i for i in p_data[12][1] if i >=0])) + "\t"
-
-    line = line + "%5.0f\t\t" % (np.mean([i for i in hrc_val if i >= 0]))
-    line = line + f"{np.mean([i for i in pre_hrc_val if i >= 0]):5.0f}\n" 
+    line = line + "%5.0f\t\t" % (avgs[c_len])
+    line = line + f"{avgs[c_len + 1]:5.0f}\n" 
 #
     line = line + '\tFLUENCE\t\t\t'
-    line = line + adjust_format(np.sum([i for i in p_data[0][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[1][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[2][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[3][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[4][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[5][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[6][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[7][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[8][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[9][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[10][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[11][1] if i >=0])) + "\t"
-    line = line + adjust_format(np.sum([i for i in p_data[12][1] if i >=0])) + "\t"
-
-    line = line + "%5.0f\t\t" % (np.sum([i for i in hrc_val if i >= 0]))
-    line = line + f"{np.sum([i for i in pre_hrc_val if i >= 0]):5.0f}\n\n"
+    for m in range(0, c_len):
+        line = line + adjust_format(sums[m]) + "\t"
+
+    line = line + "%5.0f\t\t" % (sums[c_len])
+    line = line + f"{sums[c_len + 1]:5.0f}\n\n"
     line = line + '\tHRC Proxy is defined as:\n\n'
     line = line + '\tHRC Proxy  = 143 * P5 + 64738 * P6 + 162505 * P7 + 4127\n\n'
 
@@ -258,11 +193,14 @@ def make_intg_table():
 
     """
 
-    p_save = extract_goes_data(ILINK, INTEGRAL_LIST, TO_MEV=False)
+    p_save = extract_goes_data(IFEED, INTEGRAL_LIST, TO_MEV=False)
 
-    e_save = extract_goes_data(ELINK, ELECTRON_LIST, TO_MEV=False)
-
-    p_save = p_save + e_save
+    e_save = extract_goes_data(EFEED, ELECTRON_LIST, TO_MEV=False)
+#
+#--- put the electron data on the proton time grid
+#
+    p_save = p_save.merge(e_save)
+    c_len  = len(p_save.channels)
 #
 #--- start writing the table
 #
@@ -275,59 +213,42 @@ def make_intg_table():
     line = line + '\t' + '-'*150 +'\n'
 #
 #--- aline will save the text output of the table which is used by CRM
+#--- (the data file has a different time format)
 #
-    aline = ''
-#
-#--- data length
-#
-    flen = len(p_save[0][0])
-    for k in range(0, flen):
-#
-#--- print time data 
-#
-        tout  = str(p_save[0][0][k]).strip()
-        line  = line + '\t' + tout + '\t\t'
-#
-#--- data file has a different time format
-#
-        aline = aline + datetime.strptime(tout, '%Y:%j:%H:%M').strftime('%Y %m %d %H%M')
-        aline = aline + ' 99999 99999\t'    #--- adding dummy julian time
+    t_list = p_save.time_strings('%Y:%j:%H:%M')
+    a_list = p_save.time_strings('%Y %m %d %H%M')
+    f_cols = [p_save.flux[:, m] for m in range(0, c_len)]
 #
-#--- print flax data
+#--- print time and flux data 
 #
-        for m in range(0, len(p_save)):
-            try:
-                out  = adjust_format(p_save[m][1][k])
-            except:  # noqa: E722
-                continue
-            line = line   +  out +"\t\t" 
-            aline = aline + "%2.3e\t\t" % (p_save[m][1][k])
-        line = line + '\n'
+    spec = ['\t%s\t\t'] + [tab2_format] * c_len
+    line = line + tfmt.render_table(spec, [t_list] + f_cols)
 #
-#--- electron does not have distinction for 0.8 2.8 or 4.0; so fake with all E>2.0
+#--- adding dummy julian time; electron does not have distinction for 0.8 2.8 or 4.0;
+#--- so fake with all E>2.0
 #
-        try:
-            aline = aline  + "%2.3e\t%2.3e\n" % (p_save[m][1][k], p_save[m][1][k])
-        except:  # noqa: E722
-            aline = aline  + "na\t%na\n" % (p_save[m][1][k], p_save[m][1][k])
+    spec  = ['%s 99999 99999\t'] + ['%2.3e\t\t'] * c_len + ['%2.3e\t', '%2.3e']
+    aline = tfmt.render_table(spec, [a_list] + f_cols + [f_cols[-1], f_cols[-1]])
 #
 #--- table break
 #
     line = line + '\n'
     line = line + '\t' + '-'*150 +'\n\n'
 #
-#--- add average and sum of the data
+#--- add average and sum of the valid entries of the data
 #
+    avgs, sums = gan.channel_stats(p_save.flux)
+
     line = line + '\tAVERAGE\t\t\t'
-    for m in range(0, len(p_save)):
-        out = adjust_format(np.mean(p_save[m][1]))
+    for m in range(0, c_len):
+        out = adjust_format(avgs[m])
         line  = line + out + '\t\t'
 
     line = line + '\n'
 
     line = line + '\tFLUENCE\t\t\t'
-    for m in range(0, len(p_save)):
-        out = adjust_format(np.sum(p_save[m][1]) * 7200.0)
+    for m in range(0, c_len):
+        out = adjust_format(sums[m] * 7200.0)
         line = line + out + '\t\t'
 #
 #--- set data file 
@@ -409,170 +330,48 @@ def _read_json(link):
     :param link: URL or file path
     :type link: str
     """
-    if os.path.isfile(link):
-        with open(link) as f:
-            data = json.load(f)
-    else:
-        with urllib.request.urlopen(link) as url:
-            data = json.loads(url.read().decode())
-    return data
+    return feed_cache.fetch_json(link)
 
-def extract_goes_data(link, energy_list, TO_MEV):
+def extract_goes_data(feed, energy_list, TO_MEV):
     """
-    extract GOES satellite flux data
-    input: link        --- json web address or file
+    extract the last two hours of GOES satellite flux data
+    input: feed        --- feed name in the GOES store or json file (test)
             energy_list --- a list of energy designation 
-    output: <data_dir>/<out file>
-    """
-#
-#--- read json file from a file or the web
-#
-    data = _read_json(link)
-#
-#--- go through all energy ranges
-#
-    elen   = len(energy_list)
-    d_save = []
-    ctime = datetime.strptime(data[-1]['time_tag'], '%Y-%m-%dT%H:%M:%SZ') - timedelta(hours=2)
-    for k in range(0, elen):
-        t_list = []
-        f_list = []
-        energy = energy_list[k]
-        last_time = datetime.strptime(data[0]['time_tag'], '%Y-%m-%dT%H:%M:%SZ')
-#
-#--- check the last entry time and select only last 2hrs
-#
-        for ent in data:
-#
-#--- read time and flux of the given energy range
-#
-            if ent['energy'] == energy:
-                if TO_MEV:
-                    flux  = float(ent['flux']) * 1e3   #--- keV to MeV
-                else:
-                    flux  = float(ent['flux'])
-                otime =  datetime.strptime(ent['time_tag'], '%Y-%m-%dT%H:%M:%SZ')
-                #
-                #--- If the otime is more than five minutes after the last_time
-                #--- then that means the data set is missing an entry for this energy band and zero values should be append.
-                #
-                diff = (otime - last_time).seconds
-                if diff > 300:
-                    for i in range(300,int(diff),300): #: All times should be in divisions of 5 minutes/300 seconds.
-                        missing_time = last_time + timedelta(seconds=i)
-                        if missing_time > ctime:
-                            t_list.append(missing_time.strftime('%Y:%j:%H:%M'))
-                            f_list.append(-1e5) #: Mark missing data with the invalid data marker (-1e5)
-
-                if otime > ctime:
-                    t_list.append(otime.strftime('%Y:%j:%H:%M'))
-                    f_list.append(flux)
-                    last_time = otime
-
-        d_save.append([t_list, f_list])
-#
-#--- Check if there is a missing energy at the beginning or ending of a band.
-#
-    for i in range(len(d_save)):
-        #Find a channel with all 24 needed data points and use those time values
-        if len(d_save[i][0]) == 24:
-            start = d_save[i][0][0]
-            stop = d_save[i][0][-1]
-            break
-
-    for i in range(len(d_save)):
-        if len(d_save[i][0]) < 24:
-            #if there is still not 24 data points, then we are missing the start or end of this channel
-            if d_save[i][0][0] != start:
-                d_save[i][0].insert(0,start)
-                d_save[i][1].insert(0,-1e5)
-                
-            if d_save[i][0][-1] != stop:
-                d_save[i][0].append(stop)
-                d_save[i][1].append(-1e5)
-    return d_save
-
-def compute_hrc(data):
-    """
-    compute hrc proxy value
-
-    HRC_PROXY = 6000 x P4 + 270000 x P5 + 100000 x P6
-        P4 ~ 11640-23270 keV + 25900-38100 keV 
-        P5 ~ 40300-73400 keV, 
-        P6 ~ 83700-98500 keV + 99900-118000 keV + 115000-143000 keV + 160000-242000 keV.
-        and:
-        c0: '1020-1860 keV',
-        c1: '1900-2300 keV',
-        c2: '2310-3340 keV',
-        c3: '3400-6480 keV',
-        c4: '5840-11000 keV',
-        c5: '11640-23270 keV',
-        c6: '25900-38100 keV',
-        c7: '40300-73400 keV',
-        c8: '83700-98500 keV',
-        c9: '99900-118000 keV',
-        c10: '115000-143000 keV',
-        c11: '160000-242000 keV',
-        c12: '276000-404000 keV'
-    input:  data    --- a list of lists of data: [[<time>, <data1>], [<time>, <data2>],...]
-    output: hrc     --- hrc proxy list
+            TO_MEV      --- if True, convert the flux from /keV to /MeV
+    output: GoesData of (time x energy) flux matrix on the 5 minute grid;
+            missing entries are marked with the invalid data marker (-1e5)
     """
-    c5  = data[5][1]
-    c6  = data[6][1]
-    c7  = data[7][1]
-
-    hrc = []
-
-    for k in range(0, len(c5)):
-        try:
-            val = 143.0 * c5[k] + 64738.0 * c6[k] + 162505.0 * c7[k] + 4127 #: After 2021:125:06:05:00 
-            if c5[k] < 0 or c6[k] < 0 or c7[k] < 0:
-                val = -1e5 #: Missing a channel value
-
-        except:
-            val = -1e5 #: Missing a channel value
+    if TO_MEV:
+        scale = 1e3     #--- keV to MeV
+    else:
+        scale = 1.0
+    if os.path.isfile(feed):
+        return goes_ingest.extract_goes_data(feed, energy_list, scale=scale, hours=2)
 
-        hrc.append(val)
+    return goes_store.get_window(feed, hours=2, channels=energy_list, scale=scale)
 
-    return hrc
+def tab_format(val):
+    """format a flux value for a table column followed by a tab
 
-def compute_pre2020_hrc(data):
-    p5 = data[5][1]
-    p6 = data[6][1]
-    p7 = data[7][1]
-    p8a = data[8][1]
-    p8b = data[9][1]
-    p8c = data[10][1]
+    :param val: flux value
+    :type val: float
+    :return: the value formatted by adjust_format and a tab
+    :rtype: str
 
-    hrc = []
+    """
+    return adjust_format(val) + "\t"
 
-    p5p6 = combine_rates([p5, p6], ('P5', 'P6'))
-    p8abc = combine_rates([p8a, p8b, p8c], ('P8A', 'P8B', 'P8C'))
-
-    for k in range(len(p5p6)):
-        try:
-            val = 6000 * p5p6[k] + 270000 * p7[k] + 100000 * p8abc[k]
-            if p5p6[k] < 0 or p7[k] < 0 or p8abc[k] < 0:
-                val = -1e5 #: Missing a channel value
-        except IndexError:
-            val = -1e5 #: Missing a channel value
-        hrc.append(val)
-    return hrc
+def tab2_format(val):
+    """format a flux value for a table column followed by two tabs
 
+    :param val: flux value
+    :type val: float
+    :return: the value formatted by adjust_format and two tabs
+    :rtype: str
 
-def combine_rates(data_list, channel_name):
     """
-    Return combined rates for multiple channels
-    """
-    combined = np.zeros(len(data_list[0]))
-    for i, data in enumerate(data_list):
-        combined = combined + (np.array(data) * DE[channel_name[i]][2])
-    delta_e = DE[channel_name[-1]][0] - DE[channel_name[0]][1]
-    final = list(combined / delta_e)
-    for i in range(len(final)):
-        if final[i] < 0: #: Prevent from computing with missing data value
-            final[i] = -1e5
-    return final
+    return adjust_format(val) + "\t\t"
+
 def adjust_format(val):
 
     val = float(val)
@@ -634,8 +433,9 @@ if __name__ == "__main__":
             GOES_DATA_DIR = OUT_DIR
             HTML_GOES_DIR = f"{OUT_DIR}/GOES"
 
+        goes_store.STORE_DIR = f"{OUT_DIR}/Store"
         if args.json:
-            DLINK = args.json
+            DFEED = args.json
         
         #: Refresh GOES css
         os.system(f"cp {GOES_TEMPLATE_DIR}/goes.css {HTML_GOES_DIR}")
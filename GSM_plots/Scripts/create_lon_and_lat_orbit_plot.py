@@ -7,7 +7,7 @@
 #                                                                               #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                           #
 #                                                                               #
-#           last update: Mar 16, 2021                                           #
+#           last update: Oct 16, 2026                                           #
 #                                                                               #
 #################################################################################
 
@@ -48,10 +48,12 @@ if (os.getenv('TEST') == 'TEST'):
 #--- append  pathes to private folders to a python directory
 #
 sys.path.append('/data/mta4/Script/Python3.10/MTA/')
+sys.path.append(ephem_dir + 'Scripts/')
 #
 #--- import several functions
 #
 import mta_common_functions as mcf
+import time_join            as tjn
 #
 #--- temp writing file name
 #
@@ -233,49 +235,28 @@ def read_region_data(time_list):
         atemp = re.split('\s+', ent)
         ctime.append(float(atemp[0]))
         region.append(int(float(atemp[1])))
+    region = numpy.array(region, dtype=int)
+    clen   = len(ctime)
 #
-#--- compare two time list and find which region satellite is in
-#
-    color = []
-    start = 0
-    clen  = len(ctime)
-    chk   = 0
-    for otime in time_list:
-        for k in range(start, clen):
-            k1 = k + 1
-            if k1 >= clen:
-                chk = 1
-                break
+#--- find the region entry in effect at each time; the times after the last
+#--- entry are handled below
+#
+    pos    = tjn.asof_index(ctime, time_list, 'previous')
+    after  = numpy.nonzero(pos >= clen - 1)[0]
+    nin    = after[0] if len(after) > 0 else len(pos)
+    pos    = pos[:nin]
+    reg    = region[numpy.maximum(pos, 0)] if clen > 0 else pos
 #
 #--- if the region list could not cover the first part of the time list, use color "white"
 #
-            if k == 0 and otime < ctime[k]:
-                color.append('white')
-                break
-
-            elif otime >=ctime[k] and otime < ctime[k1]:
-                if region[k] == 1:
-                    color.append('aqua')
-                elif region[k] == 2:
-                    color.append('fuchsia')
-                else:
-                    color.append('yellow')
-                start = k - 5
-                if start < 0:
-                    start = 0
-                break
-            else:
-                continue
-
-        if chk > 0:
-            break
+    color  = numpy.where(pos < 0, 'white', numpy.where(reg == 1, 'aqua',\
+                         numpy.where(reg == 2, 'fuchsia', 'yellow'))).tolist()
 #
 #--- if the color list was not be filled, use the last region color to fill
 #
-    if len(color) < len(time_list):
-        lcolor = color[-1]
-        for k in range(len(color), len(time_list)):
-            color.append(lcolor)
+    if nin < len(time_list):
+        lcolor = color[-1] if nin > 0 else 'white'
+        color  = color + [lcolor] * (len(time_list) - nin)
 
     return color
 
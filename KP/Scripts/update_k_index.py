@@ -6,7 +6,7 @@
 #                                                                                   #
 #               author: t. isobe (tisobe@cfa.harvard.edu)                           #
 #                                                                                   #
-#               last updae: Mar 16, 2021                                            #
+#               last updae: Oct 16, 2026                                            #
 #                                                                                   #
 #####################################################################################
 
@@ -41,6 +41,16 @@ if (os.getenv('TEST') == 'TEST'):
     os.system('mkdir -p TestOut')
     test_out = os.getcwd() + '/TestOut'
 #
+#--- shared on-disk cache of the web feeds
+#
+sys.path.append(goes_dir + 'Scripts/')
+import feed_cache as fcache
+#
+#--- append-only text archive
+#
+sys.path.append(ephem_dir + 'Scripts/')
+import text_archive as tarc
+#
 #--- temp writing file name
 #
 rtail  = int(time.time() * random.random())
@@ -82,7 +92,7 @@ def update_k_index(hname=''):
 #--- find the last entry time of the observed kp list
 #
     try:
-        data   = read_data_file(d_file_p)
+        data   = tarc.read_last(d_file_p)
         atemp  = re.split('\s+', data[-1])
         l_time = int(atemp[0])
     except:
@@ -94,42 +104,37 @@ def update_k_index(hname=''):
     #for writing out files in test directory
     if (os.getenv('TEST') == 'TEST'):
         appendfile = test_out + "/" + os.path.basename(appendfile)
-    with open(appendfile, 'a') as fo:
-        for k in range(0, len(t_list)):
-            if t_list[k] > l_time:
-                line = str(t_list[k]) + '\t' + str(k_list[k]) + '\n'
-                fo.write(line)
-#
-#--- replace a "predictive" list with the observed list
-#
-    cmd = 'cp -f ' + d_file_p + ' ' + d_file
-    os.system(cmd)
+    line = ''
+    for k in range(0, len(t_list)):
+        if t_list[k] > l_time:
+            line = line + str(t_list[k]) + '\t' + str(k_list[k]) + '\n'
+
+    tarc.append_text(appendfile, line)
 #
 #--- add predicted part
 #
     [t_list2, k_list2] = futre_k_index(f_k_index)
-    appendfile = d_file
-    #for writing out files in test directory
-    if (os.getenv('TEST') == 'TEST'):
-        appendfile = test_out + "/" + os.path.basename(appendfile)
-    with open(appendfile, 'a') as fo:
-        for k in range(0, len(t_list2)):
-            if t_list2[k] > t_list[-1]:
-                line = str(t_list2[k]) + '\t' + str(k_list2[k]) + '\n'
-                fo.write(line)
+    line = ''
+    for k in range(0, len(t_list2)):
+        if t_list2[k] > t_list[-1]:
+            line = line + str(t_list2[k]) + '\t' + str(k_list2[k]) + '\n'
 #
 #--- add long term guss
 #
     [t_list3, k_list3] = get_long_term_kp()
-    appendfile = d_file
+    for k in range(0, len(t_list3)):
+        if t_list3[k] > t_list2[-1]:
+            line = line + str(t_list3[k]) + '\t' + str(k_list3[k]) + '\n'
+#
+#--- replace a "predictive" list with the observed list and the predicted part at once
+#
+    ofile = d_file
     #for writing out files in test directory
     if (os.getenv('TEST') == 'TEST'):
-        appendfile = test_out + "/" + os.path.basename(appendfile)
-    with open(appendfile, 'a') as fo:
-        for k in range(0, len(t_list3)):
-            if t_list3[k] > t_list2[-1]:
-                line = str(t_list3[k]) + '\t' + str(k_list3[k]) + '\n'
-                fo.write(line)
+        ofile = test_out + "/" + os.path.basename(ofile)
+    pfile = appendfile if os.path.isfile(appendfile) else d_file_p
+    with open(pfile, 'rb') as f:
+        tarc.commit_file(ofile, f.read() + line.encode())
 
 #-----------------------------------------------------------------------------------
 #-- get_file: read the data from source and lists of time and k index             --
@@ -146,10 +151,7 @@ def get_file(hname):
 #--- read the web data; we assume the data is something like:
 #--- 80803  1- 1o 1o 2+  2o 1+ 0+ 1-    9+      5 0.2
 #
-    cmd = 'wget -q -O ' + zspace + ' ' + hname
-    os.system(cmd)
-
-    data = read_data_file(zspace, remove=1)
+    data = read_web_data(hname)
 
     t_list = []
     k_list = []
@@ -188,6 +190,23 @@ def get_file(hname):
 
     return [t_list, k_list]
 
+#-----------------------------------------------------------------------------------
+#-- read_web_data: read the web data through the shared feed cache                --
+#-----------------------------------------------------------------------------------
+
+def read_web_data(link):
+    """
+    read the web data through the shared feed cache
+    input:  link    --- web address
+    output: data    --- a list of the data; empty if the data cannot be read
+    """
+    try:
+        text = fcache.fetch_text(link)
+    except Exception:
+        return []
+
+    return [line.strip() for line in text.splitlines()]
+
 #-----------------------------------------------------------------------------------
 #-- read_data_file: read data file                                                --
 #-----------------------------------------------------------------------------------
@@ -250,10 +269,7 @@ def futre_k_index(hname):
 #
 #--- download the file and read it
 #
-    cmd = 'wget -q -O ' + zspace + ' ' + hname
-    os.system(cmd)
-
-    data = read_data_file(zspace, remove=1)
+    data = read_web_data(hname)
 
     t_list = []
     k_list = []
@@ -348,10 +364,7 @@ def get_long_term_kp():
     """
 #--- download the file and read it
 #
-    cmd = 'wget -q -O ' + zspace + ' ' + l_k_index
-    os.system(cmd)
-
-    data = read_data_file(zspace, remove=1)
+    data = read_web_data(l_k_index)
 
     t_list  = []
     kp_list = []
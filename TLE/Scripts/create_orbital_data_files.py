@@ -4,7 +4,7 @@
 
 :Author: t. isobe (tisobe@cfa.harvard.edu)
 :Maintenance: W. Aaron (william.aaron@cfa.harvard.edu)
-:Last Updated: Feb 20, 2025
+:Last Updated: Oct 16, 2026
 
 """
 import sys
@@ -14,13 +14,11 @@ import time
 import math
 import numpy
 from cxotime import CxoTime
-from datetime import datetime, timezone
 import calendar
 import argparse
 import getpass
 import signal
 import traceback
-import urllib.request
 
 #
 # --- Define Directory Pathing
@@ -31,12 +29,17 @@ TLE_DATA_DIR = "/data/mta4/Space_Weather/TLE/Data"
 # --- append paths to private folders to a python directory
 #
 sys.path.append("/data/mta4/Script/Python3.12")
+sys.path.append("/data/mta4/Space_Weather/EPHEM/Scripts")
+sys.path.append("/data/mta4/Space_Weather/GOES/Scripts")
 #
 # --- import several functions
 #
-from geopack import geopack
 from sgp4.api import Satrec, jday
 from astLib import astCoords
+import coord_transform as ctr  #: array versions of the geopack coordinate conversions
+import table_format as tfmt  #: fixed width table formatter
+import feed_cache  #: shared on-disk cache of the web feeds
+import time_convert as tcnv  #: vectorized time conversion
 
 STATS = ["cxo", "xmm"]  #: Satellite list
 EARTH = 6371.0  #: Earth radius (neither equatorial nor polar)
@@ -44,6 +47,7 @@ R2D = 180.0 / math.pi  #: radian to degree conversion factor
 CURRENT_CHANDRA_TIME = CxoTime()
 TLE_URL = "http://www.celestrak.com/NORAD/elements/science.txt"  #: a list of satellite orbital data on web
 COORD_SYS = "2000"  #: J2000 coordinate system
+TLE_TTL = 7200  #: CelesTrak updates the elements a few times a day; check at most every 2 hours
 
 
 def create_orbital_data_files():
@@ -262,35 +266,34 @@ def create_time_list(day_before, day_after, interval):
     stop = CURRENT_CHANDRA_TIME.secs + day_after * 86400.0
     steps = int((stop - start) / interval) + 1
 
+    #
+    # --- convert all steps at once; the fractional part of seconds is removed
+    #
+    secs = start + interval * numpy.arange(steps)
+    date_list = [atime[:17] for atime in tcnv.secs_to_date(secs)]
+    uts = tcnv.date_to_uts(date_list)
+    #
+    # --- calendar date of each step for the julian dates
+    #
+    dtm = uts.astype("datetime64[s]")
+    day = dtm.astype("datetime64[D]")
+    month = dtm.astype("datetime64[M]")
+    sec = (dtm - day).astype(numpy.int64)
+    year = (dtm.astype("datetime64[Y]").astype(numpy.int64) + 1970).tolist()
+    mon = (month.astype(numpy.int64) % 12 + 1).tolist()
+    mday = ((day - month.astype("datetime64[D]")).astype(numpy.int64) + 1).tolist()
+    hh = (sec // 3600).tolist()
+    mm = (sec // 60 % 60).tolist()
+    ss = (sec % 60).tolist()
+
     jd_list = []
     fr_list = []
-    uts_list = []
-    date_list = []
     for k in range(0, steps):
-        atime = start + interval * k
-        atime = CxoTime(atime).date
-        atemp = re.split(r"\.", atime)  # --- remove fractional part of seconds
-        atime = atemp[0]
-        date_list.append(atime)
-
-        atime = time.strftime(
-            "%Y:%m:%d:%H:%M:%S", time.strptime(atime, "%Y:%j:%H:%M:%S")
-        )
-        atime = re.split(":", atime)
-        year = int(float(atime[0]))
-        mon = int(float(atime[1]))
-        day = int(float(atime[2]))
-        hh = int(float(atime[3]))
-        mm = int(float(atime[4]))
-        ss = int(float(atime[5]))
-
-        jd, fr = jday(year, mon, day, hh, mm, ss)
-
+        jd, fr = jday(year[k], mon[k], mday[k], hh[k], mm[k], ss[k])
         jd_list.append(jd)
         fr_list.append(fr)
 
-        uts = ut_in_secs(year, mon, day, hh, mm, ss)
-        uts_list.append(uts)
+    uts_list = uts.tolist()
 
     return date_list, jd_list, fr_list, uts_list
 
@@ -337,8 +340,7 @@ def get_orbit_elements():
     #
     # --- download the data and read it
     #
-    with urllib.request.urlopen(TLE_URL) as f:
-        data = [line.strip().decode() for line in f.readlines()]
+    data = [line.strip() for line in feed_cache.fetch_text(TLE_URL, ttl=TLE_TTL).splitlines()]
     #
     # --- find the data of cxo and xmm
     #
@@ -543,87 +545,61 @@ def convert_to_gsm(sat):
     with open(ifile) as f:
         data = [line.strip() for line in f.readlines()]
     #
-    # --- there are two files to create
+    # --- separate the time and the satellite postion (in km) columns
     #
-    line1 = ""
-    line2 = ""
+    gtime = []
+    cols = []
     for ent in data:
-        #
-        # --- find time in seconds from 1970.1.1 to set the environment
-        #
         atemp = re.split(r"\s+", ent)
-        gtime = float(atemp[0])
-        year = float(atemp[-6])
-        mon = float(atemp[-5])
-        day = float(atemp[-4])
-        hh = float(atemp[-3])
-        mm = float(atemp[-2])
-        ss = float(atemp[-1])
-
-        uts = ut_in_secs(year, mon, day, hh, mm, ss)
-        psi = geopack.recalc(uts) #: Despite not being used, a bug in geopack.geigeo does not initialize the cgst variable correctly without running this first :(
-        #
-        # --- get the satellite postion in x, y, z
-        #
-        x = float(atemp[1]) / 1.0e3
-        y = float(atemp[2]) / 1.0e3
-        z = float(atemp[3]) / 1.0e3
-        #
-        # --- converts equatorial inertial (gei) to geographical (geo) coords
-        #
-        xgeo, ygeo, zgeo = geopack.geigeo(x, y, z, 1)
-        #
-        # --- converts geographic (geo) to geocentric solar magnetospheric (gsm) coordinates
-        #
-        xgsm, ygsm, zgsm = geopack.geogsm(xgeo, ygeo, zgeo, 1)
-        #
-        # --- convert magnetosperic (gsm) to gse
-        #
-        xgse, ygse, zgse = geopack.gsmgse(xgsm, ygsm, zgsm, 1)
-        #
-        # --- convert to spherical coordinates
-        #
-        r, tgsm, pgsm = geopack.sphcar(xgsm, ygsm, zgsm, -1)
-        tgsm *= R2D
-        pgsm *= R2D
-        if pgsm > 180.0:
-            pgsm -= 360.0
-
-        r, tgse, pgse = geopack.sphcar(xgse, ygse, zgse, -1)
-        tgse *= R2D
-        pgse *= R2D
-        if pgse > 180.0:
-            pgse -= 360.0
-        #
-        # --- convert them in the Earth radius unit
-        #
-        xgsm /= EARTH
-        ygsm /= EARTH
-        zgsm /= EARTH
-        xgse /= EARTH
-        ygse /= EARTH
-        zgse /= EARTH
-
-        line1 = line1 + "%12.1f%10.2f%8.2f%8.2f%8.2f%8.2f%12.6f%3d%3d%3d%3d%3d\n" % (
-            gtime,
-            r,
-            tgsm,
-            pgsm,
-            tgse,
-            pgse,
-            year,
-            mon,
-            day,
-            hh,
-            mm,
-            ss,
-        )
-
-        line2 = (
-            line2
-            + "%12.1f%11.6f%11.6f%11.6f%11.6f%11.6f%11.6f%12.6f%3d%3d%3d%3d%3d\n"
-            % (gtime, xgsm, ygsm, zgsm, xgse, ygse, zgse, year, mon, day, hh, mm, ss)
-        )
+        gtime.append(float(atemp[0]))
+        cols.append([float(val) for val in atemp[1:4] + atemp[-6:]])
+    cols = numpy.array(cols).reshape(len(gtime), 9)
+    x = cols[:, 0] / 1.0e3
+    y = cols[:, 1] / 1.0e3
+    z = cols[:, 2] / 1.0e3
+    year, mon, day, hh, mm, ss = cols[:, 3:].T
+    #
+    # --- find time in seconds from 1970.1.1 to set the environment
+    #
+    uts = ut_in_secs(year, mon, day, hh, mm, ss)
+    #
+    # --- convert equatorial inertial (gei) to geocentric solar magnetospheric (gsm)
+    # --- and gse coordinates for all positions at once
+    #
+    xgsm, ygsm, zgsm, xgse, ygse, zgse = ctr.gei_to_gsm(uts, x, y, z)
+    #
+    # --- convert to spherical coordinates
+    #
+    r, tgsm, pgsm = ctr.car_to_sph(xgsm, ygsm, zgsm)
+    tgsm = tgsm * R2D
+    pgsm = pgsm * R2D
+    pgsm = numpy.where(pgsm > 180.0, pgsm - 360.0, pgsm)
+
+    r, tgse, pgse = ctr.car_to_sph(xgse, ygse, zgse)
+    tgse = tgse * R2D
+    pgse = pgse * R2D
+    pgse = numpy.where(pgse > 180.0, pgse - 360.0, pgse)
+    #
+    # --- convert them in the Earth radius unit
+    #
+    xgsm = xgsm / EARTH
+    ygsm = ygsm / EARTH
+    zgsm = zgsm / EARTH
+    xgse = xgse / EARTH
+    ygse = ygse / EARTH
+    zgse = zgse / EARTH
+    #
+    # --- there are two files to create
+    #
+    tcols = [year, mon, day, hh, mm, ss]
+    line1 = tfmt.render_table(
+        ["%12.1f", "%10.2f", "%8.2f", "%8.2f", "%8.2f", "%8.2f", "%12.6f"] + ["%3d"] * 5,
+        [gtime, r, tgsm, pgsm, tgse, pgse] + tcols,
+    )
+    line2 = tfmt.render_table(
+        ["%12.1f"] + ["%11.6f"] * 6 + ["%12.6f"] + ["%3d"] * 5,
+        [gtime, xgsm, ygsm, zgsm, xgse, ygse, zgse] + tcols,
+    )
     #
     # --- print out the results
     #
@@ -652,16 +628,9 @@ def ut_in_secs(year, mon, day, hh, mm, ss):
     :param ss: seconds
     :type ss: str, int,float
     :return: UT in seconds from 1970.1.1
-    :rtype: float
+    :rtype: float, numpy.ndarray
     """
-    year = int(float(year))
-    mon = int(float(mon))
-    day = int(float(day))
-    hh = int(float(hh))
-    mm = int(float(mm))
-    ss = int(float(ss))
-
-    uts = datetime(year,mon,day,hh,mm,ss, tzinfo=timezone.utc).timestamp()
+    uts = tcnv.ut_in_secs(year, mon, day, hh, mm, ss)
 
     return uts
 
@@ -6,7 +6,7 @@
 #                                                                                               #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                                           #
 #                                                                                               #
-#           last update: Mar 16, 2021                                                           #
+#           last update: Oct 16, 2026                                                           #
 #                                                                                               #
 #################################################################################################
 
@@ -16,12 +16,8 @@ import string
 import re
 import time
 import math
-import Chandra.Time
-from datetime import datetime
 import numpy
 
-sys.path.append('/data/mta4/Script/Python3.10/lib/python3.10/site-packages')
-from geopack import geopack
 #
 #--- reading directory list
 #
@@ -49,7 +45,10 @@ sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
 #--- import several functions
 #
 import mta_common_functions as mcf
+import time_convert         as tcnv  #---- vectorized time conversion
+import time_join            as tjn   #---- time series matching
 import convert_coord        as ecc
+import coord_transform      as ctr
 #
 #--- temp writing file name
 #
@@ -141,7 +140,7 @@ def read_gsm(satellite):
     xgse  = []
     ygse  = []
     zgse  = []
-    alt   = []
+    gsm   = []
     for ent in data:
         atemp = re.split('\s+', ent)
 #
@@ -171,14 +170,15 @@ def read_gsm(satellite):
 #
         uts = ut_in_secs(year, mon, day, hh, mm, ss)
         utime.append(uts)
-        psi = geopack.recalc(uts)
+        gsm.append([float(atemp[1]), float(atemp[2]), float(atemp[3])])
 #
-#--- compute altitude
+#--- compute altitude; convert gsm back to gei for all positions at once
 #
-        xgeo, ygeo, zgeo = geopack.geogsm(float(atemp[1]), float(atemp[2]), float(atemp[3]), -1)
-        x, y , z = geopack.geigeo(xgeo, ygeo, zgeo, -1)
-        r = math.sqrt(x*x + y*y + z*z) * 1.e3
-        alt.append(r)
+    gsm   = numpy.array(gsm).reshape(len(utime), 3)
+    mat   = ctr.get_matrices(utime)
+    xgeo, ygeo, zgeo = ctr.geo_to_gsm(mat, gsm[:, 0], gsm[:, 1], gsm[:, 2], -1)
+    x, y, z = ctr.gei_to_geo(mat, xgeo, ygeo, zgeo, -1)
+    alt   = numpy.sqrt(x*x + y*y + z*z) * 1.e3
 
     return [atime, utime, xgsm, ygsm, zgsm, xgse, ygse, zgse, alt]
 
@@ -198,16 +198,19 @@ def write_region_data(xtime, utime,  nkps, xgsm, ygsm, zgsm, alt,  sat):
             sat             --- either xmm or cxo
     output: <xmm_dir>/Data/crmreg_<sat>.dat
     """
+#
+#--- find the location ids of all positions at once (locreg does not use geopack)
+#
+    xtail, ytail, ztail, lids = ecc.locreg_array(nkps, xgsm, ygsm, zgsm)
+
     line = ''
     for k in range(0, len(xtime)):
-        psi = geopack.recalc(utime[k])
-        xtail, ytail, ztail, lid = ecc.locreg(nkps[k], xgsm[k], ygsm[k], zgsm[k])
         line = line + '%9d'   % xtime[k] + '\t' 
         line = line + '%3.3f' % alt[k]   + '\t'
         line = line + '%3.3f' % xgsm[k]  + '\t'
         line = line + '%3.3f' % ygsm[k]  + '\t'
         line = line + '%3.3f' % zgsm[k]  + '\t'
-        line = line + '%4d'   % lid      + '\n'
+        line = line + '%4d'   % lids[k]  + '\n'
 
     ofile = xmm_dir + 'Data/crmreg_' + sat + '.dat'
     #for writing out files in test directory
@@ -227,26 +230,12 @@ def match_kp(ktime, xtime, kps):
             xtime   --- a list of time 
             kps     --- a list of kp values
     output: nkps    --- a list of kp values matched to xtime list
+                        (the kp in effect at the time; the first kp before the kp data)
     """
-    klen  = len(ktime)
-    nkps  = []
-    start = 0
-    for etime in xtime:
-        for m in range(start, klen):
-            if m + 1 >= klen:
-                nkps.append(kps[-1])
-                break
-
-            if ktime[m] < etime:
-                continue
-            elif etime >= ktime[m] and etime < ktime[m+1]:
-                nkps.append(kps[m])
-                start = m - 5
-                if start < 0:
-                    start = 0
-                break
-
-    return nkps
+    pos  = tjn.asof_index(ktime, xtime, 'previous')
+    nkps = numpy.asarray(kps, dtype=float)[numpy.maximum(pos, 0)]
+
+    return nkps.tolist()
 
 #---------------------------------------------------------------------------------------
 #-- ut_in_secs: onvert calendar date into univarsal time in sec                       --
@@ -263,15 +252,7 @@ def ut_in_secs(year, mon, day, hh, mm, ss):
     ss  --- seconds
     output:uts  --- UT in seconds from 1970.1.1
     """
-    year = int(float(year))
-    mon  = int(float(mon))
-    day  = int(float(day))
-    hh   = int(float(hh))
-    mm   = int(float(mm))
-    ss   = int(float(ss))
-    
-    uts  = (datetime(year, mon, day, hh, mm, ss)\
-                        - datetime(1970,1,1)).total_seconds()
+    uts  = tcnv.ut_in_secs(year, mon, day, hh, mm, ss)
     uts += 86400.0
 
     return uts
@@ -291,10 +272,7 @@ def convert_to_chandra(year, mon, day, hh, mm, ss):
             ss  --- seconds
     output: ctime --- seconds from 1998.1.1
     """
-    line = str(year) + ':' + str(mon) + ':' + str(day) + ':' 
-    line = line + str(hh) + ':' + str(mm) + ':' + str(ss)
-    line = time.strftime('%Y:%j:%H:%M:%S', time.strptime(line, '%Y:%m:%d:%H:%M:%S'))
-    ctime = Chandra.Time.DateTime(line).secs
+    ctime = tcnv.uts_to_secs(tcnv.ut_in_secs(year, mon, day, hh, mm, ss))
 
     return ctime
 
@@ -6,7 +6,7 @@
 #                                                                                               #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                                           #
 #                                                                                               #
-#           last update: Mar 16, 2021                                                           #
+#           last update: Oct 16, 2026                                                           #
 #                                                                                               #
 #################################################################################################
 
@@ -16,8 +16,6 @@ import string
 import re
 import time
 import math
-import Chandra.Time
-from datetime import datetime
 #import astropy.io.fits  as pyfits
 import numpy
 import matplotlib as mpl
@@ -54,10 +52,13 @@ if (os.getenv('TEST') == 'TEST'):
 #--- append  pathes to private folders to a python directory
 #
 sys.path.append('/data/mta4/Script/Python3.10/MTA/')
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
 #
 #--- import several functions
 #
 import mta_common_functions as mcf
+import time_convert         as tcnv  #---- vectorized time conversion
+import time_join            as tjn   #---- time series matching
 #
 #--- temp writing file name
 #
@@ -380,15 +381,7 @@ def ut_in_secs(year, mon, day, hh, mm, ss):
     ss  --- seconds
     output:uts  --- UT in seconds from 1970.1.1
     """
-    year = int(float(year))
-    mon  = int(float(mon))
-    day  = int(float(day))
-    hh   = int(float(hh))
-    mm   = int(float(mm))
-    ss   = int(float(ss))
-    
-    uts  = (datetime.datetime(year, mon, day, hh, mm, ss) \
-                    - datetime.datetime(1970,1,1)).total_seconds()
+    uts  = tcnv.ut_in_secs(year, mon, day, hh, mm, ss)
     uts += 86400.0
     return uts
 
@@ -482,42 +475,24 @@ def crm_region(ifile, xtime):
         out   = chandra_to_ut_in_sec(atemp[0])
         ctime.append(out)
         area.append(float(ent[-1]))
+    area  = numpy.array(area)
+    clen  = len(ctime)
 #
-#--- match the current list of time
+#--- match the current list of time; the region entry in effect at each time
 #
-    color = []
-    start = 0
-    chk   = 0
-    for x in xtime:
-        if chk == 1:
-            break
+    pos   = tjn.asof_index(ctime, xtime, 'previous')
+    out   = numpy.nonzero((pos < 0) | (pos >= clen - 1))[0]
+    nin   = out[0] if len(out) > 0 else len(pos)
+    reg   = area[numpy.maximum(pos[:nin], 0)] if clen > 0 else pos[:nin]
 
-        for m in range(start, len(ctime)):
-            comp  = ctime[m]
-            m1 = m + 1
-            if m1 < len(ctime):
-                comp2 = ctime[m1]
-            else:
-                chk = 1
-                break
-            if x >= comp and x < comp2:
-                if area[m] == 1:
-                    color.append('greenyellow')
-                elif area[m] == 2:
-                    color.append('darkturquoise')
-                else:
-                    color.append('yellow')
-                start = m - 5
-                if start < 0:
-                    start = 0
-                break
+    color = numpy.where(reg == 1, 'greenyellow', numpy.where(reg == 2, 'darkturquoise', 'yellow'))
+    color = color.tolist()
 #
 #--- if the region data is shorter than time data, just fill with the last color entry
 #
-    if chk > 0:
-        k = len(color)
-        for m in range(k, len(xtime)):
-            color.append(color[k-1])
+    if nin < len(xtime):
+        lcolor = color[-1] if nin > 0 else 'white'
+        color  = color + [lcolor] * (len(xtime) - nin)
 
     return color
 
@@ -531,11 +506,9 @@ def chandra_to_ut_in_sec(ctime):
     input:  ctime   --- chandra time (seconds from 1998.1.1)
     output: out     --- ut in seconds from 1970.1.1
     """
-    out   = Chandra.Time.DateTime(ctime).date
-    btemp = re.split('\.', out)
-    out   = time.strftime('%Y:%m:%d:%H:%M:%S', time.strptime(btemp[0], '%Y:%j:%H:%M:%S'))
-    [year, mon, day , hh, mm, ss] = re.split(':', out)
-    out = ut_in_secs(year, mon, day, hh, mm, ss)
+    out   = tcnv.secs_to_date(float(ctime))
+    out   = tcnv.date_to_uts(out[:17])          #--- drop the fractional part of seconds
+    out  += 86400.0
 
     return out
 
@@ -6,7 +6,7 @@
 #                                                                                               #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                                           #
 #                                                                                               #
-#           last update: Mar 16, 2021                                                           #
+#           last update: Oct 16, 2026                                                           #
 #                                                                                               #
 #################################################################################################
 
@@ -54,10 +54,12 @@ if (os.getenv('TEST') == 'TEST'):
 #--- append  pathes to private folders to a python directory
 #
 sys.path.append('/data/mta4/Script/Python3.10/MTA/')
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
 #
 #--- import several functions
 #
 import mta_common_functions as mcf
+import time_convert         as tcnv  #---- vectorized time conversion
 #
 #--- temp writing file name
 #
@@ -383,10 +385,7 @@ def convert_to_chandra(year, mon, day, hh, mm, ss):
             ss  --- seconds
     output: ctime --- seconds from 1998.1.1
     """
-    line = str(year) + ':' + str(mon) + ':' + str(day) + ':' 
-    line = line + str(hh) + ':' + str(mm) + ':' + str(ss)
-    line = time.strftime('%Y:%j:%H:%M:%S', time.strptime(line, '%Y:%m:%d:%H:%M:%S'))
-    ctime = Chandra.Time.DateTime(line).secs
+    ctime = tcnv.uts_to_secs(tcnv.ut_in_secs(year, mon, day, hh, mm, ss))
 
     return ctime
 
@@ -6,7 +6,7 @@
 #                                                                                               #
 #           author: t. isobe (tisobe@cfa.harvard.edu)                                           #
 #                                                                                               #
-#           last update: Mar 16, 2021                                                           #
+#           last update: Oct 16, 2026                                                           #
 #                                                                                               #
 #################################################################################################
 
@@ -19,7 +19,6 @@ import math
 import Chandra.Time
 from datetime import datetime
 import numpy
-from subprocess import Popen, PIPE
 #
 #--- reading directory list
 #
@@ -42,10 +41,14 @@ if (os.getenv('TEST') == 'TEST'):
 #--- append  pathes to private folders to a python directory
 #
 sys.path.append('/data/mta4/Script/Python3.10/MTA/')
+sys.path.append('/data/mta4/Space_Weather/EPHEM/Scripts/')
 #
 #--- import several functions
 #
 import mta_common_functions as mcf
+import time_convert         as tcnv  #---- vectorized time conversion
+import table_format         as tfmt  #---- fixed width table formatter
+import text_archive         as tarc  #---- append-only text archive
 #
 #--- temp writing file name
 #
@@ -63,6 +66,10 @@ m_list = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct',
 #--- xmm data html
 #
 xmm_file = 'https://xmm-tools.cosmos.esa.int/external/xmm_obs_info/radmon/plots/radmon_02h.dat'
+#
+#--- the bin size of xmm_7day.archive2 in seconds
+#
+bin_size = 300.0
 
 #--------------------------------------------------------------------------
 #-- update_xmm_rad_data: update xmm radiation flux database              --
@@ -82,25 +89,11 @@ def update_xmm_rad_data():
     current_chandra_time = Chandra.Time.DateTime(current_time_date).secs
     d7ago                = current_chandra_time - 7 * 86400.0
 #
-#--- backup the data file
+#--- the last entry time of the data set
 #
     ifile = xmm_dir + 'Data/xmm_7day.archive2'
-    ofile = ifile + '~'
-    cmd   = 'rm -rf ' + ofile
-    os.system(cmd)
-    cmd   = 'cp ' + ifile + ' ' + ofile
-    os.system(cmd)
-#
-#--- read the data set and remove older data
-#
-    data  = mcf.read_data_file(ifile)
+    stime = xmm_line_time(tarc.read_last(ifile)[0])
     line  = ''
-    for ent in data:
-        atemp = re.split('\s+', ent)
-        stime = float(atemp[0])
-        if stime < d7ago:
-            continue
-        line = line + ent + '\n'
 #
 #--- read the current data and append the data
 #
@@ -110,51 +103,144 @@ def update_xmm_rad_data():
 
     cmd = 'wget -q -O' + ofile + ' ' + xmm_file
     os.system(cmd)
-    data  = mcf.read_data_file(ofile)
+    [ctime, rows] = read_radmon_data(ofile)
+#
+#--- use only the data newer than the last entry; the data are binned into bin_size
+#--- intervals (the last interval, which may not be completed yet, is not used)
+#
+    keep  = numpy.nonzero(ctime > stime)[0]
+    ctime = ctime[keep]
+    if len(ctime) > 0:
+        vals   = numpy.array([rows[k][1:8] for k in keep], dtype=float)
+        starts = bin_starts(ctime, bin_size)
+        pos1   = numpy.array(starts[:-1], dtype=int)
+        pos2   = numpy.array(starts[1:],  dtype=int)
+        diff   = ctime[pos2] - ctime[pos1]
+        btime  = ctime[pos2] - 0.5 * diff
+        avg    = segment_means(vals, pos1, pos2 - pos1)
 
-    save = [0, 0, 0, 0, 0, 0, 0, 0]
-    chk  = 0
-    dcnt = 0
-    for ent in data:
-        atemp = re.split('\s+', ent)
-        ltime = atemp[0].replace('-', ':')
-        ctime = Chandra.Time.DateTime(ltime).secs
-        if ctime <= stime:
-            continue
+        spec   = ['%1.8e'] + ['%13.3f'] * 7
+        line   = line + tfmt.render_table(spec, [btime] + [avg[:, k] for k in range(0, 7)])
 
-        if chk == 0:
-            start = ctime
-            chk = 1
-        diff = ctime - start
-        if diff < 300:
-            for k in range(0, 7):
-                save[k] += float(atemp[k+1])
-            dcnt += 1
-        else:
-            line  = line + '%1.8e'  % (ctime - 0.5 * diff)
-            line  = line + '%13.3f' % (save[0] / dcnt)
-            line  = line + '%13.3f' % (save[1] / dcnt)
-            line  = line + '%13.3f' % (save[2] / dcnt)
-            line  = line + '%13.3f' % (save[3] / dcnt)
-            line  = line + '%13.3f' % (save[4] / dcnt)
-            line  = line + '%13.3f' % (save[5] / dcnt)
-            line  = line + '%13.3f' % (save[6] / dcnt) + '\n'
-
-            start = ctime
-            save  = [0, 0, 0, 0, 0, 0, 0, 0]
-            for k in range(0, 7):
-                save[k] += float(atemp[k+1])
-            dcnt  = 1
-#
-#--- update the data
-#
-    if line != '':
-        ofile = ifile
-        #for writing out files in test directory
-        if (os.getenv('TEST') == 'TEST'):
-            ofile = test_out + "/" + os.path.basename(ofile)
-        with open(ofile, 'w') as fo:
-            fo.write(line)
+#
+#--- append the new data and remove older data; the previous file is kept as <ifile>~
+#--- when the file is rewritten
+#
+    ofile = ifile
+    #for writing out files in test directory
+    if (os.getenv('TEST') == 'TEST'):
+        ofile = test_out + "/" + os.path.basename(ofile)
+        os.system('cp ' + ifile + ' ' + ofile)
+
+    tarc.update_window(ofile, line, xmm_line_time, start=d7ago, backup='~')
+
+#--------------------------------------------------------------------------
+#-- xmm_line_time: get the time of a data line                           --
+#--------------------------------------------------------------------------
+
+def xmm_line_time(line):
+    """
+    get the time of a data line of xmm_7day.archive2, xmm.archive, and mta_xmm_db.dat
+    input:  line    --- data line
+    output: time in seconds from 1998.1.1
+    """
+    return float(re.split('\s+', line.strip())[0])
+
+#--------------------------------------------------------------------------
+#-- read_radmon_data: read radmon data and convert the time at once      --
+#--------------------------------------------------------------------------
+
+def read_radmon_data(ifile):
+    """
+    read radmon data and convert the time at once
+    input:  ifile   --- radmon data file (radmon_02h.dat)
+    output: ctime   --- numpy array of time in seconds from 1998.1.1
+            rows    --- a list of the data columns of each line
+    """
+    data  = mcf.read_data_file(ifile)
+    rows  = [re.split('\s+', ent) for ent in data]
+    ltime = [atemp[0].replace('-', ':') for atemp in rows]
+#
+#--- if some time could not be read, convert them one by one with Chandra.Time
+#
+    try:
+        ctime = numpy.array(tcnv.date_to_secs(ltime), dtype=float)
+    except ValueError:
+        ctime = numpy.array([Chandra.Time.DateTime(ent).secs for ent in ltime], dtype=float)
+
+    return [ctime, rows]
+
+#--------------------------------------------------------------------------
+#-- bin_starts: find the starting positions of the bins                  --
+#--------------------------------------------------------------------------
+
+def bin_starts(ctime, width):
+    """
+    find the starting positions of the bins; a new bin starts at the first data
+    whose time is width or more after the start of the current bin
+    input:  ctime   --- numpy array of time
+            width   --- bin size in seconds
+    output: starts  --- a list of the starting positions of the bins
+    """
+    nrow = len(ctime)
+    if nrow == 0:
+        return []
+#
+#--- if the data are not in time order, check them one by one
+#
+    if (numpy.diff(ctime) < 0).any():
+        starts = [0]
+        for k in range(1, nrow):
+            if not (ctime[k] - ctime[starts[-1]] < width):
+                starts.append(k)
+        return starts
+#
+#--- the next bin start of each data; make the boundary the same as the test of
+#--- ctime[j] - ctime[i] < width
+#
+    idx  = numpy.arange(nrow)
+    nxt  = numpy.searchsorted(ctime, ctime + width, side='left')
+    while True:
+        back = (nxt > idx + 1) & (ctime[nxt - 1] - ctime >= width)
+        if not back.any():
+            break
+        nxt[back] -= 1
+
+    while True:
+        fwd = nxt < nrow
+        fwd[fwd] = ctime[nxt[fwd]] - ctime[fwd] < width
+        if not fwd.any():
+            break
+        nxt[fwd] += 1
+
+    nxt    = nxt.tolist()
+    starts = []
+    pos    = 0
+    while pos < nrow:
+        starts.append(pos)
+        pos = nxt[pos]
+
+    return starts
+
+#--------------------------------------------------------------------------
+#-- segment_means: compute the averages of the data segments             --
+#--------------------------------------------------------------------------
+
+def segment_means(vals, starts, counts):
+    """
+    compute the averages of the data segments; the values are added in the data
+    order so that the results are the same as the sums taken one by one
+    input:  vals    --- (data x column) numpy array
+            starts  --- numpy array of the starting positions of the segments
+            counts  --- numpy array of the numbers of the data in the segments
+    output: (segment x column) numpy array of the averages
+    """
+    sums = numpy.zeros((len(starts), vals.shape[1]))
+    for k in range(0, int(counts.max(initial=0))):
+        sel = counts > k
+        sums[sel] += vals[starts[sel] + k]
+
+    return sums / numpy.maximum(counts, 1)[:, None]
 
 #--------------------------------------------------------------------------
 #--------------------------------------------------------------------------
@@ -215,9 +301,8 @@ def update_mta_xmm_db():
     #for writing out files in test directory
     if (os.getenv('TEST') == 'TEST'):
         ofile = test_out + "/" + os.path.basename(ofile)
-    with open(ofile, 'a') as fo:
-        fo.write(line)
-            
+    tarc.append_text(ofile, line)
+
 #--------------------------------------------------------------------------
 #-- find_the_last_entry_time: find the last entry time                   --
 #--------------------------------------------------------------------------
@@ -228,18 +313,13 @@ def find_the_last_entry_time(ifile):
     input:  ifile   --- data file name. assume that the time is the first entry
     output: stime   --- the last entry time
     """
-    p = Popen(['tail', '-1', ifile],shell=False, stderr=PIPE, stdout=PIPE)
-    res, err = p.communicate()
-    if err:
-        print(err.decode())
+    try:
+        stime = xmm_line_time(tarc.read_last(ifile)[0])
+    except OSError as err:
+        print(err)
+        stime = current_chandra_time - 1440.0
+    except:
         stime = current_chandra_time - 1440.0
-    else:
-        last_line = res.decode().strip()
-        atemp = re.split('\s+', last_line)
-        try:
-            stime = float(atemp[0])
-        except:
-            stime = current_chandra_time - 1440.0
 
     return stime
 
@@ -329,37 +409,22 @@ def update_xmm_archive():
     output: <xmm_dir>/Data/xmm.archive
     """
 #
-#--- copy the old data file
-#
-    ifile = xmm_dir + 'Data/xmm.archive'
-    cmd   = 'rm -rf ' + ifile + '~'
-    os.system(cmd)
-    cmd   = 'cp ' + ifile + ' ' + ifile + '~'
-    os.system(cmd)
-#
 #--- find the last entry time of xmm.archive
 #
+    ifile = xmm_dir + 'Data/xmm.archive'
     stime = find_the_last_entry_time(ifile)
 #
-#--- read xmm_7day data
+#--- read the new part of xmm_7day data and append it
 #
     sfile = xmm_dir + 'Data/xmm_7day.archive2'
-    data  = mcf.read_data_file(sfile)
-#
-#--- append the new part 
-#
-    line  = ''
-    for ent in data:
-        atemp = re.split('\s+', ent)
-        atime = float(atemp[0])
-        if atime > stime:
-            line = line + ent + '\n'
+    data  = tarc.read_after(sfile, stime, xmm_line_time)
+    line  = ''.join([ent + '\n' for ent in data])
+
     ofile = ifile
     #for writing out files in test directory
     if (os.getenv('TEST') == 'TEST'):
         ofile = test_out + "/" + os.path.basename(ofile)
-    with open(ofile , 'a') as fo:
-        fo.write(line)
+    tarc.append_text(ofile, line)
 
 #--------------------------------------------------------------------------
 #-- create_data_table_for_html: create a table for xmm html page         --
@@ -377,72 +442,34 @@ def create_data_table_for_html():
 #
     ifile = xmm_dir + 'Data/xmm_7day.archive2'
     data  = mcf.read_data_file(ifile)
+    cols  = numpy.array([re.split('\s+', ent)[:8] for ent in data], dtype=float).reshape(-1, 8)
 #
 #--- make the last one hour interval time table for the last 24 hours.
 #--- disp_time cnotains time in a display format at 30 min mark
 #
     [disp_time, cstart, cstop] = make_time_interval()
 #
-#--- now make one hour average data in that intervals
-#
-    line   = ''
-    dstart = 0
-    le1    = 0
-    le2    = 0
-    hes1   = 0
-    hes2   = 0
-    hesc   = 0
-    dcnt   = 0
-    for k in range(0, len(cstart)):
-        for m in range(dstart,len(data)):
-            atemp = re.split('\s+',data[m])
-            dtime = float(atemp[0])
-            if dtime < cstart[k]:
-                continue
-            elif dtime >= cstart[k] and dtime < cstop[k]:
-                le1  += float(atemp[2])
-                le2  += float(atemp[3])
-                hes1 += float(atemp[5])
-                hes2 += float(atemp[6])
-                hesc += float(atemp[7])
-                dcnt += 1
-            else:
+#--- now make one hour average data in that intervals; an interval is written
+#--- only when there are data after the interval
+#
+    dtime = cols[:, 0]
+    pos1  = numpy.searchsorted(dtime, cstart, side='left')
+    pos2  = numpy.searchsorted(dtime, cstop,  side='left')
+    done  = pos2 < len(dtime)
+    dcnt  = pos2 - pos1
+    avg   = segment_means(cols[:, [2, 3, 5, 6, 7]], pos1, numpy.where(done, dcnt, 0))
+
+    line  = ''
+    for k in numpy.nonzero(done)[0]:
 #
 #--- sometime, the data are totally missing; if so, display 'na'
 #
-                line = line + '' + disp_time[k] 
-                if dcnt == 0:
-                    line = line + '           na'
-                    line = line + '           na'
-                    line = line + '           na'
-                    line = line + '           na'
-                    line = line + '           na\n'
-                else:
-#
-#---- take an average and prep for the next interval
-#
-                    le1  /= dcnt
-                    le2  /= dcnt
-                    hes1 /= dcnt
-                    hes2 /= dcnt
-                    hesc /= dcnt
-                    line = line + '%13.3f' % le1
-                    line = line + '%13.3f' % le2
-                    line = line + '%13.3f' % hes1
-                    line = line + '%13.3f' % hes2
-                    line = line + '%13.3f' % hesc + '\n'
-
-                le1    = 0
-                le2    = 0
-                hes1   = 0
-                hes2   = 0
-                hesc   = 0
-                dcnt   = 0
-
-                dstart = m - 5
-                if dstart < 0:
-                    dstart = 0
-                break
+        line = line + disp_time[k]
+        if dcnt[k] == 0:
+            line = line + '           na' * 5 + '\n'
+        else:
+            line = line + '%13.3f%13.3f%13.3f%13.3f%13.3f' % tuple(avg[k].tolist()) + '\n'
+
 #
 #--- update the data  table
 #